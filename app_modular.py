@@ -5,21 +5,93 @@ Use the same Flask app object everywhere:
 - Deploy: ``gunicorn app_modular:app``
 
 This module builds the Flask app and registers all blueprints (core + migrated).
+
+Preloading (``APP_PRELOAD=1`` with the repo's gunicorn.conf.py): the master
+builds the app once, running boot DDL, seeding and job recovery, and every
+forked worker starts its own job worker and operations loop in
+``init_worker()``. ``STARTUP_PROFILE=1`` prints per-phase startup timings.
 """
 
 from __future__ import annotations
 
 import os
 import re
+import sys
+import time
+from contextlib import contextmanager
 
 from flask import Flask, g, jsonify, request
 from flask_cors import CORS
 
 from backend.config import config
 
+_TRUTHY = ("1", "true", "yes", "on")
+PRELOAD = os.getenv("APP_PRELOAD", "").lower() in _TRUTHY
+STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "").lower() in _TRUTHY
+_startup_phases: list[tuple[str, float, int]] = []
+
+
+@contextmanager
+def _startup_phase(name: str):
+    """Time one create_app() phase and count the modules it imported."""
+    modules = len(sys.modules)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _startup_phases.append((name, time.perf_counter() - started, len(sys.modules) - modules))
+
+
+def startup_profile() -> list[dict]:
+    return [
+        {"phase": name, "seconds": round(seconds, 4), "modules": modules}
+        for name, seconds, modules in _startup_phases
+    ]
+
+
+def start_background_services() -> None:
+    """Start this process's durable job worker and operations loop."""
+    # Start the durable job worker (DB-driven, restart-safe).
+    # Each Gunicorn process spawns a worker thread, but only one
+    # acquires the PostgreSQL advisory lock (leader election).
+    # Non-leaders exit immediately.
+    try:
+        from backend.services.job_worker import start_worker
+
+        start_worker()
+    except Exception as e:
+        print(f"[APP] Warning: Failed to start job worker: {e}")
+
+    # Start the operations loop (stall detection + stale sweep + rescue).
+    # Runs on all processes since it's idempotent and lightweight.
+    # Config-driven intervals from STALE_SWEEP_* and RESCUE_* env vars.
+    try:
+        from backend.services.job_worker import start_operations_loop
+
+        start_operations_loop()
+    except Exception as e:
+        print(f"[APP] Warning: Failed to start operations loop: {e}")
+
+
+def init_worker(app: Flask) -> None:
+    """Per-worker setup after forking from a preloading master.
+
+    Drops the DB pool, S3 client and job-worker identity inherited from the
+    master, then starts the background threads the master skipped.
+    """
+    from backend import db
+    from backend.services import job_worker, s3_service
+
+    db.reset_after_fork()
+    s3_service.reset_client()
+    job_worker.reset_after_fork()
+    if app.config["DB_RUNTIME_REPORT"]["ready"]:
+        start_background_services()
+
 
 def create_app() -> Flask:
     app = Flask(__name__)
+    _startup_phases.clear()
 
     # Initialize structured logging (must be before anything logs)
     try:
@@ -39,7 +111,8 @@ def create_app() -> Flask:
     from backend.db import get_runtime_report, init_db
 
     try:
-        init_db()
+        with _startup_phase("init_db"):
+            init_db()
     except Exception as e:
         print(f"[APP] Fatal database startup error: {e}")
         raise
@@ -109,6 +182,61 @@ def create_app() -> Flask:
         methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     )
 
+    # ── Request-scoped DB connection ──
+    # In the endpoints listed in DB_REQUEST_SCOPE_ENDPOINTS every
+    # get_conn()/transaction() shares one pooled connection (see
+    # backend.db.connection_scope). Other requests keep a checkout per block,
+    # so they don't hold a connection until teardown. Every request reports
+    # its query count and DB time in Server-Timing / X-DB-Queries.
+    _DB_REQUEST_SCOPE = os.getenv("DB_REQUEST_SCOPE", "true").lower() in ("true", "1", "yes")
+    _DB_SCOPE_ENDPOINTS = frozenset(
+        name.strip()
+        for name in os.getenv("DB_REQUEST_SCOPE_ENDPOINTS", "print_check.print_check").split(",")
+        if name.strip()
+    )
+
+    if _DB_REQUEST_SCOPE:
+        from backend.db import begin_scope, current_scope, end_scope
+
+        @app.before_request
+        def _db_scope_begin():
+            begin_scope(request.endpoint or request.path, share=request.endpoint in _DB_SCOPE_ENDPOINTS)
+
+        @app.after_request
+        def _db_scope_headers(response):
+            scope = current_scope()
+            if scope is not None and scope.queries:
+                response.headers["X-DB-Queries"] = str(scope.queries)
+                response.headers.add(
+                    "Server-Timing",
+                    f'db;dur={scope.db_ms:.1f};desc="{scope.queries} queries"',
+                )
+            return response
+
+        @app.teardown_request
+        def _db_scope_end(exc=None):
+            end_scope()
+
+    # ── Background admission control ──
+    # Request latency and in-flight counts feed
+    # backend.services.admission_control, which paces background batches
+    # (ops loop, retention, rescue, reconciliation, campaign publish).
+    # Registered after the DB scope so its teardown runs before end_scope().
+    from backend.db import current_scope as _current_scope
+    from backend.services import admission_control as _admission
+
+    @app.before_request
+    def _admission_begin():
+        if _admission.tracks(request.path):
+            g._admission_started = _admission.request_started()
+
+    @app.teardown_request
+    def _admission_end(exc=None):
+        started = g.pop("_admission_started", None)
+        if started is not None:
+            scope = _current_scope()
+            _admission.request_finished(started, scope.db_ms if scope is not None else 0.0)
+
     @app.before_request
     def _identity_default():
         g.identity_id = None
@@ -207,9 +335,10 @@ def create_app() -> Flask:
             },
         }), 403
 
-    from backend.routes import register_blueprints
+    with _startup_phase("blueprints"):
+        from backend.routes import register_blueprints
 
-    register_blueprints(app)
+        register_blueprints(app)
 
     @app.after_request
     def _apply_security_headers(response):
@@ -315,14 +444,28 @@ def create_app() -> Flask:
     # ─────────────────────────────────────────────────────────────
     # Startup seeding: ensure action_costs & plans exist in DB
     # ─────────────────────────────────────────────────────────────
+    # Skipped when the schema registry says this boot DDL + seed set
+    # already ran (see services/schema_registry.py).
     if app.config["DB_RUNTIME_REPORT"]["ready"]:
-        try:
-            from backend.services.pricing_service import PricingService
-
-            PricingService.seed_action_costs()
-            PricingService.seed_plans()
-        except Exception as e:
-            print(f"[APP] Warning: Failed to seed pricing data: {e}")
+        from backend.services import schema_registry
+
+        if not schema_registry.boot_current():
+            with _startup_phase("seed"):
+                try:
+                    from backend.services.pricing_service import (
+                        DEFAULT_ACTION_COSTS,
+                        DEFAULT_PLANS,
+                        PricingService,
+                    )
+
+                    seeded_costs = PricingService.seed_action_costs()
+                    seeded_plans = PricingService.seed_plans()
+                    if seeded_costs < len(DEFAULT_ACTION_COSTS) or seeded_plans < len(DEFAULT_PLANS):
+                        schema_registry.note_boot_failure("pricing seed incomplete")
+                except Exception as e:
+                    schema_registry.note_boot_failure("pricing seed failed")
+                    print(f"[APP] Warning: Failed to seed pricing data: {e}")
+                schema_registry.stamp_boot()
 
         # ── Recover stale jobs and start durable worker ───────────
         # After a deploy/restart, mark orphaned jobs as stalled so the
@@ -336,26 +479,20 @@ def create_app() -> Flask:
         except Exception as e:
             print(f"[APP] Warning: Stale job recovery failed: {e}")
 
-        # Start the durable job worker (DB-driven, restart-safe).
-        # Each Gunicorn process spawns a worker thread, but only one
-        # acquires the PostgreSQL advisory lock (leader election).
-        # Non-leaders exit immediately.
-        try:
-            from backend.services.job_worker import start_worker
+        # Under APP_PRELOAD this is the gunicorn master: threads started
+        # here would not survive the fork, so each worker starts its own in
+        # init_worker(). The master also closes its pool before forking.
+        if PRELOAD:
+            from backend.db import close_pool
 
-            start_worker()
-        except Exception as e:
-            print(f"[APP] Warning: Failed to start job worker: {e}")
-
-        # Start the operations loop (stall detection + stale sweep + rescue).
-        # Runs on all processes since it's idempotent and lightweight.
-        # Config-driven intervals from STALE_SWEEP_* and RESCUE_* env vars.
-        try:
-            from backend.services.job_worker import start_operations_loop
+            close_pool()
+        else:
+            with _startup_phase("background"):
+                start_background_services()
 
-            start_operations_loop()
-        except Exception as e:
-            print(f"[APP] Warning: Failed to start operations loop: {e}")
+    if STARTUP_PROFILE:
+        for entry in startup_profile():
+            print(f"[STARTUP] {entry['phase']}: {entry['seconds']:.3f}s, {entry['modules']} modules imported")
 
     return app
 
@@ -25,7 +25,9 @@ import os
 import re
 import threading
 import time as _time
+from collections import deque
 from contextlib import contextmanager
+from functools import lru_cache
 from typing import Optional, Any, Dict, List, Union
 from datetime import datetime, timezone
 
@@ -111,6 +113,9 @@ def is_transient_db_error(exc: BaseException) -> bool:
     # PoolTimeout: pool couldn't serve a connection in time
     if _POOL_AVAILABLE and isinstance(exc, _pool_timeout_class()):
         return True
+    # Background budget: same meaning as a pool timeout, back off and retry
+    if isinstance(exc, BackgroundBudgetExhausted):
+        return True
     # psycopg.OperationalError covers most transport errors
     if isinstance(exc, psycopg.OperationalError):
         return True
@@ -211,6 +216,7 @@ def _get_pool():
                 kwargs={
                     "connect_timeout": _DB_CONNECT_TIMEOUT,
                     "row_factory": dict_row,
+                    "cursor_factory": _InstrumentedCursor,
                     "keepalives": 1,           # enable TCP keepalives
                     "keepalives_idle": 30,      # first probe after 30s idle
                     "keepalives_interval": 10,  # retry probe every 10s
@@ -264,6 +270,17 @@ def pool_stats() -> dict:
         return {"pooling": True, "error": "stats_unavailable"}
 
 
+def reset_after_fork():
+    """Forget a pool inherited from a preloading master without closing it.
+
+    Closing would terminate the master's sessions on sockets the child shares;
+    the child opens its own pool on first use.
+    """
+    global _pool, _pool_init_attempted
+    _pool = None
+    _pool_init_attempted = False
+
+
 def close_pool():
     """Close the connection pool (for clean shutdown)."""
     global _pool
@@ -312,6 +329,11 @@ class DatabaseIntegrityError(DatabaseError):
         self.original_error = original_error
 
 
+class BackgroundBudgetExhausted(DatabaseConnectionError):
+    """Raised when background work waited too long for a connection slot."""
+    pass
+
+
 # ─────────────────────────────────────────────────────────────
 # Connection State
 # ─────────────────────────────────────────────────────────────
@@ -371,6 +393,315 @@ def now_utc_iso() -> str:
     return now_utc().isoformat()
 
 
+# ─────────────────────────────────────────────────────────────
+# Query Instrumentation
+#
+# Every connection this module opens uses _InstrumentedCursor, so each
+# execute() is timed and attributed to the ``source`` tag the caller passed
+# to get_conn()/transaction() and to a normalized SQL fingerprint (literals
+# and IN-lists collapsed).  Per (source, fingerprint) we keep call/error
+# counts, total/max latency, a latency histogram and rows returned/affected;
+# per source we keep pool checkout wait and fallback counts.  Statements
+# slower than DB_SLOW_QUERY_MS get an EXPLAIN plan captured on a separate
+# direct connection, at most once per fingerprint per DB_EXPLAIN_INTERVAL_S.
+#
+# Config:
+#   DB_QUERY_STATS              (default true)  record per-query stats
+#   DB_QUERY_STATS_MAX          (default 500)   fingerprints tracked; the rest
+#                                               are counted under "(other)"
+#   DB_SLOW_QUERY_MS            (default 500)   slow-query / EXPLAIN threshold
+#   DB_EXPLAIN_INTERVAL_S       (default 600)   min gap between plans per
+#                                               fingerprint (0 disables EXPLAIN)
+# ─────────────────────────────────────────────────────────────
+_QUERY_STATS_ENABLED = os.getenv("DB_QUERY_STATS", "true").lower() in ("true", "1", "yes")
+_QUERY_STATS_MAX = max(10, int(os.getenv("DB_QUERY_STATS_MAX", "500")))
+_SLOW_QUERY_MS = max(1, int(os.getenv("DB_SLOW_QUERY_MS", "500")))
+_EXPLAIN_INTERVAL_S = max(0, int(os.getenv("DB_EXPLAIN_INTERVAL_S", "600")))
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open.
+_LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+_OVERFLOW_FINGERPRINT = "(other)"
+_EXPLAINABLE = ("select", "with", "insert", "update", "delete")
+
+_query_stats_lock = threading.Lock()
+_query_stats: Dict[tuple, Dict[str, Any]] = {}
+_source_stats: Dict[str, Dict[str, Any]] = {}
+_query_stats_since = _time.time()
+_explain_last: Dict[str, float] = {}
+_explain_running = False
+_pool_fallback_times: deque = deque(maxlen=256)  # monotonic time of each pool fallback
+
+_FP_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_FP_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_FP_NUMBER_RE = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?\b")
+_FP_LIST_RE = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))+\s*\)")
+_FP_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint_sql(sql: str) -> str:
+    """Normalize a statement so calls that differ only by literals group together.
+
+    Strips comments, replaces string/number literals with ``?``, collapses
+    value lists such as ``IN (%s, %s, %s)`` to ``(...)`` and squeezes
+    whitespace.  ``%s`` placeholders are kept as-is.
+    """
+    text = _FP_COMMENT_RE.sub(" ", sql)
+    text = _FP_STRING_RE.sub("?", text)
+    text = _FP_NUMBER_RE.sub("?", text)
+    text = _FP_LIST_RE.sub("(...)", text)
+    return _FP_SPACE_RE.sub(" ", text).strip()
+
+
+def _sql_text(query, conn=None) -> str:
+    """Best-effort text of a query passed to execute() (str, bytes or sql.Composable)."""
+    if isinstance(query, str):
+        return query
+    if isinstance(query, bytes):
+        return query.decode("utf-8", "replace")
+    try:
+        return query.as_string(conn)
+    except Exception:
+        return type(query).__name__
+
+
+def _new_query_entry(source: str, fp: str) -> Dict[str, Any]:
+    return {
+        "source": source, "fingerprint": fp,
+        "calls": 0, "errors": 0, "rows": 0, "slow": 0,
+        "total_ms": 0.0, "max_ms": 0.0,
+        "histogram": [0] * (len(_LATENCY_BUCKETS_MS) + 1),
+        "last_plan": None,
+    }
+
+
+def _record_query(source: str, sql: str, elapsed_ms: float, rows: int,
+                  error: bool = False, params=None) -> None:
+    """Fold one statement execution into the per-(source, fingerprint) stats."""
+    if not _QUERY_STATS_ENABLED:
+        return
+    source = source or "(untagged)"
+    fp = fingerprint_sql(sql)
+    bucket = 0
+    while bucket < len(_LATENCY_BUCKETS_MS) and elapsed_ms > _LATENCY_BUCKETS_MS[bucket]:
+        bucket += 1
+    slow = elapsed_ms >= _SLOW_QUERY_MS
+    with _query_stats_lock:
+        key = (source, fp)
+        entry = _query_stats.get(key)
+        if entry is None:
+            if len(_query_stats) >= _QUERY_STATS_MAX:
+                key = (source, _OVERFLOW_FINGERPRINT)
+                entry = _query_stats.get(key)
+            if entry is None:
+                entry = _query_stats[key] = _new_query_entry(*key)
+        entry["calls"] += 1
+        entry["total_ms"] += elapsed_ms
+        if elapsed_ms > entry["max_ms"]:
+            entry["max_ms"] = elapsed_ms
+        entry["histogram"][bucket] += 1
+        if rows and rows > 0:
+            entry["rows"] += rows
+        if error:
+            entry["errors"] += 1
+        if slow:
+            entry["slow"] += 1
+    if slow and not error:
+        _maybe_sample_plan(source, fp, sql, params, elapsed_ms)
+
+
+def _record_pool_wait(source: str, wait_ms: float, fallback: bool = False) -> None:
+    """Record how long a pool checkout for ``source`` waited (and whether it fell back)."""
+    if fallback:
+        _pool_fallback_times.append(_time.monotonic())
+    if not _QUERY_STATS_ENABLED:
+        return
+    source = source or "(untagged)"
+    with _query_stats_lock:
+        entry = _source_stats.get(source)
+        if entry is None:
+            entry = _source_stats[source] = {
+                "source": source, "checkouts": 0, "fallbacks": 0,
+                "pool_wait_ms": 0.0, "pool_wait_max_ms": 0.0,
+            }
+        entry["checkouts"] += 1
+        entry["pool_wait_ms"] += wait_ms
+        if wait_ms > entry["pool_wait_max_ms"]:
+            entry["pool_wait_max_ms"] = wait_ms
+        if fallback:
+            entry["fallbacks"] += 1
+
+
+def _maybe_sample_plan(source: str, fp: str, sql: str, params, elapsed_ms: float) -> None:
+    """Start a background EXPLAIN for a slow statement unless one ran recently."""
+    global _explain_running
+    if not USE_DB or not _EXPLAIN_INTERVAL_S:
+        return
+    if not sql.lstrip().lower().startswith(_EXPLAINABLE):
+        return
+    now = _time.monotonic()
+    with _query_stats_lock:
+        last = _explain_last.get(fp)
+        if _explain_running or (source, fp) not in _query_stats:
+            return
+        if last is not None and now - last < _EXPLAIN_INTERVAL_S:
+            return
+        _explain_running = True
+        _explain_last[fp] = now
+    _start_plan_capture(source, fp, sql, params, elapsed_ms)
+
+
+def _start_plan_capture(source: str, fp: str, sql: str, params, elapsed_ms: float) -> None:
+    threading.Thread(
+        target=_capture_plan, args=(source, fp, sql, params, elapsed_ms),
+        name="db-explain", daemon=True,
+    ).start()
+
+
+def _capture_plan(source: str, fp: str, sql: str, params, elapsed_ms: float) -> None:
+    """EXPLAIN (no ANALYZE) the statement on its own connection and keep the plan."""
+    global _explain_running
+    plan = None
+    try:
+        conn = _create_connection("db.explain")
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SET statement_timeout = '5000'")
+                cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+                row = cur.fetchone()
+                plan = next(iter(row.values())) if isinstance(row, dict) else row[0]
+        finally:
+            _safe_rollback(conn)
+            conn.close()
+    except Exception as e:
+        print(f"[DB][EXPLAIN] source={source} failed: {type(e).__name__}: {e}")
+    finally:
+        with _query_stats_lock:
+            _explain_running = False
+            entry = _query_stats.get((source, fp))
+            if entry is not None and plan is not None:
+                entry["last_plan"] = {
+                    "captured_at": now_utc_iso(),
+                    "elapsed_ms": round(elapsed_ms, 1),
+                    "plan": plan,
+                }
+
+
+_SORT_KEYS = ("total_ms", "calls", "mean_ms", "max_ms", "rows", "errors")
+
+
+def query_stats(limit: int = 20, sort: str = "total_ms", include_plans: bool = True) -> dict:
+    """Top queries by ``sort`` (default total time) plus per-source pool wait. Safe to call anytime."""
+    if sort not in _SORT_KEYS:
+        sort = "total_ms"
+    with _query_stats_lock:
+        entries = [dict(e, histogram=list(e["histogram"])) for e in _query_stats.values()]
+        sources = [dict(s) for s in _source_stats.values()]
+        since = _query_stats_since
+    labels = [f"le_{b}ms" for b in _LATENCY_BUCKETS_MS] + [f"gt_{_LATENCY_BUCKETS_MS[-1]}ms"]
+    for e in entries:
+        e["mean_ms"] = round(e["total_ms"] / e["calls"], 2) if e["calls"] else 0.0
+        e["total_ms"] = round(e["total_ms"], 1)
+        e["max_ms"] = round(e["max_ms"], 1)
+        e["histogram"] = dict(zip(labels, e["histogram"]))
+        if not include_plans:
+            e.pop("last_plan", None)
+    entries.sort(key=lambda e: e[sort], reverse=True)
+    for s in sources:
+        s["pool_wait_mean_ms"] = round(s["pool_wait_ms"] / s["checkouts"], 2) if s["checkouts"] else 0.0
+        s["pool_wait_ms"] = round(s["pool_wait_ms"], 1)
+        s["pool_wait_max_ms"] = round(s["pool_wait_max_ms"], 1)
+    sources.sort(key=lambda s: s["pool_wait_ms"], reverse=True)
+    return {
+        "enabled": _QUERY_STATS_ENABLED,
+        "since": datetime.fromtimestamp(since, timezone.utc).isoformat(),
+        "slow_query_ms": _SLOW_QUERY_MS,
+        "tracked": len(entries),
+        "total_calls": sum(e["calls"] for e in entries),
+        "total_ms": round(sum(e["total_ms"] for e in entries), 1),
+        "queries": entries[:max(1, int(limit))],
+        "sources": sources,
+        "pool": pool_stats(),
+    }
+
+
+def recent_pool_fallbacks(window_s: float) -> int:
+    """Number of pool checkouts that fell back to a direct connection in the last window_s."""
+    horizon = _time.monotonic() - window_s
+    return sum(1 for t in list(_pool_fallback_times) if t >= horizon)
+
+
+def reset_query_stats() -> None:
+    """Drop all collected query stats and start a new window."""
+    global _query_stats_since
+    with _query_stats_lock:
+        _query_stats.clear()
+        _source_stats.clear()
+        _explain_last.clear()
+        _pool_fallback_times.clear()
+        _query_stats_since = _time.time()
+
+
+if PSYCOPG_AVAILABLE:
+    class _InstrumentedCursor(psycopg.Cursor):
+        """Client cursor that reports every execute() to _record_query."""
+
+        def execute(self, query, params=None, **kwargs):
+            if not _QUERY_STATS_ENABLED:
+                return super().execute(query, params, **kwargs)
+            t0 = _time.monotonic()
+            failed = True
+            try:
+                result = super().execute(query, params, **kwargs)
+                failed = False
+                return result
+            finally:
+                conn = self.connection
+                elapsed_ms = (_time.monotonic() - t0) * 1000
+                _count_scope_query(elapsed_ms)
+                _record_query(
+                    getattr(conn, "_query_source", ""), _sql_text(query, conn),
+                    elapsed_ms, 0 if failed else self.rowcount, error=failed, params=params,
+                )
+
+        def executemany(self, query, params_seq, **kwargs):
+            if not _QUERY_STATS_ENABLED:
+                return super().executemany(query, params_seq, **kwargs)
+            t0 = _time.monotonic()
+            failed = True
+            try:
+                result = super().executemany(query, params_seq, **kwargs)
+                failed = False
+                return result
+            finally:
+                conn = self.connection
+                elapsed_ms = (_time.monotonic() - t0) * 1000
+                _count_scope_query(elapsed_ms)
+                _record_query(
+                    getattr(conn, "_query_source", ""), _sql_text(query, conn),
+                    elapsed_ms, 0 if failed else self.rowcount, error=failed,
+                )
+else:
+    _InstrumentedCursor = None
+
+
+def _count_scope_query(elapsed_ms: float) -> None:
+    """Add one statement to the current thread's connection scope counters."""
+    scope = getattr(_scope_local, "scope", None)
+    if scope is not None:
+        scope.queries += 1
+        scope.db_ms += elapsed_ms
+
+
+def _tag_conn(conn, source: str):
+    """Attribute statements on ``conn`` to ``source`` until the next checkout."""
+    try:
+        conn._query_source = source
+    except Exception:
+        pass
+    return conn
+
+
 # ─────────────────────────────────────────────────────────────
 # Connection Management
 # ─────────────────────────────────────────────────────────────
@@ -398,7 +729,7 @@ def _ensure_idle(conn):
         pass  # broken connection — putconn will discard it
 
 
-def _create_connection():
+def _create_connection(source: str = ""):
     """
     Create a new database connection.
     Internal function - raises exceptions on failure.
@@ -414,7 +745,9 @@ def _create_connection():
             _DATABASE_URL,
             connect_timeout=_DB_CONNECT_TIMEOUT,
             row_factory=dict_row,  # Default to dict rows
+            cursor_factory=_InstrumentedCursor,
         )
+        _tag_conn(conn, source)
         # Set search path and session safety limits in ONE round trip.
         # Previously 4 separate execute() calls = 4 network round trips
         # (each ~40ms to external PostgreSQL = ~160ms total).
@@ -433,6 +766,281 @@ def _create_connection():
         raise DatabaseConnectionError(f"Unexpected error connecting to database: {e}", original_error=e)
 
 
+# ─────────────────────────────────────────────────────────────
+# Request / Task Connection Scope
+#
+# Inside connection_scope() (or between begin_scope() and end_scope(), which
+# the app wires to every request), get_conn() and transaction() borrow ONE
+# connection checked out lazily on first use and returned when the scope
+# ends, instead of a pool checkout per block. A scope begun with share=False
+# only counts statements: the app uses that for every request outside
+# DB_REQUEST_SCOPE_ENDPOINTS, so ordinary requests don't hold a pool
+# connection from their first query until teardown.  A borrow only reuses the
+# scoped connection while it is idle: a get_conn() nested inside a
+# transaction() (or inside a block that left a transaction open) still gets
+# its own connection, exactly as before.
+#
+# The scoped connection stays checked out between borrows, so handlers that
+# are about to do long non-DB work (provider calls, mesh analysis) should
+# call release_scope_connection() first.
+# ─────────────────────────────────────────────────────────────
+_scope_local = threading.local()
+
+
+class ConnectionScope:
+    """Per-thread connection holder plus query counters for one request/task."""
+
+    __slots__ = ("source", "share", "conn", "pool", "in_tx", "queries", "db_ms", "checkouts")
+
+    def __init__(self, source: str = "", share: bool = True):
+        self.source = source
+        self.share = share
+        self.conn = None
+        self.pool = None
+        self.in_tx = False
+        self.queries = 0
+        self.db_ms = 0.0
+        self.checkouts = 0
+
+    def stats(self) -> dict:
+        return {
+            "source": self.source,
+            "queries": self.queries,
+            "db_ms": round(self.db_ms, 1),
+            "checkouts": self.checkouts,
+        }
+
+
+def current_scope() -> Optional[ConnectionScope]:
+    """The connection scope active on this thread, if any."""
+    return getattr(_scope_local, "scope", None)
+
+
+def begin_scope(source: str = "", share: bool = True) -> ConnectionScope:
+    """Start a connection scope on this thread (an existing one is kept).
+
+    With share=False the scope only counts statements; every block still
+    checks out (and returns) its own connection.
+    """
+    scope = current_scope()
+    if scope is None:
+        scope = _scope_local.scope = ConnectionScope(source, share)
+    return scope
+
+
+def end_scope() -> Optional[ConnectionScope]:
+    """End this thread's scope and return its connection. Safe to call twice."""
+    scope = current_scope()
+    if scope is None:
+        return None
+    _scope_local.scope = None
+    _release_scope_conn(scope)
+    return scope
+
+
+@contextmanager
+def connection_scope(source: str = ""):
+    """Share one connection across the get_conn()/transaction() calls in this block.
+
+    Nested scopes join the outer one; only the outermost returns the connection.
+    Inside a counting-only scope (share=False) the block shares a connection
+    of its own, returned when the block ends.
+    """
+    outer = current_scope()
+    if outer is not None and outer.share:
+        yield outer
+        return
+    if outer is not None:
+        outer.share = True
+        try:
+            yield outer
+        finally:
+            outer.share = False
+            _release_scope_conn(outer)
+        return
+    scope = begin_scope(source)
+    try:
+        yield scope
+    finally:
+        end_scope()
+
+
+def release_scope_connection() -> None:
+    """Hand the scoped connection back now; the next borrow checks out a fresh one."""
+    scope = current_scope()
+    if scope is not None and not scope.in_tx:
+        _release_scope_conn(scope)
+
+
+def _release_scope_conn(scope: ConnectionScope) -> None:
+    conn, pool = scope.conn, scope.pool
+    scope.conn = scope.pool = None
+    if conn is None:
+        return
+    if pool is not None:
+        _ensure_idle(conn)
+        try:
+            conn.autocommit = True
+        except Exception:
+            pass
+        try:
+            pool.putconn(conn)
+            return
+        except Exception:
+            pass
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def _conn_idle(conn) -> bool:
+    try:
+        return not conn.closed and conn.info.transaction_status == 0
+    except Exception:
+        return False
+
+
+def _scope_conn(scope: ConnectionScope, source: str):
+    """The scope's connection if it can be lent right now, checking one out on first use.
+
+    Returns None when the existing connection is mid-transaction, so the
+    caller falls back to its own checkout.
+    """
+    if scope.conn is not None:
+        if getattr(scope.conn, "closed", True) or getattr(scope.conn, "broken", False):
+            _release_scope_conn(scope)
+        elif scope.in_tx or not _conn_idle(scope.conn):
+            return None
+        else:
+            return scope.conn
+
+    pool = _get_pool()
+    conn = None
+    t0 = _time.monotonic()
+    if pool is not None:
+        try:
+            conn = pool.getconn(timeout=_DB_POOL_TIMEOUT)
+            _record_pool_wait(source, (_time.monotonic() - t0) * 1000)
+        except Exception as e:
+            if not is_transient_db_error(e):
+                raise
+            _record_pool_wait(source, (_time.monotonic() - t0) * 1000, fallback=True)
+            print(f"[DB][FALLBACK] scope={scope.source} source={source} "
+                  f"pool_wait={int((_time.monotonic() - t0) * 1000)}ms")
+            pool = None
+    if conn is None:
+        conn = _create_connection(source)
+    # Scoped connections always run in autocommit between borrows, the same
+    # contract pooled get_conn() callers already rely on.
+    conn.autocommit = True
+    scope.conn, scope.pool = conn, pool
+    scope.checkouts += 1
+    return conn
+
+
+@contextmanager
+def _borrow_scoped(scope: ConnectionScope, conn, source: str, tx: bool):
+    """Lend the scoped connection to one get_conn()/transaction() block."""
+    prev_source = getattr(conn, "_query_source", "")
+    _tag_conn(conn, source)
+    if tx:
+        scope.in_tx = True
+        conn.autocommit = False
+    try:
+        if tx:
+            with _run_transaction(conn) as cur:
+                yield cur
+        else:
+            yield conn
+    finally:
+        scope.in_tx = False
+        _ensure_idle(conn)
+        try:
+            if not conn.autocommit:
+                conn.autocommit = True
+        except Exception:
+            pass
+        _tag_conn(conn, prev_source)
+
+
+# ─────────────────────────────────────────────────────────────
+# Background Connection Budget
+#
+# Threads doing background work (ops loop, retention, rescue,
+# reconciliation, campaign publish) run inside background_work().  Every
+# get_conn()/transaction() block they open then holds one of
+# DB_BACKGROUND_MAX_CONNS slots, so heavy sweeps can never occupy more than
+# that many connections (pooled or direct fallback) at once and the rest of
+# the pool stays free for user requests.  A thread that already holds a slot
+# opens nested blocks without taking another, so a task cannot deadlock on
+# its own budget.  Pacing background batches by pool pressure lives in
+# backend.services.admission_control.
+# ─────────────────────────────────────────────────────────────
+_DB_BACKGROUND_MAX_CONNS = max(1, int(os.getenv("DB_BACKGROUND_MAX_CONNS", str(max(1, _DB_POOL_MAX_SIZE // 4)))))
+_DB_BACKGROUND_SLOT_TIMEOUT = float(os.getenv("DB_BACKGROUND_SLOT_TIMEOUT", "10"))
+
+_background_slots = threading.BoundedSemaphore(_DB_BACKGROUND_MAX_CONNS)
+_background_local = threading.local()
+_background_lock = threading.Lock()
+_background_stats = {"acquired": 0, "waited": 0, "timeouts": 0, "in_use": 0, "wait_ms_max": 0.0}
+
+
+@contextmanager
+def background_work(name: str):
+    """Count this thread's connections against the background budget for the block.
+
+    Nested calls keep the outermost name.
+    """
+    prev = getattr(_background_local, "name", None)
+    _background_local.name = prev or name
+    try:
+        yield
+    finally:
+        _background_local.name = prev
+
+
+def current_background_work() -> Optional[str]:
+    """Name of the background_work() block active on this thread, if any."""
+    return getattr(_background_local, "name", None)
+
+
+def _needs_background_slot() -> bool:
+    return current_background_work() is not None and not getattr(_background_local, "slot", False)
+
+
+@contextmanager
+def _background_slot(source: str):
+    t0 = _time.monotonic()
+    if not _background_slots.acquire(timeout=_DB_BACKGROUND_SLOT_TIMEOUT):
+        with _background_lock:
+            _background_stats["timeouts"] += 1
+        raise BackgroundBudgetExhausted(
+            f"background connection budget exhausted: {_DB_BACKGROUND_MAX_CONNS} in use, "
+            f"work={current_background_work()} source={source}"
+        )
+    wait_ms = (_time.monotonic() - t0) * 1000
+    with _background_lock:
+        _background_stats["acquired"] += 1
+        _background_stats["in_use"] += 1
+        if wait_ms >= 1:
+            _background_stats["waited"] += 1
+        _background_stats["wait_ms_max"] = max(_background_stats["wait_ms_max"], round(wait_ms, 1))
+    _background_local.slot = True
+    try:
+        yield
+    finally:
+        _background_local.slot = False
+        with _background_lock:
+            _background_stats["in_use"] -= 1
+        _background_slots.release()
+
+
+def background_budget_stats() -> dict:
+    with _background_lock:
+        return dict(_background_stats, max_conns=_DB_BACKGROUND_MAX_CONNS)
+
+
 @contextmanager
 def get_conn(source: str = ""):
     """
@@ -455,7 +1063,23 @@ def get_conn(source: str = ""):
     If a query fails mid-execution on a connection that was healthy at
     checkout, that error propagates to the caller (and the pool discards
     the broken connection automatically).
+
+    Inside a connection_scope() the scope's connection is reused instead.
+    Inside background_work() the block also holds a background budget slot.
     """
+    if _needs_background_slot():
+        with _background_slot(source), get_conn(source) as conn:
+            yield conn
+        return
+
+    scope = current_scope()
+    if scope is not None and scope.share:
+        scoped = _scope_conn(scope, source)
+        if scoped is not None:
+            with _borrow_scoped(scope, scoped, source, tx=False) as conn:
+                yield conn
+            return
+
     import time as _gc_time
     pool = _get_pool()
     conn = None
@@ -468,9 +1092,12 @@ def get_conn(source: str = ""):
         try:
             conn = pool.getconn(timeout=_DB_POOL_TIMEOUT)
             from_pool = True
+            _tag_conn(conn, source)
+            _record_pool_wait(source, (_gc_time.monotonic() - _t0) * 1000)
         except Exception as e:
             if is_transient_db_error(e):
                 _ms_pool_wait = int((_gc_time.monotonic() - _t0) * 1000)
+                _record_pool_wait(source, _ms_pool_wait, fallback=True)
                 _pool_failed = True
                 conn = None
             else:
@@ -479,7 +1106,7 @@ def get_conn(source: str = ""):
     if conn is None:
         # Direct connection (pool failed/timed out, or pool disabled)
         _t_direct = _gc_time.monotonic()
-        conn = _create_connection()
+        conn = _create_connection(source)
         _ms_direct = int((_gc_time.monotonic() - _t_direct) * 1000)
         if _pool_failed:
             print(f"[DB][FALLBACK] source={source} pool_wait={_ms_pool_wait}ms direct={_ms_direct}ms")
@@ -518,7 +1145,7 @@ def get_conn(source: str = ""):
                     pass
     else:
         # Direct connection (pool failed or disabled)
-        conn = _create_connection()
+        conn = _create_connection(source)
         try:
             yield conn
         finally:
@@ -543,7 +1170,7 @@ def get_conn_direct(source: str = ""):
     depend on pool health. The connection is opened, used, and closed
     within this block — no pool threads, no shared state.
     """
-    conn = _create_connection()
+    conn = _create_connection(source)
     try:
         yield conn
     finally:
@@ -600,7 +1227,22 @@ def transaction(source: str = ""):
     Pool-first with direct-fallback on transient checkout errors.
     Automatically commits on success, rolls back on exception.
     Yields a cursor with dict_row factory.
+    Inside a connection_scope() the scope's connection is reused when idle.
+    Inside background_work() the block also holds a background budget slot.
     """
+    if _needs_background_slot():
+        with _background_slot(source), transaction(source) as cur:
+            yield cur
+        return
+
+    scope = current_scope()
+    if scope is not None and scope.share:
+        scoped = _scope_conn(scope, source)
+        if scoped is not None:
+            with _borrow_scoped(scope, scoped, source, tx=True) as cur:
+                yield cur
+            return
+
     import time as _tx_time
     pool = _get_pool()
     conn = None
@@ -611,11 +1253,14 @@ def transaction(source: str = ""):
         try:
             conn = pool.getconn(timeout=_DB_POOL_TIMEOUT)
             from_pool = True
+            _tag_conn(conn, source)
+            _record_pool_wait(source, (_tx_time.monotonic() - _t0) * 1000)
         except Exception as e:
             if is_transient_db_error(e):
                 _ms_pool = int((_tx_time.monotonic() - _t0) * 1000)
+                _record_pool_wait(source, _ms_pool, fallback=True)
                 _t_dir = _tx_time.monotonic()
-                conn = _create_connection()
+                conn = _create_connection(source)
                 _ms_dir = int((_tx_time.monotonic() - _t_dir) * 1000)
                 print(f"[DB][TX_FALLBACK] source={source} pool_wait={_ms_pool}ms direct={_ms_dir}ms")
                 # fall through to direct path below
@@ -646,7 +1291,7 @@ def transaction(source: str = ""):
     else:
         # Direct connection (fallback already created it, or pool disabled)
         if conn is None:
-            conn = _create_connection()
+            conn = _create_connection(source)
         try:
             with _run_transaction(conn) as cur:
                 yield cur
@@ -665,7 +1310,7 @@ def transaction_direct(source: str = ""):
     Use for auth-critical paths (bootstrap, restore/redeem) that must work
     even when the pool is full of dead SSL connections.
     """
-    conn = _create_connection()
+    conn = _create_connection(source)
     try:
         with _run_transaction(conn) as cur:
             yield cur
@@ -894,6 +1539,29 @@ class Tables:
     ACTIVITY_LOGS = f"{_APP_SCHEMA}.activity_logs"
     PROVIDER_OPERATIONS = f"{_APP_SCHEMA}.provider_operations"
 
+    # Storage (migrations 086, 087, 088)
+    S3_CONTENT_INDEX = f"{_APP_SCHEMA}.s3_content_index"
+    DERIVED_ARTIFACTS = f"{_APP_SCHEMA}.derived_artifacts"
+    MESH_FEATURES = f"{_APP_SCHEMA}.mesh_features"
+
+    # Analytics rollups (migration 090)
+    JOB_ROLLUP_HOURLY = f"{_BILLING_SCHEMA}.job_rollup_hourly"
+    LEDGER_ROLLUP_DAILY = f"{_BILLING_SCHEMA}.ledger_rollup_daily"
+    ANALYTICS_ROLLUP_STATE = f"{_BILLING_SCHEMA}.analytics_rollup_state"
+
+    # Admin dashboard snapshots (migration 091)
+    ADMIN_DASHBOARD_SNAPSHOTS = f"{_BILLING_SCHEMA}.admin_dashboard_snapshots"
+
+    # Hot/archive split (migration 092); *_ALL = hot UNION ALL archive
+    JOBS_ARCHIVE = f"{_BILLING_SCHEMA}.jobs_archive"
+    JOBS_ALL = f"{_BILLING_SCHEMA}.jobs_all"
+    NOTIFICATION_DELIVERIES = f"{_BILLING_SCHEMA}.notification_deliveries"
+    NOTIFICATION_DELIVERIES_ARCHIVE = f"{_BILLING_SCHEMA}.notification_deliveries_archive"
+    NOTIFICATION_DELIVERIES_ALL = f"{_BILLING_SCHEMA}.notification_deliveries_all"
+
+    # Queued video conversions (migration 097)
+    VIDEO_CONVERSIONS = f"{_APP_SCHEMA}.video_conversions"
+
 
 # ─────────────────────────────────────────────────────────────
 # Utilities
@@ -988,13 +1656,17 @@ def init_db() -> bool:
         # master and die on fork, causing "couldn't stop thread" errors.
         # The pool stays dormant until the first request hits the worker.
         try:
-            conn = _create_connection()
-            with conn.cursor() as cur:
-                cur.execute("SELECT 1 AS ok")
-                row = cur.fetchone()
-            conn.close()
-            if not row or row.get("ok") != 1:
-                raise DatabaseConnectionError("Connection test query failed")
+            conn = _create_connection("db.startup_check")
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1 AS ok")
+                    row = cur.fetchone()
+                if not row or row.get("ok") != 1:
+                    raise DatabaseConnectionError("Connection test query failed")
+                from backend.services import schema_registry
+                schema_current = schema_registry.check_boot(conn)
+            finally:
+                conn.close()
         except DatabaseConnectionError:
             raise
         except Exception as e:
@@ -1006,8 +1678,12 @@ def init_db() -> bool:
         else:
             print("[DB] Pool mode: DISABLED — using direct connections")
 
-        # Run schema checks with a direct connection too
-        _ensure_schema_direct()
+        # Run schema checks with a direct connection too, unless the
+        # registry says this exact boot DDL + seed set already ran.
+        if schema_current:
+            print("[DB] Schema current (boot fingerprint matches); skipping boot DDL")
+        elif not _ensure_schema_direct():
+            schema_registry.note_boot_failure("boot DDL failed")
 
         _DB_STARTUP_READY = True
         _DB_STARTUP_REASON = ""
@@ -1119,11 +1795,13 @@ def ensure_schema() -> None:
         print(f"[DB] Warning: Could not ensure schema indexes: {e}")
 
 
-def _ensure_schema_direct() -> None:
+def _ensure_schema_direct() -> bool:
     """Verify critical schema elements using a direct connection (no pool).
-    Safe to call in the Gunicorn master before fork."""
+    Safe to call in the Gunicorn master before fork. Returns False if the
+    index/table DDL or the safety schema failed, so the boot isn't stamped
+    as current."""
     try:
-        conn = _create_connection()
+        conn = _create_connection("db.ensure_schema")
         try:
             with conn.cursor() as cur:
                 cur.execute("""
@@ -1244,11 +1922,13 @@ def _ensure_schema_direct() -> None:
 
         try:
             from backend.services.prompt_safety_service import ensure_safety_schema
-            ensure_safety_schema()
+            return ensure_safety_schema()
         except Exception as e:
             print(f"[DB] Warning: Could not ensure safety schema: {e}")
+            return False
     except Exception as e:
         print(f"[DB] Warning: Could not ensure schema indexes: {e}")
+        return False
 
 
 # ─────────────────────────────────────────────────────────────
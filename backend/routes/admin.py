@@ -18,6 +18,10 @@ Endpoints:
 - POST /api/admin/reservations/<id>/release - Release a reservation
 - GET  /api/admin/jobs               - List jobs
 - GET  /api/admin/health             - Admin health check
+- GET  /api/admin/metrics/queries    - Top DB queries by total time (per source + fingerprint)
+- POST /api/admin/metrics/queries/reset - Start a new query-stats window
+- GET  /api/admin/metrics/admission  - Background admission control (pool pressure, budget, deferrals)
+- GET  /api/admin/metrics/auth-rate-limits - Auth limiter local/synced decisions and pending flushes
 - GET  /api/admin/debug/user         - Internal debug: user summary (masked email, wallet, history)
 - POST /api/admin/jobs/rescue        - Rescue late-completed Seedance jobs
 - GET  /api/admin/provider-health    - Aggregated provider health (success rates, spend, alerts)
@@ -174,6 +178,103 @@ def video_metrics():
         return jsonify({"ok": False, "error": str(e)}), 500
 
 
+@bp.route("/metrics/storage", methods=["GET"])
+@require_admin
+def storage_metrics():
+    """
+    Get upload/storage pipeline metrics.
+
+    Returns:
+        content_index (hit/miss counters for the S3 dedup index),
+        video_convert (ffmpeg conversion queue depth),
+        presign (presigned URL cache hits vs. fresh signatures),
+        derived_artifacts (STL/3MF conversion + repair cache),
+        mesh_features (per-model geometry store + background worker),
+        print_estimate (mesh-based pricing estimate cache),
+        mesh_lod (simplified-mesh builds and cache hits for analysis / repair)
+    """
+    try:
+        from backend.services import (
+            derived_artifact_store, mesh_feature_store, mesh_lod_service, print_estimate_service,
+            s3_content_index,
+        )
+        from backend.services.ffmpeg_service import conversion_queue
+        from backend.services.s3_service import presign_cache_stats
+        return jsonify({
+            "ok": True,
+            "content_index": s3_content_index.stats(),
+            "video_convert": conversion_queue.stats(),
+            "presign": presign_cache_stats(),
+            "derived_artifacts": derived_artifact_store.stats(),
+            "mesh_features": mesh_feature_store.stats(),
+            "print_estimate": print_estimate_service.stats(),
+            "mesh_lod": mesh_lod_service.stats(),
+        })
+    except Exception as e:
+        print(f"[ADMIN] Storage metrics error: {e}")
+        return jsonify({"ok": False, "error": str(e)}), 500
+
+
+@bp.route("/metrics/queries", methods=["GET"])
+@require_admin
+def query_metrics():
+    """
+    Per-process DB query instrumentation (see backend.db query_stats).
+
+    Query params:
+        - limit: Number of queries to return (default 20, max 200)
+        - sort: total_ms (default), calls, mean_ms, max_ms, rows, errors
+        - plans: 'false' to omit captured EXPLAIN plans
+
+    Returns:
+        queries (source, fingerprint, calls, latency histogram, rows,
+        last slow-query plan), sources (pool checkout wait per source),
+        pool (current pool snapshot)
+    """
+    try:
+        from backend.db import query_stats
+        limit = min(max(request.args.get("limit", 20, type=int) or 20, 1), 200)
+        sort = request.args.get("sort", "total_ms")
+        include_plans = request.args.get("plans", "true").lower() != "false"
+        return jsonify({"ok": True, **query_stats(limit=limit, sort=sort, include_plans=include_plans)})
+    except Exception as e:
+        print(f"[ADMIN] Query metrics error: {e}")
+        return jsonify({"ok": False, "error": str(e)}), 500
+
+
+@bp.route("/metrics/queries/reset", methods=["POST"])
+@require_admin
+def reset_query_metrics():
+    """Clear collected query stats so the next read covers a fresh window."""
+    from backend.db import reset_query_stats
+    reset_query_stats()
+    return jsonify({"ok": True})
+
+
+@bp.route("/metrics/admission", methods=["GET"])
+@require_admin
+def admission_metrics():
+    """
+    Background admission control: current pressure level and reasons,
+    per-task admitted/throttled/deferred counts and the background
+    connection budget (see backend.services.admission_control).
+    """
+    from backend.services import admission_control
+    return jsonify({"ok": True, **admission_control.stats()})
+
+
+@bp.route("/metrics/auth-rate-limits", methods=["GET"])
+@require_admin
+def auth_rate_limit_metrics():
+    """
+    Per-process auth limiter counters: attempts decided locally vs. synced
+    with auth_rate_limits, pending batched counts, flushes and swept rows
+    (see backend.services.auth_rate_limit_service).
+    """
+    from backend.services import auth_rate_limit_service
+    return jsonify({"ok": True, **auth_rate_limit_service.stats()})
+
+
 @bp.route("/identities", methods=["GET"])
 @require_admin
 def list_identities():
@@ -1451,7 +1552,7 @@ def debug_openai_credits():
             jobs = query_all(
                 f"""
                 SELECT id, identity_id, provider, action_code, status, reservation_id, created_at, updated_at
-                FROM {Tables.JOBS}
+                FROM {Tables.JOBS_ALL}
                 WHERE id::text = %s OR reservation_id::text = %s
                 ORDER BY created_at DESC
                 LIMIT %s
@@ -1462,7 +1563,7 @@ def debug_openai_credits():
             jobs = query_all(
                 f"""
                 SELECT id, identity_id, provider, action_code, status, reservation_id, created_at, updated_at
-                FROM {Tables.JOBS}
+                FROM {Tables.JOBS_ALL}
                 WHERE identity_id = %s AND (provider = 'openai' OR action_code = 'OPENAI_IMAGE')
                 ORDER BY created_at DESC
                 LIMIT %s
@@ -1473,7 +1574,7 @@ def debug_openai_credits():
             jobs = query_all(
                 f"""
                 SELECT id, identity_id, provider, action_code, status, reservation_id, created_at, updated_at
-                FROM {Tables.JOBS}
+                FROM {Tables.JOBS_ALL}
                 WHERE provider = 'openai' OR action_code = 'OPENAI_IMAGE'
                 ORDER BY created_at DESC
                 LIMIT %s
@@ -3012,63 +3113,103 @@ def _csv_response(rows, fieldnames, filename):
     )
 
 
+def _csv_export(query, fieldnames, format_rows, filename):
+    """
+    Stream an export query as CSV (constant memory, no row cap).
+
+    Query args on top of the endpoint filters:
+      after=<created_at>|<id>  resume after the last row already received
+      limit=N                  stop after N rows
+      destination=s3           write the file to S3 and return a download URL
+                               plus ``after``, the token of the last row written
+    """
+    from itertools import chain
+    from flask import stream_with_context
+    from backend.services import csv_export_service as exports
+
+    after = request.args.get("after")
+    try:
+        exports.parse_after(after)
+        limit = int(request.args["limit"]) if request.args.get("limit") else None
+    except ValueError as e:
+        return jsonify({"ok": False, "error": f"Invalid export parameters: {e}"}), 400
+
+    batches = exports.iter_batches(query, after=after, limit=limit)
+    if request.args.get("destination") == "s3":
+        tracked = exports.KeysetTracker(batches)
+        result = exports.upload_csv(exports.iter_csv(fieldnames, tracked, format_rows), filename)
+        return jsonify({**result, "rows": tracked.rows, "after": tracked.after})
+    chunks = exports.iter_csv(fieldnames, batches, format_rows)
+
+    # Pull the header and first batch now so connection or query errors
+    # still come back as a JSON 500 instead of a truncated file.
+    head = [next(chunks), next(chunks, "")]
+    return Response(
+        stream_with_context(chain(head, chunks)),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+_PURCHASE_CSV_FIELDS = [
+    "purchase_id", "created_at", "paid_at", "status",
+    "email", "identity_id", "plan_code", "plan_name",
+    "provider", "payment_reference", "payment_id",
+    "amount_usd", "currency", "credits_granted", "credits_remaining",
+    "credit_type", "is_subscription_purchase",
+    "refund_exists", "latest_refund_status", "latest_refund_id",
+    "refund_action_state", "refund_risk_level", "refund_risk_reason",
+]
+
+
+def _purchase_csv_row(p):
+    risk = p.get("refund_risk") or {}
+    return {
+        "purchase_id": p.get("id", ""),
+        "created_at": p.get("created_at", ""),
+        "paid_at": p.get("paid_at", ""),
+        "status": p.get("status", ""),
+        "email": p.get("email", ""),
+        "identity_id": p.get("identity_id", ""),
+        "plan_code": p.get("plan_code", ""),
+        "plan_name": p.get("plan_name", ""),
+        "provider": p.get("provider", ""),
+        "payment_reference": p.get("payment_reference", ""),
+        "payment_id": p.get("payment_id", ""),
+        "amount_usd": p.get("amount_usd", ""),
+        "currency": p.get("currency", ""),
+        "credits_granted": p.get("credits_granted", ""),
+        "credits_remaining": p.get("credits_remaining", ""),
+        "credit_type": p.get("credit_type", ""),
+        "is_subscription_purchase": p.get("is_subscription_purchase", ""),
+        "refund_exists": p.get("refund_exists", ""),
+        "latest_refund_status": p.get("latest_refund_status", ""),
+        "latest_refund_id": p.get("latest_refund_id", ""),
+        "refund_action_state": p.get("refund_action_state", ""),
+        "refund_risk_level": risk.get("level", ""),
+        "refund_risk_reason": risk.get("reason", ""),
+    }
+
+
 @bp.route("/purchases/export.csv", methods=["GET"])
 @require_admin
 def purchases_export_csv():
     """Export purchases as CSV with same filters as list endpoint."""
     try:
-        result = AdminService.list_purchases(
+        query = AdminService.purchases_export_query(
             status=request.args.get("status"),
             identity_id=request.args.get("identity_id"),
             email=request.args.get("email"),
             purchase_id=request.args.get("purchase_id"),
             date_from=request.args.get("date_from"),
             date_to=request.args.get("date_to"),
-            limit=min(int(request.args.get("limit", 5000)), 5000),
-            offset=0,
-            _max_limit=5000,
         )
-
-        fieldnames = [
-            "purchase_id", "created_at", "paid_at", "status",
-            "email", "identity_id", "plan_code", "plan_name",
-            "provider", "payment_reference", "payment_id",
-            "amount_usd", "currency", "credits_granted", "credits_remaining",
-            "credit_type", "is_subscription_purchase",
-            "refund_exists", "latest_refund_status", "latest_refund_id",
-            "refund_action_state", "refund_risk_level", "refund_risk_reason",
-        ]
-
-        rows = []
-        for p in result.get("purchases", []):
-            risk = p.get("refund_risk") or {}
-            rows.append({
-                "purchase_id": p.get("id", ""),
-                "created_at": p.get("created_at", ""),
-                "paid_at": p.get("paid_at", ""),
-                "status": p.get("status", ""),
-                "email": p.get("email", ""),
-                "identity_id": p.get("identity_id", ""),
-                "plan_code": p.get("plan_code", ""),
-                "plan_name": p.get("plan_name", ""),
-                "provider": p.get("provider", ""),
-                "payment_reference": p.get("payment_reference", ""),
-                "payment_id": p.get("payment_id", ""),
-                "amount_usd": p.get("amount_usd", ""),
-                "currency": p.get("currency", ""),
-                "credits_granted": p.get("credits_granted", ""),
-                "credits_remaining": p.get("credits_remaining", ""),
-                "credit_type": p.get("credit_type", ""),
-                "is_subscription_purchase": p.get("is_subscription_purchase", ""),
-                "refund_exists": p.get("refund_exists", ""),
-                "latest_refund_status": p.get("latest_refund_status", ""),
-                "latest_refund_id": p.get("latest_refund_id", ""),
-                "refund_action_state": p.get("refund_action_state", ""),
-                "refund_risk_level": risk.get("level", ""),
-                "refund_risk_reason": risk.get("reason", ""),
-            })
-
-        return _csv_response(rows, fieldnames, "purchases.csv")
+        return _csv_export(
+            query,
+            _PURCHASE_CSV_FIELDS,
+            lambda rows: [_purchase_csv_row(p) for p in AdminService.enrich_purchases(rows)],
+            "purchases.csv",
+        )
 
     except Exception as e:
         print(f"[ADMIN] Purchases CSV export error: {e}")
@@ -3077,65 +3218,68 @@ def purchases_export_csv():
         return jsonify({"ok": False, "error": str(e)}), 500
 
 
+_REFUND_CSV_FIELDS = [
+    "refund_id", "created_at", "executed_at", "refund_status", "refund_type",
+    "email", "identity_id", "purchase_id", "subscription_id", "purchase_type",
+    "amount_usd", "currency", "credits_reversed", "credits_granted", "credits_used",
+    "credit_type", "payment_provider",
+    "external_refund_attempted", "external_refund_executed", "external_refund_id", "external_refund_error",
+    "executed_by", "reason", "admin_note", "display_summary",
+]
+
+
+def _refund_csv_row(rf):
+    ext = rf.get("external_refund") or {}
+    return {
+        "refund_id": rf.get("id", ""),
+        "created_at": rf.get("created_at", ""),
+        "executed_at": rf.get("executed_at", ""),
+        "refund_status": rf.get("refund_status", ""),
+        "refund_type": rf.get("refund_type", ""),
+        "email": rf.get("email", ""),
+        "identity_id": rf.get("identity_id", ""),
+        "purchase_id": rf.get("purchase_id", ""),
+        "subscription_id": rf.get("subscription_id", ""),
+        "purchase_type": rf.get("purchase_type", ""),
+        "amount_usd": rf.get("amount_usd", ""),
+        "currency": rf.get("currency", ""),
+        "credits_reversed": rf.get("credits_reversed", ""),
+        "credits_granted": rf.get("credits_granted", ""),
+        "credits_used": rf.get("credits_used", ""),
+        "credit_type": rf.get("credit_type", ""),
+        "payment_provider": rf.get("payment_provider", ""),
+        "external_refund_attempted": ext.get("attempted", ""),
+        "external_refund_executed": ext.get("executed", ""),
+        "external_refund_id": ext.get("external_refund_id", ""),
+        "external_refund_error": ext.get("error", ""),
+        "executed_by": rf.get("executed_by", ""),
+        "reason": rf.get("reason", ""),
+        "admin_note": rf.get("admin_note", ""),
+        "display_summary": rf.get("display_summary", ""),
+    }
+
+
 @bp.route("/refunds/export.csv", methods=["GET"])
 @require_admin
 def refunds_export_csv():
     """Export refund history as CSV with same filters as list endpoint."""
     try:
-        from backend.services.refund_service import list_refunds
+        from backend.services.refund_service import format_refund, refunds_export_query
 
-        result = list_refunds(
+        query = refunds_export_query(
             status=request.args.get("status"),
             identity_id=request.args.get("identity_id"),
             purchase_id=request.args.get("purchase_id"),
             email=request.args.get("email"),
             date_from=request.args.get("date_from"),
             date_to=request.args.get("date_to"),
-            limit=min(int(request.args.get("limit", 5000)), 5000),
-            offset=0,
         )
-
-        fieldnames = [
-            "refund_id", "created_at", "executed_at", "refund_status", "refund_type",
-            "email", "identity_id", "purchase_id", "subscription_id", "purchase_type",
-            "amount_usd", "currency", "credits_reversed", "credits_granted", "credits_used",
-            "credit_type", "payment_provider",
-            "external_refund_attempted", "external_refund_executed", "external_refund_id", "external_refund_error",
-            "executed_by", "reason", "admin_note", "display_summary",
-        ]
-
-        rows = []
-        for rf in result.get("refunds", []):
-            ext = rf.get("external_refund") or {}
-            rows.append({
-                "refund_id": rf.get("id", ""),
-                "created_at": rf.get("created_at", ""),
-                "executed_at": rf.get("executed_at", ""),
-                "refund_status": rf.get("refund_status", ""),
-                "refund_type": rf.get("refund_type", ""),
-                "email": rf.get("email", ""),
-                "identity_id": rf.get("identity_id", ""),
-                "purchase_id": rf.get("purchase_id", ""),
-                "subscription_id": rf.get("subscription_id", ""),
-                "purchase_type": rf.get("purchase_type", ""),
-                "amount_usd": rf.get("amount_usd", ""),
-                "currency": rf.get("currency", ""),
-                "credits_reversed": rf.get("credits_reversed", ""),
-                "credits_granted": rf.get("credits_granted", ""),
-                "credits_used": rf.get("credits_used", ""),
-                "credit_type": rf.get("credit_type", ""),
-                "payment_provider": rf.get("payment_provider", ""),
-                "external_refund_attempted": ext.get("attempted", ""),
-                "external_refund_executed": ext.get("executed", ""),
-                "external_refund_id": ext.get("external_refund_id", ""),
-                "external_refund_error": ext.get("error", ""),
-                "executed_by": rf.get("executed_by", ""),
-                "reason": rf.get("reason", ""),
-                "admin_note": rf.get("admin_note", ""),
-                "display_summary": rf.get("display_summary", ""),
-            })
-
-        return _csv_response(rows, fieldnames, "refund_history.csv")
+        return _csv_export(
+            query,
+            _REFUND_CSV_FIELDS,
+            lambda rows: [_refund_csv_row(format_refund(r)) for r in rows],
+            "refund_history.csv",
+        )
 
     except Exception as e:
         print(f"[ADMIN] Refunds CSV export error: {e}")
@@ -3144,66 +3288,68 @@ def refunds_export_csv():
         return jsonify({"ok": False, "error": str(e)}), 500
 
 
+_DISPUTE_FLAG_CSV_FIELDS = [
+    "flag_purchase_paid", "flag_credits_granted", "flag_credits_used",
+    "flag_refund_offered", "flag_refund_executed", "flag_account_access_confirmed",
+]
+_DISPUTE_CSV_FIELDS = [
+    "dispute_id", "created_at", "updated_at", "dispute_status",
+    "email", "identity_id", "purchase_id",
+    "payment_provider", "payment_reference",
+    "amount_usd", "currency",
+    "dispute_reason", "admin_note", "evidence_summary",
+] + _DISPUTE_FLAG_CSV_FIELDS + ["evidence_links"]
+
+
+def _dispute_csv_row(d):
+    flags = d.get("evidence_flags") or {}
+    links = d.get("evidence_links") or []
+    return {
+        "dispute_id": d.get("id", ""),
+        "created_at": d.get("created_at", ""),
+        "updated_at": d.get("updated_at", ""),
+        "dispute_status": d.get("dispute_status", ""),
+        "email": d.get("email", ""),
+        "identity_id": d.get("identity_id", ""),
+        "purchase_id": d.get("purchase_id", ""),
+        "payment_provider": d.get("payment_provider", ""),
+        "payment_reference": d.get("payment_reference", ""),
+        "amount_usd": d.get("amount_usd", ""),
+        "currency": d.get("currency", ""),
+        "dispute_reason": d.get("dispute_reason", ""),
+        "admin_note": d.get("admin_note", ""),
+        "evidence_summary": d.get("evidence_summary", ""),
+        "flag_purchase_paid": flags.get("purchase_paid", ""),
+        "flag_credits_granted": flags.get("credits_granted", ""),
+        "flag_credits_used": flags.get("credits_used", ""),
+        "flag_refund_offered": flags.get("refund_offered", ""),
+        "flag_refund_executed": flags.get("refund_executed", ""),
+        "flag_account_access_confirmed": flags.get("account_access_confirmed", ""),
+        "evidence_links": " | ".join(links) if links else "",
+    }
+
+
 @bp.route("/disputes/export.csv", methods=["GET"])
 @require_admin
 def disputes_export_csv():
     """Export disputes as CSV with same filters as list endpoint."""
     try:
-        from backend.services.dispute_service import list_disputes
+        from backend.services.dispute_service import disputes_export_query, format_dispute
 
-        result = list_disputes(
+        query = disputes_export_query(
             status=request.args.get("status"),
             purchase_id=request.args.get("purchase_id"),
             email=request.args.get("email"),
             identity_id=request.args.get("identity_id"),
             date_from=request.args.get("date_from"),
             date_to=request.args.get("date_to"),
-            limit=min(int(request.args.get("limit", 5000)), 5000),
-            offset=0,
         )
-
-        _evd_flag_cols = [
-            "flag_purchase_paid", "flag_credits_granted", "flag_credits_used",
-            "flag_refund_offered", "flag_refund_executed", "flag_account_access_confirmed",
-        ]
-
-        fieldnames = [
-            "dispute_id", "created_at", "updated_at", "dispute_status",
-            "email", "identity_id", "purchase_id",
-            "payment_provider", "payment_reference",
-            "amount_usd", "currency",
-            "dispute_reason", "admin_note", "evidence_summary",
-        ] + _evd_flag_cols + ["evidence_links"]
-
-        rows = []
-        for d in result.get("disputes", []):
-            flags = d.get("evidence_flags") or {}
-            links = d.get("evidence_links") or []
-            rows.append({
-                "dispute_id": d.get("id", ""),
-                "created_at": d.get("created_at", ""),
-                "updated_at": d.get("updated_at", ""),
-                "dispute_status": d.get("dispute_status", ""),
-                "email": d.get("email", ""),
-                "identity_id": d.get("identity_id", ""),
-                "purchase_id": d.get("purchase_id", ""),
-                "payment_provider": d.get("payment_provider", ""),
-                "payment_reference": d.get("payment_reference", ""),
-                "amount_usd": d.get("amount_usd", ""),
-                "currency": d.get("currency", ""),
-                "dispute_reason": d.get("dispute_reason", ""),
-                "admin_note": d.get("admin_note", ""),
-                "evidence_summary": d.get("evidence_summary", ""),
-                "flag_purchase_paid": flags.get("purchase_paid", ""),
-                "flag_credits_granted": flags.get("credits_granted", ""),
-                "flag_credits_used": flags.get("credits_used", ""),
-                "flag_refund_offered": flags.get("refund_offered", ""),
-                "flag_refund_executed": flags.get("refund_executed", ""),
-                "flag_account_access_confirmed": flags.get("account_access_confirmed", ""),
-                "evidence_links": " | ".join(links) if links else "",
-            })
-
-        return _csv_response(rows, fieldnames, "disputes.csv")
+        return _csv_export(
+            query,
+            _DISPUTE_CSV_FIELDS,
+            lambda rows: [_dispute_csv_row(format_dispute(r)) for r in rows],
+            "disputes.csv",
+        )
 
     except Exception as e:
         print(f"[ADMIN] Disputes CSV export error: {e}")
@@ -3212,45 +3358,48 @@ def disputes_export_csv():
         return jsonify({"ok": False, "error": str(e)}), 500
 
 
+_LEDGER_CSV_FIELDS = [
+    "id", "created_at", "provider", "entry_type", "amount_usd", "currency",
+    "balance_snapshot_usd", "description", "reference", "period_month", "recorded_by",
+]
+
+
+def _ledger_csv_row(e):
+    return {
+        "id": e.get("id", ""),
+        "created_at": e.get("created_at", ""),
+        "provider": e.get("provider", ""),
+        "entry_type": e.get("entry_type", ""),
+        "amount_usd": e.get("amount_usd", ""),
+        "currency": e.get("currency", ""),
+        "balance_snapshot_usd": e.get("balance_snapshot_usd", ""),
+        "description": e.get("description", ""),
+        "reference": e.get("reference", ""),
+        "period_month": e.get("period_month", ""),
+        "recorded_by": e.get("recorded_by", ""),
+    }
+
+
 @bp.route("/provider-ledger/export.csv", methods=["GET"])
 @require_admin
 def provider_ledger_export_csv():
     """Export provider ledger entries as CSV."""
     try:
-        from backend.services.provider_ledger_service import list_ledger_entries
+        from backend.services.provider_ledger_service import format_ledger_entry, ledger_export_query
 
-        result = list_ledger_entries(
+        query = ledger_export_query(
             provider=request.args.get("provider"),
             entry_type=request.args.get("entry_type"),
             month=request.args.get("month"),
             date_from=request.args.get("date_from"),
             date_to=request.args.get("date_to"),
-            limit=min(int(request.args.get("limit", 5000)), 5000),
-            offset=0,
         )
-
-        fieldnames = [
-            "id", "created_at", "provider", "entry_type", "amount_usd", "currency",
-            "balance_snapshot_usd", "description", "reference", "period_month", "recorded_by",
-        ]
-
-        rows = []
-        for e in result.get("entries", []):
-            rows.append({
-                "id": e.get("id", ""),
-                "created_at": e.get("created_at", ""),
-                "provider": e.get("provider", ""),
-                "entry_type": e.get("entry_type", ""),
-                "amount_usd": e.get("amount_usd", ""),
-                "currency": e.get("currency", ""),
-                "balance_snapshot_usd": e.get("balance_snapshot_usd", ""),
-                "description": e.get("description", ""),
-                "reference": e.get("reference", ""),
-                "period_month": e.get("period_month", ""),
-                "recorded_by": e.get("recorded_by", ""),
-            })
-
-        return _csv_response(rows, fieldnames, "provider_ledger.csv")
+        return _csv_export(
+            query,
+            _LEDGER_CSV_FIELDS,
+            lambda rows: [_ledger_csv_row(format_ledger_entry(r)) for r in rows],
+            "provider_ledger.csv",
+        )
 
     except Exception as e:
         print(f"[ADMIN] Provider ledger CSV export error: {e}")
@@ -3838,9 +3987,11 @@ def dashboard_summary():
     Unified admin dashboard summary.
 
     Query params:
-        force  – "true" to bypass 60s cache
+        force  – "true" to recompute every section now instead of reading
+                 the background snapshots
 
-    Returns operational, economics, safety, and anomaly data.
+    Returns operational, economics, safety, and anomaly data, plus each
+    section's snapshot age and compute time under "sections".
     """
     force = request.args.get("force", "").lower() == "true"
     try:
@@ -4089,10 +4240,24 @@ def update_campaign(campaign_id):
 @bp.route("/campaigns/<campaign_id>/publish", methods=["POST"])
 @require_admin
 def publish_campaign(campaign_id):
-    """Publish a campaign: resolve audience and deliver notifications."""
+    """Publish a campaign: resolve audience and deliver notifications.
+
+    A run that stopped under load leaves the campaign 'publishing' and
+    answers 503: nothing resumes it until it is published again.
+    """
     try:
         from backend.services.notification_campaign_service import NotificationCampaignService
         result = NotificationCampaignService.publish_campaign(campaign_id)
+        if result.get("deferred"):
+            return jsonify({
+                "ok": False,
+                "error": "publish_deferred",
+                "message": (
+                    f"Delivery paused under load with {result['remaining']} recipients left. "
+                    "Publish again to resume."
+                ),
+                **result,
+            }), 503, {"Retry-After": "60"}
         return jsonify({"ok": True, **result})
     except ValueError as e:
         return jsonify({"ok": False, "error": str(e)}), 400
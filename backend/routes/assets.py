@@ -11,31 +11,18 @@ import ipaddress
 import re
 import socket
 
-import boto3
 import requests
 from flask import Blueprint, Response, abort, jsonify, request
 
-from backend.config import (
-    AWS_ACCESS_KEY_ID,
-    AWS_BUCKET_MODELS,
-    AWS_REGION,
-    AWS_SECRET_ACCESS_KEY,
-    PROXY_ALLOWED_HOSTS,
-)
+from backend.config import AWS_BUCKET_MODELS, PROXY_ALLOWED_HOSTS
 from backend.db import USE_DB, get_conn, dict_row, Tables
 from backend.middleware import with_session, with_optional_session
 from backend.services.identity_service import require_identity
+from backend.services.mesh_conversion_service import ConversionOptions, convert_model
+from backend.services.s3_service import presign_s3_key, presign_s3_keys
 
 bp = Blueprint("assets", __name__)
 
-# Local S3 client for presigned URLs
-_s3 = boto3.client(
-    "s3",
-    region_name=AWS_REGION,
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-)
-
 
 def _extract_s3_key_from_url(url: str | None) -> str | None:
     if not url:
@@ -357,11 +344,9 @@ def proxy_glb_mod():
     # === S3 URLs: Redirect to presigned URL (no proxying needed) ===
     if is_our_s3 and s3_key:
         try:
-            presigned_url = _s3.generate_presigned_url(
-                "get_object",
-                Params={"Bucket": AWS_BUCKET_MODELS, "Key": s3_key},
-                ExpiresIn=3600,
-            )
+            presigned_url = presign_s3_key(s3_key, expires_in=3600)
+            if not presigned_url:
+                raise RuntimeError("presign returned no URL")
             # For HEAD requests, return 200 with headers (no body)
             if request.method == "HEAD":
                 headers = {
@@ -469,6 +454,50 @@ def proxy_glb_mod():
     return Response(gen(), status=r.status_code, headers=resp_headers)
 
 
+def _converted_download(glb_url: str, source_hash: str | None, name: str | None, file_type: str):
+    """
+    STL/3MF download of a GLB. Conversions are cached per (GLB content hash,
+    options), so only the first download of a model with given
+    units/scale/height converts; later ones just presign the stored file.
+    """
+    try:
+        options = ConversionOptions.from_params(request.args, fmt=file_type)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": {"code": "INVALID_OPTIONS", "message": str(e)}}), 400
+
+    converted = convert_model(source_url=glb_url, source_hash=source_hash, options=options)
+    if not converted.get("ok"):
+        print(f"[DOWNLOAD][mod] {file_type} conversion failed: {converted.get('error')}")
+        return jsonify({
+            "ok": False,
+            "error": {"code": "CONVERSION_FAILED", "message": f"Could not convert this model to {file_type.upper()}"},
+        }), 422
+
+    stem = _clean_download_filename(name, "model").rsplit(".", 1)[0] or "model"
+    filename = f"{stem}.{file_type}"
+    expires_in = 3600
+    presigned_url = presign_s3_key(
+        converted["s3_key"],
+        expires_in=expires_in,
+        response_disposition=_attachment_header(filename),
+    )
+    if not presigned_url:
+        return jsonify({
+            "ok": False,
+            "error": {"code": "S3_ERROR", "message": "Failed to generate download URL"},
+        }), 500
+
+    return jsonify({
+        "ok": True,
+        "download_url": presigned_url,
+        "filename": filename,
+        "expires_in": expires_in,
+        "cached": converted.get("cached", False),
+        "size_bytes": converted.get("size_bytes"),
+        "source": "modular",
+    })
+
+
 @bp.route("/assets/<asset_type>/<asset_id>/download", methods=["GET", "OPTIONS"])
 @with_session
 def asset_download_mod(asset_type: str, asset_id: str):
@@ -498,19 +527,19 @@ def asset_download_mod(asset_type: str, asset_id: str):
             with conn.cursor() as cur:
                 if asset_type == "model":
                     file_type = file_type or "glb"
-                    if file_type == "glb":
+                    if file_type in ("glb", "stl", "3mf"):
                         url_col = "glb_url"
                     elif file_type == "thumbnail":
                         url_col = "thumbnail_url"
                     else:
                         return jsonify({
                             "ok": False,
-                            "error": {"code": "INVALID_FILE_TYPE", "message": "file must be 'glb' or 'thumbnail' for models"},
+                            "error": {"code": "INVALID_FILE_TYPE", "message": "file must be 'glb', 'stl', '3mf' or 'thumbnail' for models"},
                         }), 400
 
                     cur.execute(
                         f"""
-                        SELECT {url_col} AS url, title
+                        SELECT {url_col} AS url, title, content_hash AS source_hash
                         FROM timrx_app.models
                         WHERE id = %s AND identity_id = %s
                         """,
@@ -531,7 +560,7 @@ def asset_download_mod(asset_type: str, asset_id: str):
 
                     cur.execute(
                         f"""
-                        SELECT {url_col} AS url, filename AS title
+                        SELECT {url_col} AS url, filename AS title, NULL AS source_hash
                         FROM timrx_app.images
                         WHERE id = %s AND identity_id = %s
                         """,
@@ -540,7 +569,7 @@ def asset_download_mod(asset_type: str, asset_id: str):
 
                 else:
                     file_type = file_type or "glb"
-                    if file_type == "glb":
+                    if file_type in ("glb", "stl", "3mf"):
                         url_col = "glb_url"
                     elif file_type == "thumbnail":
                         url_col = "thumbnail_url"
@@ -549,14 +578,15 @@ def asset_download_mod(asset_type: str, asset_id: str):
                     else:
                         return jsonify({
                             "ok": False,
-                            "error": {"code": "INVALID_FILE_TYPE", "message": "file must be 'glb', 'thumbnail', or 'image' for history items"},
+                            "error": {"code": "INVALID_FILE_TYPE", "message": "file must be 'glb', 'stl', '3mf', 'thumbnail', or 'image' for history items"},
                         }), 400
 
                     cur.execute(
                         f"""
-                        SELECT {url_col} AS url, title
-                        FROM timrx_app.history_items
-                        WHERE id = %s AND identity_id = %s
+                        SELECT h.{url_col} AS url, h.title, m.content_hash AS source_hash
+                        FROM timrx_app.history_items h
+                        LEFT JOIN timrx_app.models m ON m.id = h.model_id
+                        WHERE h.id = %s AND h.identity_id = %s
                         """,
                         (asset_id, identity_id),
                     )
@@ -571,6 +601,7 @@ def asset_download_mod(asset_type: str, asset_id: str):
 
         url = row.get("url") if isinstance(row, dict) else row[0]
         name = row.get("title") if isinstance(row, dict) else row[1]
+        source_hash = row.get("source_hash") if isinstance(row, dict) else row[2]
 
         if not url:
             return jsonify({
@@ -578,6 +609,9 @@ def asset_download_mod(asset_type: str, asset_id: str):
                 "error": {"code": "FILE_NOT_FOUND", "message": f"No {file_type} file available for this asset"},
             }), 404
 
+        if file_type in ("stl", "3mf"):
+            return _converted_download(url, source_hash, name, file_type)
+
         s3_key = _extract_s3_key_from_url(url)
         if not s3_key:
             return jsonify({
@@ -590,14 +624,8 @@ def asset_download_mod(asset_type: str, asset_id: str):
             })
 
         expires_in = 3600
-        try:
-            presigned_url = _s3.generate_presigned_url(
-                "get_object",
-                Params={"Bucket": AWS_BUCKET_MODELS, "Key": s3_key},
-                ExpiresIn=expires_in,
-            )
-        except Exception as e:
-            print(f"[DOWNLOAD][mod] Error generating presigned URL: {e}")
+        presigned_url = presign_s3_key(s3_key, expires_in=expires_in)
+        if not presigned_url:
             return jsonify({
                 "ok": False,
                 "error": {"code": "S3_ERROR", "message": "Failed to generate download URL"},
@@ -620,3 +648,115 @@ def asset_download_mod(asset_type: str, asset_id: str):
     except Exception as e:
         print(f"[INTERNAL_ERROR] context=asset_download error={e}")
         return jsonify({"ok": False, "error": {"code": "SERVER_ERROR", "message": "Something went wrong. Please try again."}}), 500
+
+
+# (asset_type, file) -> (table, url column, title column)
+_BATCH_DOWNLOAD_COLUMNS = {
+    ("model", "glb"): ("timrx_app.models", "glb_url", "title"),
+    ("model", "thumbnail"): ("timrx_app.models", "thumbnail_url", "title"),
+    ("image", "original"): ("timrx_app.images", "image_url", "filename"),
+    ("image", "thumbnail"): ("timrx_app.images", "thumbnail_url", "filename"),
+    ("history", "glb"): ("timrx_app.history_items", "glb_url", "title"),
+    ("history", "thumbnail"): ("timrx_app.history_items", "thumbnail_url", "title"),
+    ("history", "image"): ("timrx_app.history_items", "image_url", "title"),
+}
+_BATCH_DOWNLOAD_DEFAULT_FILE = {"model": "glb", "image": "original", "history": "glb"}
+_BATCH_DOWNLOAD_MAX_ITEMS = 500
+
+
+@bp.route("/assets/download-urls", methods=["POST", "OPTIONS"])
+@with_session
+def asset_download_urls_mod():
+    """
+    Batch form of /assets/<type>/<id>/download for history and library pages.
+
+    Body: {"items": [{"asset_type": "model", "asset_id": "...", "file": "glb"}, ...]}
+    One ownership query per (table, column) group and a single presign pass;
+    URLs signed recently are served from the presign cache.
+    """
+    if request.method == "OPTIONS":
+        return ("", 204)
+
+    identity_id, auth_error = require_identity()
+    if auth_error:
+        return auth_error
+
+    if not USE_DB:
+        return jsonify({"ok": False, "error": {"code": "DB_UNAVAILABLE", "message": "Database not configured"}}), 503
+
+    if not AWS_BUCKET_MODELS:
+        return jsonify({"ok": False, "error": {"code": "S3_NOT_CONFIGURED", "message": "S3 storage not configured"}}), 503
+
+    items = (request.get_json(silent=True) or {}).get("items")
+    if not isinstance(items, list) or not items:
+        return jsonify({"ok": False, "error": {"code": "INVALID_REQUEST", "message": "items must be a non-empty list"}}), 400
+    if len(items) > _BATCH_DOWNLOAD_MAX_ITEMS:
+        return jsonify({
+            "ok": False,
+            "error": {"code": "TOO_MANY_ITEMS", "message": f"At most {_BATCH_DOWNLOAD_MAX_ITEMS} items per request"},
+        }), 400
+
+    groups: dict[tuple, list[str]] = {}
+    resolved: list[tuple[str, str, str, tuple | None]] = []
+    for item in items:
+        item = item if isinstance(item, dict) else {}
+        asset_type = str(item.get("asset_type") or "")
+        asset_id = str(item.get("asset_id") or "")
+        file_type = str(item.get("file") or _BATCH_DOWNLOAD_DEFAULT_FILE.get(asset_type, ""))
+        spec = _BATCH_DOWNLOAD_COLUMNS.get((asset_type, file_type)) if asset_id else None
+        resolved.append((asset_type, asset_id, file_type, spec))
+        if spec:
+            groups.setdefault(spec, []).append(asset_id)
+
+    found: dict[tuple, tuple[str | None, str | None]] = {}
+    try:
+        with get_conn() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                for (table, url_col, title_col), ids in groups.items():
+                    cur.execute(
+                        f"""
+                        SELECT id::text AS id, {url_col} AS url, {title_col} AS title
+                        FROM {table}
+                        WHERE id::text = ANY(%s) AND identity_id = %s
+                        """,
+                        (list(dict.fromkeys(ids)), identity_id),
+                    )
+                    for row in cur.fetchall():
+                        found[(table, url_col, title_col, row["id"])] = (row["url"], row["title"])
+    except Exception as e:
+        print(f"[INTERNAL_ERROR] context=asset_download_urls error={e}")
+        return jsonify({"ok": False, "error": {"code": "SERVER_ERROR", "message": "Something went wrong. Please try again."}}), 500
+
+    keys_by_url = {
+        url: _extract_s3_key_from_url(url)
+        for url, _title in found.values()
+        if url
+    }
+    expires_in = 3600
+    signed = presign_s3_keys([k for k in keys_by_url.values() if k], expires_in=expires_in)
+
+    results = []
+    for asset_type, asset_id, file_type, spec in resolved:
+        entry = {"asset_type": asset_type, "asset_id": asset_id, "file": file_type}
+        if not spec:
+            entry["error"] = "INVALID_FILE_TYPE" if asset_id else "INVALID_REQUEST"
+        elif (*spec, asset_id) not in found:
+            entry["error"] = "ASSET_NOT_FOUND"
+        else:
+            url, title = found[(*spec, asset_id)]
+            s3_key = keys_by_url.get(url) if url else None
+            if not url:
+                entry["error"] = "FILE_NOT_FOUND"
+            elif not s3_key:
+                entry.update({"download_url": url, "filename": title or "download", "expires_in": None})
+            elif not signed.get(s3_key):
+                entry["error"] = "S3_ERROR"
+            else:
+                entry.update({
+                    "download_url": signed[s3_key],
+                    "filename": title or s3_key.split("/")[-1],
+                    "expires_in": expires_in,
+                })
+        results.append(entry)
+
+    return jsonify({"ok": True, "items": results, "source": "modular"})
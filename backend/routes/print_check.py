@@ -14,7 +14,7 @@ from collections import defaultdict
 
 from flask import Blueprint, jsonify, request
 
-from backend.db import USE_DB, get_conn, Tables
+from backend.db import USE_DB, get_conn, release_scope_connection, Tables
 from backend.middleware import with_session_readonly
 from backend.services.identity_service import require_identity
 
@@ -191,6 +191,10 @@ def print_check(job_id: str):
             "retry_after": 8,
         }), 429
 
+    # The analysis downloads and inspects the mesh for seconds; don't keep the
+    # request's DB connection checked out meanwhile.
+    release_scope_connection()
+
     # Run analysis
     try:
         from backend.services.print_analysis_service import PrintAnalysisService
@@ -23,7 +23,9 @@ from backend.middleware import require_admin, require_session
 from backend.services import print_offer_service, print_order_service, s3_service
 from backend.services.paypal_service import PayPalService
 from backend.services.print_order_archive import get_admin_download_target
-from backend.services.print_order_pricing import compute as compute_price, PriceError, pick_currency
+from backend.services.print_order_pricing import (
+    compute as compute_price, compute_options, PriceError, pick_currency,
+)
 from backend.services.download_link_signer import verify as _verify_download_link
 
 bp = Blueprint("print_orders", __name__)
@@ -118,7 +120,11 @@ def _validate_payload(data: Dict[str, Any]) -> Dict[str, Any]:
 @bp.route("/quote", methods=["POST", "OPTIONS"])
 @require_session
 def quote():
-    """Server-side price recomputation, returned without persisting an order."""
+    """
+    Server-side price recomputation, returned without persisting an order.
+    With ``include_options: true`` the response also carries base prices for
+    every quality × infill combination (one batched estimate, no offers).
+    """
     if request.method == "OPTIONS":
         return ("", 204)
 
@@ -127,9 +133,13 @@ def quote():
     shipping = data.get("shipping") or {}
     country = (shipping.get("country") or data.get("country") or "").upper()
     speed   = (shipping.get("speed") or data.get("speed") or "standard").lower()
+    model = data.get("model") if isinstance(data.get("model"), dict) else {}
 
     try:
-        base_price = compute_price(spec=spec, country=country, speed=speed)
+        features = print_order_service.model_features(
+            (model.get("id") or "")[:128] or None, g.identity_id,
+        )
+        base_price = compute_price(spec=spec, country=country, speed=speed, features=features)
         price = print_offer_service.compute_offer_quote(
             identity_id=g.identity_id,
             base=base_price,
@@ -137,6 +147,9 @@ def quote():
             shipping=shipping,
             request_ip=_get_client_ip(),
         )
+        options = None
+        if data.get("include_options"):
+            options = compute_options(spec=spec, country=country, speed=speed, features=features)
     except PriceError as e:
         return _err("BAD_SPEC", str(e), 400)
     except Exception as e:
@@ -153,6 +166,7 @@ def quote():
         "currency_detected": pick_currency(country),
         "providers_available": providers,
         "quote": price,
+        **({"options": options} if options is not None else {}),
     })
 
 
@@ -315,18 +329,19 @@ def _admin_download_handler(order_ref: str):
 
     s3_key, _content_type, filename = target
     # Presign with response-content-disposition so the browser saves it
-    # with our chosen filename.
+    # with our chosen filename. It has to be part of the signed request —
+    # a query param appended after signing fails SigV4 verification.
     try:
-        url = s3_service.presign_s3_key(s3_key, expires_in=3600)
+        url = s3_service.presign_s3_key(
+            s3_key,
+            expires_in=3600,
+            response_disposition=f'attachment; filename="{filename}"',
+        )
     except Exception as e:
         print(f"[PRINT-ORDER] presign failed for {s3_key}: {e}")
         return _err("PRESIGN_FAILED", "Could not generate download URL", 500)
     if not url:
         return _err("PRESIGN_FAILED", "S3 not configured", 500)
-
-    # Append disposition hint to the presigned URL (S3 honors this param)
-    sep = "&" if "?" in url else "?"
-    url = f"{url}{sep}response-content-disposition=attachment%3B%20filename%3D{filename}"
     return redirect(url, code=302)
 
 
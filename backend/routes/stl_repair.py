@@ -18,7 +18,8 @@ from backend.db import USE_DB, get_conn, Tables
 from backend.middleware import with_session
 from backend.services import s3_service
 from backend.services.identity_service import require_identity
-from backend.services.stl_repair_service import StlRepairService
+from backend.services.mesh_conversion_service import store_artifact_bytes
+from backend.services.stl_repair_service import StlRepairService, repair_artifact_options
 
 bp = Blueprint("stl_repair", __name__)
 
@@ -179,13 +180,15 @@ def repair_existing_model(job_id: str):
         }), 422
 
     stl_bytes = result.pop("stl_bytes", None)
-    if not stl_bytes:
+    artifact = result.pop("artifact", None)
+    source_hash = result.pop("source_hash", None)
+    if not stl_bytes and not artifact:
         return jsonify({"ok": False, "error": "Repair did not produce an STL file"}), 500
 
     before = result.get("before") or {}
     after = result.get("after") or {}
     print(
-        "[STL_REPAIR] completed "
+        f"[STL_REPAIR] {'reused' if artifact else 'completed'} "
         f"job={job_id} engine={result.get('engine')} runtime={result.get('repair_runtime_seconds')} "
         f"before_faces={before.get('faces')} before_watertight={before.get('is_watertight')} "
         f"before_boundary_edges={before.get('boundary_edges')} before_non_manifold_edges={before.get('non_manifold_edges')} "
@@ -195,26 +198,41 @@ def repair_existing_model(job_id: str):
     )
 
     stem = _safe_filename_stem(body.get("filename") or title)
-    digest = hashlib.sha256(stl_bytes).hexdigest()[:12]
-    key = f"models/stl-repairs/{identity_id}/{stem}-{digest}.stl"
+    filename = f"{stem}-repaired.stl"
 
     try:
-        upload = s3_service.upload_bytes_to_s3(
-            data_bytes=stl_bytes,
-            content_type="model/stl",
-            prefix="models",
-            key=key,
-            return_hash=True,
+        if artifact is None:
+            # Repaired output is stored once per (source hash, target height);
+            # repeat repairs of the same model come back as `artifact` above.
+            options = repair_artifact_options(target_height_mm)
+            if options is not None and source_hash:
+                artifact = store_artifact_bytes(source_hash, options, stl_bytes, meta={"report": result})
+        if artifact is not None:
+            repaired_url = artifact["url"]
+            s3_key = artifact["s3_key"]
+        else:
+            digest = hashlib.sha256(stl_bytes).hexdigest()[:12]
+            key = f"models/stl-repairs/{identity_id}/{stem}-{digest}.stl"
+            upload = s3_service.upload_bytes_to_s3(
+                data_bytes=stl_bytes,
+                content_type="model/stl",
+                prefix="models",
+                key=key,
+                return_hash=True,
+            )
+            repaired_url = upload.get("url")
+            s3_key = upload.get("key") or key
+        download_url = s3_service.presign_s3_key(
+            s3_key,
+            expires_in=3600,
+            response_disposition=f'attachment; filename="{filename}"',
         )
-        repaired_url = upload.get("url")
-        s3_key = upload.get("key") or key
-        download_url = s3_service.presign_s3_key(s3_key, expires_in=3600)
     except Exception as exc:
         return jsonify({"ok": False, "error": f"Could not store repaired STL: {exc}"}), 500
 
     return jsonify({
         "ok": True,
-        "filename": f"{stem}-repaired.stl",
+        "filename": filename,
         "repaired_url": repaired_url,
         "download_url": download_url or repaired_url,
         "expires_in": 3600 if download_url else None,
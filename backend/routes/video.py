@@ -22,18 +22,18 @@ import json
 import os
 import re
 import shutil
-import subprocess
 import tempfile
-import threading
 import uuid
 from pathlib import Path
-from flask import Blueprint, Response, g, jsonify, request, send_file
+from flask import Blueprint, Response, g, jsonify, redirect, request, send_file
 
 from backend.db import USE_DB, get_conn, Tables
 from backend.middleware import require_admin, with_session, with_session_readonly
 from backend.services.async_dispatch import get_executor
 from backend.services.credits_helper import start_paid_job, release_job_credits
 from backend.services.expense_guard import ExpenseGuard
+from backend.services import video_conversion_store
+from backend.services.ffmpeg_service import ConversionQueueFull, conversion_queue, ffmpeg_bin
 from backend.services.identity_service import require_identity
 from backend.services.history_service import create_video_record
 from backend.services.job_service import create_internal_job_row, load_store, save_store
@@ -74,7 +74,6 @@ from backend.services.status_cache import get_cached_status, cache_status
 
 bp = Blueprint("video", __name__)
 
-_CONVERT_LOCK = threading.Semaphore(int(os.getenv("VIDEO_CONVERT_MAX_PARALLEL", "1")))
 _VIDEO_CONVERT_MAX_UPLOAD_MB = int(os.getenv("VIDEO_CONVERT_MAX_UPLOAD_MB", "200"))
 _VIDEO_CONVERT_TIMEOUT_SECONDS = int(os.getenv("VIDEO_CONVERT_TIMEOUT_SECONDS", "600"))
 _VIDEO_CONVERT_MAX_UPLOAD_BYTES = _VIDEO_CONVERT_MAX_UPLOAD_MB * 1024 * 1024
@@ -452,10 +451,67 @@ def _cleanup_dir(path: str) -> None:
         print(f"[VIDEO_CONVERT] cleanup failed path={path}: {exc}")
 
 
+def _avi_to_mp4_ffmpeg_args() -> list[str]:
+    return [
+        "-map", "0:v:0",
+        "-map", "0:a?",
+        "-c:v", "libx264",
+        "-preset", os.getenv("VIDEO_CONVERT_X264_PRESET", "veryfast"),
+        "-crf", os.getenv("VIDEO_CONVERT_CRF", "23"),
+        "-pix_fmt", "yuv420p",
+        "-c:a", "aac",
+        "-b:a", "160k",
+        "-movflags", "+faststart",
+    ]
+
+
+def _wants_async_convert() -> bool:
+    flag = request.args.get("async") or request.form.get("async") or ""
+    return flag.strip().lower() in ("1", "true", "yes")
+
+
+def _send_converted_file(job):
+    """Stream a finished conversion back and drop the job once it's sent."""
+    response = send_file(
+        job.output_path,
+        mimetype="video/mp4",
+        as_attachment=True,
+        download_name=job.meta.get("download_name") or "timrx-video.mp4",
+        max_age=0,
+        conditional=False,
+    )
+    response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
+    # The queue slot was freed when ffmpeg exited; this only cleans the files
+    # once streaming completes.
+    response.call_on_close(lambda: conversion_queue.discard(job))
+    return response
+
+
+def _conversion_error_response(status: str):
+    if status == "timeout":
+        return jsonify({
+            "ok": False,
+            "error": "conversion_timeout",
+            "message": "Conversion timed out. Try a shorter or smaller AVI file.",
+        }), 504
+    return jsonify({
+        "ok": False,
+        "error": "conversion_failed",
+        "message": "FFmpeg could not convert this AVI file.",
+    }), 422
+
+
 @bp.route("/video/convert/avi-to-mp4", methods=["POST", "OPTIONS"])
 @with_session
 def convert_avi_to_mp4():
-    """Convert one uploaded AVI to MP4 using local temp storage only."""
+    """
+    Convert one uploaded AVI to MP4 using local temp storage only.
+
+    The conversion runs on the bounded ffmpeg queue (ffmpeg_service). By
+    default the request waits and streams the MP4 back as before; with
+    ``?async=1`` it returns 202 and the client polls
+    /video/convert/jobs/<job_id> for progress, then downloads.
+    """
     if request.method == "OPTIONS":
         return ("", 204)
 
@@ -463,8 +519,7 @@ def convert_avi_to_mp4():
     if auth_error:
         return auth_error
 
-    ffmpeg_bin = shutil.which(os.getenv("FFMPEG_BIN", "ffmpeg"))
-    if not ffmpeg_bin:
+    if not ffmpeg_bin():
         return jsonify({
             "ok": False,
             "error": "ffmpeg_not_available",
@@ -487,29 +542,12 @@ def convert_avi_to_mp4():
     if not original_name.lower().endswith(".avi"):
         return jsonify({"ok": False, "error": "invalid_format", "message": "Only .avi files are accepted."}), 400
 
-    if not _CONVERT_LOCK.acquire(blocking=False):
-        return jsonify({
-            "ok": False,
-            "error": "converter_busy",
-            "message": "Another video conversion is running. Please try again shortly.",
-            "retry_after": 30,
-        }), 429
-
     tmp_dir = tempfile.mkdtemp(prefix="timrx-avi-convert-")
     input_path = os.path.join(tmp_dir, "input.avi")
     output_base = _safe_video_filename(original_name)
     output_path = os.path.join(tmp_dir, f"{output_base}.mp4")
     downloaded = 0
-    lock_released = False  # guard so the semaphore is released exactly once
-
-    def _release_lock_once():
-        nonlocal lock_released
-        if not lock_released:
-            lock_released = True
-            try:
-                _CONVERT_LOCK.release()
-            except Exception:
-                pass
+    job = None
 
     try:
         with open(input_path, "wb") as fh:
@@ -526,83 +564,133 @@ def convert_avi_to_mp4():
                     }), 413
                 fh.write(chunk)
 
-        cmd = [
-            ffmpeg_bin,
-            "-hide_banner",
-            "-nostdin",
-            "-y",
-            "-i", input_path,
-            "-map", "0:v:0",
-            "-map", "0:a?",
-            "-c:v", "libx264",
-            "-preset", os.getenv("VIDEO_CONVERT_X264_PRESET", "veryfast"),
-            "-crf", os.getenv("VIDEO_CONVERT_CRF", "23"),
-            "-pix_fmt", "yuv420p",
-            "-c:a", "aac",
-            "-b:a", "160k",
-            "-movflags", "+faststart",
-            output_path,
-        ]
-        result = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=_VIDEO_CONVERT_TIMEOUT_SECONDS,
-            check=False,
-        )
-        if result.returncode != 0 or not os.path.exists(output_path) or os.path.getsize(output_path) <= 0:
-            stderr = result.stderr.decode("utf-8", errors="ignore")[-1200:]
-            print(f"[VIDEO_CONVERT] ffmpeg failed user={identity_id[:8]} rc={result.returncode} err={stderr}")
+        try:
+            job = conversion_queue.submit(
+                identity_id,
+                input_path,
+                output_path,
+                tmp_dir,
+                _avi_to_mp4_ffmpeg_args(),
+                meta={"download_name": f"{output_base}.mp4", "input_bytes": downloaded},
+                is_async=_wants_async_convert(),
+            )
+        except ConversionQueueFull:
             return jsonify({
                 "ok": False,
-                "error": "conversion_failed",
-                "message": "FFmpeg could not convert this AVI file.",
-            }), 422
-
-        # ffmpeg has finished — the CPU-heavy work is done. Release the lock NOW
-        # so the next conversion can start. Streaming the finished file back is
-        # cheap I/O and must NOT hold the lock: relying on call_on_close to
-        # release leaks the semaphore forever if the client disconnects or the
-        # gunicorn worker is recycled mid-download (root cause of the permanent
-        # "Another video conversion is running" 429).
-        _release_lock_once()
-
-        response = send_file(
-            output_path,
-            mimetype="video/mp4",
-            as_attachment=True,
-            download_name=f"{output_base}.mp4",
-            max_age=0,
-            conditional=False,
-        )
-        response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-        # call_on_close now only cleans the temp dir once streaming completes.
-        response.call_on_close(lambda: _cleanup_dir(tmp_dir))
+                "error": "converter_busy",
+                "message": "Too many video conversions are queued. Please try again shortly.",
+                "retry_after": 30,
+            }), 429
+
+        if job.is_async:
+            return jsonify({
+                "ok": True,
+                "job_id": job.job_id,
+                "status": job.status,
+                "queue_position": conversion_queue.queue_position(job),
+                "status_url": f"/api/video/convert/jobs/{job.job_id}",
+            }), 202
+
+        # Synchronous mode: wait for the queued job (queue wait + conversion).
+        if not job.done.wait(timeout=_VIDEO_CONVERT_TIMEOUT_SECONDS * 2):
+            conversion_queue.discard(job)
+            return jsonify({
+                "ok": False,
+                "error": "conversion_timeout",
+                "message": "Conversion timed out. Try a shorter or smaller AVI file.",
+            }), 504
+        if job.status != "done":
+            conversion_queue.discard(job)
+            return _conversion_error_response(job.status)
+
         print(
             f"[VIDEO_CONVERT] success user={identity_id[:8]} "
             f"in={downloaded} out={os.path.getsize(output_path)}"
         )
-        return response
+        return _send_converted_file(job)
 
-    except subprocess.TimeoutExpired:
-        return jsonify({
-            "ok": False,
-            "error": "conversion_timeout",
-            "message": "Conversion timed out. Try a shorter or smaller AVI file.",
-        }), 504
     except Exception as exc:
         print(f"[VIDEO_CONVERT] failed user={identity_id[:8]} error={exc}")
         return jsonify({"ok": False, "error": "conversion_error", "message": "Video conversion failed."}), 500
     finally:
-        # Always release the lock. _release_lock_once is idempotent, so this
-        # covers every early-return and exception path with no double-release.
-        _release_lock_once()
-        # The success path defers temp-dir cleanup to call_on_close (after the
-        # file finishes streaming); every other path cleans up here.
-        if "response" not in locals():
+        # Once a job owns tmp_dir the queue cleans it (on download or TTL);
+        # every pre-submit exit path cleans it here.
+        if job is None:
             _cleanup_dir(tmp_dir)
 
 
+@bp.route("/video/convert/jobs/<job_id>", methods=["GET", "OPTIONS"])
+@with_session
+def convert_job_status(job_id: str):
+    """
+    Progress for a queued AVI conversion (owner only). Jobs running in
+    another worker are answered from video_conversion_store.
+    """
+    if request.method == "OPTIONS":
+        return ("", 204)
+
+    identity_id, auth_error = require_identity()
+    if auth_error:
+        return auth_error
+
+    job = conversion_queue.get(job_id, owner_id=identity_id)
+    if job is not None:
+        body = {"ok": True, **job.to_dict(), "queue_position": conversion_queue.queue_position(job)}
+        downloadable = job.status == "done"
+    else:
+        stored = video_conversion_store.load(job_id, identity_id)
+        if stored is None:
+            return jsonify({"ok": False, "error": "not_found"}), 404
+        body = {"ok": True, **stored["state"], "status": stored["status"], "queue_position": None}
+        downloadable = stored["status"] == "done" and bool(stored["s3_key"])
+    if downloadable:
+        body["download_url"] = f"/api/video/convert/jobs/{job_id}/download"
+    return jsonify(body)
+
+
+@bp.route("/video/convert/jobs/<job_id>/download", methods=["GET", "OPTIONS"])
+@with_session
+def convert_job_download(job_id: str):
+    """
+    Download a finished AVI conversion (owner only). The owning worker
+    streams the file once; any other worker redirects to the uploaded copy,
+    which is removed when the result window ends.
+    """
+    if request.method == "OPTIONS":
+        return ("", 204)
+
+    identity_id, auth_error = require_identity()
+    if auth_error:
+        return auth_error
+
+    job = conversion_queue.get(job_id, owner_id=identity_id)
+    if job is not None:
+        if job.status in ("queued", "running"):
+            return jsonify({"ok": False, "error": "not_ready", **job.to_dict()}), 409
+        if job.status != "done":
+            return _conversion_error_response(job.status)
+        return _send_converted_file(job)
+
+    stored = video_conversion_store.load(job_id, identity_id)
+    if stored is None:
+        return jsonify({"ok": False, "error": "not_found"}), 404
+    if stored["status"] in ("queued", "running"):
+        return jsonify({"ok": False, "error": "not_ready", **stored["state"], "status": stored["status"]}), 409
+    if stored["status"] != "done":
+        return _conversion_error_response(stored["status"])
+    if not stored["s3_key"]:
+        return jsonify({"ok": False, "error": "not_found"}), 404
+    from backend.services.s3_service import presign_s3_key
+
+    filename = stored["state"].get("download_name") or "timrx-video.mp4"
+    url = presign_s3_key(stored["s3_key"], expires_in=300, response_disposition=f'attachment; filename="{filename}"')
+    if not url:
+        return jsonify({"ok": False, "error": "not_found"}), 404
+    response = redirect(url, code=302)
+    response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
+    return response
+
+
 @bp.route("/video/generate", methods=["POST", "OPTIONS"])
 @with_session
 def generate_video():
@@ -4,24 +4,50 @@ Admin Dashboard Service — unified summary for the admin super-dashboard.
 Single entry point: get_dashboard_summary(force_refresh)
 Reuses shared service functions; never duplicates analytics logic.
 
-Caching: 60-second in-memory TTL (single admin, read-heavy).
-Graceful degradation: each section can fail independently.
+Snapshots: the ops loop leader recomputes each section on its own cadence
+(refresh_snapshots) and stores it in admin_dashboard_snapshots (migration
+091). Requests read the stored sections and report their age; a section
+without a snapshot yet is computed inline once, and force_refresh
+recomputes every section in the request.
+Graceful degradation: each section can fail independently; a failed
+refresh keeps the previous data and records the error.
+
+Config:
+    ADMIN_DASHBOARD_SNAPSHOTS       (default true)
+    ADMIN_DASHBOARD_OPERATIONAL_S   (default 60)    section refresh cadence
+    ADMIN_DASHBOARD_ECONOMICS_S     (default 300)
+    ADMIN_DASHBOARD_SAFETY_S        (default 300)
+    ADMIN_DASHBOARD_SLOW_MS         (default 5000)  log sections slower than this
 """
 
 from __future__ import annotations
 
+import json
+import os
 import time
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
-from backend.db import USE_DB, query_all, query_one, Tables
+from backend.db import USE_DB, execute, query_all, query_one, Tables
 
 
-# ─────────────────────────────────────────────────────────────────────────────
-# Cache
-# ─────────────────────────────────────────────────────────────────────────────
-_cache: Dict[str, Any] = {"data": None, "expires_at": 0}
-_CACHE_TTL = 60  # seconds
+def _env_int(name: str, default: int, minimum: int | None = None) -> int:
+    try:
+        value = int(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        value = default
+    if minimum is not None:
+        value = max(minimum, value)
+    return value
+
+
+SNAPSHOTS_ENABLED = os.getenv("ADMIN_DASHBOARD_SNAPSHOTS", "true").lower() not in ("0", "false", "no")
+SLOW_MS = _env_int("ADMIN_DASHBOARD_SLOW_MS", 5000, 0)
+SECTION_INTERVALS = {
+    "operational": _env_int("ADMIN_DASHBOARD_OPERATIONAL_S", 60, 10),
+    "economics": _env_int("ADMIN_DASHBOARD_ECONOMICS_S", 300, 10),
+    "safety": _env_int("ADMIN_DASHBOARD_SAFETY_S", 300, 10),
+}
 
 
 def get_dashboard_summary(force_refresh: bool = False) -> Dict[str, Any]:
@@ -30,12 +56,71 @@ def get_dashboard_summary(force_refresh: bool = False) -> Dict[str, Any]:
 
     Sections: operational, economics, safety, anomalies.
     Each section is computed independently; a failure in one does not
-    block the others.
+    block the others. ``sections`` carries each snapshot's computed_at,
+    age and compute time.
     """
-    now = time.time()
-    if not force_refresh and _cache["data"] and now < _cache["expires_at"]:
-        return {**_cache["data"], "cached": True}
+    if not SNAPSHOTS_ENABLED or not USE_DB:
+        return _live_summary()
+
+    try:
+        if force_refresh:
+            for section in SECTION_INTERVALS:
+                _refresh_section(section)
+        snapshots = _load_snapshots()
+        missing = [name for name in SECTION_INTERVALS if not snapshots.get(name, {}).get("computed_at")]
+        if missing:
+            for section in missing:
+                _refresh_section(section)
+            snapshots = _load_snapshots()
+    except Exception as e:
+        # Snapshot table missing or unreadable: serve the live computation.
+        print(f"[ADMIN_DASHBOARD] snapshot read failed, computing live: {type(e).__name__}: {e}")
+        return _live_summary()
+
+    now = datetime.now(timezone.utc)
+    result: Dict[str, Any] = {"ok": True, "cached": not force_refresh, "sections": {}}
+    oldest: Optional[datetime] = None
+    for section in SECTION_INTERVALS:
+        snap = snapshots.get(section) or {}
+        computed_at = snap.get("computed_at")
+        if computed_at:
+            result[section] = snap["data"] or {}
+            oldest = computed_at if oldest is None else min(oldest, computed_at)
+        else:
+            result[section] = {"_error": snap.get("error") or f"{section} not computed yet"}
+        result["sections"][section] = {
+            "computed_at": computed_at.isoformat() if computed_at else None,
+            "age_seconds": round((now - computed_at).total_seconds(), 1) if computed_at else None,
+            "compute_ms": snap.get("compute_ms"),
+            "error": snap.get("error"),
+            "refresh_interval_s": SECTION_INTERVALS[section],
+        }
+    result["generated_at"] = oldest.isoformat() if oldest else now.isoformat()
+    result["age_seconds"] = round((now - oldest).total_seconds(), 1) if oldest else None
+
+    # Anomalies computed from the other sections
+    result["anomalies"] = _compute_anomalies(result)
+    return result
+
 
+def refresh_snapshots() -> List[Dict[str, Any]]:
+    """Recompute the sections whose cadence has elapsed (ops loop leader)."""
+    if not SNAPSHOTS_ENABLED or not USE_DB:
+        return []
+    rows = query_all(
+        f"SELECT section, EXTRACT(EPOCH FROM (NOW() - attempted_at)) AS age_s "
+        f"FROM {Tables.ADMIN_DASHBOARD_SNAPSHOTS}"
+    )
+    ages = {r["section"]: float(r["age_s"]) for r in rows if r["age_s"] is not None}
+    return [
+        _refresh_section(section)
+        for section, interval in SECTION_INTERVALS.items()
+        if ages.get(section, float("inf")) >= interval
+    ]
+
+
+def _live_summary() -> Dict[str, Any]:
+    """Compute every section in the request (no database or snapshots disabled)."""
     result: Dict[str, Any] = {
         "ok": True,
         "generated_at": datetime.now(timezone.utc).isoformat(),
@@ -45,14 +130,59 @@ def get_dashboard_summary(force_refresh: bool = False) -> Dict[str, Any]:
         "safety": _safe_section(_compute_safety),
         "anomalies": [],
     }
-
-    # Anomalies computed from the other sections
     result["anomalies"] = _compute_anomalies(result)
+    return result
 
-    _cache["data"] = result
-    _cache["expires_at"] = time.time() + _CACHE_TTL
 
-    return result
+def _load_snapshots() -> Dict[str, Dict[str, Any]]:
+    rows = query_all(
+        f"SELECT section, data, computed_at, compute_ms, error FROM {Tables.ADMIN_DASHBOARD_SNAPSHOTS}"
+    )
+    return {r["section"]: r for r in rows}
+
+
+def _refresh_section(section: str) -> Dict[str, Any]:
+    """Compute one section and store it; on failure keep the previous data."""
+    builder = _SECTION_BUILDERS[section]
+    started = time.monotonic()
+    data, error = None, None
+    try:
+        data = builder()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"[:500]
+        print(f"[ADMIN_DASHBOARD] Section {section} failed: {error}")
+    compute_ms = int((time.monotonic() - started) * 1000)
+    if compute_ms >= SLOW_MS:
+        print(f"[ADMIN_DASHBOARD] Section {section} slow: {compute_ms}ms")
+
+    if error is None:
+        execute(
+            f"""
+            INSERT INTO {Tables.ADMIN_DASHBOARD_SNAPSHOTS}
+                (section, data, computed_at, compute_ms, attempted_at, error)
+            VALUES (%s, %s::jsonb, NOW(), %s, NOW(), NULL)
+            ON CONFLICT (section) DO UPDATE SET
+                data = EXCLUDED.data,
+                computed_at = EXCLUDED.computed_at,
+                compute_ms = EXCLUDED.compute_ms,
+                attempted_at = EXCLUDED.attempted_at,
+                error = NULL
+            """,
+            (section, json.dumps(data, default=str), compute_ms),
+        )
+    else:
+        execute(
+            f"""
+            INSERT INTO {Tables.ADMIN_DASHBOARD_SNAPSHOTS} (section, compute_ms, attempted_at, error)
+            VALUES (%s, %s, NOW(), %s)
+            ON CONFLICT (section) DO UPDATE SET
+                compute_ms = EXCLUDED.compute_ms,
+                attempted_at = EXCLUDED.attempted_at,
+                error = EXCLUDED.error
+            """,
+            (section, compute_ms, error),
+        )
+    return {"section": section, "compute_ms": compute_ms, "error": error}
 
 
 def get_safety_summary(hours: int = 24, days: int = 7) -> Dict[str, Any]:
@@ -262,6 +392,13 @@ def _compute_safety() -> Dict[str, Any]:
     }
 
 
+_SECTION_BUILDERS = {
+    "operational": _compute_operational,
+    "economics": _compute_economics,
+    "safety": _compute_safety,
+}
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Anomaly detection (Python threshold logic, not SQL)
 # ─────────────────────────────────────────────────────────────────────────────
@@ -12,6 +12,7 @@ from datetime import date, datetime, timezone
 from typing import Any, Dict, List, Optional
 
 from backend.db import USE_DB, query_all, query_one, Tables
+from backend.services import analytics_rollup_service as rollups
 
 
 # Known providers and their feature areas
@@ -67,20 +68,39 @@ def get_provider_health() -> Dict[str, Any]:
       down     — success_rate_24h < 0.50 AND has recent failures (or only failures)
       unknown  — zero jobs in last 24h
     """
+    # Job aggregates come from the hourly rollup once it is backfilled
+    # (24h windows are then aligned to the hour); otherwise from jobs.
+    use_rollup = rollups.ready("jobs")
+
     # 1. Job counts by provider (last 24h)
-    jobs_24h = query_all(f"""
-        SELECT
-            provider,
-            COUNT(*) AS total,
-            COUNT(*) FILTER (WHERE status IN ('succeeded', 'ready')) AS successes,
-            COUNT(*) FILTER (WHERE status = 'failed') AS failures,
-            MAX(CASE WHEN status IN ('succeeded', 'ready') THEN updated_at END) AS last_success_at,
-            MAX(CASE WHEN status = 'failed' THEN updated_at END) AS last_failure_at
-        FROM {Tables.JOBS}
-        WHERE created_at > NOW() - INTERVAL '24 hours'
-          AND provider IS NOT NULL
-        GROUP BY provider
-    """)
+    if use_rollup:
+        jobs_24h = query_all(f"""
+            SELECT
+                provider,
+                SUM(jobs) AS total,
+                COALESCE(SUM(jobs) FILTER (WHERE status IN ('succeeded', 'ready')), 0) AS successes,
+                COALESCE(SUM(jobs) FILTER (WHERE status = 'failed'), 0) AS failures,
+                MAX(CASE WHEN status IN ('succeeded', 'ready') THEN last_updated_at END) AS last_success_at,
+                MAX(CASE WHEN status = 'failed' THEN last_updated_at END) AS last_failure_at
+            FROM {Tables.JOB_ROLLUP_HOURLY}
+            WHERE bucket >= date_trunc('hour', NOW() - INTERVAL '24 hours')
+              AND provider <> ''
+            GROUP BY provider
+        """)
+    else:
+        jobs_24h = query_all(f"""
+            SELECT
+                provider,
+                COUNT(*) AS total,
+                COUNT(*) FILTER (WHERE status IN ('succeeded', 'ready')) AS successes,
+                COUNT(*) FILTER (WHERE status = 'failed') AS failures,
+                MAX(CASE WHEN status IN ('succeeded', 'ready') THEN updated_at END) AS last_success_at,
+                MAX(CASE WHEN status = 'failed' THEN updated_at END) AS last_failure_at
+            FROM {Tables.JOBS}
+            WHERE created_at > NOW() - INTERVAL '24 hours'
+              AND provider IS NOT NULL
+            GROUP BY provider
+        """)
 
     # 2. Job counts (last 1h)
     jobs_1h = query_all(f"""
@@ -93,15 +113,26 @@ def get_provider_health() -> Dict[str, Any]:
     jobs_1h_map = {r["provider"]: r["total"] for r in jobs_1h}
 
     # 3. Top error codes per provider (last 24h, failed only)
-    error_codes = query_all(f"""
-        SELECT provider, last_error_code AS code, COUNT(*) AS cnt
-        FROM {Tables.JOBS}
-        WHERE created_at > NOW() - INTERVAL '24 hours'
-          AND status = 'failed'
-          AND last_error_code IS NOT NULL
-        GROUP BY provider, last_error_code
-        ORDER BY provider, cnt DESC
-    """)
+    if use_rollup:
+        error_codes = query_all(f"""
+            SELECT provider, error_code AS code, SUM(jobs) AS cnt
+            FROM {Tables.JOB_ROLLUP_HOURLY}
+            WHERE bucket >= date_trunc('hour', NOW() - INTERVAL '24 hours')
+              AND status = 'failed'
+              AND error_code <> ''
+            GROUP BY provider, error_code
+            ORDER BY provider, cnt DESC
+        """)
+    else:
+        error_codes = query_all(f"""
+            SELECT provider, last_error_code AS code, COUNT(*) AS cnt
+            FROM {Tables.JOBS}
+            WHERE created_at > NOW() - INTERVAL '24 hours'
+              AND status = 'failed'
+              AND last_error_code IS NOT NULL
+            GROUP BY provider, last_error_code
+            ORDER BY provider, cnt DESC
+        """)
     # Group by provider
     errors_by_provider: Dict[str, List[Dict]] = {}
     for r in error_codes:
@@ -112,15 +143,26 @@ def get_provider_health() -> Dict[str, Any]:
             errors_by_provider[p].append({"code": r["code"], "count": r["cnt"]})
 
     # 3b. Average latency per provider (last 24h, succeeded only)
-    latency_rows = query_all(f"""
-        SELECT provider,
-               ROUND(AVG(EXTRACT(EPOCH FROM (updated_at - created_at)) * 1000))::bigint AS avg_latency_ms
-        FROM {Tables.JOBS}
-        WHERE created_at > NOW() - INTERVAL '24 hours'
-          AND status IN ('succeeded', 'ready')
-          AND provider IS NOT NULL
-        GROUP BY provider
-    """)
+    if use_rollup:
+        latency_rows = query_all(f"""
+            SELECT provider,
+                   ROUND(SUM(latency_ms)::numeric / NULLIF(SUM(jobs), 0))::bigint AS avg_latency_ms
+            FROM {Tables.JOB_ROLLUP_HOURLY}
+            WHERE bucket >= date_trunc('hour', NOW() - INTERVAL '24 hours')
+              AND status IN ('succeeded', 'ready')
+              AND provider <> ''
+            GROUP BY provider
+        """)
+    else:
+        latency_rows = query_all(f"""
+            SELECT provider,
+                   ROUND(AVG(EXTRACT(EPOCH FROM (updated_at - created_at)) * 1000))::bigint AS avg_latency_ms
+            FROM {Tables.JOBS}
+            WHERE created_at > NOW() - INTERVAL '24 hours'
+              AND status IN ('succeeded', 'ready')
+              AND provider IS NOT NULL
+            GROUP BY provider
+        """)
     latency_map = {
         r["provider"]: int(r["avg_latency_ms"])
         for r in latency_rows
@@ -154,25 +196,31 @@ def get_provider_health() -> Dict[str, Any]:
     """)
     wallet_24h_map = {r["provider"]: r["cnt"] for r in wallet_alerts_24h}
 
-    # 6. Estimated spend today + this month (from estimated_provider_cost_usd)
+    # 6. Estimated spend today + this month (from estimated_provider_cost_usd).
+    # Hourly buckets start exactly on day and month boundaries.
+    if use_rollup:
+        jobs_source, jobs_since, job_cost, has_provider = Tables.JOB_ROLLUP_HOURLY, "bucket", "cost_usd", "provider <> ''"
+    else:
+        jobs_source, jobs_since, job_cost, has_provider = Tables.JOBS, "created_at", "estimated_provider_cost_usd", "provider IS NOT NULL"
+
     spend_today = query_all(f"""
         SELECT provider,
-               COALESCE(SUM(estimated_provider_cost_usd), 0) AS spend
-        FROM {Tables.JOBS}
-        WHERE created_at >= DATE_TRUNC('day', NOW() AT TIME ZONE 'UTC')
+               COALESCE(SUM({job_cost}), 0) AS spend
+        FROM {jobs_source}
+        WHERE {jobs_since} >= DATE_TRUNC('day', NOW() AT TIME ZONE 'UTC')
           AND status IN ('succeeded', 'ready')
-          AND provider IS NOT NULL
+          AND {has_provider}
         GROUP BY provider
     """)
     spend_today_map = {r["provider"]: float(r["spend"]) for r in spend_today}
 
     spend_month = query_all(f"""
         SELECT provider,
-               COALESCE(SUM(estimated_provider_cost_usd), 0) AS spend
-        FROM {Tables.JOBS}
-        WHERE created_at >= DATE_TRUNC('month', NOW() AT TIME ZONE 'UTC')
+               COALESCE(SUM({job_cost}), 0) AS spend
+        FROM {jobs_source}
+        WHERE {jobs_since} >= DATE_TRUNC('month', NOW() AT TIME ZONE 'UTC')
           AND status IN ('succeeded', 'ready')
-          AND provider IS NOT NULL
+          AND {has_provider}
         GROUP BY provider
     """)
     spend_month_map = {r["provider"]: float(r["spend"]) for r in spend_month}
@@ -181,10 +229,10 @@ def get_provider_health() -> Dict[str, Any]:
     credits_today = query_all(f"""
         SELECT provider,
                COALESCE(SUM(cost_credits), 0) AS credits
-        FROM {Tables.JOBS}
-        WHERE created_at >= DATE_TRUNC('day', NOW() AT TIME ZONE 'UTC')
+        FROM {jobs_source}
+        WHERE {jobs_since} >= DATE_TRUNC('day', NOW() AT TIME ZONE 'UTC')
           AND status IN ('succeeded', 'ready')
-          AND provider IS NOT NULL
+          AND {has_provider}
         GROUP BY provider
     """)
     credits_today_map = {r["provider"]: int(r["credits"]) for r in credits_today}
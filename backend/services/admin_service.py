@@ -18,6 +18,8 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime, timezone
 
 from backend.db import query_one, query_all, execute_returning, transaction, Tables
+from backend.services import analytics_rollup_service as rollups
+from backend.services.csv_export_service import ExportQuery
 from backend.services.wallet_service import WalletService
 
 _SUCCESSFUL_ANALYTICS_JOB_STATUSES = (
@@ -51,6 +53,29 @@ _ACTION_CATEGORY_CASE_SQL = """
     END
 """
 
+_PURCHASE_LIST_SELECT = f"""
+SELECT
+    p.id,
+    p.identity_id,
+    p.plan_id,
+    p.provider,
+    p.provider_payment_id,
+    p.payment_id,
+    p.amount_usd,
+    p.currency,
+    p.credits_granted,
+    p.status,
+    p.meta,
+    p.created_at,
+    p.paid_at,
+    i.email,
+    pl.code AS plan_code,
+    pl.name AS plan_name
+FROM {Tables.PURCHASES} p
+LEFT JOIN {Tables.IDENTITIES} i ON i.id = p.identity_id
+LEFT JOIN {Tables.PLANS} pl ON pl.id = p.plan_id
+"""
+
 
 class AdminService:
     """Admin operations service."""
@@ -103,7 +128,7 @@ class AdminService:
         jobs_stats = query_all(
             f"""
             SELECT status, COUNT(*) as count
-            FROM {Tables.JOBS}
+            FROM {Tables.JOBS_ALL}
             GROUP BY status
             """
         )
@@ -154,33 +179,60 @@ class AdminService:
         days = min(max(1, days), 90)
 
         # Summary: total purchased vs spent (all time)
-        summary_row = query_one(
-            f"""
-            SELECT
-                COALESCE(SUM(CASE WHEN amount_credits > 0 THEN amount_credits ELSE 0 END), 0) as purchased,
-                COALESCE(SUM(CASE WHEN entry_type = 'reservation_finalize' THEN ABS(amount_credits) ELSE 0 END), 0) as spent
-            FROM {Tables.LEDGER_ENTRIES}
-            """
-        )
+        if rollups.ready("ledger"):
+            summary_row = query_one(
+                f"""
+                SELECT
+                    COALESCE(SUM(credits_in), 0) as purchased,
+                    COALESCE(SUM(CASE WHEN entry_type = 'reservation_finalize' THEN credits_in + credits_out ELSE 0 END), 0) as spent
+                FROM {Tables.LEDGER_ROLLUP_DAILY}
+                """
+            )
+        else:
+            summary_row = query_one(
+                f"""
+                SELECT
+                    COALESCE(SUM(CASE WHEN amount_credits > 0 THEN amount_credits ELSE 0 END), 0) as purchased,
+                    COALESCE(SUM(CASE WHEN entry_type = 'reservation_finalize' THEN ABS(amount_credits) ELSE 0 END), 0) as spent
+                FROM {Tables.LEDGER_ENTRIES}
+                """
+            )
         total_purchased = int(summary_row["purchased"]) if summary_row else 0
         total_spent = int(summary_row["spent"]) if summary_row else 0
         usage_rate = round((total_spent / total_purchased * 100), 1) if total_purchased > 0 else 0.0
 
         # Credits by action type (from completed jobs in period)
-        by_type_rows = query_all(
-            f"""
-            SELECT
-                {_ACTION_CATEGORY_CASE_SQL} as category,
-                COALESCE(SUM(cost_credits), 0) as total_credits,
-                COUNT(*) as job_count
-            FROM {Tables.JOBS}
-            WHERE status IN ({_SUCCESSFUL_ANALYTICS_JOB_STATUSES_SQL})
-              AND created_at >= NOW() - %s * INTERVAL '1 day'
-            GROUP BY category
-            ORDER BY total_credits DESC
-            """,
-            (days,)
-        )
+        jobs_rollup = rollups.ready("jobs")
+        if jobs_rollup:
+            by_type_rows = query_all(
+                f"""
+                SELECT
+                    {_ACTION_CATEGORY_CASE_SQL} as category,
+                    COALESCE(SUM(cost_credits), 0) as total_credits,
+                    COALESCE(SUM(jobs), 0) as job_count
+                FROM {Tables.JOB_ROLLUP_HOURLY}
+                WHERE status IN ({_SUCCESSFUL_ANALYTICS_JOB_STATUSES_SQL})
+                  AND bucket >= date_trunc('hour', NOW() - %s * INTERVAL '1 day')
+                GROUP BY category
+                ORDER BY total_credits DESC
+                """,
+                (days,)
+            )
+        else:
+            by_type_rows = query_all(
+                f"""
+                SELECT
+                    {_ACTION_CATEGORY_CASE_SQL} as category,
+                    COALESCE(SUM(cost_credits), 0) as total_credits,
+                    COUNT(*) as job_count
+                FROM {Tables.JOBS_ALL}
+                WHERE status IN ({_SUCCESSFUL_ANALYTICS_JOB_STATUSES_SQL})
+                  AND created_at >= NOW() - %s * INTERVAL '1 day'
+                GROUP BY category
+                ORDER BY total_credits DESC
+                """,
+                (days,)
+            )
 
         # Calculate percentages for action types
         total_period_credits = sum(int(r["total_credits"]) for r in by_type_rows)
@@ -204,7 +256,7 @@ class AdminService:
                 COALESCE(SUM(j.cost_credits), 0) as total_spent,
                 COUNT(*) as job_count,
                 MAX(j.created_at) as last_active
-            FROM {Tables.JOBS} j
+            FROM {Tables.JOBS_ALL} j
             LEFT JOIN {Tables.IDENTITIES} i ON i.id = j.identity_id
             WHERE j.status IN ({_SUCCESSFUL_ANALYTICS_JOB_STATUSES_SQL})
               AND j.created_at >= NOW() - %s * INTERVAL '1 day'
@@ -233,20 +285,36 @@ class AdminService:
             })
 
         # Credits over time (daily)
-        over_time_rows = query_all(
-            f"""
-            SELECT
-                DATE(created_at) as date,
-                COALESCE(SUM(cost_credits), 0) as credits_spent,
-                COUNT(*) as job_count
-            FROM {Tables.JOBS}
-            WHERE status IN ({_SUCCESSFUL_ANALYTICS_JOB_STATUSES_SQL})
-              AND created_at >= NOW() - %s * INTERVAL '1 day'
-            GROUP BY DATE(created_at)
-            ORDER BY date ASC
-            """,
-            (days,)
-        )
+        if jobs_rollup:
+            over_time_rows = query_all(
+                f"""
+                SELECT
+                    DATE(bucket) as date,
+                    COALESCE(SUM(cost_credits), 0) as credits_spent,
+                    COALESCE(SUM(jobs), 0) as job_count
+                FROM {Tables.JOB_ROLLUP_HOURLY}
+                WHERE status IN ({_SUCCESSFUL_ANALYTICS_JOB_STATUSES_SQL})
+                  AND bucket >= date_trunc('hour', NOW() - %s * INTERVAL '1 day')
+                GROUP BY DATE(bucket)
+                ORDER BY date ASC
+                """,
+                (days,)
+            )
+        else:
+            over_time_rows = query_all(
+                f"""
+                SELECT
+                    DATE(created_at) as date,
+                    COALESCE(SUM(cost_credits), 0) as credits_spent,
+                    COUNT(*) as job_count
+                FROM {Tables.JOBS_ALL}
+                WHERE status IN ({_SUCCESSFUL_ANALYTICS_JOB_STATUSES_SQL})
+                  AND created_at >= NOW() - %s * INTERVAL '1 day'
+                GROUP BY DATE(created_at)
+                ORDER BY date ASC
+                """,
+                (days,)
+            )
 
         over_time = [
             {
@@ -414,7 +482,7 @@ class AdminService:
         jobs = query_all(
             f"""
             SELECT id, provider, action_code, status, cost_credits, created_at, updated_at
-            FROM {Tables.JOBS}
+            FROM {Tables.JOBS_ALL}
             WHERE identity_id = %s
             ORDER BY created_at DESC
             LIMIT 20
@@ -492,11 +560,64 @@ class AdminService:
         Filters: status, identity_id, email (partial match), purchase_id,
                  date_from, date_to, pagination.
         """
-        from datetime import date as d_date
-
         limit = min(max(1, limit), _max_limit)
         offset = max(0, offset)
 
+        where_clause, params = AdminService._purchase_filters(
+            status=status, identity_id=identity_id, email=email,
+            purchase_id=purchase_id, date_from=date_from, date_to=date_to,
+        )
+
+        # Count
+        count_params = list(params)
+        total_row = query_one(
+            f"SELECT COUNT(*) AS count FROM {Tables.PURCHASES} p "
+            f"LEFT JOIN {Tables.IDENTITIES} i ON i.id = p.identity_id "
+            f"{where_clause}",
+            count_params,
+        )
+        total = total_row["count"] if total_row else 0
+
+        # Main query
+        params.extend([limit, offset])
+        rows = query_all(
+            f"""
+            {_PURCHASE_LIST_SELECT}
+            {where_clause}
+            ORDER BY p.created_at DESC
+            LIMIT %s OFFSET %s
+            """,
+            params,
+        )
+
+        if not rows:
+            return {"purchases": [], "total": total, "limit": limit, "offset": offset}
+
+        return {
+            "purchases": AdminService.enrich_purchases(rows),
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+        }
+
+    @staticmethod
+    def purchases_export_query(**filters) -> ExportQuery:
+        """Unpaginated purchases query (same filters as list_purchases) for CSV export."""
+        where_clause, params = AdminService._purchase_filters(**filters)
+        return ExportQuery(f"{_PURCHASE_LIST_SELECT} {where_clause}", tuple(params))
+
+    @staticmethod
+    def _purchase_filters(
+        status: Optional[str] = None,
+        identity_id: Optional[str] = None,
+        email: Optional[str] = None,
+        purchase_id: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+    ) -> tuple:
+        """WHERE clause and params for the purchase list filters."""
+        from datetime import date as d_date
+
         conditions = []
         params: list = []
 
@@ -531,50 +652,11 @@ class AdminService:
         if conditions:
             where_clause = "WHERE " + " AND ".join(conditions)
 
-        # Count
-        count_params = list(params)
-        total_row = query_one(
-            f"SELECT COUNT(*) AS count FROM {Tables.PURCHASES} p "
-            f"LEFT JOIN {Tables.IDENTITIES} i ON i.id = p.identity_id "
-            f"{where_clause}",
-            count_params,
-        )
-        total = total_row["count"] if total_row else 0
-
-        # Main query
-        params.extend([limit, offset])
-        rows = query_all(
-            f"""
-            SELECT
-                p.id,
-                p.identity_id,
-                p.plan_id,
-                p.provider,
-                p.provider_payment_id,
-                p.payment_id,
-                p.amount_usd,
-                p.currency,
-                p.credits_granted,
-                p.status,
-                p.meta,
-                p.created_at,
-                p.paid_at,
-                i.email,
-                pl.code AS plan_code,
-                pl.name AS plan_name
-            FROM {Tables.PURCHASES} p
-            LEFT JOIN {Tables.IDENTITIES} i ON i.id = p.identity_id
-            LEFT JOIN {Tables.PLANS} pl ON pl.id = p.plan_id
-            {where_clause}
-            ORDER BY p.created_at DESC
-            LIMIT %s OFFSET %s
-            """,
-            params,
-        )
-
-        if not rows:
-            return {"purchases": [], "total": total, "limit": limit, "offset": offset}
+        return where_clause, params
 
+    @staticmethod
+    def enrich_purchases(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add refund state, credit usage and refund risk to purchase rows."""
         # Batch-fetch refund info for these purchases
         purchase_ids = [str(r["id"]) for r in rows]
         placeholders = ",".join(["%s"] * len(purchase_ids))
@@ -683,12 +765,7 @@ class AdminService:
                 "refund_risk": risk,
             })
 
-        return {
-            "purchases": purchases,
-            "total": total,
-            "limit": limit,
-            "offset": offset,
-        }
+        return purchases
 
     # ─────────────────────────────────────────────────────────────
     # Purchase Detail + Timeline
@@ -791,7 +868,7 @@ class AdminService:
             f"""
             SELECT id, provider, action_code, status, cost_credits,
                    estimated_provider_cost_usd, created_at
-            FROM {Tables.JOBS}
+            FROM {Tables.JOBS_ALL}
             WHERE identity_id = %s::uuid
               AND created_at >= %s
             ORDER BY created_at DESC
@@ -1133,7 +1210,7 @@ class _AdminServiceExtra:
             where_clause = "WHERE " + " AND ".join(conditions)
 
         total = query_one(
-            f"SELECT COUNT(*) as count FROM {Tables.JOBS} j {where_clause}",
+            f"SELECT COUNT(*) as count FROM {Tables.JOBS_ALL} j {where_clause}",
             params,
         )
 
@@ -1141,7 +1218,7 @@ class _AdminServiceExtra:
             SELECT j.id, j.identity_id, j.provider, j.action_code,
                    j.status, j.cost_credits, j.upstream_job_id,
                    j.error_message, j.created_at, j.updated_at, i.email
-            FROM {Tables.JOBS} j
+            FROM {Tables.JOBS_ALL} j
             LEFT JOIN {Tables.IDENTITIES} i ON i.id = j.identity_id
             {where_clause}
             ORDER BY j.created_at DESC
@@ -1223,7 +1300,7 @@ class IdentityInspectionService:
         counts = {}
         for label, sql in [
             ("history_items", f"SELECT COUNT(*) as c FROM {Tables.HISTORY_ITEMS} WHERE identity_id = %s"),
-            ("jobs", f"SELECT COUNT(*) as c FROM {Tables.JOBS} WHERE identity_id = %s"),
+            ("jobs", f"SELECT COUNT(*) as c FROM {Tables.JOBS_ALL} WHERE identity_id = %s"),
             ("models", f"SELECT COUNT(*) as c FROM timrx_app.models WHERE identity_id = %s"),
             ("images", f"SELECT COUNT(*) as c FROM timrx_app.images WHERE identity_id = %s"),
             ("videos", f"SELECT COUNT(*) as c FROM timrx_app.videos WHERE identity_id = %s"),
@@ -1347,7 +1424,7 @@ class IdentityInspectionService:
                     SELECT i.id, i.email, i.email_verified, i.created_at, i.last_seen_at,
                            COALESCE(w.balance_credits, 0) as balance,
                            (SELECT COUNT(*) FROM {Tables.HISTORY_ITEMS} WHERE identity_id = i.id) as history_count,
-                           (SELECT COUNT(*) FROM {Tables.JOBS} WHERE identity_id = i.id) as job_count
+                           (SELECT COUNT(*) FROM {Tables.JOBS_ALL} WHERE identity_id = i.id) as job_count
                     FROM {Tables.IDENTITIES} i
                     LEFT JOIN {Tables.WALLETS} w ON w.identity_id = i.id
                     WHERE i.id = %s
@@ -1466,6 +1543,17 @@ class IdentityInspectionService:
         def _dec(v):
             return float(v) if v is not None else 0.0
 
+        # Job aggregates read the hourly rollup once it is backfilled; the
+        # period window is then aligned to the hour.
+        if rollups.ready("jobs"):
+            jobs_source, job_count, job_cost = Tables.JOB_ROLLUP_HOURLY, "COALESCE(SUM(jobs), 0)", "cost_usd"
+            jobs_window = f"bucket >= date_trunc('hour', NOW() - INTERVAL '{int(days)} days')"
+            has_provider = "provider <> ''"
+        else:
+            jobs_source, job_count, job_cost = Tables.JOBS_ALL, "COUNT(*)", "estimated_provider_cost_usd"
+            jobs_window = f"created_at >= NOW() - INTERVAL '{int(days)} days'"
+            has_provider = "provider IS NOT NULL"
+
         # ── Overview: total revenue, cost, margin ──
         revenue_row = query_one(f"""
             SELECT COALESCE(SUM(amount_usd), 0) AS total
@@ -1475,8 +1563,8 @@ class IdentityInspectionService:
         total_revenue = _dec(revenue_row["total"]) if revenue_row else 0.0
 
         cost_row = query_one(f"""
-            SELECT COALESCE(SUM(estimated_provider_cost_usd), 0) AS total
-            FROM {Tables.JOBS}
+            SELECT COALESCE(SUM({job_cost}), 0) AS total
+            FROM {jobs_source}
             WHERE status IN ('completed', 'succeeded', 'ready', 'done')
         """)
         total_cost = _dec(cost_row["total"]) if cost_row else 0.0
@@ -1493,10 +1581,10 @@ class IdentityInspectionService:
         period_revenue = _dec(period_revenue_row["total"]) if period_revenue_row else 0.0
 
         period_cost_row = query_one(f"""
-            SELECT COALESCE(SUM(estimated_provider_cost_usd), 0) AS total
-            FROM {Tables.JOBS}
+            SELECT COALESCE(SUM({job_cost}), 0) AS total
+            FROM {jobs_source}
             WHERE status IN ('completed', 'succeeded', 'ready', 'done')
-              AND created_at >= NOW() - INTERVAL '{int(days)} days'
+              AND {jobs_window}
         """)
         period_cost = _dec(period_cost_row["total"]) if period_cost_row else 0.0
 
@@ -1514,12 +1602,12 @@ class IdentityInspectionService:
                         THEN '3d'
                     ELSE 'other'
                 END AS category,
-                COUNT(*) AS jobs,
+                {job_count} AS jobs,
                 COALESCE(SUM(cost_credits), 0) AS credits_used,
-                COALESCE(SUM(estimated_provider_cost_usd), 0) AS cost_usd
-            FROM {Tables.JOBS}
+                COALESCE(SUM({job_cost}), 0) AS cost_usd
+            FROM {jobs_source}
             WHERE status IN ('completed', 'succeeded', 'ready', 'done')
-              AND created_at >= NOW() - INTERVAL '{int(days)} days'
+              AND {jobs_window}
             GROUP BY category
             ORDER BY cost_usd DESC
         """)
@@ -1544,13 +1632,13 @@ class IdentityInspectionService:
         provider_rows = query_all(f"""
             SELECT
                 provider,
-                COUNT(*) AS jobs,
+                {job_count} AS jobs,
                 COALESCE(SUM(cost_credits), 0) AS credits_used,
-                COALESCE(SUM(estimated_provider_cost_usd), 0) AS cost_usd
-            FROM {Tables.JOBS}
+                COALESCE(SUM({job_cost}), 0) AS cost_usd
+            FROM {jobs_source}
             WHERE status IN ('completed', 'succeeded', 'ready', 'done')
-              AND created_at >= NOW() - INTERVAL '{int(days)} days'
-              AND provider IS NOT NULL
+              AND {jobs_window}
+              AND {has_provider}
             GROUP BY provider
             ORDER BY cost_usd DESC
         """)
@@ -1571,7 +1659,7 @@ class IdentityInspectionService:
                 COUNT(*) AS jobs,
                 COALESCE(SUM(j.cost_credits), 0) AS credits_used,
                 COALESCE(SUM(j.estimated_provider_cost_usd), 0) AS cost_usd
-            FROM {Tables.JOBS} j
+            FROM {Tables.JOBS_ALL} j
             LEFT JOIN {Tables.IDENTITIES} i ON i.id = j.identity_id
             WHERE j.status IN ('completed', 'succeeded', 'ready', 'done')
               AND j.created_at >= NOW() - INTERVAL '{int(days)} days'
@@ -1580,14 +1668,16 @@ class IdentityInspectionService:
             LIMIT 30
         """)
 
-        # Get revenue per user from purchases
+        # Get revenue per user from purchases (only the users listed)
         user_revenue = {}
+        user_ids = [row["identity_id"] for row in user_rows if row["identity_id"] is not None]
         rev_rows = query_all(f"""
             SELECT identity_id, COALESCE(SUM(amount_usd), 0) AS revenue
             FROM {Tables.PURCHASES}
             WHERE status = 'completed'
+              AND identity_id = ANY(%s)
             GROUP BY identity_id
-        """)
+        """, (user_ids,)) if user_ids else []
         for rr in rev_rows:
             user_revenue[str(rr["identity_id"])] = _dec(rr["revenue"])
 
@@ -0,0 +1,219 @@
+"""
+Admission control for background work under connection-pool pressure.
+
+Background tasks (ops-loop rescue / rollups / dashboard snapshots /
+retention, reconciliation, campaign publish) share one small pool with
+user requests. Before each batch they call admit(), which reads live
+pressure signals and decides:
+
+    ok        run the batch now
+    throttle  pause ADMISSION_THROTTLE_MS, then run it
+    defer     don't run it; the caller skips the step / stops its loop and
+              picks up where it left off next time (admit() may first
+              wait up to max_wait_s for pressure to clear)
+
+Signals (pressure()):
+    - pool_stats(): requests waiting for a connection defer; an exhausted
+      pool (no idle connection at max size) throttles
+    - pool checkouts that fell back to direct connections within
+      ADMISSION_WINDOW_S throttle, ADMISSION_DEFER_FALLBACKS or more defer
+    - p99 of per-request DB time over ADMISSION_WINDOW_S (recorded by the
+      app's request hooks): above ADMISSION_DB_P99_MS throttles, above
+      twice that defers.  DB time rather than wall time, so endpoints that
+      wait on providers or mesh analysis don't read as DB pressure.
+    - user requests in flight >= ADMISSION_BUSY_REQUESTS throttles
+
+The separate connection cap for background work is enforced in
+backend.db (background_work(), DB_BACKGROUND_MAX_CONNS); this module only
+paces batches.
+
+Config:
+    ADMISSION_CONTROL_ENABLED   (default true)
+    ADMISSION_WINDOW_S          (default 30)
+    ADMISSION_DB_P99_MS         (default 400)
+    ADMISSION_MIN_SAMPLES       (default 20)   requests before the p99 counts
+    ADMISSION_BUSY_REQUESTS     (default 2)
+    ADMISSION_DEFER_FALLBACKS   (default 3)
+    ADMISSION_THROTTLE_MS       (default 500)
+    ADMISSION_MAX_WAIT_S        (default 15)   wait budget for in-request
+                                               tasks (reconciliation, publish)
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from backend import db
+
+
+def _env_int(name: str, default: int, minimum: int | None = None) -> int:
+    try:
+        value = int(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        value = default
+    if minimum is not None:
+        value = max(minimum, value)
+    return value
+
+
+ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() not in ("0", "false", "no")
+WINDOW_S = _env_int("ADMISSION_WINDOW_S", 30, 1)
+DB_P99_MS = _env_int("ADMISSION_DB_P99_MS", 400, 1)
+MIN_SAMPLES = _env_int("ADMISSION_MIN_SAMPLES", 20, 1)
+BUSY_REQUESTS = _env_int("ADMISSION_BUSY_REQUESTS", 2, 1)
+DEFER_FALLBACKS = _env_int("ADMISSION_DEFER_FALLBACKS", 3, 1)
+THROTTLE_MS = _env_int("ADMISSION_THROTTLE_MS", 500, 0)
+MAX_WAIT_S = _env_int("ADMISSION_MAX_WAIT_S", 15, 0)
+
+# Admin/cron endpoints run the background tasks themselves; counting them
+# as user traffic would make those tasks throttle on their own latency.
+IGNORED_PREFIXES = ("/api/admin",)
+
+_POLL_S = 0.5
+_PRESSURE_TTL_S = 0.25
+
+_lock = threading.Lock()
+_requests: Deque[Tuple[float, float, float]] = deque(maxlen=2048)  # (finished_at, total_ms, db_ms)
+_inflight = 0
+_tasks: Dict[str, Dict[str, int]] = {}
+_cached: Optional[Tuple[float, Dict[str, Any]]] = None
+
+
+# ─────────────────────────────────────────────────────────────
+# Request signals (app hooks)
+# ─────────────────────────────────────────────────────────────
+def tracks(path: str) -> bool:
+    """Whether a request path counts as user traffic."""
+    return not path.startswith(IGNORED_PREFIXES)
+
+
+def request_started() -> float:
+    global _inflight
+    with _lock:
+        _inflight += 1
+    return time.monotonic()
+
+
+def request_finished(started: float, db_ms: float = 0.0) -> None:
+    global _inflight
+    now = time.monotonic()
+    with _lock:
+        _inflight = max(0, _inflight - 1)
+        _requests.append((now, (now - started) * 1000, db_ms))
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# ─────────────────────────────────────────────────────────────
+# Pressure
+# ─────────────────────────────────────────────────────────────
+def pressure() -> Dict[str, Any]:
+    """Current pressure level with the reasons behind it (cached briefly)."""
+    global _cached
+    now = time.monotonic()
+    with _lock:
+        if _cached is not None and now - _cached[0] < _PRESSURE_TTL_S:
+            return _cached[1]
+        horizon = now - WINDOW_S
+        recent = [(total, db_ms) for t, total, db_ms in _requests if t >= horizon]
+        inflight = _inflight
+
+    defer: List[str] = []
+    throttle: List[str] = []
+
+    pool = db.pool_stats()
+    if pool.get("pooling") and "error" not in pool:
+        if pool["requests_waiting"] > 0:
+            defer.append(f"pool_waiters={pool['requests_waiting']}")
+        elif pool["pool_available"] == 0 and pool["pool_size"] >= pool["pool_max"]:
+            throttle.append("pool_exhausted")
+
+    fallbacks = db.recent_pool_fallbacks(WINDOW_S)
+    if fallbacks >= DEFER_FALLBACKS:
+        defer.append(f"pool_fallbacks={fallbacks}")
+    elif fallbacks:
+        throttle.append(f"pool_fallbacks={fallbacks}")
+
+    db_p99 = latency_p99 = None
+    if len(recent) >= MIN_SAMPLES:
+        db_p99 = round(_percentile([d for _, d in recent], 0.99), 1)
+        latency_p99 = round(_percentile([t for t, _ in recent], 0.99), 1)
+        if db_p99 > 2 * DB_P99_MS:
+            defer.append(f"db_p99_ms={db_p99}")
+        elif db_p99 > DB_P99_MS:
+            throttle.append(f"db_p99_ms={db_p99}")
+
+    if inflight >= BUSY_REQUESTS:
+        throttle.append(f"inflight={inflight}")
+
+    result = {
+        "level": "defer" if defer else "throttle" if throttle else "ok",
+        "reasons": defer + throttle,
+        "inflight": inflight,
+        "samples": len(recent),
+        "db_p99_ms": db_p99,
+        "latency_p99_ms": latency_p99,
+        "pool_fallbacks": fallbacks,
+    }
+    with _lock:
+        _cached = (now, result)
+    return result
+
+
+def _count(task: str, outcome: str) -> None:
+    with _lock:
+        entry = _tasks.setdefault(task, {"admitted": 0, "throttled": 0, "deferred": 0})
+        entry[outcome] += 1
+
+
+def admit(task: str, max_wait_s: float = 0.0) -> bool:
+    """Gate one background batch. Returns False when the caller should defer it.
+
+    Under throttle the call sleeps THROTTLE_MS and admits. Under defer it
+    re-checks for up to ``max_wait_s`` before giving up.
+    """
+    if not ENABLED:
+        return True
+    deadline = time.monotonic() + max_wait_s
+    while True:
+        state = pressure()
+        if state["level"] == "ok":
+            _count(task, "admitted")
+            return True
+        if state["level"] == "throttle":
+            _count(task, "throttled")
+            time.sleep(THROTTLE_MS / 1000.0)
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            _count(task, "deferred")
+            print(f"[ADMISSION] deferred {task}: {', '.join(state['reasons'])}")
+            return False
+        time.sleep(min(_POLL_S, remaining))
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        tasks = {name: dict(entry) for name, entry in _tasks.items()}
+    return {
+        "enabled": ENABLED,
+        "pressure": pressure(),
+        "tasks": tasks,
+        "background_budget": db.background_budget_stats(),
+    }
+
+
+def reset() -> None:
+    global _inflight, _cached
+    with _lock:
+        _requests.clear()
+        _tasks.clear()
+        _inflight = 0
+        _cached = None
@@ -0,0 +1,291 @@
+"""
+Incrementally maintained analytics rollups (migration 090).
+
+Admin analytics used to aggregate the whole jobs / ledger_entries tables per
+request. The ops loop leader now keeps two small tables up to date:
+
+    job_rollup_hourly    per hour of created_at × provider × action_code ×
+                         status × error_code: jobs, credits, estimated cost,
+                         summed latency, last update
+    ledger_rollup_daily  per day × entry_type: entries, credits in / out
+
+refresh() recomputes only the buckets whose source rows changed since the
+watermark (jobs.updated_at, ledger_entries.created_at), re-reading an
+OVERLAP_S window behind it so rows committed late are not missed. The first
+refresh of an empty rollup backfills history in BACKFILL_HOURS steps, one
+step per call; readers keep using the live queries until ready() is true.
+The change scan reads only the hot table; buckets are recomputed from the
+hot + archive view so rows moved out by retention_service still count.
+
+Windows read from the hourly rollup are aligned to whole hours, so a
+"last 24 hours" figure covers up to 25 hours.
+
+Config:
+    ANALYTICS_ROLLUP_ENABLED          (default true)
+    ANALYTICS_ROLLUP_INTERVAL_S       (default 300)   ops-loop refresh cadence
+    ANALYTICS_ROLLUP_OVERLAP_S        (default 600)   re-read window behind the watermark
+    ANALYTICS_ROLLUP_BACKFILL_HOURS   (default 720)   history per backfill step
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from backend.db import USE_DB, Tables, is_transient_db_error, query_one, transaction
+
+
+def _env_int(name: str, default: int, minimum: int | None = None) -> int:
+    try:
+        value = int(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        value = default
+    if minimum is not None:
+        value = max(minimum, value)
+    return value
+
+
+ENABLED = os.getenv("ANALYTICS_ROLLUP_ENABLED", "true").lower() not in ("0", "false", "no")
+INTERVAL_S = _env_int("ANALYTICS_ROLLUP_INTERVAL_S", 300, 30)
+OVERLAP_S = _env_int("ANALYTICS_ROLLUP_OVERLAP_S", 600, 0)
+BACKFILL_HOURS = _env_int("ANALYTICS_ROLLUP_BACKFILL_HOURS", 720, 24)
+
+_READY_TTL_S = 60.0
+
+
+@dataclass(frozen=True)
+class Rollup:
+    name: str
+    source: str
+    history: str         # source plus archived rows (migration 092), for recompute
+    target: str
+    target_bucket: str   # bucket column in the rollup table
+    unit: str            # date_trunc unit of a bucket
+    bucket_expr: str     # same bucket computed from a source row
+    change_column: str   # source column that moves when a row is written
+    step: timedelta      # bucket width
+    columns: str         # rollup columns after the bucket
+    select: str          # matching select list after the bucket expression
+    group_by: str
+
+
+JOBS = Rollup(
+    name="jobs",
+    source=Tables.JOBS,
+    history=Tables.JOBS_ALL,
+    target=Tables.JOB_ROLLUP_HOURLY,
+    target_bucket="bucket",
+    unit="hour",
+    bucket_expr="date_trunc('hour', created_at)",
+    change_column="updated_at",
+    step=timedelta(hours=1),
+    columns="provider, action_code, status, error_code, jobs, cost_credits, cost_usd, latency_ms, last_updated_at",
+    select="""
+        COALESCE(provider, ''),
+        action_code,
+        status,
+        CASE WHEN status = 'failed' THEN COALESCE(last_error_code, '') ELSE '' END,
+        COUNT(*),
+        COALESCE(SUM(cost_credits), 0),
+        COALESCE(SUM(estimated_provider_cost_usd), 0),
+        COALESCE(SUM(EXTRACT(EPOCH FROM (updated_at - created_at)) * 1000), 0)::bigint,
+        MAX(updated_at)
+    """,
+    group_by="1, 2, 3, 4, 5",
+)
+
+LEDGER = Rollup(
+    name="ledger",
+    source=Tables.LEDGER_ENTRIES,
+    history=Tables.LEDGER_ENTRIES,
+    target=Tables.LEDGER_ROLLUP_DAILY,
+    target_bucket="day",
+    unit="day",
+    bucket_expr="created_at::date",
+    change_column="created_at",
+    step=timedelta(days=1),
+    columns="entry_type, entries, credits_in, credits_out",
+    select="""
+        entry_type,
+        COUNT(*),
+        COALESCE(SUM(amount_credits) FILTER (WHERE amount_credits > 0), 0),
+        COALESCE(SUM(-amount_credits) FILTER (WHERE amount_credits < 0), 0)
+    """,
+    group_by="1, 2",
+)
+
+ROLLUPS = (JOBS, LEDGER)
+
+_stats = {"refreshes": 0, "backfill_steps": 0, "buckets": 0, "rows": 0, "errors": 0}
+_ready: Dict[str, tuple] = {}
+_lock = threading.Lock()
+
+
+# ─────────────────────────────────────────────────────────────
+# Refresh (ops loop leader)
+# ─────────────────────────────────────────────────────────────
+def _recompute(cur, rollup: Rollup, *, buckets: Optional[List[Any]] = None, lo=None, hi=None) -> int:
+    """Replace rollup rows for an explicit bucket list or a [lo, hi) range;
+    returns the number of rollup rows written."""
+    if buckets is not None:
+        lo, hi = min(buckets), max(buckets) + rollup.step
+        target_filter = f"{rollup.target_bucket} = ANY(%(buckets)s)"
+        source_filter = f"AND {rollup.bucket_expr} = ANY(%(buckets)s)"
+    else:
+        target_filter = f"{rollup.target_bucket} >= %(lo)s AND {rollup.target_bucket} < %(hi)s"
+        source_filter = ""
+    params = {"buckets": buckets, "lo": lo, "hi": hi}
+    cur.execute(f"DELETE FROM {rollup.target} WHERE {target_filter}", params)
+    cur.execute(
+        f"""
+        INSERT INTO {rollup.target} ({rollup.target_bucket}, {rollup.columns})
+        SELECT {rollup.bucket_expr}, {rollup.select}
+        FROM {rollup.history}
+        WHERE created_at >= %(lo)s AND created_at < %(hi)s
+          {source_filter}
+        GROUP BY {rollup.group_by}
+        """,
+        params,
+    )
+    return max(cur.rowcount, 0)
+
+
+def _refresh_one(rollup: Rollup) -> Dict[str, Any]:
+    started = time.monotonic()
+    result: Dict[str, Any] = {"rollup": rollup.name, "buckets": 0, "rows": 0, "backfill": False}
+    with transaction(f"analytics_rollup:{rollup.name}") as cur:
+        cur.execute("SELECT pg_try_advisory_xact_lock(hashtext(%s)) AS ok", (f"analytics_rollup:{rollup.name}",))
+        row = cur.fetchone()
+        if not row or not row["ok"]:
+            result["skipped"] = "locked"
+            return result
+
+        cur.execute(
+            f"INSERT INTO {Tables.ANALYTICS_ROLLUP_STATE} (name) VALUES (%s) ON CONFLICT (name) DO NOTHING",
+            (rollup.name,),
+        )
+        cur.execute(
+            f"SELECT watermark, backfill_cursor, backfill_until FROM {Tables.ANALYTICS_ROLLUP_STATE} WHERE name = %s",
+            (rollup.name,),
+        )
+        state = cur.fetchone()
+        watermark = state["watermark"]
+        cursor, until = state["backfill_cursor"], state["backfill_until"]
+
+        if watermark is None:
+            # Backfill one step of history, oldest first. Step bounds come
+            # from date_trunc so they always fall on bucket boundaries.
+            result["backfill"] = True
+            if until is None:
+                cur.execute(
+                    f"SELECT date_trunc(%s, MIN(created_at)) AS first, NOW() AS now FROM {rollup.history}",
+                    (rollup.unit,),
+                )
+                first = cur.fetchone()
+                cursor, until = first["first"], first["now"]
+            if cursor is not None:
+                cur.execute(
+                    "SELECT date_trunc(%s, %s::timestamptz + %s * INTERVAL '1 hour') AS hi",
+                    (rollup.unit, cursor, BACKFILL_HOURS),
+                )
+                hi = cur.fetchone()["hi"]
+                result["rows"] = _recompute(cur, rollup, lo=cursor, hi=hi)
+                cursor = hi
+            if cursor is None or cursor > until:
+                # Caught up: rows written since the backfill started are
+                # picked up by the incremental path from here on.
+                watermark, cursor = until, None
+        else:
+            cur.execute(
+                f"""
+                SELECT {rollup.bucket_expr} AS bucket, MAX({rollup.change_column}) AS seen
+                FROM {rollup.source}
+                WHERE {rollup.change_column} > %s
+                GROUP BY 1
+                """,
+                (watermark - timedelta(seconds=OVERLAP_S),),
+            )
+            touched = cur.fetchall()
+            if touched:
+                result["rows"] = _recompute(cur, rollup, buckets=[r["bucket"] for r in touched])
+                result["buckets"] = len(touched)
+                watermark = max(watermark, max(r["seen"] for r in touched))
+
+        refresh_ms = int((time.monotonic() - started) * 1000)
+        cur.execute(
+            f"""
+            UPDATE {Tables.ANALYTICS_ROLLUP_STATE}
+            SET watermark = %s, backfill_cursor = %s, backfill_until = %s,
+                refreshed_at = NOW(), refresh_ms = %s, rollup_rows = %s
+            WHERE name = %s
+            """,
+            (watermark, cursor, until if watermark is None else None, refresh_ms, result["rows"], rollup.name),
+        )
+    result["refresh_ms"] = refresh_ms
+    result["ready"] = watermark is not None
+    with _lock:
+        _stats["refreshes"] += 1
+        _stats["buckets"] += result["buckets"]
+        _stats["rows"] += result["rows"]
+        if result["backfill"]:
+            _stats["backfill_steps"] += 1
+        if result["ready"]:
+            _ready[rollup.name] = (True, time.monotonic())
+    return result
+
+
+def refresh() -> List[Dict[str, Any]]:
+    """Bring every rollup up to date (one backfill step while backfilling)."""
+    if not ENABLED or not USE_DB:
+        return []
+    results = []
+    for rollup in ROLLUPS:
+        try:
+            results.append(_refresh_one(rollup))
+        except Exception as e:
+            with _lock:
+                _stats["errors"] += 1
+            print(f"[ROLLUP] {rollup.name} refresh failed: {type(e).__name__}: {e}")
+            results.append({"rollup": rollup.name, "error": str(e), "transient": is_transient_db_error(e)})
+    return results
+
+
+# ─────────────────────────────────────────────────────────────
+# Readers
+# ─────────────────────────────────────────────────────────────
+def ready(name: str) -> bool:
+    """True once the rollup has finished its backfill (cached for a minute)."""
+    if not ENABLED or not USE_DB:
+        return False
+    now = time.monotonic()
+    with _lock:
+        cached = _ready.get(name)
+    if cached and now - cached[1] < _READY_TTL_S:
+        return cached[0]
+    try:
+        row = query_one(
+            f"SELECT watermark IS NOT NULL AS ready FROM {Tables.ANALYTICS_ROLLUP_STATE} WHERE name = %s",
+            (name,),
+        )
+        value = bool(row and row["ready"])
+    except Exception:
+        value = False
+    with _lock:
+        _ready[name] = (value, now)
+    return value
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        return dict(_stats, ready=sorted(n for n, (v, _) in _ready.items() if v))
+
+
+def reset() -> None:
+    with _lock:
+        for key in _stats:
+            _stats[key] = 0
+        _ready.clear()
@@ -19,6 +19,7 @@ import requests
 
 from backend.config import AWS_BUCKET_MODELS, config
 from backend.db import USE_DB, get_conn, Tables
+from backend.services import job_state_writer
 from backend.services.credits_helper import finalize_job_credits, release_job_credits
 from backend.services.expense_guard import ExpenseGuard
 from backend.services.history_service import save_image_to_normalized_db, save_video_to_normalized_db
@@ -27,10 +28,10 @@ from backend.services.job_service import load_store, save_active_job_to_db, save
 from backend.services.meshy_service import mesh_post
 from backend.services.openai_service import openai_image_generate
 from backend.services.s3_service import safe_upload_to_s3
+from backend.services.ffmpeg_service import inspect_video
 from backend.services.gemini_video_service import (
     gemini_video_status,
     download_video_bytes,
-    extract_video_thumbnail,
     GeminiAuthError,
     GeminiConfigError,
     GeminiValidationError,
@@ -1624,22 +1625,11 @@ def _mark_job_for_worker(job_id: str, upstream_id: str, provider_name: str, stor
 
 
 def _update_job_meta(job_id: str, meta_patch: dict):
-    """Merge a dict into the jobs.meta JSONB column."""
+    """Merge a dict into the jobs.meta JSONB column (prepared; flushes pending progress first)."""
     if not USE_DB or not meta_patch:
         return
     try:
-        with get_conn() as conn:
-            with conn.cursor() as cursor:
-                cursor.execute(
-                    f"""
-                    UPDATE {Tables.JOBS}
-                    SET meta = COALESCE(meta, '{{}}'::jsonb) || %s::jsonb,
-                        updated_at = NOW()
-                    WHERE id::text = %s
-                    """,
-                    (json.dumps(meta_patch), job_id),
-                )
-            conn.commit()
+        job_state_writer.write_meta(job_id, meta_patch)
     except Exception as e:
         print(f"[JOB] ERROR updating meta for {job_id}: {e}")
 
@@ -2986,25 +2976,12 @@ def _update_job_progress(internal_job_id, store_meta, db_status, progress, extra
     save_store(store)
 
     if USE_DB:
-        try:
-            meta_json = {"progress": progress, "status_detail": db_status}
-            if extra_meta:
-                meta_json.update(extra_meta)
-            with get_conn() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(
-                        f"""
-                        UPDATE {Tables.JOBS}
-                        SET status = %s,
-                            meta = COALESCE(meta, '{{}}'::jsonb) || %s::jsonb,
-                            updated_at = NOW()
-                        WHERE id::text = %s
-                        """,
-                        (db_status, json.dumps(meta_json), internal_job_id),
-                    )
-                conn.commit()
-        except Exception as e:
-            print(f"[SEEDANCE] DB update error for {internal_job_id}: {e}")
+        # Coalesced per job: only the latest status/meta inside the write
+        # window is written, batched with other jobs' progress.
+        meta_json = {"progress": progress, "status_detail": db_status}
+        if extra_meta:
+            meta_json.update(extra_meta)
+        job_state_writer.queue_progress(internal_job_id, db_status, meta_json)
 
 
 def _poll_vertex_with_backoff(
@@ -3125,6 +3102,22 @@ def _poll_vertex_with_backoff(
     ExpenseGuard.unregister_active_job(internal_job_id)
 
 
+def _inspect_video_for_store(video_bytes: bytes, store_meta: dict) -> Optional[bytes]:
+    """
+    Probe the finished video once and pull its poster frame from that probe.
+
+    Fills duration_seconds / source_resolution into store_meta when the
+    provider didn't report them, and returns the poster JPEG (or None).
+    """
+    inspection = inspect_video(video_bytes, timestamp_sec=1.0)
+    probe = inspection.get("probe") or {}
+    if probe.get("duration_seconds") and not store_meta.get("duration_seconds"):
+        store_meta["duration_seconds"] = int(round(probe["duration_seconds"]))
+    if probe.get("resolution"):
+        store_meta.setdefault("source_resolution", probe["resolution"])
+    return inspection.get("poster")
+
+
 def _finalize_video_success_with_bytes(
     internal_job_id: str,
     identity_id: str,
@@ -3177,7 +3170,7 @@ def _finalize_video_success_with_bytes(
 
                 # Extract and upload thumbnail
                 try:
-                    thumb_bytes = extract_video_thumbnail(video_bytes, timestamp_sec=1.0)
+                    thumb_bytes = _inspect_video_for_store(video_bytes, store_meta)
                     if thumb_bytes:
                         thumb_b64 = f"data:image/jpeg;base64,{b64_module.b64encode(thumb_bytes).decode('utf-8')}"
                         s3_thumbnail_url = safe_upload_to_s3(
@@ -3376,10 +3369,7 @@ def _finalize_video_success(
 
                 # Extract and upload thumbnail
                 try:
-                    if provider:
-                        thumb_bytes = provider.extract_thumbnail(video_bytes, timestamp_sec=1.0)
-                    else:
-                        thumb_bytes = extract_video_thumbnail(video_bytes, timestamp_sec=1.0)
+                    thumb_bytes = _inspect_video_for_store(video_bytes, store_meta)
 
                     if thumb_bytes:
                         thumb_b64 = f"data:image/jpeg;base64,{__import__('base64').b64encode(thumb_bytes).decode('utf-8')}"
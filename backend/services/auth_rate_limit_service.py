@@ -3,14 +3,133 @@ Shared auth rate limiting backed by Postgres.
 
 This replaces per-process in-memory counters for security-sensitive endpoints
 that must behave consistently across multiple Render instances.
+
+auth_rate_limits holds one fixed-window counter per (scope, key, window);
+it stays the source of truth. To avoid a write transaction per attempt,
+each process keeps the last count it read for a key and decides locally
+where that is safe:
+
+    - the first attempt of a window goes to the database (an upsert that
+      also returns the count other instances have added), and so does any
+      attempt once the local allowance or the count's freshness runs out
+    - once the known count has reached the limit, further attempts in the
+      window are refused locally (counts only grow within a window, so the
+      known count is a lower bound and a local refusal is always right);
+      this is where brute-force traffic stops costing a write per attempt
+    - admissions are decided by the database by default. Optionally, after
+      a sync up to AUTH_RATE_LIMIT_LOCAL_SHARE % of the remaining allowance
+      is admitted locally for at most AUTH_RATE_LIMIT_SYNC_S -- only exact
+      when every process that can see the key (gunicorn workers x
+      instances) together stays within 100 %, i.e. LOCAL_SHARE <= 100 / N;
+      above that the limit can be exceeded, so leave it at 0 for
+      magic-code and login scopes unless N is known
+
+Locally refused (and, with LOCAL_SHARE > 0, admitted) attempts are added
+to the rows asynchronously, aggregated per key, every
+AUTH_RATE_LIMIT_FLUSH_MS; each flush also reads back the counts and
+tightens local allowances.
+
+sweep_expired() deletes rows whose window ended more than
+AUTH_RATE_LIMIT_RETAIN_S ago (ops loop).
+
+Config:
+    AUTH_RATE_LIMIT_LOCAL_SHARE       (default 0)     % of remaining allowance
+                                                      admitted locally per sync
+    AUTH_RATE_LIMIT_SYNC_S            (default 5)     max age of a synced count
+    AUTH_RATE_LIMIT_FLUSH_MS          (default 1000)
+    AUTH_RATE_LIMIT_MAX_KEYS          (default 10000) keys remembered per process
+    AUTH_RATE_LIMIT_RETAIN_S          (default 86400)
+    AUTH_RATE_LIMIT_SWEEP_INTERVAL_S  (default 900)   ops-loop cadence
+    AUTH_RATE_LIMIT_SWEEP_BATCH       (default 5000)  rows per delete
 """
 
 from __future__ import annotations
 
+import os
+import threading
+import time
 from datetime import datetime, timezone
-from typing import Iterable
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from backend.db import Tables, fetch_all, fetch_one, hash_string, transaction
+
+
+def _env_int(name: str, default: int, minimum: int | None = None) -> int:
+    try:
+        value = int(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        value = default
+    if minimum is not None:
+        value = max(minimum, value)
+    return value
+
+
+LOCAL_SHARE = min(100, _env_int("AUTH_RATE_LIMIT_LOCAL_SHARE", 0, 0))
+SYNC_S = _env_int("AUTH_RATE_LIMIT_SYNC_S", 5, 0)
+FLUSH_MS = _env_int("AUTH_RATE_LIMIT_FLUSH_MS", 1000, 50)
+MAX_KEYS = _env_int("AUTH_RATE_LIMIT_MAX_KEYS", 10000, 100)
+RETAIN_S = _env_int("AUTH_RATE_LIMIT_RETAIN_S", 86400, 0)
+SWEEP_INTERVAL_S = _env_int("AUTH_RATE_LIMIT_SWEEP_INTERVAL_S", 900, 60)
+SWEEP_BATCH = _env_int("AUTH_RATE_LIMIT_SWEEP_BATCH", 5000, 100)
+
+Key = Tuple[str, str, int]                 # scope, key_hash, window_seconds
+RowKey = Tuple[str, str, int, datetime]    # + window_start
+
+_UPSERT_SQL = f"""
+    INSERT INTO {Tables.AUTH_RATE_LIMITS}
+        (scope, key_hash, window_seconds, window_start, request_count, created_at, last_seen_at)
+    VALUES
+        (%s, %s, %s, %s, %s, NOW(), NOW())
+    ON CONFLICT (scope, key_hash, window_seconds, window_start)
+    DO UPDATE SET
+        request_count = {Tables.AUTH_RATE_LIMITS}.request_count + EXCLUDED.request_count,
+        last_seen_at = NOW()
+    RETURNING request_count
+"""
+
+_FLUSH_SQL = f"""
+    INSERT INTO {Tables.AUTH_RATE_LIMITS}
+        (scope, key_hash, window_seconds, window_start, request_count, created_at, last_seen_at)
+    SELECT scope, key_hash, window_seconds, window_start, request_count, NOW(), NOW()
+    FROM unnest(%s::text[], %s::text[], %s::int[], %s::timestamptz[], %s::int[])
+         AS t(scope, key_hash, window_seconds, window_start, request_count)
+    ON CONFLICT (scope, key_hash, window_seconds, window_start)
+    DO UPDATE SET
+        request_count = {Tables.AUTH_RATE_LIMITS}.request_count + EXCLUDED.request_count,
+        last_seen_at = NOW()
+    RETURNING scope, key_hash, window_seconds, window_start, request_count
+"""
+
+_lock = threading.Lock()
+# Last known state per key: window_start, count (DB count at the last sync or
+# flush plus local attempts since), limit, allowance (local admits left), synced_at.
+_buckets: Dict[Key, Dict[str, Any]] = {}
+# Locally decided attempts not yet added to their row.
+_pending: Dict[RowKey, int] = {}
+_flusher: Optional[threading.Thread] = None
+_stats = {
+    "synced": 0,
+    "local_allowed": 0,
+    "local_denied": 0,
+    "flushes": 0,
+    "flushed_rows": 0,
+    "swept": 0,
+    "errors": 0,
+}
+
+
+def _allowance(count: int, limit: int) -> int:
+    return max(0, (limit - count) * LOCAL_SHARE // 100)
 
-from backend.db import Tables, fetch_one, hash_string, transaction
+
+def _evict(now: float) -> None:
+    """Keep _buckets under MAX_KEYS; forgetting a key only costs a sync."""
+    if len(_buckets) <= MAX_KEYS:
+        return
+    for key in [k for k, b in _buckets.items() if now - b["synced_at"] > SYNC_S]:
+        del _buckets[key]
+    while len(_buckets) > MAX_KEYS:
+        del _buckets[next(iter(_buckets))]
 
 
 class AuthRateLimitService:
@@ -42,25 +161,13 @@ class AuthRateLimitService:
         bucket_start = AuthRateLimitService._bucket_start(now, window_seconds)
         retry_after = max(1, window_seconds - int(now.timestamp()) % window_seconds)
         key_hash = AuthRateLimitService._key_hash(key_parts)
+        key = (scope, key_hash, window_seconds)
+        row_key = (scope, key_hash, window_seconds, bucket_start)
 
-        with transaction("auth_rate_limit_hit") as cur:
-            cur.execute(
-                f"""
-                INSERT INTO {Tables.AUTH_RATE_LIMITS}
-                    (scope, key_hash, window_seconds, window_start, request_count, created_at, last_seen_at)
-                VALUES
-                    (%s, %s, %s, %s, 1, NOW(), NOW())
-                ON CONFLICT (scope, key_hash, window_seconds, window_start)
-                DO UPDATE SET
-                    request_count = {Tables.AUTH_RATE_LIMITS}.request_count + 1,
-                    last_seen_at = NOW()
-                RETURNING request_count
-                """,
-                (scope, key_hash, window_seconds, bucket_start),
-            )
-            row = fetch_one(cur)
+        count = AuthRateLimitService._decide_locally(key, row_key, limit)
+        if count is None:
+            count = AuthRateLimitService._sync(key, row_key, limit)
 
-        count = int(row["request_count"]) if row else 1
         remaining = max(0, limit - count)
         return {
             "ok": count <= limit,
@@ -69,3 +176,160 @@ class AuthRateLimitService:
             "remaining": remaining,
             "retry_after": retry_after,
         }
+
+    @staticmethod
+    def _decide_locally(key: Key, row_key: RowKey, limit: int) -> Optional[int]:
+        """Count the attempt locally if that is safe; None means ask the database."""
+        global _flusher
+        now = time.monotonic()
+        with _lock:
+            bucket = _buckets.get(key)
+            if bucket is None or bucket["window_start"] != row_key[3]:
+                return None
+            bucket["limit"] = limit
+            if bucket["count"] >= limit:
+                _stats["local_denied"] += 1
+            elif bucket["allowance"] > 0 and now - bucket["synced_at"] < SYNC_S:
+                bucket["allowance"] -= 1
+                _stats["local_allowed"] += 1
+            else:
+                return None
+            bucket["count"] += 1
+            _pending[row_key] = _pending.get(row_key, 0) + 1
+            if _flusher is None or not _flusher.is_alive():
+                _flusher = threading.Thread(target=_flush_loop, name="auth-rate-limit-flush", daemon=True)
+                _flusher.start()
+            return bucket["count"]
+
+    @staticmethod
+    def _sync(key: Key, row_key: RowKey, limit: int) -> int:
+        """Add this attempt (and any unflushed ones for the row) and read the shared count."""
+        with _lock:
+            unflushed = _pending.pop(row_key, 0)
+        try:
+            with transaction("auth_rate_limit_hit") as cur:
+                cur.execute(_UPSERT_SQL, (*row_key, unflushed + 1))
+                row = fetch_one(cur)
+        except Exception:
+            with _lock:
+                _stats["errors"] += 1
+                if unflushed:
+                    _pending[row_key] = _pending.get(row_key, 0) + unflushed
+            raise
+
+        count = int(row["request_count"]) if row else unflushed + 1
+        now = time.monotonic()
+        with _lock:
+            _stats["synced"] += 1
+            count += _pending.get(row_key, 0)  # local attempts counted while we were away
+            _buckets[key] = {
+                "window_start": row_key[3],
+                "count": count,
+                "limit": limit,
+                "allowance": _allowance(count, limit),
+                "synced_at": now,
+            }
+            _evict(now)
+        return count
+
+
+def flush() -> int:
+    """Add all locally decided attempts to their rows in one statement and
+    fold the returned counts back into the local state. Returns rows written."""
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+    if not batch:
+        return 0
+    keys = list(batch)
+    try:
+        with transaction("auth_rate_limit_flush") as cur:
+            cur.execute(
+                _FLUSH_SQL,
+                (
+                    [k[0] for k in keys], [k[1] for k in keys], [k[2] for k in keys],
+                    [k[3] for k in keys], [batch[k] for k in keys],
+                ),
+            )
+            rows = fetch_all(cur)
+    except Exception as e:
+        with _lock:
+            _stats["errors"] += 1
+            for row_key, n in batch.items():
+                _pending[row_key] = _pending.get(row_key, 0) + n
+        print(f"[AUTH_RATE_LIMIT] flush failed rows={len(batch)}: {type(e).__name__}: {e}")
+        return 0
+
+    now = time.monotonic()
+    with _lock:
+        _stats["flushes"] += 1
+        _stats["flushed_rows"] += len(rows)
+        for row in rows:
+            row_key = (row["scope"], row["key_hash"], int(row["window_seconds"]), row["window_start"])
+            bucket = _buckets.get(row_key[:3])
+            if bucket is None or bucket["window_start"] != row_key[3]:
+                continue
+            count = max(bucket["count"], int(row["request_count"]) + _pending.get(row_key, 0))
+            bucket["count"] = count
+            bucket["allowance"] = min(bucket["allowance"], _allowance(count, bucket["limit"]))
+            bucket["synced_at"] = now
+    return len(rows)
+
+
+def _flush_loop() -> None:
+    """Flush pending attempts until nothing is pending, then exit."""
+    global _flusher
+    while True:
+        time.sleep(FLUSH_MS / 1000.0)
+        flush()
+        with _lock:
+            if not _pending:
+                _flusher = None
+                return
+
+
+def sweep_expired() -> int:
+    """Delete rows whose window ended more than RETAIN_S ago, in batches.
+    Returns rows deleted."""
+    deleted = 0
+    while True:
+        with transaction("auth_rate_limit_sweep") as cur:
+            cur.execute(
+                f"""
+                DELETE FROM {Tables.AUTH_RATE_LIMITS}
+                WHERE ctid IN (
+                    SELECT ctid FROM {Tables.AUTH_RATE_LIMITS}
+                    WHERE window_start < NOW() - %s * INTERVAL '1 second'
+                      AND window_start + window_seconds * INTERVAL '1 second'
+                          < NOW() - %s * INTERVAL '1 second'
+                    LIMIT %s
+                )
+                """,
+                (RETAIN_S, RETAIN_S, SWEEP_BATCH),
+            )
+            batch = max(cur.rowcount, 0)
+        deleted += batch
+        if batch < SWEEP_BATCH:
+            break
+    with _lock:
+        _stats["swept"] += deleted
+    return deleted
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        return {
+            **_stats,
+            "keys": len(_buckets),
+            "pending_rows": len(_pending),
+            "pending_attempts": sum(_pending.values()),
+            "local_share": LOCAL_SHARE,
+        }
+
+
+def reset() -> None:
+    with _lock:
+        _buckets.clear()
+        _pending.clear()
+        for key in _stats:
+            _stats[key] = 0
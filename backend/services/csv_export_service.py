@@ -0,0 +1,195 @@
+"""
+Streaming CSV exports for the admin finance views.
+
+The export endpoints used to load at most 5000 rows through the paginated
+list functions and build the whole CSV in a buffer. Here the rows come from
+a named (server-side) cursor read with fetchmany() in EXPORT_BATCH_ROWS
+batches and are written out batch by batch, either as a generator response
+or into a spooled temp file that is uploaded to S3, so memory stays flat
+whatever the date range.
+
+Every export is ordered by (created_at DESC, id DESC). The keyset of the
+last written row, "<created_at>|<id>", can be passed back as ``after`` to
+resume an interrupted download without re-reading what was already sent;
+S3 exports return it as ``after`` (KeysetTracker).
+
+S3 exports hold customer PII, so they are uploaded as transient objects
+(not recorded in s3_content_index) and the ops loop deletes everything
+under EXPORT_S3_PREFIX older than EXPORT_S3_RETAIN_S (sweep_expired).
+
+The cursor runs on its own direct connection (not a pool slot), since a
+download lasts as long as the client takes to read it.
+
+Config:
+    EXPORT_BATCH_ROWS       (default 1000)  rows per fetchmany()
+    EXPORT_IDLE_TIMEOUT_S   (default 300)   idle-in-transaction limit while
+                                            the client reads a batch
+    EXPORT_S3_PREFIX        (default admin-exports/)
+    EXPORT_S3_URL_TTL_S     (default 900)   presigned download URL lifetime
+    EXPORT_S3_RETAIN_S      (default 3600)  delete uploaded exports after this
+                                            (never before the URL expires)
+    EXPORT_SWEEP_INTERVAL_S (default 900)   how often the ops loop sweeps
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import os
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from backend.db import get_conn_direct
+
+
+def _env_int(name: str, default: int, minimum: int | None = None) -> int:
+    try:
+        value = int(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        value = default
+    if minimum is not None:
+        value = max(minimum, value)
+    return value
+
+
+BATCH_ROWS = _env_int("EXPORT_BATCH_ROWS", 1000, 50)
+IDLE_TIMEOUT_S = _env_int("EXPORT_IDLE_TIMEOUT_S", 300, 30)
+S3_PREFIX = os.getenv("EXPORT_S3_PREFIX", "admin-exports/").strip("/") + "/"
+S3_URL_TTL_S = _env_int("EXPORT_S3_URL_TTL_S", 900, 60)
+S3_RETAIN_S = max(S3_URL_TTL_S, _env_int("EXPORT_S3_RETAIN_S", 3600, 60))
+SWEEP_INTERVAL_S = _env_int("EXPORT_SWEEP_INTERVAL_S", 900, 60)
+
+# Spill the S3 staging file to disk past this size.
+_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+Row = Dict[str, Any]
+
+
+@dataclass(frozen=True)
+class ExportQuery:
+    """A filtered SELECT whose output has ``created_at`` and ``id`` columns.
+
+    ``sql`` must not carry ORDER BY / LIMIT; the engine adds the keyset
+    condition, ordering and limit around it.
+    """
+    sql: str
+    params: Tuple[Any, ...] = ()
+
+
+def parse_after(token: Optional[str]) -> Optional[Tuple[datetime, str]]:
+    """Parse a "<created_at ISO>|<id>" resume token; raises ValueError."""
+    if not token:
+        return None
+    created_at, sep, row_id = token.strip().partition("|")
+    if not sep or not row_id:
+        raise ValueError("after must look like '<created_at>|<id>'")
+    return datetime.fromisoformat(created_at), row_id
+
+
+def format_after(row: Row) -> str:
+    """The resume token for ``row`` (the inverse of parse_after)."""
+    created_at = row["created_at"]
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    return f"{created_at}|{row['id']}"
+
+
+class KeysetTracker:
+    """Pass row batches through, remembering the resume token of the last row."""
+
+    def __init__(self, batches: Iterable[List[Row]]):
+        self._batches = batches
+        self.rows = 0
+        self.after: Optional[str] = None
+
+    def __iter__(self) -> Iterator[List[Row]]:
+        for batch in self._batches:
+            if batch:
+                self.rows += len(batch)
+                self.after = format_after(batch[-1])
+            yield batch
+
+
+def iter_batches(query: ExportQuery, *, after: Optional[str] = None, limit: Optional[int] = None,
+                 batch_size: int = BATCH_ROWS) -> Iterator[List[Row]]:
+    """Yield raw row batches in (created_at DESC, id DESC) order from a named cursor."""
+    keyset = parse_after(after)
+    sql = f"SELECT * FROM ({query.sql}) AS export_rows"
+    params: List[Any] = list(query.params)
+    if keyset:
+        sql += " WHERE (created_at, id::text) < (%s, %s)"
+        params.extend(keyset)
+    sql += " ORDER BY created_at DESC, id::text DESC"
+    if limit:
+        sql += " LIMIT %s"
+        params.append(int(limit))
+
+    with get_conn_direct("csv_export") as conn:
+        with conn.transaction():
+            with conn.cursor() as cur:
+                cur.execute(f"SET LOCAL idle_in_transaction_session_timeout = '{IDLE_TIMEOUT_S * 1000}'")
+            with conn.cursor(name=f"csv_export_{uuid.uuid4().hex[:12]}") as cur:
+                cur.execute(sql, params)
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+
+
+def iter_csv(fieldnames: Sequence[str], batches: Iterable[List[Row]],
+             format_rows: Callable[[List[Row]], List[Row]]) -> Iterator[str]:
+    """CSV text chunks: the header, then one chunk per formatted batch."""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=list(fieldnames), extrasaction="ignore")
+    writer.writeheader()
+    yield buf.getvalue()
+    for batch in batches:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(format_rows(batch))
+        yield buf.getvalue()
+
+
+def upload_csv(chunks: Iterable[str], filename: str) -> Dict[str, Any]:
+    """Write CSV chunks to a spooled temp file, upload it, return a download link."""
+    from backend.services.s3_service import presign_s3_key, upload_transient_fileobj_to_s3
+
+    started = time.monotonic()
+    key = f"{S3_PREFIX}{time.strftime('%Y/%m/%d', time.gmtime())}/{uuid.uuid4().hex[:12]}-{filename}"
+    size = 0
+    with tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES) as spool:
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            spool.write(data)
+            size += len(data)
+        upload_transient_fileobj_to_s3(spool, key, "text/csv")
+    url = presign_s3_key(
+        key, expires_in=S3_URL_TTL_S, response_disposition=f'attachment; filename="{filename}"'
+    )
+    print(f"[EXPORT] uploaded {key} bytes={size} ms={int((time.monotonic() - started) * 1000)}")
+    return {"ok": True, "key": key, "url": url, "bytes": size, "expires_in": S3_URL_TTL_S}
+
+
+def sweep_expired(now: Optional[float] = None) -> int:
+    """Delete uploaded exports older than S3_RETAIN_S; returns objects deleted."""
+    from backend.config import config
+    from backend.services.s3_service import delete_s3_objects_safe, get_s3_client
+
+    if not config.AWS_BUCKET_MODELS:
+        return 0
+    cutoff = (now if now is not None else time.time()) - S3_RETAIN_S
+    expired = []
+    paginator = get_s3_client().get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=config.AWS_BUCKET_MODELS, Prefix=S3_PREFIX):
+        for obj in page.get("Contents") or []:
+            if obj["LastModified"].timestamp() < cutoff:
+                expired.append(obj["Key"])
+    if not expired:
+        return 0
+    result = delete_s3_objects_safe(expired, source="csv_export_sweep")
+    return int(result.get("deleted") or 0)
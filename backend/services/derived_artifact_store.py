@@ -0,0 +1,241 @@
+"""
+Derived-artifact store: (source content hash, variant) → S3 object.
+
+STL/3MF conversions and STL repairs are pure functions of the source bytes
+and a handful of options, yet each print order and download used to redo
+them. Callers describe the output with a variant id (a short digest of the
+options) and look it up here before converting; after a successful upload
+they record it. Same two tiers as s3_content_index:
+
+- an in-process LRU keyed by (source_hash, variant), and
+- timrx_app.derived_artifacts (deploy_migrations/087), shared by all workers.
+
+Lookups never raise: a DB problem is a miss and the caller converts as
+before. The row only says where the artifact was written; callers confirm
+the object still exists (content_key_exists) before handing it out.
+
+Environment:
+    DERIVED_ARTIFACTS_ENABLED    default true
+    DERIVED_ARTIFACTS_LRU_SIZE   default 5000 entries
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+ENABLED = os.getenv("DERIVED_ARTIFACTS_ENABLED", "true").lower() not in ("0", "false", "no")
+LRU_SIZE = max(100, int(os.getenv("DERIVED_ARTIFACTS_LRU_SIZE", "5000")))
+
+_lock = threading.Lock()
+_entries: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()  # (source_hash, variant) -> row
+_counters: Dict[str, int] = {
+    "lru_hits": 0,
+    "db_hits": 0,
+    "misses": 0,
+    "records": 0,
+    "db_errors": 0,
+}
+_db_disabled_reason: Optional[str] = None
+
+
+def _bump(name: str, n: int = 1) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def _remember(source_hash: str, variant: str, entry: Dict[str, Any]) -> None:
+    with _lock:
+        _entries[(source_hash, variant)] = entry
+        _entries.move_to_end((source_hash, variant))
+        while len(_entries) > LRU_SIZE:
+            _entries.popitem(last=False)
+
+
+def _bucket() -> Optional[str]:
+    from backend.config import config
+
+    return config.AWS_BUCKET_MODELS or None
+
+
+def _db_ready() -> bool:
+    if _db_disabled_reason is not None:
+        return False
+    from backend.db import USE_DB
+
+    return bool(USE_DB)
+
+
+def _db_failed(exc: Exception) -> None:
+    global _db_disabled_reason
+    _bump("db_errors")
+    if "derived_artifacts" in str(exc) and "does not exist" in str(exc):
+        _db_disabled_reason = "table_missing"
+        print("[DERIVED] timrx_app.derived_artifacts missing (run migration 087); using in-process store only")
+    else:
+        print(f"[DERIVED] DB lookup failed, treating as miss: {exc}")
+
+
+def lookup(source_hash: str, variant: str) -> Optional[Dict[str, Any]]:
+    """
+    Return {"s3_key", "content_hash", "content_type", "size_bytes", "meta"}
+    for a previously recorded artifact, or None.
+    """
+    if not ENABLED or not source_hash or not variant:
+        return None
+    with _lock:
+        entry = _entries.get((source_hash, variant))
+        if entry is not None:
+            _entries.move_to_end((source_hash, variant))
+            _counters["lru_hits"] += 1
+            return dict(entry)
+
+    bucket = _bucket()
+    if bucket and _db_ready():
+        try:
+            from backend.db import Tables, get_conn
+
+            with get_conn("derived_artifacts") as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f"""
+                        UPDATE {Tables.DERIVED_ARTIFACTS}
+                        SET hit_count = hit_count + 1, last_used_at = NOW()
+                        WHERE source_hash = %s AND variant = %s AND s3_bucket = %s
+                        RETURNING artifact_s3_key, content_hash, content_type, size_bytes, meta
+                        """,
+                        (source_hash, variant, bucket),
+                    )
+                    row = cur.fetchone()
+                conn.commit()
+            if row:
+                entry = {
+                    "s3_key": row["artifact_s3_key"],
+                    "content_hash": row["content_hash"],
+                    "content_type": row["content_type"],
+                    "size_bytes": row["size_bytes"],
+                    "meta": row["meta"] or {},
+                }
+                _remember(source_hash, variant, entry)
+                _bump("db_hits")
+                return dict(entry)
+        except Exception as exc:
+            _db_failed(exc)
+
+    _bump("misses")
+    return None
+
+
+def record(
+    source_hash: str,
+    variant: str,
+    s3_key: str,
+    *,
+    kind: str,
+    content_hash: Optional[str] = None,
+    content_type: Optional[str] = None,
+    size_bytes: Optional[int] = None,
+    options: Optional[Dict[str, Any]] = None,
+    meta: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Remember that (source_hash, variant) was written to s3_key."""
+    if not ENABLED or not source_hash or not variant or not s3_key:
+        return
+    entry = {
+        "s3_key": s3_key,
+        "content_hash": content_hash,
+        "content_type": content_type,
+        "size_bytes": size_bytes,
+        "meta": meta or {},
+    }
+    _remember(source_hash, variant, entry)
+    _bump("records")
+
+    bucket = _bucket()
+    if not (bucket and _db_ready()):
+        return
+    try:
+        from backend.db import Tables, get_conn
+
+        with get_conn("derived_artifacts") as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    INSERT INTO {Tables.DERIVED_ARTIFACTS}
+                        (source_hash, variant, kind, s3_bucket, artifact_s3_key,
+                         content_hash, content_type, size_bytes, options, meta)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb, %s::jsonb)
+                    ON CONFLICT (source_hash, variant) DO UPDATE
+                    SET artifact_s3_key = EXCLUDED.artifact_s3_key,
+                        s3_bucket = EXCLUDED.s3_bucket,
+                        content_hash = EXCLUDED.content_hash,
+                        content_type = EXCLUDED.content_type,
+                        size_bytes = EXCLUDED.size_bytes,
+                        meta = EXCLUDED.meta,
+                        last_used_at = NOW()
+                    """,
+                    (
+                        source_hash, variant, kind, bucket, s3_key,
+                        content_hash, content_type, size_bytes,
+                        json.dumps(options or {}, default=str), json.dumps(meta or {}, default=str),
+                    ),
+                )
+            conn.commit()
+    except Exception as exc:
+        _db_failed(exc)
+
+
+def forget(source_hash: str, variant: str) -> None:
+    """Drop an entry whose object turned out to be gone."""
+    if not ENABLED or not source_hash or not variant:
+        return
+    with _lock:
+        _entries.pop((source_hash, variant), None)
+
+    if not (_bucket() and _db_ready()):
+        return
+    try:
+        from backend.db import Tables, get_conn
+
+        with get_conn("derived_artifacts") as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"DELETE FROM {Tables.DERIVED_ARTIFACTS} WHERE source_hash = %s AND variant = %s",
+                    (source_hash, variant),
+                )
+            conn.commit()
+    except Exception as exc:
+        _db_failed(exc)
+
+
+def stats() -> Dict[str, object]:
+    """Hit/miss counters for the admin storage metrics."""
+    with _lock:
+        counters = dict(_counters)
+        size = len(_entries)
+    hits = counters["lru_hits"] + counters["db_hits"]
+    lookups = hits + counters["misses"]
+    return {
+        "enabled": ENABLED,
+        "db_enabled": _db_disabled_reason is None,
+        "db_disabled_reason": _db_disabled_reason,
+        "lru_entries": size,
+        "lru_capacity": LRU_SIZE,
+        "lookups": lookups,
+        "hits": hits,
+        "hit_ratio": round(hits / lookups, 4) if lookups else None,
+        **counters,
+    }
+
+
+def reset() -> None:
+    """Clear the in-process tier and counters (tests)."""
+    global _db_disabled_reason
+    with _lock:
+        _entries.clear()
+        for name in _counters:
+            _counters[name] = 0
+    _db_disabled_reason = None
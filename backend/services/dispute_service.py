@@ -12,10 +12,16 @@ from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
 from backend.db import Tables, query_all, query_one, get_conn
+from backend.services.csv_export_service import ExportQuery
 
 
 _TABLE = Tables.PAYMENT_DISPUTES
 _VALID_STATUSES = {"open", "under_review", "won", "lost", "closed"}
+_DISPUTE_LIST_SELECT = f"""
+SELECT d.*, i.email AS _email
+FROM {_TABLE} d
+LEFT JOIN {Tables.IDENTITIES} i ON i.id = d.identity_id
+"""
 
 
 def _iso(val) -> Optional[str]:
@@ -65,6 +71,54 @@ def list_disputes(
     offset: int = 0,
 ) -> Dict[str, Any]:
     """List disputes with optional filters."""
+    where, joins, params = _dispute_filters(
+        status=status, purchase_id=purchase_id, email=email,
+        identity_id=identity_id, date_from=date_from, date_to=date_to,
+    )
+
+    count_row = query_one(
+        f"SELECT COUNT(*) AS total FROM {_TABLE} d {joins} {where}",
+        tuple(params),
+    )
+    total = count_row["total"] if count_row else 0
+
+    params.extend([limit, offset])
+    # Always join identities to include email in results
+    rows = query_all(
+        f"""
+        {_DISPUTE_LIST_SELECT}
+        {where}
+        ORDER BY d.created_at DESC
+        LIMIT %s OFFSET %s
+        """,
+        tuple(params),
+    )
+
+    disputes = [_row_to_dict(r) for r in rows]
+    return {"disputes": disputes, "total": total}
+
+
+def disputes_export_query(**filters) -> ExportQuery:
+    """Unpaginated disputes query (same filters as list_disputes) for CSV export."""
+    where, _, params = _dispute_filters(**filters)
+    return ExportQuery(f"{_DISPUTE_LIST_SELECT} {where}", tuple(params))
+
+
+def format_dispute(r: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a dispute row for the admin list / export."""
+    return _row_to_dict(r)
+
+
+def _dispute_filters(
+    *,
+    status: Optional[str] = None,
+    purchase_id: Optional[str] = None,
+    email: Optional[str] = None,
+    identity_id: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+) -> tuple:
+    """WHERE clause, identities join for the count query, and params."""
     conditions: list = []
     params: list = []
     joins = ""
@@ -90,29 +144,7 @@ def list_disputes(
         params.append(f"%{email}%")
 
     where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
-
-    count_row = query_one(
-        f"SELECT COUNT(*) AS total FROM {_TABLE} d {joins} {where}",
-        tuple(params),
-    )
-    total = count_row["total"] if count_row else 0
-
-    params.extend([limit, offset])
-    # Always join identities to include email in results
-    rows = query_all(
-        f"""
-        SELECT d.*, i.email AS _email
-        FROM {_TABLE} d
-        LEFT JOIN {Tables.IDENTITIES} i ON i.id = d.identity_id
-        {where}
-        ORDER BY d.created_at DESC
-        LIMIT %s OFFSET %s
-        """,
-        tuple(params),
-    )
-
-    disputes = [_row_to_dict(r) for r in rows]
-    return {"disputes": disputes, "total": total}
+    return where, joins, params
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -27,6 +27,7 @@ Environment variables for SES:
     SES_FROM_EMAIL=noreply@timrx.app (or EMAIL_FROM_ADDRESS)
 """
 
+import importlib.util
 import smtplib
 import socket
 from email.mime.text import MIMEText
@@ -39,16 +40,26 @@ from dataclasses import dataclass
 
 from backend.config import config
 
-# Try to import boto3 for SES
-try:
-    import boto3
+# boto3 for SES is imported when the first SES client is built; only
+# check here that it is installed.
+BOTO3_AVAILABLE = importlib.util.find_spec("boto3") is not None
+if BOTO3_AVAILABLE:
     from botocore.exceptions import ClientError, NoCredentialsError
-    BOTO3_AVAILABLE = True
-except ImportError:
-    BOTO3_AVAILABLE = False
+else:
     print("[EMAIL] WARNING: boto3 not available - SES sending disabled")
 
 
+def _ses_client():
+    import boto3
+
+    return boto3.client(
+        "ses",
+        region_name=config.AWS_REGION,
+        aws_access_key_id=config.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=config.AWS_SECRET_ACCESS_KEY,
+    )
+
+
 @dataclass
 class EmailResult:
     """Result of an email send attempt."""
@@ -218,12 +229,7 @@ class EmailService:
 
         try:
             # Create SES client
-            ses_client = boto3.client(
-                "ses",
-                region_name=config.AWS_REGION,
-                aws_access_key_id=config.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=config.AWS_SECRET_ACCESS_KEY,
-            )
+            ses_client = _ses_client()
 
             # Build email body
             body = {"Html": {"Charset": "UTF-8", "Data": html}}
@@ -389,12 +395,7 @@ class EmailService:
 
             # Route to provider
             if provider == "ses":
-                ses_client = boto3.client(
-                    "ses",
-                    region_name=config.AWS_REGION,
-                    aws_access_key_id=config.AWS_ACCESS_KEY_ID,
-                    aws_secret_access_key=config.AWS_SECRET_ACCESS_KEY,
-                )
+                ses_client = _ses_client()
                 response = ses_client.send_raw_email(
                     Source=sender,
                     Destinations=[to],
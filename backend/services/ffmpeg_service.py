@@ -0,0 +1,543 @@
+"""
+FFmpeg execution layer.
+
+One place that knows how to run ffprobe/ffmpeg without staging whole videos
+on disk:
+
+- Inputs are either in-memory bytes (streamed to ffmpeg over stdin) or a URL
+  (S3 presigned / provider CDN). For URLs ffmpeg's HTTP demuxer issues Range
+  requests, so ``-ss`` before ``-i`` seeks straight to the poster frame and
+  only the moov atom plus a few GOPs are transferred.
+- Outputs come back over stdout (``image2pipe``) — no temp files for frames.
+- ``inspect_video()`` runs ffprobe once and reuses the result for both the
+  metadata callers store and the poster-frame timestamp.
+- Long conversions (AVI → MP4) run as queued jobs on a bounded worker pool,
+  with progress parsed from ``-progress pipe:1``. Job state and finished
+  outputs of async jobs are shared with the other workers through
+  video_conversion_store.
+
+Non-faststart MP4s (moov atom at the end) can't be demuxed from a pipe; for
+byte inputs that fail over stdin we fall back to a temp file once, so the
+result is never worse than the old temp-file path.
+
+Environment:
+    FFMPEG_BIN / FFPROBE_BIN              binary names or paths
+    FFMPEG_PROBE_TIMEOUT_SECONDS          default 20
+    FFMPEG_FRAME_TIMEOUT_SECONDS          default 30
+    VIDEO_CONVERT_MAX_PARALLEL            concurrent conversions (default 1)
+    VIDEO_CONVERT_MAX_QUEUED              waiting conversions before 429 (default 4)
+    VIDEO_CONVERT_TIMEOUT_SECONDS         per conversion (default 600)
+    VIDEO_CONVERT_RESULT_TTL_SECONDS      keep finished outputs (default 900)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Union
+
+MediaSource = Union[bytes, str]
+
+PROBE_TIMEOUT_SECONDS = int(os.getenv("FFMPEG_PROBE_TIMEOUT_SECONDS", "20"))
+FRAME_TIMEOUT_SECONDS = int(os.getenv("FFMPEG_FRAME_TIMEOUT_SECONDS", "30"))
+CONVERT_MAX_PARALLEL = max(1, int(os.getenv("VIDEO_CONVERT_MAX_PARALLEL", "1")))
+CONVERT_MAX_QUEUED = max(0, int(os.getenv("VIDEO_CONVERT_MAX_QUEUED", "4")))
+CONVERT_TIMEOUT_SECONDS = int(os.getenv("VIDEO_CONVERT_TIMEOUT_SECONDS", "600"))
+CONVERT_RESULT_TTL_SECONDS = int(os.getenv("VIDEO_CONVERT_RESULT_TTL_SECONDS", "900"))
+
+# Network inputs: reconnect on dropped range requests instead of failing the frame.
+_HTTP_INPUT_FLAGS = ["-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "2"]
+
+
+def ffmpeg_bin() -> Optional[str]:
+    return shutil.which(os.getenv("FFMPEG_BIN", "ffmpeg"))
+
+
+def ffprobe_bin() -> Optional[str]:
+    return shutil.which(os.getenv("FFPROBE_BIN", "ffprobe"))
+
+
+def _is_url(source: MediaSource) -> bool:
+    return isinstance(source, str) and source.startswith(("http://", "https://"))
+
+
+def _input_args(source: MediaSource) -> List[str]:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return ["-i", "pipe:0"]
+    if _is_url(source):
+        return _HTTP_INPUT_FLAGS + ["-i", source]
+    return ["-i", str(source)]
+
+
+def _run(cmd: List[str], source: MediaSource, timeout: int) -> subprocess.CompletedProcess:
+    """Run cmd, streaming byte sources over stdin. communicate() tolerates
+    ffmpeg closing stdin early once it has the frame it needs."""
+    stdin_data = bytes(source) if isinstance(source, (bytes, bytearray, memoryview)) else None
+    return subprocess.run(
+        cmd,
+        input=stdin_data,
+        stdin=None if stdin_data is not None else subprocess.DEVNULL,
+        capture_output=True,
+        timeout=timeout,
+        check=False,
+    )
+
+
+def _with_temp_file(source: bytes, fn: Callable[[str], Any], suffix: str = ".mp4") -> Any:
+    """Last-resort fallback for byte inputs ffmpeg can't demux from a pipe."""
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(source)
+        return fn(path)
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+# ─────────────────────────────────────────────────────────────
+# Probe
+# ─────────────────────────────────────────────────────────────
+def _parse_probe(raw: Dict[str, Any]) -> Dict[str, Any]:
+    streams = raw.get("streams") or []
+    fmt = raw.get("format") or {}
+    video = next((s for s in streams if s.get("codec_type") == "video"), {}) or {}
+    has_audio = any(s.get("codec_type") == "audio" for s in streams)
+
+    def _float(value) -> Optional[float]:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+
+    fps = None
+    rate = video.get("avg_frame_rate") or video.get("r_frame_rate")
+    if rate and "/" in rate:
+        num, den = rate.split("/", 1)
+        if _float(den):
+            fps = round(_float(num) / _float(den), 3) if _float(num) is not None else None
+
+    width = video.get("width")
+    height = video.get("height")
+    return {
+        "duration_seconds": _float(fmt.get("duration")) or _float(video.get("duration")),
+        "width": width,
+        "height": height,
+        "resolution": f"{width}x{height}" if width and height else None,
+        "video_codec": video.get("codec_name"),
+        "fps": fps,
+        "has_audio": has_audio,
+        "format_name": fmt.get("format_name"),
+        "bit_rate": int(fmt["bit_rate"]) if str(fmt.get("bit_rate") or "").isdigit() else None,
+        "size_bytes": int(fmt["size"]) if str(fmt.get("size") or "").isdigit() else None,
+    }
+
+
+def probe_media(source: MediaSource, timeout: int | None = None) -> Optional[Dict[str, Any]]:
+    """ffprobe a byte buffer, local path or URL. Returns parsed metadata or None."""
+    probe = ffprobe_bin()
+    if not probe:
+        print("[FFMPEG] ffprobe not found - install ffmpeg for video metadata")
+        return None
+
+    def _probe(src: MediaSource) -> Optional[Dict[str, Any]]:
+        cmd = [
+            probe, "-v", "error",
+            "-print_format", "json",
+            "-show_format", "-show_streams",
+            *_input_args(src),
+        ]
+        result = _run(cmd, src, timeout or PROBE_TIMEOUT_SECONDS)
+        if result.returncode != 0 or not result.stdout:
+            return None
+        return _parse_probe(json.loads(result.stdout.decode("utf-8", errors="ignore") or "{}"))
+
+    try:
+        parsed = _probe(source)
+        if parsed is None and isinstance(source, (bytes, bytearray)):
+            parsed = _with_temp_file(bytes(source), _probe)
+        return parsed
+    except subprocess.TimeoutExpired:
+        print("[FFMPEG] ffprobe timed out")
+    except Exception as e:
+        print(f"[FFMPEG] ffprobe error: {e}")
+    return None
+
+
+def pick_poster_timestamp(probe: Optional[Dict[str, Any]], preferred: float = 1.0) -> float:
+    """Clamp the preferred poster time into the clip so short videos still get a frame."""
+    duration = (probe or {}).get("duration_seconds")
+    if not duration or duration <= 0:
+        return max(0.0, preferred)
+    if preferred < duration - 0.1:
+        return max(0.0, preferred)
+    return max(0.0, round(duration / 2.0, 3))
+
+
+# ─────────────────────────────────────────────────────────────
+# Poster frame
+# ─────────────────────────────────────────────────────────────
+def extract_frame(
+    source: MediaSource,
+    timestamp_sec: float = 1.0,
+    max_width: int = 640,
+    timeout: int | None = None,
+) -> Optional[bytes]:
+    """Grab one JPEG frame at timestamp_sec, streamed in and out over pipes."""
+    ffmpeg = ffmpeg_bin()
+    if not ffmpeg:
+        print("[Thumbnail] ffmpeg not found - install ffmpeg for video thumbnails")
+        return None
+
+    def _extract(src: MediaSource) -> Optional[bytes]:
+        stdin_flags = [] if isinstance(src, (bytes, bytearray)) else ["-nostdin"]
+        cmd = [
+            ffmpeg, "-hide_banner", *stdin_flags,
+            "-loglevel", "error",
+            # -ss before -i: input-side seek (Range requests for URLs)
+            "-ss", str(timestamp_sec),
+            *_input_args(src),
+            "-frames:v", "1",
+            "-q:v", "2",
+            "-vf", f"scale='min({int(max_width)},iw)':'-2'",
+            "-f", "image2pipe",
+            "-c:v", "mjpeg",
+            "pipe:1",
+        ]
+        result = _run(cmd, src, timeout or FRAME_TIMEOUT_SECONDS)
+        if result.returncode != 0 or not result.stdout:
+            err = result.stderr.decode("utf-8", errors="ignore")[:200]
+            if err:
+                print(f"[Thumbnail] ffmpeg failed: {err}")
+            return None
+        return result.stdout
+
+    try:
+        frame = _extract(source)
+        if frame is None and isinstance(source, (bytes, bytearray)):
+            # moov-at-end MP4s need a seekable input
+            frame = _with_temp_file(bytes(source), _extract)
+        if frame:
+            print(f"[Thumbnail] Extracted {len(frame)} bytes at {timestamp_sec}s")
+        return frame
+    except subprocess.TimeoutExpired:
+        print("[Thumbnail] ffmpeg timed out")
+    except Exception as e:
+        print(f"[Thumbnail] Error: {e}")
+    return None
+
+
+def inspect_video(
+    source: MediaSource,
+    timestamp_sec: float = 1.0,
+    max_width: int = 640,
+) -> Dict[str, Any]:
+    """
+    Probe once, then pull the poster frame at a timestamp chosen from that probe.
+
+    Returns {"probe": dict | None, "poster": bytes | None, "poster_timestamp": float}.
+    """
+    probe = probe_media(source)
+    ts = pick_poster_timestamp(probe, timestamp_sec)
+    poster = extract_frame(source, ts, max_width=max_width)
+    if poster is None and ts > 0:
+        poster = extract_frame(source, 0.0, max_width=max_width)
+        ts = 0.0
+    return {"probe": probe, "poster": poster, "poster_timestamp": ts}
+
+
+# ─────────────────────────────────────────────────────────────
+# Queued conversions
+# ─────────────────────────────────────────────────────────────
+class ConversionQueueFull(RuntimeError):
+    """Raised when VIDEO_CONVERT_MAX_QUEUED jobs are already waiting."""
+
+
+class _ConversionJob:
+    __slots__ = (
+        "job_id", "owner_id", "input_path", "output_path", "work_dir", "ffmpeg_args",
+        "status", "progress", "error", "duration_seconds", "created_at", "started_at",
+        "finished_at", "done", "meta", "s3_key", "process", "cancelled", "saved_progress",
+        "is_async",
+    )
+
+    def __init__(self, owner_id: str, input_path: str, output_path: str, work_dir: str,
+                 ffmpeg_args: List[str], meta: Optional[Dict[str, Any]] = None,
+                 is_async: bool = False):
+        self.job_id = uuid.uuid4().hex
+        self.owner_id = owner_id
+        self.input_path = input_path
+        self.output_path = output_path
+        self.work_dir = work_dir
+        self.ffmpeg_args = ffmpeg_args
+        self.status = "queued"
+        self.progress = 0
+        self.error: Optional[str] = None
+        self.duration_seconds: Optional[float] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = threading.Event()
+        self.meta = meta or {}
+        self.s3_key: Optional[str] = None
+        self.process: Optional[subprocess.Popen] = None
+        self.cancelled = False
+        self.saved_progress = 0
+        self.is_async = is_async
+
+    def to_dict(self) -> Dict[str, Any]:
+        queued_for = (self.started_at or time.time()) - self.created_at
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "progress": self.progress,
+            "error": self.error,
+            "duration_seconds": self.duration_seconds,
+            "queued_seconds": round(queued_for, 2),
+            "elapsed_seconds": round((self.finished_at or time.time()) - self.started_at, 2)
+            if self.started_at else None,
+            **self.meta,
+        }
+
+
+class ConversionQueue:
+    """
+    Bounded ffmpeg conversion queue (per process).
+
+    At most CONVERT_MAX_PARALLEL ffmpeg processes run at once; up to
+    CONVERT_MAX_QUEUED more wait in FIFO order. Finished jobs keep their output
+    for CONVERT_RESULT_TTL_SECONDS so a client can download after polling.
+    State changes and the finished output of async jobs also go to
+    video_conversion_store, where another worker's poll finds them; a
+    synchronous job is answered by the worker that holds the request.
+    """
+
+    def __init__(self, max_parallel: int = CONVERT_MAX_PARALLEL, max_queued: int = CONVERT_MAX_QUEUED):
+        self._max_parallel = max_parallel
+        self._max_queued = max_queued
+        self._lock = threading.Lock()
+        self._pending: deque[_ConversionJob] = deque()
+        self._jobs: Dict[str, _ConversionJob] = {}
+        self._running = 0
+
+    # ── public API ──
+    def submit(self, owner_id: str, input_path: str, output_path: str, work_dir: str,
+               ffmpeg_args: List[str], meta: Optional[Dict[str, Any]] = None,
+               is_async: bool = False) -> _ConversionJob:
+        self._reap_expired()
+        job = _ConversionJob(owner_id, input_path, output_path, work_dir, ffmpeg_args, meta, is_async)
+        with self._lock:
+            if self._running >= self._max_parallel and len(self._pending) >= self._max_queued:
+                raise ConversionQueueFull("conversion queue is full")
+            self._jobs[job.job_id] = job
+            self._pending.append(job)
+            position = len(self._pending)
+        print(f"[VIDEO_CONVERT] queued job={job.job_id[:8]} owner={owner_id[:8]} position={position}")
+        self._persist(job)
+        self._pump()
+        return job
+
+    def get(self, job_id: str, owner_id: Optional[str] = None) -> Optional[_ConversionJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or (owner_id is not None and job.owner_id != owner_id):
+            return None
+        return job
+
+    def queue_position(self, job: _ConversionJob) -> Optional[int]:
+        with self._lock:
+            for idx, pending in enumerate(self._pending, start=1):
+                if pending is job:
+                    return idx
+        return None
+
+    def discard(self, job: _ConversionJob) -> None:
+        """
+        Forget a job and remove its files and shared state. A job that is
+        still waiting is dropped from the queue; a running one has ffmpeg
+        killed and is cleaned up by its worker thread.
+        """
+        from backend.services import video_conversion_store
+
+        with self._lock:
+            self._jobs.pop(job.job_id, None)
+            job.cancelled = True
+            try:
+                self._pending.remove(job)
+                running = False
+            except ValueError:
+                running = job.finished_at is None
+            process = job.process
+        if running:
+            if process is not None and process.poll() is None:
+                process.kill()
+            return
+        shutil.rmtree(job.work_dir, ignore_errors=True)
+        if job.is_async:
+            video_conversion_store.delete(job.job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self._running,
+                "queued": len(self._pending),
+                "retained": len(self._jobs),
+                "max_parallel": self._max_parallel,
+                "max_queued": self._max_queued,
+            }
+
+    # ── internals ──
+    def _pump(self) -> None:
+        while True:
+            with self._lock:
+                if self._running >= self._max_parallel or not self._pending:
+                    return
+                job = self._pending.popleft()
+                self._running += 1
+            threading.Thread(target=self._run_job, args=(job,), name=f"ffmpeg-{job.job_id[:8]}", daemon=True).start()
+
+    def _run_job(self, job: _ConversionJob) -> None:
+        from backend.services import video_conversion_store
+
+        job.status = "running"
+        job.started_at = time.time()
+        self._persist(job)
+        try:
+            probe = probe_media(job.input_path)
+            job.duration_seconds = (probe or {}).get("duration_seconds")
+            self._run_ffmpeg(job)
+            if job.status == "done" and job.is_async and not job.cancelled:
+                job.s3_key = video_conversion_store.publish(job)
+        except Exception as exc:
+            job.status = "failed"
+            job.error = job.error or str(exc)
+            print(f"[VIDEO_CONVERT] job={job.job_id[:8]} error={exc}")
+        finally:
+            job.finished_at = time.time()
+            try:
+                os.unlink(job.input_path)
+            except OSError:
+                pass
+            if job.cancelled:
+                shutil.rmtree(job.work_dir, ignore_errors=True)
+                if job.is_async:
+                    video_conversion_store.delete(job.job_id)
+            else:
+                self._persist(job)
+            job.done.set()
+            with self._lock:
+                self._running -= 1
+            self._pump()
+
+    def _persist(self, job: _ConversionJob) -> None:
+        from backend.services import video_conversion_store
+
+        if not job.is_async:
+            return
+        ttl = CONVERT_RESULT_TTL_SECONDS
+        if job.finished_at is None:
+            ttl += CONVERT_TIMEOUT_SECONDS * 2  # still has to wait and run
+        job.saved_progress = job.progress
+        video_conversion_store.save(job, ttl)
+
+    def _run_ffmpeg(self, job: _ConversionJob) -> None:
+        from backend.services.video_conversion_store import PROGRESS_STEP
+
+        ffmpeg = ffmpeg_bin()
+        if not ffmpeg:
+            raise RuntimeError("ffmpeg_not_available")
+        cmd = [
+            ffmpeg, "-hide_banner", "-nostdin", "-y", "-loglevel", "error",
+            "-progress", "pipe:1", "-nostats",
+            "-i", job.input_path,
+            *job.ffmpeg_args,
+            job.output_path,
+        ]
+        timed_out = threading.Event()
+        stderr_file = tempfile.TemporaryFile()
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file, stdin=subprocess.DEVNULL)
+        with self._lock:
+            job.process = proc
+            if job.cancelled:
+                proc.kill()
+
+        def _kill_on_timeout():
+            timed_out.set()
+            proc.kill()
+
+        timer = threading.Timer(CONVERT_TIMEOUT_SECONDS, _kill_on_timeout)
+        timer.daemon = True
+        timer.start()
+        try:
+            for raw_line in proc.stdout:
+                key, _, value = raw_line.decode("utf-8", errors="ignore").strip().partition("=")
+                if key == "out_time_us" and job.duration_seconds:
+                    try:
+                        pct = int(int(value) / 1_000_000 / job.duration_seconds * 100)
+                        job.progress = max(job.progress, min(99, pct))
+                    except ValueError:
+                        pass
+                    if job.progress - job.saved_progress >= PROGRESS_STEP:
+                        self._persist(job)
+                elif key == "progress" and value == "end":
+                    job.progress = 99
+            returncode = proc.wait()
+        finally:
+            timer.cancel()
+            if proc.poll() is None:
+                proc.kill()
+            job.process = None
+
+        if job.cancelled:
+            stderr_file.close()
+            job.status = "cancelled"
+            print(f"[VIDEO_CONVERT] job={job.job_id[:8]} cancelled")
+            return
+        if timed_out.is_set():
+            stderr_file.close()
+            job.status = "timeout"
+            job.error = "conversion_timeout"
+            print(f"[VIDEO_CONVERT] job={job.job_id[:8]} timed out after {CONVERT_TIMEOUT_SECONDS}s")
+            return
+        if returncode != 0 or not os.path.exists(job.output_path) or os.path.getsize(job.output_path) <= 0:
+            stderr_file.seek(0)
+            err = stderr_file.read().decode("utf-8", errors="ignore")[-1200:]
+            stderr_file.close()
+            job.status = "failed"
+            job.error = "conversion_failed"
+            print(f"[VIDEO_CONVERT] ffmpeg failed job={job.job_id[:8]} rc={returncode} err={err}")
+            return
+        stderr_file.close()
+        job.progress = 100
+        job.status = "done"
+        print(
+            f"[VIDEO_CONVERT] done job={job.job_id[:8]} out={os.path.getsize(job.output_path)} "
+            f"elapsed={time.time() - job.started_at:.1f}s"
+        )
+
+    def _reap_expired(self) -> None:
+        from backend.services import video_conversion_store
+
+        video_conversion_store.reap_expired()
+        cutoff = time.time() - CONVERT_RESULT_TTL_SECONDS
+        with self._lock:
+            expired = [
+                job for job in self._jobs.values()
+                if job.finished_at is not None and job.finished_at < cutoff
+            ]
+            for job in expired:
+                self._jobs.pop(job.job_id, None)
+        for job in expired:
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+
+
+conversion_queue = ConversionQueue()
@@ -19,22 +19,23 @@ from pathlib import Path
 from typing import Any, Tuple
 from urllib.parse import urlparse
 
-import boto3
 import requests
 
-from backend.config import APP_SCHEMA, AWS_ACCESS_KEY_ID, AWS_BUCKET_MODELS, AWS_REGION, AWS_SECRET_ACCESS_KEY
+from backend.config import APP_SCHEMA, AWS_BUCKET_MODELS
 from backend.db import USE_DB, get_conn, dict_row, Tables
+from backend.services import s3_content_index
+from backend.services.image_derivative_service import find_existing_thumbnail, schedule_image_derivatives
 from backend.services.meshy_service import _filter_model_urls
 from backend.services.s3_service import (
     build_hash_s3_key,
     delete_s3_objects_safe,
     ensure_s3_url_for_data_uri,
-    generate_image_thumbnail,
     get_s3_key_from_url,
     is_s3_url,
     safe_upload_to_s3,
     upload_bytes_to_s3,
     collect_s3_keys,
+    get_s3_client,
 )
 from backend.utils import (
     GENERIC_TITLES,
@@ -57,14 +58,6 @@ _GENERIC_TITLES_SQL = ", ".join(
 )
 
 
-# Dedicated S3 client for cleanup operations
-_s3 = boto3.client(
-    "s3",
-    region_name=AWS_REGION,
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-)
-
 # ─────────────────────────────────────────────────────────────
 # Local dev history store (only when DB is disabled)
 # ─────────────────────────────────────────────────────────────
@@ -630,41 +623,23 @@ def save_image_to_normalized_db(
                     image_urls = normalized_urls
                 image_s3_key = image_s3_key_from_upload or get_s3_key_from_url(image_url)
 
-                # ── Generate real thumbnail from in-memory bytes (no extra fetch) ──
-                # Falls back to full image URL if thumbnail generation fails.
+                # ── Thumbnail: reuse content-hash derivatives, else render off-path ──
+                # Derivative keys are deterministic per source hash, so one HEAD
+                # tells us whether a previous save already produced them. When it
+                # didn't, the row starts with the full image as its thumbnail and
+                # image_derivative_service fills in sized JPEG/WebP/AVIF variants
+                # after commit.
                 thumbnail_url = image_url
                 thumbnail_s3_key = get_s3_key_from_url(image_url)
-                if image_bytes and artifact_format != "svg":
-                    try:
-                        thumb_bytes = generate_image_thumbnail(
-                            image_bytes,
-                            max_size=400,
-                            quality=80,
-                            output_format="JPEG",
-                        )
-                        if thumb_bytes:
-                            thumb_hash = compute_sha256(thumb_bytes)
-                            thumb_s3_key = build_hash_s3_key("thumbnails", provider, thumb_hash, "image/jpeg")
-                            thumb_result = upload_bytes_to_s3(
-                                thumb_bytes,
-                                content_type="image/jpeg",
-                                prefix="thumbnails",
-                                key=thumb_s3_key,
-                                return_hash=True,
-                            )
-                            thumb_url_result, _, thumb_key_result, thumb_reused = unpack_upload_result(thumb_result)
-                            if thumb_url_result and is_s3_url(thumb_url_result):
-                                thumbnail_url = thumb_url_result
-                                thumbnail_s3_key = get_s3_key_from_url(thumb_url_result)
-                                if thumb_reused is False and thumb_key_result:
-                                    _newly_created_s3_keys.append(thumb_key_result)
-                                print(f"[THUMBNAIL] Saved image thumbnail: {thumbnail_s3_key}")
-                            else:
-                                print(f"[THUMBNAIL] Upload returned non-S3 URL, using full image as fallback")
-                        else:
-                            print(f"[THUMBNAIL] Generation returned None, using full image as fallback")
-                    except Exception as e:
-                        print(f"[THUMBNAIL] Failed for image {image_id}, using full image as fallback: {e}")
+                schedule_derivatives = False
+                if image_bytes and image_content_hash and artifact_format != "svg":
+                    existing_thumb = find_existing_thumbnail(provider, image_content_hash)
+                    if existing_thumb:
+                        thumbnail_url = existing_thumb["url"]
+                        thumbnail_s3_key = existing_thumb["key"]
+                        print(f"[THUMBNAIL] Reusing image thumbnail: {thumbnail_s3_key}")
+                    else:
+                        schedule_derivatives = True
 
                 width, height = 1024, 1024
                 if size and "x" in size:
@@ -1053,6 +1028,8 @@ def save_image_to_normalized_db(
                     )
             conn.commit()
         # print(f"[DB] Saved image {image_id} -> {history_uuid} to normalized tables (user_id={user_id})")
+        if schedule_derivatives:
+            schedule_image_derivatives(returned_image_id, image_bytes, provider, image_content_hash)
         # Invalidate history cache so the new image appears immediately
         try:
             from backend.routes.history import invalidate_history_cache
@@ -3142,6 +3119,14 @@ def save_finished_job_to_normalized_db(job_id: str, status_data: dict, job_meta:
             invalidate_history_cache(user_id)
         except Exception:
             pass
+        # Precompute print geometry (mesh_feature_store) for the stored GLB
+        # so print-check, repair and quotes never have to parse it first.
+        if db_save_ok and model_id and model_content_hash and primary_content_type.startswith("model/gltf"):
+            try:
+                from backend.services import mesh_feature_store
+                mesh_feature_store.schedule(model_content_hash, url=final_glb_url)
+            except Exception as feat_err:
+                print(f"[MESH_FEATURES] schedule failed for job {job_id}: {feat_err}")
         return result
     except Exception as e:
         print(f"[DB] Failed to save finished job {job_id}: {e}")
@@ -3162,12 +3147,13 @@ def save_finished_job_to_normalized_db(job_id: str, status_data: dict, job_meta:
 def delete_s3_objects(keys: list[str]) -> int:
     if not keys or not AWS_BUCKET_MODELS:
         return 0
+    s3_content_index.forget(keys)
     deleted = 0
     for i in range(0, len(keys), 1000):
         chunk = [{"Key": key} for key in keys[i : i + 1000] if key]
         if not chunk:
             continue
-        resp = _s3.delete_objects(Bucket=AWS_BUCKET_MODELS, Delete={"Objects": chunk, "Quiet": True})
+        resp = get_s3_client().delete_objects(Bucket=AWS_BUCKET_MODELS, Delete={"Objects": chunk, "Quiet": True})
         deleted += len(resp.get("Deleted", []) or [])
         errs = resp.get("Errors") or []
         if errs:
@@ -0,0 +1,473 @@
+"""
+Image derivative pipeline.
+
+Turns one source image into every thumbnail size/format the frontend uses,
+in a single decode and off the request/finalize path:
+
+- JPEG sources are opened with ``Image.draft()`` so libjpeg decodes at 1/2,
+  1/4 or 1/8 scale in the DCT domain, and every resize uses
+  ``reducing_gap`` so Pillow does a cheap integer ``reduce()`` before the
+  final LANCZOS pass. Smaller sizes cascade from the previous one.
+- CPU work runs on a bounded, lazily created process pool (spawn context),
+  so a burst of image finalizes cannot pin Gunicorn threads on Pillow.
+- Outputs are stored under content-hash keys derived from the *source*
+  bytes: ``thumbnails/derivatives/{provider}/{source_sha256}/{size}{ext}``
+  (provider scoping mirrors build_hash_s3_key and the per-provider image
+  dedup, which keeps uq_images_thumb_s3_key satisfied). The same source always
+  maps to the same keys, so finalize can check for an existing thumbnail with
+  one HEAD and re-runs never duplicate objects.
+
+Callers:
+- history_service.save_image_to_normalized_db  -> schedule_image_derivatives()
+- scripts/backfill_image_thumbnails.py         -> store_image_derivatives(),
+                                                  apply_image_derivatives()
+- scripts/backfill_video_thumbnails.py         -> store_image_derivatives()
+
+S3/DB helpers are imported lazily so pool children only load Pillow.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def _env_int(name: str, default: int, minimum: int | None = None) -> int:
+    raw = os.getenv(name)
+    if raw is None or str(raw).strip() == "":
+        return default
+    try:
+        value = int(str(raw).strip())
+    except (TypeError, ValueError):
+        print(f"[DERIVATIVES] Invalid {name}={raw!r}; using default {default}")
+        return default
+    if minimum is not None and value < minimum:
+        return minimum
+    return value
+
+
+def _env_list(name: str, default: str) -> List[str]:
+    raw = os.getenv(name, default) or default
+    return [item.strip() for item in raw.split(",") if item.strip()]
+
+
+# The 400px JPEG is the canonical ``thumbnail_url`` every client already uses.
+PRIMARY_THUMBNAIL_SIZE = 400
+PRIMARY_THUMBNAIL_FORMAT = "JPEG"
+
+# format -> (content_type, extension)
+_FORMAT_INFO = {
+    "JPEG": ("image/jpeg", ".jpg"),
+    "WEBP": ("image/webp", ".webp"),
+    "AVIF": ("image/avif", ".avif"),
+}
+
+DERIVATIVE_SIZES = sorted(
+    {PRIMARY_THUMBNAIL_SIZE}
+    | {int(s) for s in _env_list("IMAGE_DERIVATIVE_SIZES", "200,400,800") if s.isdigit() and int(s) > 0},
+    reverse=True,
+)
+DERIVATIVE_FORMATS = list(dict.fromkeys(
+    [PRIMARY_THUMBNAIL_FORMAT]
+    + [f.upper() for f in _env_list("IMAGE_DERIVATIVE_FORMATS", "jpeg,webp,avif") if f.upper() in _FORMAT_INFO]
+))
+DERIVATIVE_QUALITY = _env_int("IMAGE_DERIVATIVE_QUALITY", 80, minimum=1)
+DERIVATIVE_WORKERS = _env_int("IMAGE_DERIVATIVE_WORKERS", 2, minimum=1)
+DERIVATIVE_MAX_PENDING = _env_int("IMAGE_DERIVATIVE_MAX_PENDING", 32, minimum=1)
+DERIVATIVE_TIMEOUT_SECONDS = _env_int("IMAGE_DERIVATIVE_TIMEOUT_SECONDS", 60, minimum=5)
+USE_PROCESS_POOL = os.getenv("IMAGE_DERIVATIVE_PROCESS_POOL", "true").lower() not in ("0", "false", "no")
+
+
+# ─────────────────────────────────────────────────────────────
+# Rendering (pure: bytes in, bytes out — safe to run in a pool child)
+# ─────────────────────────────────────────────────────────────
+def supported_formats(formats: Iterable[str] | None = None) -> List[str]:
+    """Return the requested formats this Pillow build can actually encode."""
+    from PIL import Image
+
+    try:
+        import pillow_avif  # noqa: F401  — optional AVIF encoder for older Pillow builds
+    except ImportError:
+        pass
+    Image.init()
+    wanted = [f.upper() for f in (formats or DERIVATIVE_FORMATS)]
+    return [f for f in wanted if f in _FORMAT_INFO and f in Image.SAVE]
+
+
+def _fit_within(size: tuple[int, int], max_size: int) -> tuple[int, int]:
+    width, height = size
+    if max(width, height) <= max_size:
+        return width, height
+    scale = max_size / float(max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _encode(img, fmt: str, quality: int) -> bytes:
+    buf = io.BytesIO()
+    if fmt == "JPEG":
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img.save(buf, format="JPEG", quality=quality, optimize=True, progressive=True)
+    elif fmt == "WEBP":
+        img.save(buf, format="WEBP", quality=quality, method=4)
+    elif fmt == "AVIF":
+        img.save(buf, format="AVIF", quality=quality, speed=8)
+    else:
+        raise ValueError(f"Unsupported derivative format: {fmt}")
+    return buf.getvalue()
+
+
+def render_derivatives(
+    image_bytes: bytes,
+    sizes: Iterable[int] | None = None,
+    formats: Iterable[str] | None = None,
+    quality: int | None = None,
+) -> Dict[str, Any]:
+    """
+    Decode ``image_bytes`` once and encode every (size, format) derivative.
+
+    Sizes are the longest side in pixels; images are never upscaled.
+
+    Returns:
+        {
+            "source_width": int, "source_height": int, "source_format": str,
+            "items": [{"size", "width", "height", "format", "content_type", "ext", "data"}, ...],
+        }
+    """
+    from PIL import Image
+
+    wanted_sizes = sorted({int(s) for s in (sizes or DERIVATIVE_SIZES) if int(s) > 0}, reverse=True)
+    wanted_formats = supported_formats(formats)
+    quality = int(quality or DERIVATIVE_QUALITY)
+    if not wanted_sizes or not wanted_formats:
+        raise ValueError("No derivative sizes/formats to render")
+
+    img = Image.open(io.BytesIO(image_bytes))
+    source_width, source_height = img.size
+    source_format = img.format or ""
+
+    if source_format == "JPEG":
+        # DCT-domain downscale while decoding. draft() never drops below the
+        # requested box, so the largest derivative keeps full detail.
+        img.draft("RGB", (wanted_sizes[0], wanted_sizes[0]))
+    img.load()
+
+    has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+    working_mode = "RGBA" if has_alpha else "RGB"
+    if img.mode != working_mode:
+        img = img.convert(working_mode)
+
+    items: List[Dict[str, Any]] = []
+    current = img
+    for size in wanted_sizes:
+        target = _fit_within(current.size, size)
+        if target != current.size:
+            # reducing_gap: integer box reduce() first, LANCZOS only for the
+            # last <2x step — same quality, a fraction of the filter cost.
+            current = current.resize(target, Image.LANCZOS, reducing_gap=2.0)
+        for fmt in wanted_formats:
+            content_type, ext = _FORMAT_INFO[fmt]
+            items.append({
+                "size": size,
+                "width": current.size[0],
+                "height": current.size[1],
+                "format": fmt,
+                "content_type": content_type,
+                "ext": ext,
+                "data": _encode(current, fmt, quality),
+            })
+
+    return {
+        "source_width": source_width,
+        "source_height": source_height,
+        "source_format": source_format,
+        "items": items,
+    }
+
+
+# ─────────────────────────────────────────────────────────────
+# Bounded process pool
+# ─────────────────────────────────────────────────────────────
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def _pool_child_init() -> None:
+    # Keep native libraries single-threaded inside each pool child; the pool
+    # size is the concurrency knob.
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+    os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+
+
+def _get_process_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool, _pool_pid
+    if not USE_PROCESS_POOL:
+        return None
+    with _pool_lock:
+        # A pool inherited across fork has dead workers — rebuild it.
+        if _pool is not None and _pool_pid != os.getpid():
+            _pool = None
+        if _pool is None:
+            import multiprocessing as mp
+
+            start_method = os.getenv("IMAGE_DERIVATIVE_MP_START_METHOD", "spawn")
+            try:
+                ctx = mp.get_context(start_method)
+            except ValueError:
+                ctx = mp.get_context("spawn")
+            try:
+                _pool = ProcessPoolExecutor(
+                    max_workers=DERIVATIVE_WORKERS,
+                    mp_context=ctx,
+                    initializer=_pool_child_init,
+                )
+                _pool_pid = os.getpid()
+            except Exception as exc:
+                print(f"[DERIVATIVES] Process pool unavailable, rendering in-process: {exc}")
+                return None
+        return _pool
+
+
+def _reset_process_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        try:
+            pool.shutdown(wait=False, cancel_futures=True)
+        except Exception:
+            pass
+
+
+def shutdown_pool() -> None:
+    """Stop the render pool (tests / clean shutdown)."""
+    _reset_process_pool()
+
+
+def render_derivatives_isolated(
+    image_bytes: bytes,
+    sizes: Iterable[int] | None = None,
+    formats: Iterable[str] | None = None,
+    quality: int | None = None,
+    timeout: float | None = None,
+) -> Dict[str, Any]:
+    """Run render_derivatives() on the process pool, falling back in-process."""
+    sizes = list(sizes) if sizes else None
+    formats = list(formats) if formats else None
+    pool = _get_process_pool()
+    if pool is not None:
+        try:
+            future = pool.submit(render_derivatives, image_bytes, sizes, formats, quality)
+            return future.result(timeout=timeout or DERIVATIVE_TIMEOUT_SECONDS)
+        except BrokenProcessPool as exc:
+            print(f"[DERIVATIVES] Render pool broke ({exc}); recreating and rendering in-process")
+            _reset_process_pool()
+    return render_derivatives(image_bytes, sizes, formats, quality)
+
+
+# ─────────────────────────────────────────────────────────────
+# Storage
+# ─────────────────────────────────────────────────────────────
+def build_derivative_s3_key(provider: str | None, source_hash: str, size: int, fmt: str) -> str:
+    """Content-addressed key: thumbnails/derivatives/{provider}/{source_hash}/{size}{ext}."""
+    _, ext = _FORMAT_INFO[fmt.upper()]
+    return f"thumbnails/derivatives/{provider or 'unknown'}/{source_hash}/{int(size)}{ext}"
+
+
+def primary_thumbnail_key(provider: str | None, source_hash: str) -> str:
+    return build_derivative_s3_key(provider, source_hash, PRIMARY_THUMBNAIL_SIZE, PRIMARY_THUMBNAIL_FORMAT)
+
+
+def find_existing_thumbnail(provider: str | None, source_hash: str) -> Optional[Dict[str, str]]:
+    """Return {"url", "key"} if the primary derivative already exists in S3."""
+    from backend.services.s3_service import build_s3_url, content_key_exists
+
+    if not source_hash:
+        return None
+    key = primary_thumbnail_key(provider, source_hash)
+    try:
+        if content_key_exists(key):
+            return {"url": build_s3_url(key), "key": key}
+    except Exception as exc:
+        print(f"[DERIVATIVES] Existence check failed for {key}: {exc}")
+    return None
+
+
+def store_image_derivatives(
+    image_bytes: bytes,
+    provider: str | None,
+    source_hash: str | None = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Render every derivative for ``image_bytes`` and upload them to S3.
+
+    Returns a manifest:
+        {
+            "source_hash": str,
+            "thumbnail_url": str, "thumbnail_s3_key": str,   # 400px JPEG
+            "variants": {"400": {"jpeg": key, "webp": key, ...}, ...},
+            "created_keys": [keys actually PUT this call],
+        }
+    or None if rendering failed.
+    """
+    from backend.services.s3_service import upload_artifact_bytes_to_s3
+    from backend.utils import compute_sha256, unpack_upload_result
+
+    if not image_bytes:
+        return None
+    source_hash = source_hash or compute_sha256(image_bytes)
+
+    try:
+        rendered = render_derivatives_isolated(image_bytes)
+    except Exception as exc:
+        print(f"[DERIVATIVES] Render failed source={source_hash[:12]}: {exc}")
+        return None
+
+    manifest: Dict[str, Any] = {
+        "source_hash": source_hash,
+        "source_width": rendered.get("source_width"),
+        "source_height": rendered.get("source_height"),
+        "thumbnail_url": None,
+        "thumbnail_s3_key": None,
+        "variants": {},
+        "created_keys": [],
+    }
+    for item in rendered["items"]:
+        key = build_derivative_s3_key(provider, source_hash, item["size"], item["format"])
+        url, _, s3_key, reused = unpack_upload_result(
+            upload_artifact_bytes_to_s3(item["data"], key, item["content_type"])
+        )
+        s3_key = s3_key or key
+        if reused is False:
+            manifest["created_keys"].append(s3_key)
+        manifest["variants"].setdefault(str(item["size"]), {})[item["format"].lower()] = s3_key
+        if item["size"] == PRIMARY_THUMBNAIL_SIZE and item["format"] == PRIMARY_THUMBNAIL_FORMAT:
+            manifest["thumbnail_url"] = url
+            manifest["thumbnail_s3_key"] = s3_key
+
+    print(
+        f"[DERIVATIVES] Stored {len(rendered['items'])} derivatives source={source_hash[:12]} "
+        f"new={len(manifest['created_keys'])}"
+    )
+    return manifest
+
+
+def derivatives_meta(manifest: Dict[str, Any]) -> Dict[str, Any]:
+    """The JSON blob persisted under meta->'derivatives'."""
+    return {
+        "source_hash": manifest.get("source_hash"),
+        "variants": manifest.get("variants") or {},
+    }
+
+
+def apply_image_derivatives(image_id: str, manifest: Dict[str, Any]) -> bool:
+    """Point an images row (and its history item) at freshly stored derivatives."""
+    import json
+
+    from backend.db import USE_DB, Tables, get_conn
+
+    if not USE_DB or not image_id or not manifest or not manifest.get("thumbnail_url"):
+        return False
+
+    thumb_url = manifest["thumbnail_url"]
+    identity_id = None
+    with get_conn("image_derivatives") as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                UPDATE {Tables.IMAGES}
+                SET thumbnail_url = %s,
+                    thumbnail_s3_key = %s,
+                    meta = COALESCE(meta, '{{}}'::jsonb) || jsonb_build_object('derivatives', %s::jsonb),
+                    updated_at = NOW()
+                WHERE id = %s
+                RETURNING identity_id
+                """,
+                (thumb_url, manifest.get("thumbnail_s3_key"), json.dumps(derivatives_meta(manifest)), image_id),
+            )
+            row = cur.fetchone()
+            if row:
+                identity_id = row["identity_id"]
+            cur.execute(
+                f"""
+                UPDATE {Tables.HISTORY_ITEMS}
+                SET thumbnail_url = %s,
+                    payload = CASE
+                        WHEN payload IS NULL THEN payload
+                        ELSE jsonb_set(payload, '{{thumbnail_url}}', to_jsonb(%s::text))
+                    END,
+                    updated_at = NOW()
+                WHERE image_id = %s
+                """,
+                (thumb_url, thumb_url, image_id),
+            )
+        conn.commit()
+
+    if identity_id:
+        try:
+            from backend.routes.history import invalidate_history_cache
+            invalidate_history_cache(str(identity_id))
+        except Exception:
+            pass
+    return row is not None
+
+
+# ─────────────────────────────────────────────────────────────
+# Background scheduling (finalize path)
+# ─────────────────────────────────────────────────────────────
+_dispatch_executor: Optional[ThreadPoolExecutor] = None
+_dispatch_lock = threading.Lock()
+_pending_slots = threading.BoundedSemaphore(DERIVATIVE_MAX_PENDING)
+
+
+def _get_dispatch_executor() -> ThreadPoolExecutor:
+    global _dispatch_executor
+    with _dispatch_lock:
+        if _dispatch_executor is None:
+            _dispatch_executor = ThreadPoolExecutor(
+                max_workers=DERIVATIVE_WORKERS,
+                thread_name_prefix="img-derivatives",
+            )
+        return _dispatch_executor
+
+
+def _derive_and_apply(image_id: str, image_bytes: bytes, provider: str | None, source_hash: str | None) -> None:
+    try:
+        manifest = store_image_derivatives(image_bytes, provider, source_hash=source_hash)
+        if manifest and apply_image_derivatives(image_id, manifest):
+            print(f"[DERIVATIVES] Applied to image={image_id} thumb={manifest['thumbnail_s3_key']}")
+    except Exception as exc:
+        print(f"[DERIVATIVES] Background derivative job failed image={image_id}: {exc}")
+
+
+def schedule_image_derivatives(
+    image_id: str,
+    image_bytes: bytes,
+    provider: str | None,
+    source_hash: str | None = None,
+) -> bool:
+    """
+    Queue derivative generation for an already-persisted image row.
+
+    Never blocks: when DERIVATIVE_MAX_PENDING jobs are already queued the
+    request is dropped (the row keeps its full-size fallback thumbnail and
+    scripts/backfill_image_thumbnails.py picks it up later).
+    """
+    if not image_id or not image_bytes:
+        return False
+    if not _pending_slots.acquire(blocking=False):
+        print(f"[DERIVATIVES] Queue full, deferring image={image_id} to backfill")
+        return False
+    try:
+        future = _get_dispatch_executor().submit(_derive_and_apply, str(image_id), image_bytes, provider, source_hash)
+    except Exception as exc:
+        _pending_slots.release()
+        print(f"[DERIVATIVES] Could not schedule image={image_id}: {exc}")
+        return False
+    future.add_done_callback(lambda _f: _pending_slots.release())
+    return True
@@ -25,8 +25,9 @@ import json
 import time
 from typing import Any, Dict, List, Optional
 
-from backend.db import USE_DB, get_conn, Tables
+from backend.db import USE_DB, background_work, get_conn, Tables
 from backend.config import AWS_BUCKET_MODELS
+from backend.services import admission_control
 from backend.services.video_errors import ErrorCategory
 
 
@@ -36,6 +37,7 @@ _RESCUE_STATUSES = ("failed", "provider_stalled", "stalled")
 # Providers supported for rescue (upstream status check)
 _RESCUE_PROVIDERS = ("seedance", "vertex")
 
+@background_work("rescue")
 def rescue_late_completed_jobs(
     hours: int = 72,
     dry_run: bool = False,
@@ -68,6 +70,7 @@ def rescue_late_completed_jobs(
         "finalizing_exhausted": 0,
         "skipped_orphan": 0,
         "skipped_max_rescue": 0,
+        "deferred": 0,
         "details": [],
     }
 
@@ -97,8 +100,12 @@ def rescue_late_completed_jobs(
             })
         return results
 
-    # Step 2: Process each candidate
-    for job in candidates:
+    # Step 2: Process each candidate (the rest wait for the next pass
+    # when admission control defers under pool pressure)
+    for index, job in enumerate(candidates):
+        if index and not admission_control.admit("rescue"):
+            results["deferred"] = len(candidates) - index
+            break
         job_id = str(job["id"])
         upstream_id = job.get("upstream_job_id")
         provider = job.get("provider", "seedance")
@@ -1074,5 +1081,5 @@ def _summary(results: Dict[str, Any]) -> str:
         f"upstream_failed={results['upstream_failed']} "
         f"finalizing_retried={results.get('finalizing_retried', 0)} "
         f"finalizing_exhausted={results.get('finalizing_exhausted', 0)} "
-        f"errors={results['errors']}"
+        f"errors={results['errors']} deferred={results.get('deferred', 0)}"
     )
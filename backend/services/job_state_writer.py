@@ -0,0 +1,228 @@
+"""
+Batched, prepared writes for high-frequency job state updates.
+
+The worker and the async-dispatch pollers issue many small single-row
+UPDATEs against jobs (heartbeats, progress, meta merges, claim release).
+This module keeps them cheap:
+
+- every statement is sent with ``prepare=True``, so the server parses and
+  plans each statement shape once per connection instead of on every call;
+- several statements for one flush go through psycopg pipeline mode on a
+  single connection, i.e. one network round trip and one commit;
+- progress updates from the async pollers are coalesced per job: only the
+  latest status plus the merged meta patch written within
+  JOB_PROGRESS_COALESCE_MS reaches the database, and all jobs that are due
+  are flushed together in one pipeline.
+
+Coalesced progress never overwrites a terminal or finalizing status, so a
+flush that lands after a job finished is a no-op.
+
+Config:
+    JOB_PROGRESS_COALESCE_MS  (default 2000)  progress write window; 0 writes
+                                              through immediately
+    JOB_WRITE_PREPARE         (default true)  use server-side prepared
+                                              statements (disable behind a
+                                              transaction-mode pgbouncer)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from backend.db import USE_DB, Tables, get_conn
+from backend.services.video_errors import TERMINAL_AND_FINALIZING
+
+
+def _env_int(name: str, default: int, minimum: int | None = None) -> int:
+    try:
+        value = int(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        value = default
+    if minimum is not None:
+        value = max(minimum, value)
+    return value
+
+
+COALESCE_MS = _env_int("JOB_PROGRESS_COALESCE_MS", 2000, 0)
+PREPARE = os.getenv("JOB_WRITE_PREPARE", "true").lower() in ("true", "1", "yes")
+
+Write = Tuple[str, Sequence[Any]]
+
+_PROTECTED_STATUSES = sorted(TERMINAL_AND_FINALIZING)
+
+_PROGRESS_SQL = f"""
+    UPDATE {Tables.JOBS}
+    SET status = %s,
+        meta = COALESCE(meta, '{{}}'::jsonb) || %s::jsonb,
+        updated_at = NOW()
+    WHERE id::text = %s
+      AND NOT (status = ANY(%s))
+"""
+
+_META_SQL = f"""
+    UPDATE {Tables.JOBS}
+    SET meta = COALESCE(meta, '{{}}'::jsonb) || %s::jsonb,
+        updated_at = NOW()
+    WHERE id::text = %s
+"""
+
+_lock = threading.Lock()
+_pending: Dict[str, Dict[str, Any]] = {}
+_flusher: Optional[threading.Thread] = None
+_stats = {
+    "progress_queued": 0,
+    "progress_written": 0,
+    "progress_coalesced": 0,
+    "flushes": 0,
+    "statements": 0,
+    "round_trips": 0,
+    "errors": 0,
+}
+
+
+def run_writes(writes: List[Write], source: str = "job_state_writer") -> int:
+    """Execute ``writes`` on one connection in one round trip and commit.
+
+    Uses pipeline mode when there is more than one statement. Returns the
+    number of statements sent; raises on failure (nothing is committed).
+    """
+    if not writes or not USE_DB:
+        return 0
+    with get_conn(source) as conn:
+        if len(writes) > 1 and hasattr(conn, "pipeline"):
+            with conn.pipeline(), conn.cursor() as cur:
+                for sql, params in writes:
+                    cur.execute(sql, params, prepare=PREPARE)
+        else:
+            with conn.cursor() as cur:
+                for sql, params in writes:
+                    cur.execute(sql, params, prepare=PREPARE)
+        conn.commit()
+    with _lock:
+        _stats["statements"] += len(writes)
+        _stats["round_trips"] += 1
+    return len(writes)
+
+
+def _progress_write(job_id: str, entry: Dict[str, Any]) -> Write:
+    return _PROGRESS_SQL, (
+        entry["status"], json.dumps(entry["meta"], default=str), job_id, _PROTECTED_STATUSES,
+    )
+
+
+def queue_progress(job_id: str, status: str, meta_patch: Optional[Dict[str, Any]] = None) -> None:
+    """Record the latest status/meta for a job; written within COALESCE_MS.
+
+    Successive calls for the same job before the flush merge their meta
+    patches (later keys win) and keep only the last status.
+    """
+    if not USE_DB or not job_id:
+        return
+    if COALESCE_MS <= 0:
+        try:
+            run_writes([_progress_write(job_id, {"status": status, "meta": dict(meta_patch or {})})])
+            with _lock:
+                _stats["progress_queued"] += 1
+                _stats["progress_written"] += 1
+        except Exception as e:
+            _record_error(f"progress write failed job={job_id}: {e}")
+        return
+
+    global _flusher
+    with _lock:
+        _stats["progress_queued"] += 1
+        entry = _pending.get(job_id)
+        if entry is None:
+            _pending[job_id] = {
+                "status": status,
+                "meta": dict(meta_patch or {}),
+                "due": time.monotonic() + COALESCE_MS / 1000.0,
+            }
+        else:
+            _stats["progress_coalesced"] += 1
+            entry["status"] = status
+            entry["meta"].update(meta_patch or {})
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_flush_loop, name="job-progress-flush", daemon=True)
+            _flusher.start()
+
+
+def write_meta(job_id: str, meta_patch: Dict[str, Any]) -> None:
+    """Merge ``meta_patch`` into jobs.meta now.
+
+    Any coalesced progress still pending for the job goes out first in the
+    same pipeline, so the two writes keep their call order.
+    """
+    if not USE_DB or not job_id or not meta_patch:
+        return
+    with _lock:
+        pending = _pending.pop(job_id, None)
+    writes: List[Write] = []
+    if pending is not None:
+        writes.append(_progress_write(job_id, pending))
+    writes.append((_META_SQL, (json.dumps(meta_patch, default=str), job_id)))
+    run_writes(writes)
+    if pending is not None:
+        with _lock:
+            _stats["progress_written"] += 1
+
+
+def flush_progress(job_id: Optional[str] = None, due_only: bool = False) -> int:
+    """Write pending progress (one job, or all / all due) in one pipeline."""
+    now = time.monotonic()
+    with _lock:
+        if job_id is not None:
+            batch = {job_id: _pending.pop(job_id)} if job_id in _pending else {}
+        else:
+            batch = {
+                jid: entry for jid, entry in _pending.items()
+                if not due_only or entry["due"] <= now
+            }
+            for jid in batch:
+                _pending.pop(jid, None)
+    if not batch:
+        return 0
+    try:
+        run_writes([_progress_write(jid, entry) for jid, entry in batch.items()])
+    except Exception as e:
+        _record_error(f"progress flush failed jobs={len(batch)}: {e}")
+        return 0
+    with _lock:
+        _stats["flushes"] += 1
+        _stats["progress_written"] += len(batch)
+    return len(batch)
+
+
+def _flush_loop() -> None:
+    """Flush due progress until nothing is pending, then exit."""
+    global _flusher
+    interval = max(COALESCE_MS / 4000.0, 0.05)
+    while True:
+        time.sleep(interval)
+        flush_progress(due_only=True)
+        with _lock:
+            if not _pending:
+                _flusher = None
+                return
+
+
+def _record_error(message: str) -> None:
+    with _lock:
+        _stats["errors"] += 1
+    print(f"[JOB_WRITE] {message}")
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        return {**_stats, "pending": len(_pending), "coalesce_ms": COALESCE_MS, "prepare": PREPARE}
+
+
+def reset() -> None:
+    with _lock:
+        _pending.clear()
+        for key in _stats:
+            _stats[key] = 0
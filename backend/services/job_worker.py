@@ -48,7 +48,9 @@ from typing import Any, Dict, Optional
 
 from backend.config import config
 from backend.db import USE_DB, get_conn, transaction, Tables
+from backend.services import job_state_writer
 from backend.services.video_errors import (
+    TERMINAL_AND_FINALIZING,
     TERMINAL_STATES as _SHARED_TERMINAL_STATES,
     TERMINAL_ERROR_CODES as _SHARED_TERMINAL_ERROR_CODES,
     get_failure_message,
@@ -213,6 +215,23 @@ def start_worker():
     print(f"[JOB] Worker thread launched: {WORKER_ID}")
 
 
+def reset_after_fork():
+    """Give a worker forked from a preloading master its own identity.
+
+    WORKER_ID and WORKER_INDEX are computed at import, i.e. once in the
+    master. The leader connection and thread handles belong to the master
+    and are dropped without closing.
+    """
+    global WORKER_ID, WORKER_INDEX, _worker_thread, _ops_thread, _leader_conn, _shutdown_registered
+    WORKER_ID = f"worker-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    WORKER_INDEX = os.getpid() % TOTAL_WORKERS if TOTAL_WORKERS > 1 else 0
+    _worker_thread = None
+    _ops_thread = None
+    _leader_conn = None
+    _shutdown_registered = False
+    _worker_stop.clear()
+
+
 def stop_worker():
     """Signal the worker to stop gracefully."""
     global _leader_conn
@@ -244,7 +263,7 @@ def _try_lock_once() -> bool:
         _leader_conn = None
 
     if _create_connection:
-        _leader_conn = _create_connection()
+        _leader_conn = _create_connection("worker_leader")
     else:
         import psycopg
         from psycopg.rows import dict_row
@@ -368,14 +387,7 @@ def _worker_loop():
                     f"provider={provider} stage={stage} upstream={upstream} attempt={attempt}"
                 )
 
-                try:
-                    _process_job(job)
-                except Exception as e:
-                    print(f"[JOB] ERROR processing job={job_id} provider={provider}: {e}")
-                    traceback.print_exc()
-                    _handle_job_error(job, str(e))
-                finally:
-                    _release_claim(job_id)
+                _run_claimed_job(job)
 
             except Exception as e:
                 if is_transient_db_error(e):
@@ -435,7 +447,7 @@ def _claim_next_job() -> Optional[Dict[str, Any]]:
                            attempt_count, claimed_by, heartbeat_at,
                            next_poll_at, last_provider_status,
                            result_url, thumbnail_url,
-                           created_at, updated_at
+                           created_at, updated_at, NOW() AS db_now
                     FROM {Tables.JOBS}
                     WHERE (
                         status IN ('dispatched', 'provider_pending', 'provider_processing', 'stalled')
@@ -462,9 +474,8 @@ def _claim_next_job() -> Optional[Dict[str, Any]]:
                 attempt = (row.get("attempt_count") or 0)
                 npa = row.get("next_poll_at")
 
-                # Diagnostic: read server NOW() to compare with next_poll_at
-                cur.execute("SELECT NOW() AS db_now")
-                db_now = cur.fetchone()["db_now"]
+                # Server NOW() comes back with the row (no extra round trip).
+                db_now = row.pop("db_now")
 
                 print(
                     f"[JOB][DEBUG] _claim_next_job FOUND job={row['id']} "
@@ -506,25 +517,108 @@ def _claim_next_job() -> Optional[Dict[str, Any]]:
         return None
 
 
+# ── Claim-cycle write buffer ────────────────────────────────
+# Within one claim cycle (claim -> one provider poll -> release) the poll
+# state update is held back and written together with the claim release as
+# ONE prepared UPDATE, and the heartbeat is skipped while the claim's own
+# heartbeat_at is still fresh.  Post-claim DB round trips per poll cycle go
+# from three (heartbeat, state, release) to one.
+
+_cycle = threading.local()
+
+_RELEASE_SQL = f"""
+    UPDATE {Tables.JOBS}
+    SET claimed_by = NULL,
+        claimed_at = NULL,
+        updated_at = NOW()
+    WHERE id::text = %s
+      AND claimed_by = %s
+"""
+
+_HEARTBEAT_SQL = f"""
+    UPDATE {Tables.JOBS}
+    SET heartbeat_at = NOW(), updated_at = NOW()
+    WHERE id::text = %s AND claimed_by = %s
+"""
+
+# Poll state never overwrites a job another path already moved to a
+# terminal or finalizing status (same guard as job_state_writer._PROGRESS_SQL).
+_STATE_SQL = f"""
+    UPDATE {Tables.JOBS}
+    SET status = %s,
+        last_provider_status = %s,
+        progress = %s,
+        next_poll_at = NOW() + %s * INTERVAL '1 second',
+        heartbeat_at = NOW(),
+        meta = COALESCE(meta, '{{}}'::jsonb) || %s::jsonb,
+        updated_at = NOW()
+    WHERE id::text = %s
+      AND NOT (status = ANY(%s))
+"""
+
+_PROTECTED_STATUSES = sorted(TERMINAL_AND_FINALIZING)
+
+def _run_claimed_job(job: Dict[str, Any]) -> None:
+    """Process one claimed job, then release the claim."""
+    job_id = str(job["id"])
+    _begin_job_cycle(job_id)
+    try:
+        _process_job(job)
+    except Exception as e:
+        print(f"[JOB] ERROR processing job={job_id} provider={job.get('provider') or 'unknown'}: {e}")
+        traceback.print_exc()
+        # The buffered poll state predates the error; flushing it on release
+        # would undo the stall and its backoff next_poll_at.
+        _cycle.state = None
+        _handle_job_error(job, str(e))
+    finally:
+        _release_claim(job_id)
+
+
+def _begin_job_cycle(job_id: str) -> None:
+    _cycle.job_id = job_id
+    _cycle.claimed_at = time.monotonic()
+    _cycle.state = None
+
+
+def _cycle_for(job_id: str):
+    """The active claim cycle if it belongs to ``job_id``, else None."""
+    if getattr(_cycle, "job_id", None) == job_id:
+        return _cycle
+    return None
+
+
+def _state_params(job_id: str, state: Dict[str, Any]) -> tuple:
+    return (
+        state["status"], state["provider_status"], state["progress"],
+        state["next_poll_interval"], json.dumps(state["meta"], default=str), job_id,
+        _PROTECTED_STATUSES,
+    )
+
+
 def _release_claim(job_id: str):
-    """Release worker claim on a job (clear claimed_by)."""
+    """Release worker claim on a job (clear claimed_by), flushing any buffered poll state."""
     if not USE_DB:
         return
+    cycle = _cycle_for(job_id)
+    state = cycle.state if cycle is not None else None
+    if cycle is not None:
+        _cycle.job_id = None
+        _cycle.state = None
     try:
-        with get_conn("job_worker_release") as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    f"""
-                    UPDATE {Tables.JOBS}
-                    SET claimed_by = NULL,
-                        claimed_at = NULL,
-                        updated_at = NOW()
-                    WHERE id::text = %s
-                      AND claimed_by = %s
-                    """,
-                    (job_id, WORKER_ID),
-                )
-            conn.commit()
+        if state is not None:
+            # One round trip: the guarded state write may match nothing (the
+            # job was finalized meanwhile), the release still applies.
+            job_state_writer.run_writes(
+                [(_STATE_SQL, _state_params(job_id, state)), (_RELEASE_SQL, (job_id, WORKER_ID))],
+                source="job_worker_release",
+            )
+            print(
+                f"[JOB] state+release job={job_id} status={state['status']} "
+                f"progress={state['progress']} next_poll=+{state['next_poll_interval']}s"
+            )
+        else:
+            job_state_writer.run_writes([(_RELEASE_SQL, (job_id, WORKER_ID))], source="job_worker_release")
 
         # NOTE: Debug verification query removed to reduce pool pressure.
         # The release UPDATE above is sufficient — if it committed, the
@@ -556,21 +650,18 @@ def _release_claim(job_id: str):
 
 
 def _update_heartbeat(job_id: str):
-    """Update heartbeat timestamp to signal worker is alive."""
+    """Update heartbeat timestamp to signal worker is alive.
+
+    Skipped when this cycle claimed the job less than HEARTBEAT_INTERVAL
+    ago: the claim itself just set heartbeat_at.
+    """
     if not USE_DB:
         return
+    cycle = _cycle_for(job_id)
+    if cycle is not None and time.monotonic() - cycle.claimed_at < HEARTBEAT_INTERVAL:
+        return
     try:
-        with get_conn("job_worker_heartbeat") as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    f"""
-                    UPDATE {Tables.JOBS}
-                    SET heartbeat_at = NOW(), updated_at = NOW()
-                    WHERE id::text = %s AND claimed_by = %s
-                    """,
-                    (job_id, WORKER_ID),
-                )
-            conn.commit()
+        job_state_writer.run_writes([(_HEARTBEAT_SQL, (job_id, WORKER_ID))], source="job_worker_heartbeat")
     except Exception:
         pass  # Non-critical
 
@@ -2123,52 +2214,35 @@ def _update_job_state(
     next_poll_interval: int,
     extra_meta: Optional[Dict[str, Any]] = None,
 ):
-    """Update job with current polling state and schedule next poll."""
+    """Update job with current polling state and schedule next poll.
+
+    Inside the job's claim cycle the update is buffered (later calls win,
+    meta patches merge) and written by _release_claim in the same statement
+    that releases the claim.
+    """
     if not USE_DB:
         return
 
-    print(
-        f"[JOB][DEBUG] _update_job_state ENTER job={job_id} status={status} "
-        f"provider_status={provider_status} progress={progress} "
-        f"next_poll_interval={next_poll_interval}s extra_meta={extra_meta}"
-    )
+    meta_patch = {"progress": progress, "provider_status": provider_status}
+    if extra_meta:
+        meta_patch.update(extra_meta)
+    state = {
+        "status": status,
+        "provider_status": provider_status,
+        "progress": progress,
+        "next_poll_interval": next_poll_interval,
+        "meta": meta_patch,
+    }
 
-    try:
-        meta_patch = {"progress": progress, "provider_status": provider_status}
-        if extra_meta:
-            meta_patch.update(extra_meta)
+    cycle = _cycle_for(job_id)
+    if cycle is not None:
+        if cycle.state is not None:
+            state["meta"] = {**cycle.state["meta"], **meta_patch}
+        cycle.state = state
+        return
 
-        with get_conn() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    f"""
-                    UPDATE {Tables.JOBS}
-                    SET status = %s,
-                        last_provider_status = %s,
-                        progress = %s,
-                        next_poll_at = NOW() + %s * INTERVAL '1 second',
-                        heartbeat_at = NOW(),
-                        meta = COALESCE(meta, '{{}}'::jsonb) || %s::jsonb,
-                        updated_at = NOW()
-                    WHERE id::text = %s
-                    RETURNING next_poll_at, heartbeat_at
-                    """,
-                    (status, provider_status, progress, next_poll_interval,
-                     json.dumps(meta_patch, default=str), job_id),
-                )
-                row = cur.fetchone()
-                if row:
-                    print(
-                        f"[JOB][DEBUG] _update_job_state OK job={job_id} "
-                        f"next_poll_at={row['next_poll_at']} heartbeat_at={row['heartbeat_at']} rowcount={cur.rowcount}"
-                    )
-                else:
-                    print(
-                        f"[JOB][DEBUG] _update_job_state NO ROW MATCHED job={job_id} "
-                        f"(WHERE id::text = '{job_id}' matched 0 rows!)"
-                    )
-            conn.commit()
-            print(f"[JOB][DEBUG] _update_job_state COMMITTED job={job_id}")
+    try:
+        job_state_writer.run_writes([(_STATE_SQL, _state_params(job_id, state))], source="job_transition")
     except Exception as e:
         print(f"[JOB] state update error job={job_id}: {e}")
         import traceback as _tb
@@ -2673,6 +2747,20 @@ def start_operations_loop():
        → runs ONLY on the leader (heavier, DB-mutating)
     3. Rescue (every rescue interval) — recovers late-completed upstream jobs
        → runs ONLY on the leader (heaviest, multi-connection)
+    4. Analytics rollups (every ANALYTICS_ROLLUP_INTERVAL_S, every cycle
+       while backfilling) — refreshes admin analytics aggregates
+       → runs ONLY on the leader
+    5. Admin dashboard snapshots (every cycle; each section refreshes on
+       its own ADMIN_DASHBOARD_*_S cadence) → runs ONLY on the leader
+    6. Retention (every RETENTION_INTERVAL_S) — moves cold jobs and
+       notification deliveries into the archive tables
+       → runs ONLY on the leader
+    7. Auth rate-limit sweep (every AUTH_RATE_LIMIT_SWEEP_INTERVAL_S) —
+       deletes expired auth_rate_limits windows → runs ONLY on the leader
+
+    The thread runs inside db.background_work(), so its connections count
+    against DB_BACKGROUND_MAX_CONNS, and steps 3-7 are skipped for the
+    cycle when admission_control defers them under pool pressure.
 
     Config-driven via config.STALE_SWEEP_* and config.RESCUE_*.
     Replaces the old start_stall_detector().
@@ -2694,6 +2782,20 @@ def start_operations_loop():
     # How many sweep cycles per rescue cycle
     rescue_every_n = max(1, rescue_interval // sweep_interval)
 
+    from backend.services import analytics_rollup_service as _rollups
+    rollup_every_n = max(1, _rollups.INTERVAL_S // sweep_interval)
+
+    from backend.services import retention_service as _retention
+    retention_every_n = max(1, _retention.INTERVAL_S // sweep_interval)
+
+    from backend.services import auth_rate_limit_service as _auth_limits
+    auth_sweep_every_n = max(1, _auth_limits.SWEEP_INTERVAL_S // sweep_interval)
+
+    from backend.services import csv_export_service as _exports
+    export_sweep_every_n = max(1, _exports.SWEEP_INTERVAL_S // sweep_interval)
+
+    from backend.services import admission_control as _admission
+
     # Allow override: OPS_LEADER_ONLY=false to restore old behavior (all workers)
     leader_only = os.getenv("OPS_LEADER_ONLY", "true").lower() not in ("false", "0", "no")
     pid = os.getpid()
@@ -2703,6 +2805,7 @@ def start_operations_loop():
 
         cycle = 0
         consecutive_db_errors = 0
+        rollup_backfilling = True
 
         # ── STARTUP GATE ────────────────────────────────────────
         # Wait before touching the DB at all.  The pool needs time to
@@ -2775,7 +2878,8 @@ def start_operations_loop():
             if _worker_stop.is_set():
                 print(f"[OPS][pid={pid}] stop detected, exiting before rescue")
                 return
-            if rescue_enabled and cycle % rescue_every_n == 0 and (_am_leader or not leader_only):
+            if (rescue_enabled and cycle % rescue_every_n == 0 and (_am_leader or not leader_only)
+                    and _admission.admit("ops:rescue")):
                 try:
                     from backend.services.job_rescue import rescue_late_completed_jobs
                     result = rescue_late_completed_jobs(
@@ -2796,6 +2900,69 @@ def start_operations_loop():
                     else:
                         print(f"[OPS][pid={pid}] rescue pass error: {e}")
 
+            # -- Analytics rollups (leader only, every Nth cycle or while backfilling) --
+            if _worker_stop.is_set():
+                print(f"[OPS][pid={pid}] stop detected, exiting before rollups")
+                return
+            if ((rollup_backfilling or cycle % rollup_every_n == 0) and (_am_leader or not leader_only)
+                    and _admission.admit("ops:rollups")):
+                results = _rollups.refresh()
+                rollup_backfilling = any(r.get("backfill") for r in results)
+                for r in results:
+                    if r.get("transient"):
+                        _cycle_had_db_error = True
+                    elif r.get("backfill") and "refresh_ms" in r:
+                        print(f"[OPS][pid={pid}] rollup {r['rollup']} backfill step rows={r['rows']} "
+                              f"ready={r['ready']} ms={r['refresh_ms']}")
+
+            # -- Admin dashboard snapshots (leader only, sections due by cadence) --
+            if not _worker_stop.is_set() and (_am_leader or not leader_only) and _admission.admit("ops:snapshots"):
+                try:
+                    from backend.services.admin_dashboard_service import refresh_snapshots
+                    for r in refresh_snapshots():
+                        if r["error"]:
+                            print(f"[OPS][pid={pid}] dashboard section {r['section']} failed in {r['compute_ms']}ms")
+                except Exception as e:
+                    if is_transient_db_error(e):
+                        _cycle_had_db_error = True
+                        print(f"[OPS][pid={pid}][TRANSIENT] dashboard snapshots: {type(e).__name__}: {e}")
+                    else:
+                        print(f"[OPS][pid={pid}] dashboard snapshots error: {e}")
+
+            # -- Retention (leader only, every Nth cycle) --
+            if (not _worker_stop.is_set() and cycle % retention_every_n == 0 and (_am_leader or not leader_only)
+                    and _admission.admit("ops:retention")):
+                for r in _retention.run():
+                    if r.get("transient"):
+                        _cycle_had_db_error = True
+                    elif r.get("moved") or r.get("partitions_dropped"):
+                        print(f"[OPS][pid={pid}] retention {r['table']} moved={r['moved']} "
+                              f"batches={r['batches']} dropped={r['partitions_dropped']} ms={r['ms']}")
+
+            # -- Expired auth rate-limit windows (leader only, every Nth cycle) --
+            if (not _worker_stop.is_set() and cycle % auth_sweep_every_n == 0 and (_am_leader or not leader_only)
+                    and _admission.admit("ops:auth_rate_limits")):
+                try:
+                    swept = _auth_limits.sweep_expired()
+                    if swept:
+                        print(f"[OPS][pid={pid}] auth rate-limit sweep deleted={swept}")
+                except Exception as e:
+                    if is_transient_db_error(e):
+                        _cycle_had_db_error = True
+                        print(f"[OPS][pid={pid}][TRANSIENT] auth rate-limit sweep: {type(e).__name__}: {e}")
+                    else:
+                        print(f"[OPS][pid={pid}] auth rate-limit sweep error: {e}")
+
+            # -- Expired admin CSV exports in S3 (leader only, every Nth cycle) --
+            if (not _worker_stop.is_set() and cycle % export_sweep_every_n == 0
+                    and (_am_leader or not leader_only)):
+                try:
+                    deleted = _exports.sweep_expired()
+                    if deleted:
+                        print(f"[OPS][pid={pid}] csv export sweep deleted={deleted}")
+                except Exception as e:
+                    print(f"[OPS][pid={pid}] csv export sweep error: {e}")
+
             # -- Stuck non-video job termination (leader only, every 5th cycle) --
             if not _worker_stop.is_set() and cycle % 5 == 0 and (_am_leader or not leader_only):
                 try:
@@ -2817,8 +2984,13 @@ def start_operations_loop():
             else:
                 consecutive_db_errors = 0
 
+    def _run():
+        from backend.db import background_work
+        with background_work("ops"):
+            _loop()
+
     _ops_thread = threading.Thread(
-        target=_loop,
+        target=_run,
         name="job-ops-loop",
         daemon=True,
     )
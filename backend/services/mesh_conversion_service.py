@@ -0,0 +1,507 @@
+"""
+GLB → STL / 3MF conversion with a derived-artifact cache.
+
+Print-order archiving, STL/3MF downloads and STL repair all turn the same
+content-hashed source model into a printable file. The output depends only
+on the source bytes and a few options, so each result is written once to
+
+    models/derived/{source_hash}/{variant}{ext}
+
+and recorded in derived_artifact_store. A repeat request with the same
+source hash and options resolves to that key without downloading or
+converting anything; concurrent requests for the same artifact wait on one
+conversion instead of racing.
+
+Output is written straight from numpy in face chunks (binary STL) or as a
+streamed ZIP (3MF) into a spooled temp file, then multipart-uploaded, so the
+exported file never has to exist as one bytes object.
+
+Environment:
+    MESH_CONVERT_MAX_SOURCE_MB     default 100 (download cap for source models)
+    MESH_CONVERT_SPOOL_MB          default 16 (in-memory spool before disk)
+    MESH_CONVERT_CHUNK_FACES       default 65536
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import struct
+import tempfile
+import threading
+import zipfile
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+import requests
+
+from backend.services import derived_artifact_store, s3_service
+from backend.utils import compute_sha256
+
+# trimesh (and scipy under it) is most of the app's import time; it is
+# imported inside the functions that convert, not when the routes load.
+TRIMESH_OK = importlib.util.find_spec("trimesh") is not None
+if not TRIMESH_OK:
+    print("[MESH_CONVERT] trimesh not installed")
+
+
+def _env_int(name: str, default: int, minimum: int | None = None) -> int:
+    try:
+        value = int(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        value = default
+    if minimum is not None:
+        value = max(minimum, value)
+    return value
+
+
+MAX_SOURCE_BYTES = _env_int("MESH_CONVERT_MAX_SOURCE_MB", 100, minimum=1) * 1024 * 1024
+SPOOL_BYTES = _env_int("MESH_CONVERT_SPOOL_MB", 16, minimum=1) * 1024 * 1024
+CHUNK_FACES = _env_int("MESH_CONVERT_CHUNK_FACES", 65536, minimum=1024)
+
+# Bump when the writers change output bytes so old artifacts stop matching.
+WRITER_VERSION = 1
+
+UNIT_TO_MM = {"mm": 1.0, "cm": 10.0, "m": 1000.0, "in": 25.4}
+FORMAT_CONTENT_TYPES = {"stl": "model/stl", "3mf": "model/3mf"}
+
+DERIVED_PREFIX = "models/derived"
+
+
+@dataclass(frozen=True)
+class ConversionOptions:
+    """
+    Output options. Source coordinates are read in ``source_units`` and the
+    output is always millimetres (what slicers assume for STL and what the
+    3MF model declares). ``target_height_mm`` overrides units/scale by
+    scaling the longest axis to that height. ``repair`` marks artifacts
+    produced by the STL repair pipeline rather than a plain conversion.
+    """
+
+    fmt: str = "stl"
+    binary: bool = True
+    source_units: str = "mm"
+    scale: float = 1.0
+    target_height_mm: Optional[float] = None
+    repair: bool = False
+
+    def __post_init__(self):
+        # Normalise numbers so 10 and 10.0 produce the same variant id.
+        object.__setattr__(self, "scale", float(self.scale))
+        if self.target_height_mm is not None:
+            object.__setattr__(self, "target_height_mm", float(self.target_height_mm))
+        if self.fmt not in FORMAT_CONTENT_TYPES:
+            raise ValueError(f"format must be one of {sorted(FORMAT_CONTENT_TYPES)}")
+        if self.source_units not in UNIT_TO_MM:
+            raise ValueError(f"units must be one of {sorted(UNIT_TO_MM)}")
+        if not (0.001 <= self.scale <= 1000.0):
+            raise ValueError("scale must be between 0.001 and 1000")
+        if self.target_height_mm is not None and not (0.1 <= self.target_height_mm <= 10000.0):
+            raise ValueError("target_height_mm must be between 0.1 and 10000")
+
+    @classmethod
+    def from_params(cls, params, fmt: str = "stl") -> "ConversionOptions":
+        """Build options from request args / JSON (units, scale, target_height_mm, ascii)."""
+        raw_height = params.get("target_height_mm")
+        try:
+            scale = float(params.get("scale") or 1.0)
+            target_height = float(raw_height) if raw_height not in (None, "") else None
+        except (TypeError, ValueError):
+            raise ValueError("scale and target_height_mm must be numbers")
+        ascii_flag = str(params.get("ascii") or "").lower() in ("1", "true", "yes")
+        return cls(
+            fmt=fmt,
+            binary=not ascii_flag,
+            source_units=(params.get("units") or "mm").lower(),
+            scale=scale,
+            target_height_mm=target_height,
+        )
+
+    @property
+    def content_type(self) -> str:
+        return FORMAT_CONTENT_TYPES[self.fmt]
+
+    @property
+    def extension(self) -> str:
+        return f".{self.fmt}"
+
+    @property
+    def kind(self) -> str:
+        return f"{self.fmt}_repair" if self.repair else self.fmt
+
+    def variant(self) -> str:
+        """Stable id for these options: format prefix + digest of the canonical form."""
+        canonical = json.dumps(
+            {**asdict(self), "writer": WRITER_VERSION},
+            sort_keys=True,
+        )
+        return f"{self.kind}-{hashlib.sha256(canonical.encode()).hexdigest()[:16]}"
+
+
+def derived_s3_key(source_hash: str, options: ConversionOptions) -> str:
+    return f"{DERIVED_PREFIX}/{source_hash}/{options.variant()}{options.extension}"
+
+
+# ─────────────────────────────────────────────────────────────
+# Artifact lookup / storage
+# ─────────────────────────────────────────────────────────────
+# (source_hash, variant) -> [lock, holders]; holders counts the requests
+# that hold or wait on the lock, so the entry outlives every one of them.
+_inflight_guard = threading.Lock()
+_inflight: Dict[tuple, list] = {}
+
+
+def _artifact_result(source_hash: str, options: ConversionOptions, entry: Dict[str, Any], cached: bool) -> Dict[str, Any]:
+    return {
+        "ok": True,
+        "cached": cached,
+        "source_hash": source_hash,
+        "variant": options.variant(),
+        "s3_key": entry["s3_key"],
+        "url": s3_service.build_s3_url(entry["s3_key"]),
+        "content_type": entry.get("content_type") or options.content_type,
+        "size_bytes": entry.get("size_bytes"),
+        "content_hash": entry.get("content_hash"),
+        "meta": entry.get("meta") or {},
+    }
+
+
+def find_artifact(source_hash: str, options: ConversionOptions) -> Optional[Dict[str, Any]]:
+    """
+    Return the stored artifact for (source_hash, options), or None. A store
+    entry whose object is gone is dropped; an object at the deterministic key
+    with no store entry (DB tier off, or row lost) is adopted.
+    """
+    if not source_hash:
+        return None
+    variant = options.variant()
+    entry = derived_artifact_store.lookup(source_hash, variant)
+    try:
+        if entry:
+            if s3_service.content_key_exists(entry["s3_key"], entry.get("content_hash")):
+                return _artifact_result(source_hash, options, entry, cached=True)
+            derived_artifact_store.forget(source_hash, variant)
+        elif not options.repair:
+            key = derived_s3_key(source_hash, options)
+            if s3_service.content_key_exists(key):
+                derived_artifact_store.record(
+                    source_hash, variant, key, kind=options.kind,
+                    content_type=options.content_type, options=asdict(options),
+                )
+                return _artifact_result(source_hash, options, {"s3_key": key}, cached=True)
+    except Exception as e:
+        print(f"[MESH_CONVERT] artifact check failed for {source_hash}/{variant}: {e}")
+    return None
+
+
+def store_artifact(
+    source_hash: str,
+    options: ConversionOptions,
+    fileobj,
+    meta: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Upload a finished artifact from a file object and record it."""
+    fileobj.seek(0)
+    digest = hashlib.sha256()
+    size = 0
+    for block in iter(lambda: fileobj.read(1024 * 1024), b""):
+        digest.update(block)
+        size += len(block)
+    content_hash = digest.hexdigest()
+
+    key = derived_s3_key(source_hash, options)
+    s3_service.upload_fileobj_to_s3(fileobj, key, options.content_type, content_hash=content_hash, size_bytes=size)
+    derived_artifact_store.record(
+        source_hash,
+        options.variant(),
+        key,
+        kind=options.kind,
+        content_hash=content_hash,
+        content_type=options.content_type,
+        size_bytes=size,
+        options=asdict(options),
+        meta=meta,
+    )
+    entry = {
+        "s3_key": key,
+        "content_hash": content_hash,
+        "content_type": options.content_type,
+        "size_bytes": size,
+        "meta": meta or {},
+    }
+    return _artifact_result(source_hash, options, entry, cached=False)
+
+
+def store_artifact_bytes(
+    source_hash: str,
+    options: ConversionOptions,
+    data: bytes,
+    meta: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    return store_artifact(source_hash, options, io.BytesIO(data), meta=meta)
+
+
+def _inflight_lock(source_hash: str, variant: str) -> threading.Lock:
+    with _inflight_guard:
+        entry = _inflight.setdefault((source_hash, variant), [threading.Lock(), 0])
+        entry[1] += 1
+        return entry[0]
+
+
+def _release_inflight(source_hash: str, variant: str, lock: threading.Lock) -> None:
+    with _inflight_guard:
+        entry = _inflight.get((source_hash, variant))
+        if entry is None or entry[0] is not lock:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            _inflight.pop((source_hash, variant), None)
+
+
+# ─────────────────────────────────────────────────────────────
+# Mesh loading + writers
+# ─────────────────────────────────────────────────────────────
+def load_mesh(data: bytes, file_type: str = "glb"):
+    """
+    Load model bytes as one Trimesh. Scenes are flattened with their node
+    transforms applied, so the output matches what the viewer shows.
+    Returns None if there is no triangle geometry.
+    """
+    if not TRIMESH_OK:
+        return None
+    import trimesh
+
+    loaded = trimesh.load(io.BytesIO(data), file_type=file_type)
+    if isinstance(loaded, trimesh.Scene):
+        if not loaded.geometry:
+            return None
+        if hasattr(loaded, "to_mesh"):
+            mesh = loaded.to_mesh()
+        else:  # trimesh < 4.5
+            mesh = loaded.dump(concatenate=True)
+    else:
+        mesh = loaded
+    if mesh is None or not hasattr(mesh, "faces") or len(mesh.faces) == 0:
+        return None
+    return mesh
+
+
+def output_scale(mesh, options: ConversionOptions) -> float:
+    if options.target_height_mm:
+        longest = float(max(mesh.extents)) if len(mesh.vertices) else 0.0
+        if longest <= 1e-9:
+            return 1.0
+        return options.target_height_mm / longest
+    return UNIT_TO_MM[options.source_units] * options.scale
+
+
+_STL_RECORD = None
+
+
+def _stl_record_dtype():
+    global _STL_RECORD
+    if _STL_RECORD is None:
+        import numpy as np
+
+        _STL_RECORD = np.dtype([("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attr", "<u2")])
+    return _STL_RECORD
+
+
+def write_binary_stl(mesh, fh, factor: float = 1.0) -> None:
+    """Binary STL written in face chunks; peak extra memory is one chunk."""
+    faces = mesh.faces
+    normals = mesh.face_normals
+    vertices = mesh.vertices
+    import numpy as np
+
+    fh.write(b"TimrX binary STL".ljust(80, b" "))
+    fh.write(struct.pack("<I", len(faces)))
+    dtype = _stl_record_dtype()
+    for start in range(0, len(faces), CHUNK_FACES):
+        chunk = faces[start:start + CHUNK_FACES]
+        records = np.zeros(len(chunk), dtype=dtype)
+        records["normal"] = normals[start:start + CHUNK_FACES]
+        records["vertices"] = vertices[chunk] * factor
+        fh.write(records.tobytes())
+
+
+def write_ascii_stl(mesh, fh, factor: float = 1.0) -> None:
+    faces = mesh.faces
+    normals = mesh.face_normals
+    vertices = mesh.vertices
+    fh.write(b"solid timrx\n")
+    for start in range(0, len(faces), CHUNK_FACES):
+        chunk = faces[start:start + CHUNK_FACES]
+        tris = vertices[chunk] * factor
+        lines = []
+        for n, tri in zip(normals[start:start + CHUNK_FACES], tris):
+            lines.append(
+                f"facet normal {n[0]:.6e} {n[1]:.6e} {n[2]:.6e}\n outer loop\n"
+                f"  vertex {tri[0][0]:.6e} {tri[0][1]:.6e} {tri[0][2]:.6e}\n"
+                f"  vertex {tri[1][0]:.6e} {tri[1][1]:.6e} {tri[1][2]:.6e}\n"
+                f"  vertex {tri[2][0]:.6e} {tri[2][1]:.6e} {tri[2][2]:.6e}\n"
+                " endloop\nendfacet\n"
+            )
+        fh.write("".join(lines).encode("ascii"))
+    fh.write(b"endsolid timrx\n")
+
+
+_3MF_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>'
+    '</Types>'
+)
+_3MF_RELS = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Target="/3D/3dmodel.model" Id="rel0" '
+    'Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>'
+    '</Relationships>'
+)
+
+
+def write_3mf(mesh, fh, factor: float = 1.0) -> None:
+    """Minimal single-object 3MF (core spec), model XML streamed into the ZIP."""
+    vertices = mesh.vertices
+    faces = mesh.faces
+    with zipfile.ZipFile(fh, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _3MF_CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _3MF_RELS)
+        with zf.open("3D/3dmodel.model", "w", force_zip64=True) as model:
+            model.write(
+                b'<?xml version="1.0" encoding="UTF-8"?>\n'
+                b'<model unit="millimeter" xml:lang="en-US" '
+                b'xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">'
+                b'<resources><object id="1" type="model"><mesh><vertices>'
+            )
+            for start in range(0, len(vertices), CHUNK_FACES):
+                block = vertices[start:start + CHUNK_FACES] * factor
+                model.write("".join(
+                    f'<vertex x="{x:.6g}" y="{y:.6g}" z="{z:.6g}"/>' for x, y, z in block
+                ).encode("ascii"))
+            model.write(b"</vertices><triangles>")
+            for start in range(0, len(faces), CHUNK_FACES):
+                block = faces[start:start + CHUNK_FACES]
+                model.write("".join(
+                    f'<triangle v1="{a}" v2="{b}" v3="{c}"/>' for a, b, c in block
+                ).encode("ascii"))
+            model.write(
+                b"</triangles></mesh></object></resources>"
+                b'<build><item objectid="1"/></build></model>'
+            )
+
+
+def write_mesh(mesh, fh, options: ConversionOptions) -> float:
+    """Write ``mesh`` in the requested format; returns the applied scale factor."""
+    factor = output_scale(mesh, options)
+    if options.fmt == "3mf":
+        write_3mf(mesh, fh, factor)
+    elif options.binary:
+        write_binary_stl(mesh, fh, factor)
+    else:
+        write_ascii_stl(mesh, fh, factor)
+    return factor
+
+
+# ─────────────────────────────────────────────────────────────
+# Public entry point
+# ─────────────────────────────────────────────────────────────
+def _download_source(url: str) -> bytes:
+    fetch_url = s3_service.presign_s3_url(url) if s3_service.is_s3_url(url) else None
+    resp = requests.get(fetch_url or url, timeout=(5, 120), stream=True)
+    resp.raise_for_status()
+    if int(resp.headers.get("content-length") or 0) > MAX_SOURCE_BYTES:
+        raise ValueError(f"source model exceeds {MAX_SOURCE_BYTES // (1024 * 1024)} MB")
+    buf = io.BytesIO()
+    for chunk in resp.iter_content(chunk_size=1024 * 1024):
+        if not chunk:
+            continue
+        buf.write(chunk)
+        if buf.tell() > MAX_SOURCE_BYTES:
+            raise ValueError(f"source model exceeds {MAX_SOURCE_BYTES // (1024 * 1024)} MB")
+    return buf.getvalue()
+
+
+def convert_model(
+    source_bytes: Optional[bytes] = None,
+    *,
+    source_url: Optional[str] = None,
+    source_hash: Optional[str] = None,
+    options: Optional[ConversionOptions] = None,
+    file_type: str = "glb",
+) -> Dict[str, Any]:
+    """
+    Convert a model to STL/3MF, reusing a stored artifact when one exists.
+
+    Pass ``source_hash`` when the caller already knows it (models.content_hash)
+    so a cached artifact resolves without downloading the source. Returns the
+    artifact dict ({"ok", "cached", "s3_key", "url", "size_bytes", ...}) or
+    {"ok": False, "error": ...}.
+    """
+    options = options or ConversionOptions()
+    if source_hash:
+        found = find_artifact(source_hash, options)
+        if found:
+            return found
+
+    try:
+        if source_bytes is None:
+            if not source_url:
+                return {"ok": False, "error": "no source model"}
+            source_bytes = _download_source(source_url)
+    except Exception as e:
+        print(f"[MESH_CONVERT] source download failed: {e}")
+        return {"ok": False, "error": f"could not download source model: {e}"}
+
+    # Artifacts are keyed by the bytes actually converted, so a stale
+    # caller-supplied hash can never point at the wrong model.
+    actual_hash = compute_sha256(source_bytes)
+    if actual_hash != source_hash:
+        found = find_artifact(actual_hash, options)
+        if found:
+            return found
+    source_hash = actual_hash
+
+    if not TRIMESH_OK:
+        return {"ok": False, "error": "trimesh not available"}
+
+    variant = options.variant()
+    lock = _inflight_lock(source_hash, variant)
+    with lock:
+        # Another request may have finished this exact artifact while we waited.
+        found = find_artifact(source_hash, options)
+        if found:
+            result = found
+        else:
+            result = _convert_and_store(source_bytes, source_hash, options, file_type)
+    _release_inflight(source_hash, variant, lock)
+    return result
+
+
+def _convert_and_store(source_bytes: bytes, source_hash: str, options: ConversionOptions, file_type: str) -> Dict[str, Any]:
+    try:
+        mesh = load_mesh(source_bytes, file_type=file_type)
+        if mesh is None:
+            return {"ok": False, "error": "source has no triangle geometry"}
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as spool:
+            factor = write_mesh(mesh, spool, options)
+            meta = {
+                "faces": int(len(mesh.faces)),
+                "vertices": int(len(mesh.vertices)),
+                "scale_factor": round(factor, 6),
+            }
+            del mesh
+            result = store_artifact(source_hash, options, spool, meta=meta)
+        print(
+            f"[MESH_CONVERT] {source_hash[:12]} → {result['s3_key']} "
+            f"({result['size_bytes']} bytes, faces={meta['faces']})"
+        )
+        return result
+    except Exception as e:
+        print(f"[MESH_CONVERT] conversion failed for {source_hash[:12]} ({options.variant()}): {e}")
+        return {"ok": False, "error": f"conversion failed: {e}"}
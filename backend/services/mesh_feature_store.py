@@ -0,0 +1,622 @@
+"""
+Mesh feature store: model content hash → basic geometry.
+
+Print-check, STL repair, print-order pricing and archiving all need the same
+handful of numbers about a model, and each used to download and parse the
+file to get them (pricing simply trusted client-supplied dimensions). This
+module computes them once per content hash (models.content_hash, the SHA-256
+of the stored GLB) and keeps them in the same two tiers as
+derived_artifact_store:
+
+- an in-process LRU keyed by content hash, and
+- timrx_app.mesh_features (deploy_migrations/088), shared by all workers.
+
+Features are computed off the request path: schedule() queues the bytes (or
+a URL) on a small dispatch thread, which parses the mesh in a spawn-context
+process pool child with the print-analysis memory cap. The mesh is loaded
+the way mesh_conversion_service loads it for STL export (scene flattened
+with node transforms), so the bounding box matches the printed part.
+
+Readers never compute inline and never raise: get() returns None on a miss
+and the caller falls back to what it did before.
+
+Environment:
+    MESH_FEATURES_ENABLED           default true
+    MESH_FEATURES_LRU_SIZE          default 2000 entries
+    MESH_FEATURES_MAX_SOURCE_MB     default 50
+    MESH_FEATURES_MAX_PENDING       default 8 queued jobs
+    MESH_FEATURES_TIMEOUT_SECONDS   default 60
+    MESH_FEATURES_MEMORY_MB         default 1500 (0 = no cap)
+    MESH_FEATURES_STREAM_FACES      default 1000000; larger binary STL/GLB
+                                    files get streamed whole-model features
+                                    (mesh_stream_reader) instead of a full load
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+
+
+def _env_int(name: str, default: int, minimum: int | None = None) -> int:
+    raw = os.getenv(name)
+    if raw is None or str(raw).strip() == "":
+        return default
+    try:
+        value = int(str(raw).strip())
+    except (TypeError, ValueError):
+        print(f"[MESH_FEATURES] Invalid {name}={raw!r}; using default {default}")
+        return default
+    if minimum is not None and value < minimum:
+        return minimum
+    return value
+
+
+# Bump when compute_features() changes shape or meaning; older rows are misses.
+FEATURE_VERSION = 3
+
+ENABLED = os.getenv("MESH_FEATURES_ENABLED", "true").lower() not in ("0", "false", "no")
+LRU_SIZE = _env_int("MESH_FEATURES_LRU_SIZE", 2000, minimum=100)
+MAX_SOURCE_BYTES = _env_int("MESH_FEATURES_MAX_SOURCE_MB", 50, minimum=1) * 1024 * 1024
+MAX_PENDING = _env_int("MESH_FEATURES_MAX_PENDING", 8, minimum=1)
+TIMEOUT_SECONDS = _env_int("MESH_FEATURES_TIMEOUT_SECONDS", 60, minimum=5)
+MEMORY_MB = _env_int("MESH_FEATURES_MEMORY_MB", 1500, minimum=0)
+STREAM_FACES = _env_int("MESH_FEATURES_STREAM_FACES", 1000000, minimum=1000)
+
+# Build direction is +Y (glTF up), matching PrintAnalysisService.
+OVERHANG_THRESHOLDS_DEG = {"fdm": 45.0, "resin": 30.0}
+
+# Candidate build directions for the support estimate (print_estimate_service
+# prices any of them without reloading the mesh).
+ORIENTATIONS = {
+    "+y": (0.0, 1.0, 0.0),
+    "-y": (0.0, -1.0, 0.0),
+    "+z": (0.0, 0.0, 1.0),
+    "-z": (0.0, 0.0, -1.0),
+    "+x": (1.0, 0.0, 0.0),
+    "-x": (-1.0, 0.0, 0.0),
+}
+
+
+# ─────────────────────────────────────────────────────────────
+# Feature computation
+# ─────────────────────────────────────────────────────────────
+def detect_unit(max_extent: float) -> tuple[str, float]:
+    """
+    Guess the unit of raw mesh coordinates from the largest extent.
+    Returns (detected_unit, mm_multiplier). glTF is metres by spec, and
+    Meshy output is normalised to roughly -1..1.
+    """
+    if 0 < max_extent < 10:
+        return "meters", 1000.0
+    if 10 <= max_extent < 100:
+        return "mm_or_cm", 1.0  # Assume mm unless user says otherwise
+    return "mm", 1.0
+
+
+def overhang_mask(mesh, up=(0.0, 1.0, 0.0), threshold_deg: float = 45.0):
+    """
+    Faces that need support when printed with ``up`` as the build direction:
+    downward-facing faces steeper than ``threshold_deg`` from the vertical,
+    excluding faces resting on the build plate.
+    """
+    import numpy as np
+
+    up = np.asarray(up, dtype=float)
+    up = up / np.linalg.norm(up)
+    # cos(angle between the normal and straight down); a face overhangs when
+    # its normal is within (90 - threshold)° of straight down.
+    down = -(mesh.face_normals @ up)
+    heights = mesh.vertices @ up
+    tol = max(float(np.ptp(heights)) * 1e-4, 1e-9)
+    on_bed = (heights[mesh.faces] <= heights.min() + tol).all(axis=1)
+    return (down > np.sin(np.radians(threshold_deg))) & ~on_bed
+
+
+def overhang_stats(mesh, mm_multiplier: float) -> Dict[str, Dict[str, Any]]:
+    areas = mesh.area_faces
+    face_count = len(areas)
+    out = {}
+    for name, threshold in OVERHANG_THRESHOLDS_DEG.items():
+        mask = overhang_mask(mesh, threshold_deg=threshold)
+        count = int(mask.sum())
+        out[name] = {
+            "threshold_deg": threshold,
+            "faces": count,
+            "pct": round(count / face_count * 100, 1) if face_count else 0.0,
+            "area_cm2": round(float(areas[mask].sum()) * mm_multiplier ** 2 / 100.0, 2),
+        }
+    return out
+
+
+def _support_stats(mesh, mm_multiplier: float) -> Dict[str, Dict[str, Any]]:
+    """
+    Support estimate per orientation and process: each overhanging face
+    needs a column down to the bed, so support volume is the sum of
+    projected overhang area × centroid height. Faces above other parts of
+    the model are over-counted; print_estimate_service caps the result.
+    """
+    import numpy as np
+
+    areas = mesh.area_faces
+    centroids = mesh.triangles_center
+    out: Dict[str, Dict[str, Any]] = {}
+    for label, up in ORIENTATIONS.items():
+        up_v = np.asarray(up, dtype=float)
+        projected = areas * np.clip(-(mesh.face_normals @ up_v), 0.0, None)
+        heights = centroids @ up_v - float((mesh.vertices @ up_v).min())
+        per_process = {}
+        for name, threshold in OVERHANG_THRESHOLDS_DEG.items():
+            mask = overhang_mask(mesh, up=up, threshold_deg=threshold)
+            per_process[name] = {
+                "area_cm2": round(float(projected[mask].sum()) * mm_multiplier ** 2 / 100.0, 2),
+                "volume_cm3": round(float((projected[mask] * heights[mask]).sum()) * mm_multiplier ** 3 / 1000.0, 3),
+            }
+        out[label] = per_process
+    return out
+
+
+def _orientation_rankings(mesh, mm_multiplier: float) -> Dict[str, Any]:
+    """Top build orientations per process (orientation_service), best effort."""
+    from backend.services.orientation_service import rank_orientations
+
+    out = {}
+    for name, threshold in OVERHANG_THRESHOLDS_DEG.items():
+        try:
+            out[name] = rank_orientations(mesh, threshold_deg=threshold, mm_multiplier=mm_multiplier)
+        except Exception as exc:
+            print(f"[MESH_FEATURES] Orientation search ({name}) failed: {exc}")
+    return out
+
+
+def compute_features(mesh, *, partial: bool = False) -> Dict[str, Any]:
+    """Geometry summary of a loaded Trimesh. Raw values are in mesh units."""
+    import numpy as np
+    import trimesh
+
+    face_count = int(len(mesh.faces))
+    bounds = np.asarray(mesh.bounds, dtype=float)
+    extents = bounds[1] - bounds[0]
+    detected_unit, mm_multiplier = detect_unit(float(extents.max()) if face_count else 0.0)
+    area_faces = mesh.area_faces
+    surface_area = float(area_faces.sum())
+
+    # Topology on a position-merged copy: STL soups and GLB texture seams
+    # split vertices, which would otherwise read as open edges and as one
+    # component per triangle.
+    topo = trimesh.Trimesh(vertices=mesh.vertices, faces=mesh.faces, process=False)
+    topo.merge_vertices(merge_tex=True, merge_norm=True)
+
+    is_watertight = bool(topo.is_watertight)
+    volume = float(topo.volume) if is_watertight else None
+
+    boundary_edges = non_manifold_edges = None
+    try:
+        edge_counts = np.bincount(topo.edges_unique_inverse)
+        boundary_edges = int((edge_counts == 1).sum())
+        non_manifold_edges = int((edge_counts > 2).sum())
+    except Exception:
+        pass
+
+    component_count = None
+    try:
+        component_count = int(len(trimesh.graph.connected_components(
+            topo.face_adjacency, nodes=np.arange(face_count), min_len=1,
+        )))
+    except Exception:
+        pass
+
+    return {
+        "version": FEATURE_VERSION,
+        "partial": bool(partial),
+        "face_count": face_count,
+        "vertex_count": int(len(mesh.vertices)),
+        "bounds": [[round(float(v), 6) for v in row] for row in bounds],
+        "extents": [round(float(v), 6) for v in extents],
+        "detected_unit": detected_unit,
+        "mm_multiplier": mm_multiplier,
+        "extents_mm": [round(float(v) * mm_multiplier, 2) for v in extents],
+        "is_watertight": is_watertight,
+        "is_winding_consistent": bool(topo.is_winding_consistent),
+        "boundary_edges": boundary_edges,
+        "non_manifold_edges": non_manifold_edges,
+        "component_count": component_count,
+        "degenerate_faces": int((area_faces < 1e-10).sum()),
+        "volume": volume,
+        "volume_cm3": round(volume * mm_multiplier ** 3 / 1000.0, 3) if volume is not None else None,
+        "surface_area": surface_area,
+        "surface_area_cm2": round(surface_area * mm_multiplier ** 2 / 100.0, 2),
+        "overhang": overhang_stats(mesh, mm_multiplier) if face_count else {},
+        "support": _support_stats(mesh, mm_multiplier) if face_count else {},
+        "orientations": _orientation_rankings(mesh, mm_multiplier) if face_count else {},
+    }
+
+
+def features_from_scan(scan: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Features from a mesh_stream_reader.scan() of the whole file. Same keys
+    as compute_features; what a single streaming pass can't give
+    (components, overhangs, support, orientations) is None / empty.
+    """
+    extents = [float(v) for v in scan["extents"]]
+    detected_unit, mm_multiplier = detect_unit(max(extents))
+    is_watertight = bool(scan.get("is_watertight"))
+    volume = float(scan["volume"]) if is_watertight else None
+    surface_area = float(scan["surface_area"])
+    return {
+        "version": FEATURE_VERSION,
+        "partial": False,
+        "streamed": True,
+        "face_count": int(scan["face_count"]),
+        "vertex_count": None,
+        "bounds": [[round(float(v), 6) for v in row] for row in scan["bounds"]],
+        "extents": [round(v, 6) for v in extents],
+        "detected_unit": detected_unit,
+        "mm_multiplier": mm_multiplier,
+        "extents_mm": [round(v * mm_multiplier, 2) for v in extents],
+        "is_watertight": is_watertight,
+        "is_winding_consistent": scan.get("is_winding_consistent"),
+        "boundary_edges": scan.get("boundary_edges"),
+        "non_manifold_edges": scan.get("non_manifold_edges"),
+        "component_count": None,
+        "degenerate_faces": int(scan["degenerate_faces"]),
+        "volume": volume,
+        "volume_cm3": round(volume * mm_multiplier ** 3 / 1000.0, 3) if volume is not None else None,
+        "surface_area": surface_area,
+        "surface_area_cm2": round(surface_area * mm_multiplier ** 2 / 100.0, 2),
+        "overhang": {},
+        "support": {},
+        "orientations": {},
+    }
+
+
+def features_from_bytes(data: bytes, file_type: str = "glb") -> Optional[Dict[str, Any]]:
+    """Parse model bytes and compute features (runs in a pool child)."""
+    from backend.services import mesh_stream_reader
+    from backend.services.mesh_conversion_service import load_mesh
+
+    started = time.monotonic()
+    if (mesh_stream_reader.face_count(data, file_type) or 0) > STREAM_FACES:
+        try:
+            features = features_from_scan(mesh_stream_reader.scan(data, file_type))
+            features["compute_seconds"] = round(time.monotonic() - started, 3)
+            return features
+        except mesh_stream_reader.StreamUnsupported as exc:
+            print(f"[MESH_FEATURES] Streaming scan unsupported ({exc}); loading the full mesh")
+    mesh = load_mesh(data, file_type=file_type)
+    if mesh is None:
+        return None
+    features = compute_features(mesh)
+    features["compute_seconds"] = round(time.monotonic() - started, 3)
+    return features
+
+
+# ─────────────────────────────────────────────────────────────
+# Store (LRU + DB)
+# ─────────────────────────────────────────────────────────────
+_lock = threading.Lock()
+_entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()  # content_hash -> features
+_counters: Dict[str, int] = {
+    "lru_hits": 0,
+    "db_hits": 0,
+    "misses": 0,
+    "records": 0,
+    "computed": 0,
+    "compute_errors": 0,
+    "scheduled": 0,
+    "dropped": 0,
+    "db_errors": 0,
+}
+_db_disabled_reason: Optional[str] = None
+
+
+def _bump(name: str, n: int = 1) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def _remember(content_hash: str, features: Dict[str, Any]) -> None:
+    with _lock:
+        _entries[content_hash] = features
+        _entries.move_to_end(content_hash)
+        while len(_entries) > LRU_SIZE:
+            _entries.popitem(last=False)
+
+
+def _db_ready() -> bool:
+    if _db_disabled_reason is not None:
+        return False
+    from backend.db import USE_DB
+
+    return bool(USE_DB)
+
+
+def _db_failed(exc: Exception) -> None:
+    global _db_disabled_reason
+    _bump("db_errors")
+    if "mesh_features" in str(exc) and "does not exist" in str(exc):
+        _db_disabled_reason = "table_missing"
+        print("[MESH_FEATURES] timrx_app.mesh_features missing (run migration 088); using in-process store only")
+    else:
+        print(f"[MESH_FEATURES] DB access failed, treating as miss: {exc}")
+
+
+def get(content_hash: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Stored features for a model content hash, or None."""
+    if not ENABLED or not content_hash:
+        return None
+    with _lock:
+        features = _entries.get(content_hash)
+        if features is not None:
+            _entries.move_to_end(content_hash)
+            _counters["lru_hits"] += 1
+            return dict(features)
+
+    if _db_ready():
+        try:
+            from backend.db import Tables, get_conn
+
+            with get_conn("mesh_features") as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f"""
+                        SELECT features FROM {Tables.MESH_FEATURES}
+                        WHERE content_hash = %s AND feature_version = %s
+                        """,
+                        (content_hash, FEATURE_VERSION),
+                    )
+                    row = cur.fetchone()
+            if row and row["features"]:
+                features = dict(row["features"])
+                _remember(content_hash, features)
+                _bump("db_hits")
+                return dict(features)
+        except Exception as exc:
+            _db_failed(exc)
+
+    _bump("misses")
+    return None
+
+
+def put(content_hash: str, features: Dict[str, Any]) -> None:
+    """Persist features for a content hash (LRU + DB)."""
+    if not ENABLED or not content_hash or not features:
+        return
+    features["content_hash"] = content_hash
+    _remember(content_hash, features)
+    _bump("records")
+
+    if not _db_ready():
+        return
+    try:
+        from backend.db import Tables, get_conn
+
+        with get_conn("mesh_features") as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"""
+                    INSERT INTO {Tables.MESH_FEATURES}
+                        (content_hash, feature_version, features, face_count,
+                         is_watertight, component_count, partial, compute_seconds)
+                    VALUES (%s, %s, %s::jsonb, %s, %s, %s, %s, %s)
+                    ON CONFLICT (content_hash) DO UPDATE
+                    SET feature_version = EXCLUDED.feature_version,
+                        features = EXCLUDED.features,
+                        face_count = EXCLUDED.face_count,
+                        is_watertight = EXCLUDED.is_watertight,
+                        component_count = EXCLUDED.component_count,
+                        partial = EXCLUDED.partial,
+                        compute_seconds = EXCLUDED.compute_seconds,
+                        updated_at = NOW()
+                    """,
+                    (
+                        content_hash, FEATURE_VERSION, json.dumps(features, default=str),
+                        features.get("face_count"), features.get("is_watertight"),
+                        features.get("component_count"), bool(features.get("partial")),
+                        features.get("compute_seconds"),
+                    ),
+                )
+            conn.commit()
+    except Exception as exc:
+        _db_failed(exc)
+
+
+# ─────────────────────────────────────────────────────────────
+# Background computation
+# ─────────────────────────────────────────────────────────────
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def _pool_child_init(memory_mb: int) -> None:
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+    os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+    from backend.services.print_analysis_service import _set_analysis_child_limits
+
+    _set_analysis_child_limits(memory_mb)
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _pool, _pool_pid
+    with _pool_lock:
+        # A pool inherited across fork has dead workers — rebuild it.
+        if _pool is not None and _pool_pid != os.getpid():
+            _pool = None
+        if _pool is None:
+            import multiprocessing as mp
+
+            _pool = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=mp.get_context("spawn"),
+                initializer=_pool_child_init,
+                initargs=(MEMORY_MB,),
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _reset_process_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        try:
+            pool.shutdown(wait=False, cancel_futures=True)
+        except Exception:
+            pass
+
+
+def shutdown_pool() -> None:
+    """Stop the compute pool (tests / clean shutdown)."""
+    _reset_process_pool()
+
+
+def compute_isolated(data: bytes, file_type: str = "glb") -> Optional[Dict[str, Any]]:
+    """Run features_from_bytes() in the memory-capped pool child."""
+    try:
+        future = _get_process_pool().submit(features_from_bytes, data, file_type)
+        return future.result(timeout=TIMEOUT_SECONDS)
+    except BrokenProcessPool as exc:
+        # Usually the child hit its memory cap; the next job gets a fresh pool.
+        print(f"[MESH_FEATURES] Compute pool broke ({exc}); recreating")
+        _reset_process_pool()
+    except Exception as exc:
+        print(f"[MESH_FEATURES] Feature computation failed: {exc}")
+        _reset_process_pool()
+    return None
+
+
+def ensure(content_hash: str, data: bytes, file_type: str = "glb") -> Optional[Dict[str, Any]]:
+    """Stored features for ``content_hash``, computing them from ``data`` on a miss."""
+    features = get(content_hash)
+    if features is not None:
+        return features
+    if len(data) > MAX_SOURCE_BYTES:
+        print(f"[MESH_FEATURES] {content_hash[:12]} skipped: {len(data)} bytes exceeds MESH_FEATURES_MAX_SOURCE_MB")
+        return None
+    features = compute_isolated(data, file_type)
+    if features is None:
+        _bump("compute_errors")
+        return None
+    _bump("computed")
+    put(content_hash, features)
+    return features
+
+
+_dispatch_executor: Optional[ThreadPoolExecutor] = None
+_dispatch_lock = threading.Lock()
+_pending_slots = threading.BoundedSemaphore(MAX_PENDING)
+_inflight: set[str] = set()
+
+
+def _get_dispatch_executor() -> ThreadPoolExecutor:
+    global _dispatch_executor
+    with _dispatch_lock:
+        if _dispatch_executor is None:
+            _dispatch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mesh-features")
+        return _dispatch_executor
+
+
+def _compute_job(content_hash: str, data: Optional[bytes], url: Optional[str], file_type: str) -> None:
+    try:
+        if data is None:
+            from backend.services.mesh_conversion_service import _download_source
+
+            data = _download_source(url)
+        features = ensure(content_hash, data, file_type)
+        if features is not None:
+            print(
+                f"[MESH_FEATURES] {content_hash[:12]} faces={features['face_count']} "
+                f"watertight={features['is_watertight']} in {features.get('compute_seconds')}s"
+            )
+    except Exception as exc:
+        _bump("compute_errors")
+        print(f"[MESH_FEATURES] Background job failed for {content_hash[:12]}: {exc}")
+
+
+def schedule(
+    content_hash: Optional[str],
+    *,
+    data: Optional[bytes] = None,
+    url: Optional[str] = None,
+    file_type: str = "glb",
+) -> bool:
+    """
+    Queue feature computation for a model unless it is already stored or
+    queued. Never blocks: when MESH_FEATURES_MAX_PENDING jobs are queued the
+    request is dropped and the next reader schedules it again.
+    """
+    if not ENABLED or not content_hash or (data is None and not url):
+        return False
+    with _lock:
+        if content_hash in _entries or content_hash in _inflight:
+            return False
+    if not _pending_slots.acquire(blocking=False):
+        _bump("dropped")
+        return False
+    with _lock:
+        _inflight.add(content_hash)
+
+    def _done(_future) -> None:
+        with _lock:
+            _inflight.discard(content_hash)
+        _pending_slots.release()
+
+    try:
+        future = _get_dispatch_executor().submit(_compute_job, content_hash, data, url, file_type)
+    except Exception as exc:
+        _done(None)
+        print(f"[MESH_FEATURES] Could not schedule {content_hash[:12]}: {exc}")
+        return False
+    future.add_done_callback(_done)
+    _bump("scheduled")
+    return True
+
+
+def get_or_schedule(content_hash: Optional[str], url: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """get(), queueing a background computation from ``url`` on a miss."""
+    features = get(content_hash)
+    if features is None and url:
+        schedule(content_hash, url=url)
+    return features
+
+
+def stats() -> Dict[str, object]:
+    """Hit/miss counters for the admin storage metrics."""
+    with _lock:
+        counters = dict(_counters)
+        size = len(_entries)
+        inflight = len(_inflight)
+    hits = counters["lru_hits"] + counters["db_hits"]
+    lookups = hits + counters["misses"]
+    return {
+        "enabled": ENABLED,
+        "feature_version": FEATURE_VERSION,
+        "db_enabled": _db_disabled_reason is None,
+        "db_disabled_reason": _db_disabled_reason,
+        "lru_entries": size,
+        "lru_capacity": LRU_SIZE,
+        "inflight": inflight,
+        "lookups": lookups,
+        "hits": hits,
+        "hit_ratio": round(hits / lookups, 4) if lookups else None,
+        **counters,
+    }
+
+
+def reset() -> None:
+    """Clear the in-process tier and counters (tests)."""
+    global _db_disabled_reason
+    with _lock:
+        _entries.clear()
+        _inflight.clear()
+        for name in _counters:
+            _counters[name] = 0
+    _db_disabled_reason = None
@@ -0,0 +1,405 @@
+"""
+Print-ready levels of detail (LODs) for high-poly models.
+
+Print analysis and STL repair have hard face limits (PRINT_ANALYSIS_MAX_FACES,
+STL_REPAIR_MESHFIX_FACE_LIMIT). Above them the only advice used to be "Remesh
+with a lower polygon target", i.e. a paid upstream remesh job before the
+model could even be checked. This module builds a simplified copy locally
+at one of a few fixed face counts (MESH_LOD_LEVELS) and caches it, so the
+mesh-based checks run on the LOD and the full-resolution model is only
+needed when the LOD isn't enough. STL repair still delivers the full
+model; it runs MeshFix on the LOD only to report what a remesh would fix.
+
+Building:
+
+- Binary STL / GLB sources are vertex-clustered straight from
+  mesh_stream_reader's triangle chunks (one grid cell per output vertex,
+  sized from the surface area so the result lands near the target), so a
+  LOD of a file too large to load still covers the whole model. A cluster
+  result well above the target is then quadric-decimated.
+- Anything else is quadric-decimated from the loaded mesh
+  (wall_thickness_service.decimate: pymeshlab, then trimesh).
+
+Clustering can leave a few non-manifold edges, which the analysis checks
+don't mind; STL repair always asks for the quadric LOD.
+
+Caching: a LOD is a pure function of the source bytes, the level and the
+method, so it is written once as binary STL to
+
+    models/derived/{source_hash}/lod-{faces}-{method}-v{LOD_VERSION}.stl
+
+and recorded in derived_artifact_store. Analysis and repair run in child
+processes, so the parent reserves a LOD file with lod_slot(): a cached LOD
+is downloaded into it before the child starts, and a LOD the child built
+is uploaded from it afterwards.
+
+Environment:
+    MESH_LOD_LEVELS    default "200000,50000" (face counts, any order)
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _env_levels(name: str, default: Tuple[int, ...]) -> Tuple[int, ...]:
+    raw = os.getenv(name)
+    if raw is None or str(raw).strip() == "":
+        return default
+    try:
+        levels = sorted({int(part) for part in str(raw).split(",") if part.strip()}, reverse=True)
+    except (TypeError, ValueError):
+        logger.warning("[MESH_LOD] Invalid %s=%r; using default %s", name, raw, default)
+        return default
+    levels = [level for level in levels if level >= 1000]
+    return tuple(levels) or default
+
+
+LEVELS = _env_levels("MESH_LOD_LEVELS", (200000, 50000))
+
+# Bump when the LOD builder changes output so old LODs stop matching.
+LOD_VERSION = 1
+CONTENT_TYPE = "model/stl"
+# Cluster results this far above the target get a quadric pass.
+CLUSTER_OVERSHOOT = 1.25
+# Grid cells per axis are capped so cell keys fit comfortably in int64.
+MAX_GRID_CELLS = 1 << 20
+
+_lock = threading.Lock()
+_counters: Dict[str, int] = {"hits": 0, "misses": 0, "built": 0, "stored": 0, "failed": 0}
+
+
+def _bump(name: str, n: int = 1) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def level_for(face_count: Optional[int], limit: int) -> Optional[int]:
+    """Largest LOD level within ``limit`` that simplifies ``face_count``; None if none applies."""
+    if not face_count or face_count <= limit:
+        return None
+    for level in LEVELS:
+        if level <= limit and level < face_count:
+            return level
+    return None
+
+
+def variant(target_faces: int, method: str) -> str:
+    return f"lod-{int(target_faces)}-{method}-v{LOD_VERSION}"
+
+
+def s3_key(source_hash: str, target_faces: int, method: str) -> str:
+    from backend.services.mesh_conversion_service import DERIVED_PREFIX
+
+    return f"{DERIVED_PREFIX}/{source_hash}/{variant(target_faces, method)}.stl"
+
+
+# ─────────────────────────────────────────────────────────────
+# Building
+# ─────────────────────────────────────────────────────────────
+def _cluster_stream(source, file_type: Optional[str], target_faces: int):
+    """Vertex-cluster a binary STL / GLB chunk by chunk; None if not streamable."""
+    import numpy as np
+    import trimesh
+
+    from backend.services import mesh_stream_reader
+
+    try:
+        scan = mesh_stream_reader.scan(source, file_type, edges=False)
+    except mesh_stream_reader.StreamUnsupported:
+        return None
+    lo = np.asarray(scan["bounds"][0], dtype=float)
+    extents = np.asarray(scan["extents"], dtype=float)
+    # A closed surface clustered on a grid keeps about area / cell² vertices
+    # and twice as many faces.
+    cell = math.sqrt(2.0 * float(scan["surface_area"]) / max(int(target_faces), 1))
+    cell = max(cell, float(extents.max()) / (MAX_GRID_CELLS - 2), 1e-12)
+    dims = (np.floor(extents / cell).astype(np.int64) + 1)
+
+    key_parts, sum_parts, count_parts, tri_parts = [], [], [], []
+    with mesh_stream_reader.open_triangles(source, file_type) as (_, _, chunks):
+        for tris in chunks:
+            if not len(tris):
+                continue
+            flat = tris.reshape(-1, 3)
+            idx = np.clip(np.floor((flat - lo) / cell).astype(np.int64), 0, dims - 1)
+            keys = (idx[:, 0] * dims[1] + idx[:, 1]) * dims[2] + idx[:, 2]
+
+            unique, inverse = np.unique(keys, return_inverse=True)
+            key_parts.append(unique)
+            count_parts.append(np.bincount(inverse, minlength=len(unique)))
+            sum_parts.append(np.stack(
+                [np.bincount(inverse, weights=flat[:, axis], minlength=len(unique)) for axis in range(3)],
+                axis=1,
+            ))
+
+            corners = keys.reshape(-1, 3)
+            keep = (
+                (corners[:, 0] != corners[:, 1])
+                & (corners[:, 1] != corners[:, 2])
+                & (corners[:, 0] != corners[:, 2])
+            )
+            corners = corners[keep]
+            # Rotate each triangle so its smallest key comes first: winding is
+            # kept and the same cell triangle from different chunks matches.
+            shift = np.argmin(corners, axis=1)
+            rows = np.arange(len(corners))[:, None]
+            corners = corners[rows, (shift[:, None] + np.arange(3)) % 3]
+            tri_parts.append(np.unique(corners, axis=0))
+
+    if not key_parts:
+        return None
+    keys = np.concatenate(key_parts)
+    unique, inverse = np.unique(keys, return_inverse=True)
+    counts = np.bincount(inverse, weights=np.concatenate(count_parts), minlength=len(unique))
+    sums = np.concatenate(sum_parts)
+    vertices = np.stack(
+        [np.bincount(inverse, weights=sums[:, axis], minlength=len(unique)) for axis in range(3)],
+        axis=1,
+    ) / counts[:, None]
+
+    corners = np.unique(np.concatenate(tri_parts), axis=0)
+    if not len(corners):
+        return None
+    faces = np.searchsorted(unique, corners)
+    return trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+
+
+def build(
+    target_faces: int,
+    *,
+    source=None,
+    file_type: Optional[str] = None,
+    mesh=None,
+) -> Tuple[Optional[Any], Dict[str, Any]]:
+    """
+    LOD of about ``target_faces`` faces. Streams ``source`` (path or bytes)
+    when it is a binary STL / GLB, else decimates ``mesh``. Clustering is
+    much faster but may leave a few non-manifold edges; quadric decimation
+    keeps the topology, so repair passes the mesh when it has one. Returns
+    (lod mesh or None, info).
+    """
+    from backend.services.wall_thickness_service import decimate
+
+    started = time.monotonic()
+    info: Dict[str, Any] = {"target_faces": int(target_faces), "cached": False, "method": None}
+    lod = None
+    try:
+        if source is not None:
+            lod = _cluster_stream(source, file_type, target_faces)
+            if lod is not None:
+                info["method"] = "cluster"
+                if len(lod.faces) > target_faces * CLUSTER_OVERSHOOT:
+                    decimated = decimate(lod, target_faces)
+                    if decimated is not None and len(decimated.faces):
+                        lod = decimated
+        if lod is None and mesh is not None:
+            import trimesh
+
+            # Loaders run with process=False; the decimator needs shared vertices.
+            merged = trimesh.Trimesh(vertices=mesh.vertices, faces=mesh.faces, process=True)
+            lod = decimate(merged, target_faces)
+            info["method"] = "quadric"
+    except Exception as exc:
+        logger.warning("[MESH_LOD] LOD build (%s faces) failed: %s", target_faces, exc)
+        lod = None
+
+    if lod is None or not len(lod.faces):
+        _bump("failed")
+        return None, info
+    lod.remove_unreferenced_vertices()
+    _bump("built")
+    info["faces"] = int(len(lod.faces))
+    info["elapsed_seconds"] = round(time.monotonic() - started, 3)
+    return lod, info
+
+
+def load(path: str):
+    """Load a LOD STL written by obtain() (vertices merged)."""
+    import trimesh
+
+    return trimesh.load(path, file_type="stl")
+
+
+def obtain(
+    lod_path: Optional[str],
+    target_faces: int,
+    *,
+    source=None,
+    file_type: Optional[str] = None,
+    mesh=None,
+) -> Tuple[Optional[Any], Dict[str, Any]]:
+    """
+    The LOD for a child process: read from ``lod_path`` when the parent
+    already put a cached LOD there, otherwise build it and write it to
+    ``lod_path`` for the parent to store.
+    """
+    if lod_path and os.path.exists(lod_path) and os.path.getsize(lod_path) > 84:
+        try:
+            lod = load(lod_path)
+            return lod, {"target_faces": int(target_faces), "cached": True, "faces": int(len(lod.faces))}
+        except Exception as exc:
+            logger.warning("[MESH_LOD] Cached LOD at %s unreadable, rebuilding: %s", lod_path, exc)
+
+    lod, info = build(target_faces, source=source, file_type=file_type, mesh=mesh)
+    if lod is not None and lod_path:
+        try:
+            lod.export(lod_path, file_type="stl")
+        except Exception as exc:
+            logger.warning("[MESH_LOD] Could not write LOD to %s: %s", lod_path, exc)
+    return lod, info
+
+
+# ─────────────────────────────────────────────────────────────
+# Artifact cache
+# ─────────────────────────────────────────────────────────────
+def find(source_hash: str, target_faces: int, method: str) -> Optional[Dict[str, Any]]:
+    """Stored LOD entry for (source_hash, level, method) whose object still exists, or None."""
+    from backend.services import derived_artifact_store, s3_service
+
+    if not source_hash:
+        return None
+    entry = derived_artifact_store.lookup(source_hash, variant(target_faces, method))
+    if not entry:
+        return None
+    try:
+        if s3_service.content_key_exists(entry["s3_key"], entry.get("content_hash")):
+            return entry
+        derived_artifact_store.forget(source_hash, variant(target_faces, method))
+    except Exception as exc:
+        logger.warning("[MESH_LOD] LOD check failed for %s/%s: %s", source_hash, target_faces, exc)
+    return None
+
+
+def store(
+    source_hash: str,
+    target_faces: int,
+    method: str,
+    path: str,
+    meta: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Upload a LOD STL from ``path`` and record it; None on failure."""
+    import hashlib
+
+    from backend.services import derived_artifact_store, s3_service
+
+    try:
+        with open(path, "rb") as fh:
+            digest = hashlib.sha256()
+            size = 0
+            for block in iter(lambda: fh.read(1024 * 1024), b""):
+                digest.update(block)
+                size += len(block)
+            key = s3_key(source_hash, target_faces, method)
+            s3_service.upload_fileobj_to_s3(fh, key, CONTENT_TYPE, content_hash=digest.hexdigest(), size_bytes=size)
+        derived_artifact_store.record(
+            source_hash,
+            variant(target_faces, method),
+            key,
+            kind="stl_lod",
+            content_hash=digest.hexdigest(),
+            content_type=CONTENT_TYPE,
+            size_bytes=size,
+            options={"target_faces": int(target_faces), "method": method, "lod_version": LOD_VERSION},
+            meta=meta,
+        )
+    except Exception as exc:
+        logger.warning("[MESH_LOD] Could not store LOD %s/%s: %s", source_hash, target_faces, exc)
+        return None
+    _bump("stored")
+    return {"s3_key": key, "content_hash": digest.hexdigest(), "size_bytes": size}
+
+
+def _stl_face_count(path: str) -> Optional[int]:
+    try:
+        with open(path, "rb") as fh:
+            header = fh.read(84)
+    except OSError:
+        return None
+    if len(header) < 84:
+        return None
+    return struct.unpack_from("<I", header, 80)[0]
+
+
+class LodSlot:
+    """A reserved LOD file: ``path`` for the child; level and method for storing."""
+
+    def __init__(self, path: str, target_faces: Optional[int], method: str):
+        self.path = path
+        self.target_faces = target_faces
+        self.method = method
+        self.cached = False
+
+    def update(self, info: Optional[Dict[str, Any]]) -> None:
+        """Take level and method from the child's LOD report."""
+        if info and not info.get("cached"):
+            self.target_faces = info.get("target_faces") or self.target_faces
+            self.method = info.get("method") or self.method
+
+
+@contextmanager
+def lod_slot(
+    source_hash: Optional[str],
+    target_faces: Optional[int],
+    method: str,
+) -> Iterator[Optional[LodSlot]]:
+    """
+    Reserve a LOD file for a child process (None without a source hash). A
+    cached LOD at ``target_faces`` built by ``method`` is downloaded into it
+    first. After the child ran, the caller passes its LOD report to
+    ``slot.update()`` (the level may only be known once the model was
+    loaded). On exit a LOD the child wrote is stored and the file removed.
+    """
+    if not source_hash:
+        yield None
+        return
+    fd, path = tempfile.mkstemp(suffix=".stl", prefix="lod-")
+    os.close(fd)
+    slot = LodSlot(path, target_faces, method)
+    try:
+        entry = find(source_hash, target_faces, method) if target_faces else None
+        if entry:
+            try:
+                from backend.services import s3_service
+
+                with open(path, "wb") as fh:
+                    s3_service.download_s3_key_to_fileobj(entry["s3_key"], fh)
+                slot.cached = True
+                _bump("hits")
+            except Exception as exc:
+                logger.warning("[MESH_LOD] LOD download failed for %s: %s", entry["s3_key"], exc)
+                open(path, "wb").close()
+        elif target_faces:
+            _bump("misses")
+        yield slot
+
+        faces = _stl_face_count(path)
+        if not slot.cached and faces and slot.target_faces:
+            store(source_hash, slot.target_faces, slot.method, path, meta={"faces": faces})
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        return {**_counters, "levels": list(LEVELS)}
+
+
+def reset() -> None:
+    """Zero the counters (tests)."""
+    with _lock:
+        for name in _counters:
+            _counters[name] = 0
@@ -0,0 +1,467 @@
+"""
+Out-of-core scanner for binary STL and GLB models.
+
+trimesh.load materialises the whole scene (vertex + face arrays, caches,
+per-geometry objects), which is why print analysis caps scenes at
+SCENE_CONCAT_FACE_LIMIT and falls back to "largest part only". This module
+computes the whole-model diagnostics print analysis needs without building
+a mesh:
+
+- face count, bounds, surface area, signed volume and degenerate faces;
+- edge statistics (boundary / manifold / non-manifold edges and winding
+  consistency), from which watertightness follows.
+
+Files are memory-mapped and triangles are read in fixed-size chunks
+(MESH_STREAM_CHUNK_FACES), so peak memory is a few chunk-sized arrays plus
+the edge table. Edges are identified by hashing vertex positions (the same
+position-merge compute_features does on a merged copy); edge hashes are
+kept in memory up to MESH_STREAM_SPILL_EDGES and otherwise partitioned into
+temporary bucket files by their top bits and counted bucket by bucket.
+
+GLB support covers what our generators and converters emit: the embedded
+BIN buffer, float32 POSITION, unsigned integer indices (or none), triangle
+primitives and node transforms. Draco / meshopt compression, sparse
+accessors and external buffers raise StreamUnsupported so the caller can
+fall back to trimesh. ASCII STL is not streamed either.
+
+Environment:
+    MESH_STREAM_CHUNK_FACES   default 200000 faces per chunk
+    MESH_STREAM_SPILL_EDGES   default 6000000 edge hashes kept in memory
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+def _env_int(name: str, default: int, minimum: int | None = None) -> int:
+    raw = os.getenv(name)
+    if raw is None or str(raw).strip() == "":
+        return default
+    try:
+        value = int(str(raw).strip())
+    except (TypeError, ValueError):
+        print(f"[MESH_STREAM] Invalid {name}={raw!r}; using default {default}")
+        return default
+    if minimum is not None and value < minimum:
+        return minimum
+    return value
+
+
+CHUNK_FACES = _env_int("MESH_STREAM_CHUNK_FACES", 200000, minimum=1000)
+SPILL_EDGES = _env_int("MESH_STREAM_SPILL_EDGES", 6000000, minimum=10000)
+
+SPILL_BUCKET_BITS = 4  # 16 bucket files
+DEGENERATE_AREA = 1e-10  # same raw-unit threshold as compute_features
+
+_GLB_MAGIC = b"glTF"
+_CHUNK_JSON = 0x4E4F534A
+_CHUNK_BIN = 0x004E4942
+_COMPONENT_DTYPES = {5121: "<u1", 5123: "<u2", 5125: "<u4", 5126: "<f4"}
+_STL_RECORD = np.dtype([("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attr", "<u2")])
+
+# 64-bit mixing constants (splitmix64 / xxhash primes).
+_P1 = np.uint64(0x9E3779B185EBCA87)
+_P2 = np.uint64(0xC2B2AE3D27D4EB4F)
+_P3 = np.uint64(0x165667B19E3779F9)
+_M1 = np.uint64(0xBF58476D1CE4E5B9)
+_M2 = np.uint64(0x94D049BB133111EB)
+
+
+class StreamUnsupported(ValueError):
+    """The file uses a feature the streaming reader does not handle."""
+
+
+# ─────────────────────────────────────────────────────────────
+# Sources
+# ─────────────────────────────────────────────────────────────
+@contextmanager
+def _open_buffer(source) -> Iterator[Any]:
+    """Yield a buffer for a path (memory-mapped) or bytes-like object."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield memoryview(source)
+        return
+    with open(source, "rb") as fh:
+        size = os.fstat(fh.fileno()).st_size
+        if size == 0:
+            yield memoryview(b"")
+            return
+        mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+def _is_binary_stl(buf) -> bool:
+    if len(buf) < 84:
+        return False
+    (count,) = struct.unpack_from("<I", buf, 80)
+    return len(buf) == 84 + 50 * count
+
+
+def _stl_triangles(buf) -> Tuple[int, Iterator[np.ndarray]]:
+    if not _is_binary_stl(buf):
+        raise StreamUnsupported("not a binary STL")
+    (count,) = struct.unpack_from("<I", buf, 80)
+    records = np.ndarray((count,), dtype=_STL_RECORD, buffer=buf, offset=84)
+
+    def chunks():
+        for start in range(0, count, CHUNK_FACES):
+            yield records["vertices"][start:start + CHUNK_FACES].astype(np.float64)
+
+    return count, chunks()
+
+
+def _node_matrix(node: Dict[str, Any]) -> np.ndarray:
+    if "matrix" in node:
+        return np.asarray(node["matrix"], dtype=np.float64).reshape(4, 4).T  # column-major
+    t = np.asarray(node.get("translation", (0.0, 0.0, 0.0)), dtype=np.float64)
+    x, y, z, w = node.get("rotation", (0.0, 0.0, 0.0, 1.0))
+    s = np.asarray(node.get("scale", (1.0, 1.0, 1.0)), dtype=np.float64)
+    rot = np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ])
+    out = np.eye(4)
+    out[:3, :3] = rot * s[None, :]
+    out[:3, 3] = t
+    return out
+
+
+def _mesh_instances(gltf: Dict[str, Any]) -> List[Tuple[int, np.ndarray]]:
+    """(mesh index, world matrix) for every node that draws a mesh."""
+    nodes = gltf.get("nodes") or []
+    scenes = gltf.get("scenes") or []
+    if not scenes:
+        return [(i, np.eye(4)) for i in range(len(gltf.get("meshes") or []))]
+    roots = scenes[int(gltf.get("scene", 0))].get("nodes") or []
+
+    out = []
+    stack = [(int(i), np.eye(4), 0) for i in roots]
+    while stack:
+        index, parent, depth = stack.pop()
+        if depth > 64:
+            raise StreamUnsupported("node hierarchy too deep")
+        node = nodes[index]
+        world = parent @ _node_matrix(node)
+        if "mesh" in node:
+            out.append((int(node["mesh"]), world))
+        stack.extend((int(child), world, depth + 1) for child in node.get("children") or ())
+    return out
+
+
+def _accessor_array(gltf: Dict[str, Any], buf, bin_offset: int, index: int, columns: int) -> np.ndarray:
+    accessor = gltf["accessors"][index]
+    if "sparse" in accessor:
+        raise StreamUnsupported("sparse accessors")
+    if "bufferView" not in accessor:
+        raise StreamUnsupported("accessor without buffer view")
+    view = gltf["bufferViews"][accessor["bufferView"]]
+    if int(view.get("buffer", 0)) != 0 or "uri" in (gltf.get("buffers") or [{}])[0]:
+        raise StreamUnsupported("external buffers")
+    dtype = np.dtype(_COMPONENT_DTYPES.get(accessor["componentType"]) or "V1")
+    if dtype.kind == "V":
+        raise StreamUnsupported(f"component type {accessor['componentType']}")
+    count = int(accessor["count"])
+    offset = bin_offset + int(view.get("byteOffset", 0)) + int(accessor.get("byteOffset", 0))
+    element = dtype.itemsize * columns
+    stride = int(view.get("byteStride") or element)
+    if count and offset + stride * (count - 1) + element > len(buf):
+        raise StreamUnsupported("accessor runs past the end of the buffer")
+    shape = (count, columns) if columns > 1 else (count,)
+    strides = (stride, dtype.itemsize) if columns > 1 else (stride,)
+    return np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset, strides=strides)
+
+
+def _glb_layout(buf) -> Tuple[Dict[str, Any], int]:
+    if len(buf) < 20 or bytes(buf[:4]) != _GLB_MAGIC:
+        raise StreamUnsupported("not a GLB")
+    json_len, json_type = struct.unpack_from("<II", buf, 12)
+    if json_type != _CHUNK_JSON:
+        raise StreamUnsupported("GLB without a JSON chunk")
+    gltf = json.loads(bytes(buf[20:20 + json_len]))
+    bin_offset = 20 + json_len
+    if bin_offset + 8 <= len(buf):
+        bin_len, bin_type = struct.unpack_from("<II", buf, bin_offset)
+        if bin_type != _CHUNK_BIN:
+            raise StreamUnsupported("GLB second chunk is not BIN")
+        bin_offset += 8
+    for ext in ("KHR_draco_mesh_compression", "EXT_meshopt_compression", "KHR_meshopt_compression"):
+        if ext in (gltf.get("extensionsUsed") or ()):
+            raise StreamUnsupported(ext)
+    return gltf, bin_offset
+
+
+def _glb_triangles(buf) -> Tuple[int, Iterator[np.ndarray]]:
+    gltf, bin_offset = _glb_layout(buf)
+    meshes = gltf.get("meshes") or []
+
+    jobs = []
+    total = 0
+    for mesh_index, world in _mesh_instances(gltf):
+        for primitive in meshes[mesh_index].get("primitives") or ():
+            mode = int(primitive.get("mode", 4))
+            if mode in (0, 1, 2, 3):
+                continue  # points / lines: nothing to print
+            if mode != 4:
+                raise StreamUnsupported(f"primitive mode {mode}")
+            position = primitive.get("attributes", {}).get("POSITION")
+            if position is None:
+                continue
+            if "indices" in primitive:
+                count = int(gltf["accessors"][primitive["indices"]]["count"]) // 3
+            else:
+                count = int(gltf["accessors"][position]["count"]) // 3
+            jobs.append((primitive, world))
+            total += count
+
+    def chunks():
+        for primitive, world in jobs:
+            positions = _accessor_array(gltf, buf, bin_offset, primitive["attributes"]["POSITION"], 3)
+            if positions.dtype != np.dtype("<f4"):
+                raise StreamUnsupported("non-float positions")
+            indices = None
+            if "indices" in primitive:
+                indices = _accessor_array(gltf, buf, bin_offset, primitive["indices"], 1)
+            n = (len(indices) if indices is not None else len(positions)) // 3
+            mirrored = np.linalg.det(world[:3, :3]) < 0
+            for start in range(0, n, CHUNK_FACES):
+                stop = min(n, start + CHUNK_FACES)
+                if indices is not None:
+                    idx = np.asarray(indices[start * 3:stop * 3], dtype=np.int64)
+                    if idx.size and int(idx.max()) >= len(positions):
+                        raise StreamUnsupported("index out of range")
+                    tris = positions[idx].astype(np.float64)
+                else:
+                    tris = np.asarray(positions[start * 3:stop * 3], dtype=np.float64)
+                tris = tris @ world[:3, :3].T + world[:3, 3]
+                tris = tris.reshape(-1, 3, 3)
+                if mirrored:
+                    tris = tris[:, ::-1, :]  # keep outward winding under a mirror transform
+                yield tris
+
+    return total, chunks()
+
+
+def _triangles(buf, file_type: Optional[str]) -> Tuple[str, int, Iterator[np.ndarray]]:
+    kind = (file_type or "").lower().lstrip(".")
+    if kind not in ("stl", "glb"):
+        kind = "glb" if bytes(buf[:4]) == _GLB_MAGIC else "stl"
+    if kind == "glb":
+        return (kind, *_glb_triangles(buf))
+    return (kind, *_stl_triangles(buf))
+
+
+def face_count(source, file_type: Optional[str] = None) -> Optional[int]:
+    """Triangle count from headers only (no geometry read); None if not streamable."""
+    try:
+        with _open_buffer(source) as buf:
+            _, count, _ = _triangles(buf, file_type)
+            return count
+    except (StreamUnsupported, ValueError, KeyError, IndexError, TypeError, struct.error):
+        return None
+
+
+@contextmanager
+def open_triangles(source, file_type: Optional[str] = None) -> Iterator[Tuple[str, int, Iterator[np.ndarray]]]:
+    """
+    Yield (format, declared face count, chunk iterator) for a binary STL /
+    GLB; each chunk is an F×3×3 float64 array of world-space triangles.
+    The chunks are only valid inside the ``with`` block.
+    """
+    with _open_buffer(source) as buf:
+        yield _triangles(buf, file_type)
+
+
+# ─────────────────────────────────────────────────────────────
+# Edge counting
+# ─────────────────────────────────────────────────────────────
+def _mix(h: np.ndarray) -> np.ndarray:
+    h = h ^ (h >> np.uint64(30))
+    h = h * _M1
+    h = h ^ (h >> np.uint64(27))
+    h = h * _M2
+    return h ^ (h >> np.uint64(31))
+
+
+def _vertex_hashes(tris: np.ndarray) -> np.ndarray:
+    # float32 like STL storage; +0.0 folds -0.0 into 0.0 before hashing.
+    bits = (tris.astype(np.float32) + np.float32(0.0)).view(np.uint32).astype(np.uint64)
+    return _mix(bits[..., 0] * _P1 ^ bits[..., 1] * _P2 ^ bits[..., 2] * _P3)  # F×3
+
+
+def _edge_records(tris: np.ndarray) -> np.ndarray:
+    """One uint64 per half-edge: undirected edge hash with the direction in bit 0."""
+    vh = _vertex_hashes(tris)
+    out = []
+    for a, b in ((0, 1), (1, 2), (2, 0)):
+        ha, hb = vh[:, a], vh[:, b]
+        lo, hi = np.minimum(ha, hb), np.maximum(ha, hb)
+        key = _mix(lo * _P3 ^ _mix(hi))
+        out.append((key & ~np.uint64(1)) | (ha < hb).astype(np.uint64))
+    return np.concatenate(out)
+
+
+class _EdgeCounter:
+    """Counts edge records in memory, spilling to bucket files when large."""
+
+    def __init__(self) -> None:
+        self._parts: List[np.ndarray] = []
+        self._held = 0
+        self._spill_dir: Optional[str] = None
+        self._buckets: List[Any] = []
+        self.spilled = False
+
+    def add(self, records: np.ndarray) -> None:
+        self._parts.append(records)
+        self._held += len(records)
+        if self._held >= SPILL_EDGES:
+            self._spill()
+
+    def _spill(self) -> None:
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="timrx-edges-")
+            self._buckets = [
+                open(os.path.join(self._spill_dir, f"{i:02d}.bin"), "wb")
+                for i in range(1 << SPILL_BUCKET_BITS)
+            ]
+            self.spilled = True
+        records = np.concatenate(self._parts)
+        self._parts, self._held = [], 0
+        bucket = (records >> np.uint64(64 - SPILL_BUCKET_BITS)).astype(np.intp)
+        order = np.argsort(bucket, kind="stable")
+        records, bucket = records[order], bucket[order]
+        bounds = np.searchsorted(bucket, np.arange((1 << SPILL_BUCKET_BITS) + 1))
+        for i, fh in enumerate(self._buckets):
+            fh.write(records[bounds[i]:bounds[i + 1]].tobytes())
+
+    @staticmethod
+    def _count(records: np.ndarray, totals: Dict[str, int]) -> None:
+        if not len(records):
+            return
+        keys, inverse, counts = np.unique(records >> np.uint64(1), return_inverse=True, return_counts=True)
+        forward = np.bincount(inverse.reshape(-1), weights=(records & np.uint64(1)).astype(np.float64))
+        totals["edges"] += int(len(keys))
+        totals["boundary"] += int((counts == 1).sum())
+        totals["manifold"] += int((counts == 2).sum())
+        totals["non_manifold"] += int((counts > 2).sum())
+        # A consistently wound shared edge is walked once in each direction.
+        totals["inconsistent"] += int(((counts == 2) & (forward != 1)).sum())
+
+    def finish(self) -> Dict[str, int]:
+        totals = {"edges": 0, "boundary": 0, "manifold": 0, "non_manifold": 0, "inconsistent": 0}
+        try:
+            if self._spill_dir is None:
+                if self._parts:
+                    self._count(np.concatenate(self._parts), totals)
+                return totals
+            if self._parts:
+                self._spill()
+            for fh in self._buckets:
+                fh.close()
+            for fh in self._buckets:
+                self._count(np.fromfile(fh.name, dtype=np.uint64), totals)
+            return totals
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        for fh in self._buckets:
+            try:
+                fh.close()
+            except Exception:
+                pass
+        if self._spill_dir:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+        self._parts = []
+
+
+# ─────────────────────────────────────────────────────────────
+# Scan
+# ─────────────────────────────────────────────────────────────
+def scan(source, file_type: Optional[str] = None, *, edges: bool = True) -> Dict[str, Any]:
+    """
+    Single pass over a binary STL / GLB (path or bytes). Returns raw-unit
+    totals: face_count, bounds, surface_area, signed volume, degenerate
+    faces and, with ``edges``, the edge statistics. Raises StreamUnsupported
+    for inputs that need trimesh.
+    """
+    started = time.monotonic()
+    with _open_buffer(source) as buf:
+        kind, total, chunks = _triangles(buf, file_type)
+
+        lo = np.full(3, np.inf)
+        hi = np.full(3, -np.inf)
+        area = 0.0
+        volume = 0.0
+        degenerate = 0
+        faces = 0
+        chunk_count = 0
+        origin = None
+        counter = _EdgeCounter() if edges else None
+        try:
+            for tris in chunks:
+                if not len(tris):
+                    continue
+                if origin is None:
+                    origin = tris[0, 0].copy()  # keeps the signed volume sum well-conditioned
+                chunk_count += 1
+                faces += len(tris)
+                flat = tris.reshape(-1, 3)
+                lo = np.minimum(lo, flat.min(axis=0))
+                hi = np.maximum(hi, flat.max(axis=0))
+
+                a, b, c = tris[:, 0] - origin, tris[:, 1] - origin, tris[:, 2] - origin
+                cross = np.cross(b - a, c - a)
+                face_area = np.linalg.norm(cross, axis=1) / 2.0
+                area += float(face_area.sum())
+                degenerate += int((face_area < DEGENERATE_AREA).sum())
+                volume += float(np.einsum("ij,ij->i", a, np.cross(b, c)).sum()) / 6.0
+                if counter is not None:
+                    counter.add(_edge_records(tris))
+            edge_stats = counter.finish() if counter is not None else None
+        finally:
+            if counter is not None:
+                counter.close()
+
+    if faces == 0:
+        raise StreamUnsupported("no triangles")
+
+    out: Dict[str, Any] = {
+        "format": kind,
+        "face_count": faces,
+        "declared_faces": total,
+        "bounds": [lo.tolist(), hi.tolist()],
+        "extents": (hi - lo).tolist(),
+        "surface_area": area,
+        "volume": volume,
+        "degenerate_faces": degenerate,
+        "chunks": chunk_count,
+        "chunk_faces": CHUNK_FACES,
+    }
+    if edge_stats is not None:
+        out.update({
+            "edge_count": edge_stats["edges"],
+            "boundary_edges": edge_stats["boundary"],
+            "manifold_edges": edge_stats["manifold"],
+            "non_manifold_edges": edge_stats["non_manifold"],
+            "inconsistent_edges": edge_stats["inconsistent"],
+            "is_watertight": edge_stats["boundary"] == 0 and edge_stats["non_manifold"] == 0,
+            "is_winding_consistent": edge_stats["inconsistent"] == 0,
+            "edges_spilled": bool(counter is not None and counter.spilled),
+        })
+    out["elapsed_seconds"] = round(time.monotonic() - started, 3)
+    return out
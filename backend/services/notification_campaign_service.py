@@ -34,9 +34,10 @@ from typing import Optional, Dict, Any, List
 from datetime import datetime, timezone
 
 from backend.db import (
-    fetch_one, fetch_all, transaction, query_one, query_all, execute,
+    background_work, fetch_one, fetch_all, transaction, query_one, query_all, execute,
     Tables,
 )
+from backend.services import admission_control
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +48,7 @@ logger = logging.getLogger(__name__)
 _BILLING = "timrx_billing"
 T_CAMPAIGNS = f"{_BILLING}.notification_campaigns"
 T_DELIVERIES = f"{_BILLING}.notification_deliveries"
+T_DELIVERIES_ALL = f"{_BILLING}.notification_deliveries_all"  # hot + archive (migration 092)
 T_NOTIFICATIONS = f"{_BILLING}.notifications"
 T_IDENTITIES = f"{_BILLING}.identities"
 T_WALLETS = f"{_BILLING}.wallets"
@@ -54,6 +56,9 @@ T_SUBSCRIPTIONS = f"{_BILLING}.subscriptions"
 T_PURCHASES = f"{_BILLING}.purchases"
 T_JOBS = f"{_BILLING}.jobs"
 
+# Recipients delivered between admission checks while publishing.
+PUBLISH_PACE_EVERY = 50
+
 
 # ============================================================================
 # Campaign fields for insert/update
@@ -241,7 +246,7 @@ class NotificationCampaignService:
                 COUNT(*) FILTER (WHERE dismissed_at IS NOT NULL) AS dismiss_count,
                 COALESCE(SUM(credits_granted_general), 0) AS total_general_credits,
                 COALESCE(SUM(credits_granted_video), 0) AS total_video_credits
-            FROM {T_DELIVERIES}
+            FROM {T_DELIVERIES_ALL}
             WHERE campaign_id = %s
             """,
             (campaign_id,),
@@ -284,7 +289,7 @@ class NotificationCampaignService:
                     COUNT(*) FILTER (WHERE read_at IS NOT NULL) AS read_count,
                     COUNT(*) FILTER (WHERE clicked_at IS NOT NULL) AS click_count,
                     COALESCE(SUM(credits_granted_general), 0) AS total_general
-                FROM {T_DELIVERIES}
+                FROM {T_DELIVERIES_ALL}
                 WHERE campaign_id = c.id
             ) d ON TRUE
             {where}
@@ -400,6 +405,7 @@ class NotificationCampaignService:
     # ─── Campaign Publishing ──────────────────────────────────────────────
 
     @staticmethod
+    @background_work("campaign_publish")
     def publish_campaign(campaign_id: str) -> Dict[str, Any]:
         """
         Publish a campaign: resolve audience, create deliveries + notifications.
@@ -410,8 +416,15 @@ class NotificationCampaignService:
         Credit grants (if grant_mode='on_delivery') are applied atomically
         per user with stable ledger refs to prevent double-grants.
 
+        Delivery is paced by admission control. If pool pressure does not
+        clear within ADMISSION_MAX_WAIT_S the run stops early, the campaign
+        stays 'publishing' and publishing it again resumes where it left off.
+        Nothing republishes it automatically; the admin route reports the
+        deferral as a 503 so the admin knows to.
+
         Returns:
             Summary with counts of delivered, skipped, failed, credits_granted
+            (plus deferred/remaining when the run stopped early)
         """
         with transaction("campaign_publish_lock") as cur:
             cur.execute(
@@ -444,8 +457,14 @@ class NotificationCampaignService:
         skipped = 0
         failed = 0
         credits_granted_total = 0
-
-        for identity_id in identity_ids:
+        remaining = 0
+
+        for index, identity_id in enumerate(identity_ids):
+            if index and index % PUBLISH_PACE_EVERY == 0 and not admission_control.admit(
+                "campaign_publish", max_wait_s=admission_control.MAX_WAIT_S,
+            ):
+                remaining = len(identity_ids) - index
+                break
             try:
                 result = _deliver_to_user(campaign, identity_id)
                 if result == "delivered":
@@ -462,6 +481,22 @@ class NotificationCampaignService:
                 )
                 failed += 1
 
+        if remaining:
+            logger.warning(
+                "[CAMPAIGN] Publish deferred under load: id=%s delivered=%d remaining=%d",
+                campaign_id, delivered, remaining,
+            )
+            return {
+                "campaign_id": str(campaign_id),
+                "delivered": delivered,
+                "skipped": skipped,
+                "failed": failed,
+                "credits_granted": credits_granted_total,
+                "total_targeted": len(identity_ids),
+                "deferred": True,
+                "remaining": remaining,
+            }
+
         # Mark as published
         with transaction("campaign_mark_published") as cur:
             cur.execute(
@@ -647,7 +682,7 @@ class NotificationCampaignService:
                 COALESCE(SUM(credits_granted_video), 0) AS total_video_credits,
                 MIN(delivered_at) AS first_delivered,
                 MAX(delivered_at) AS last_delivered
-            FROM {T_DELIVERIES}
+            FROM {T_DELIVERIES_ALL}
             WHERE campaign_id = %s
             """,
             (campaign_id,),
@@ -0,0 +1,301 @@
+"""
+Build-orientation search for print analysis and pricing.
+
+Print analysis used to score overhangs for the fixed +Y build direction and
+try two alternatives. This module scores a few hundred candidate "up"
+directions in one vectorised pass over face normals, areas and vertex
+heights:
+
+- candidates are the current +Y, the six axis directions, the resting
+  directions of the convex hull's stable faces (the centre of mass projects
+  inside the face, so the part sits flat on it), and a Fibonacci-sphere
+  sample to cover everything in between;
+- for each candidate, faces whose normal is within (90 − threshold)° of
+  straight down overhang (same rule as mesh_feature_store.overhang_mask),
+  support is estimated as a column from each overhang down to the bed, and
+  the footprint is the area of faces lying on the bed;
+- candidates with enough bed contact rank first, then by support volume
+  plus a small penalty for tall builds; the top-k come back as plain dicts.
+
+Large meshes are scored on a seeded random subset of faces (sums are scaled
+back up), and the search stops between candidate chunks once its time
+budget is spent; the axis candidates are always scored first.
+
+Environment:
+    PRINT_ORIENTATION_CANDIDATES     default 200 Fibonacci samples
+    PRINT_ORIENTATION_MAX_FACES      default 40000 faces scored
+    PRINT_ORIENTATION_TIME_BUDGET_SECONDS  default 3
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int, minimum: int | None = None) -> int:
+    raw = os.getenv(name)
+    if raw is None or str(raw).strip() == "":
+        return default
+    try:
+        value = int(str(raw).strip())
+    except (TypeError, ValueError):
+        logger.warning("[ORIENTATION] Invalid %s=%r; using default %s", name, raw, default)
+        return default
+    if minimum is not None and value < minimum:
+        return minimum
+    return value
+
+
+FIBONACCI_CANDIDATES = _env_int("PRINT_ORIENTATION_CANDIDATES", 200, minimum=0)
+MAX_SCORED_FACES = _env_int("PRINT_ORIENTATION_MAX_FACES", 40000, minimum=1000)
+TIME_BUDGET_SECONDS = float(os.getenv("PRINT_ORIENTATION_TIME_BUDGET_SECONDS", "3") or "3")
+
+CANDIDATE_CHUNK = 32
+AXES = {
+    "+y": (0.0, 1.0, 0.0),
+    "-y": (0.0, -1.0, 0.0),
+    "+z": (0.0, 0.0, 1.0),
+    "-z": (0.0, 0.0, -1.0),
+    "+x": (1.0, 0.0, 0.0),
+    "-x": (-1.0, 0.0, 0.0),
+}
+# Ranking: cm³ of support-equivalent per mm of build height. Orientations
+# with less bed contact than MIN_FOOTPRINT_CM2 (or 2% of the surface area on
+# small parts) are balanced on an edge or a point and rank last.
+HEIGHT_WEIGHT = 0.02
+MIN_FOOTPRINT_CM2 = 1.0
+MIN_FOOTPRINT_FRACTION = 0.02
+
+
+def fibonacci_directions(n: int):
+    """``n`` near-uniform unit vectors on the sphere."""
+    import numpy as np
+
+    if n <= 0:
+        return np.zeros((0, 3))
+    i = np.arange(n) + 0.5
+    phi = np.arccos(1.0 - 2.0 * i / n)
+    theta = np.pi * (1.0 + 5 ** 0.5) * i
+    return np.column_stack([np.cos(theta) * np.sin(phi), np.cos(phi), np.sin(theta) * np.sin(phi)])
+
+
+def stable_directions(mesh, max_count: int = 24):
+    """
+    Up directions for which the part rests on a convex-hull face: the centre
+    of mass, projected along the face normal, lands inside the face. Largest
+    resting faces first.
+    """
+    import numpy as np
+
+    try:
+        from scipy.spatial import ConvexHull
+
+        points = np.asarray(mesh.vertices, dtype=float)
+        if len(points) > MAX_SCORED_FACES:
+            # Hull of a vertex sample: resting faces stay close, and qhull on
+            # a dense round mesh is otherwise the slowest step here.
+            keep = np.random.default_rng(5).choice(len(points), MAX_SCORED_FACES, replace=False)
+            points = points[keep]
+        hull = ConvexHull(points)
+        com = mesh.center_mass if mesh.is_watertight else mesh.centroid
+    except Exception as exc:
+        logger.info("[ORIENTATION] convex hull unavailable: %s", exc)
+        return np.zeros((0, 3))
+
+    tris = points[hull.simplices]
+    normals = hull.equations[:, :3]  # outward unit normals
+    hull_areas = np.linalg.norm(np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0]), axis=1) / 2.0
+    # Project the centre of mass onto each face plane, then barycentric test.
+    offset = np.einsum("ij,ij->i", com - tris[:, 0], normals)
+    projected = com - offset[:, None] * normals
+    a, b, c = tris[:, 0], tris[:, 1], tris[:, 2]
+    v0, v1, v2 = b - a, c - a, projected - a
+    d00 = np.einsum("ij,ij->i", v0, v0)
+    d01 = np.einsum("ij,ij->i", v0, v1)
+    d11 = np.einsum("ij,ij->i", v1, v1)
+    d20 = np.einsum("ij,ij->i", v2, v0)
+    d21 = np.einsum("ij,ij->i", v2, v1)
+    denom = d00 * d11 - d01 * d01
+    with np.errstate(divide="ignore", invalid="ignore"):
+        v = (d11 * d20 - d01 * d21) / denom
+        w = (d00 * d21 - d01 * d20) / denom
+    tol = -1e-6
+    inside = (v >= tol) & (w >= tol) & (v + w <= 1 - tol) & np.isfinite(v)
+
+    # Coplanar hull triangles share a resting direction: keep one per plane,
+    # weighted by the plane's total area.
+    ups = -normals
+    keys = np.round(ups, 4)
+    _, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    plane_area = np.bincount(inverse, weights=hull_areas)
+    chosen: Dict[int, int] = {}
+    for face in np.flatnonzero(inside):
+        chosen.setdefault(int(inverse[face]), int(face))
+    if not chosen:
+        return np.zeros((0, 3))
+    order = sorted(chosen, key=lambda plane: -plane_area[plane])[:max_count]
+    return ups[[chosen[plane] for plane in order]]
+
+
+def _label(up) -> str:
+    for name, axis in AXES.items():
+        if abs(float(up[0]) - axis[0]) < 1e-6 and abs(float(up[1]) - axis[1]) < 1e-6 and abs(float(up[2]) - axis[2]) < 1e-6:
+            return name
+    return "custom"
+
+
+def _rotation_to_y(up) -> Dict[str, Any]:
+    """Axis-angle rotation that turns ``up`` into +Y (the build direction)."""
+    import numpy as np
+
+    up = np.asarray(up, dtype=float)
+    target = np.array([0.0, 1.0, 0.0])
+    angle = float(np.degrees(np.arccos(np.clip(up @ target, -1.0, 1.0))))
+    axis = np.cross(up, target)
+    norm = float(np.linalg.norm(axis))
+    if norm < 1e-9:
+        axis = np.array([1.0, 0.0, 0.0])  # 0° or 180°: any horizontal axis
+    else:
+        axis = axis / norm
+    return {"axis": [round(float(v), 4) for v in axis], "angle_deg": round(angle, 1)}
+
+
+def describe(entry: Dict[str, Any]) -> str:
+    """Human-readable rotation for an orientation entry, e.g. "rotate 90° around X"."""
+    rotation = entry.get("rotation") or {}
+    angle = float(rotation.get("angle_deg") or 0.0)
+    if angle < 0.5:
+        return "current orientation"
+    axis = [float(v) for v in rotation.get("axis") or (1.0, 0.0, 0.0)]
+    for name, unit in (("X", (1.0, 0.0, 0.0)), ("Y", (0.0, 1.0, 0.0)), ("Z", (0.0, 0.0, 1.0))):
+        if max(abs(abs(a) - abs(b)) for a, b in zip(axis, unit)) < 1e-3:
+            return f"rotate {angle:.0f}° around {name}"
+    return f"rotate {angle:.0f}° around axis ({axis[0]:.2f}, {axis[1]:.2f}, {axis[2]:.2f})"
+
+
+def _score(mesh, ups, *, threshold_deg: float, mm_multiplier: float, face_index=None):
+    """Per-candidate sums for ``ups`` (N×3). Returns a dict of length-N arrays."""
+    import numpy as np
+
+    normals = mesh.face_normals
+    areas = mesh.area_faces
+    faces = mesh.faces
+    scale_up = 1.0
+    if face_index is not None:
+        scale_up = float(areas.sum()) / max(float(areas[face_index].sum()), 1e-12)
+        normals, areas, faces = normals[face_index], areas[face_index], faces[face_index]
+
+    vertex_heights = mesh.vertices @ ups.T                 # V×N
+    bed = vertex_heights.min(axis=0)
+    extent = vertex_heights.max(axis=0) - bed
+    tol = np.maximum(extent * 1e-4, 1e-9)
+
+    face_heights = vertex_heights[faces]                   # F×3×N
+    centroid_height = face_heights.mean(axis=1) - bed      # F×N
+    on_bed = (face_heights.max(axis=1) <= bed + tol)       # F×N
+
+    down = -(normals @ ups.T)                              # F×N
+    overhang = (down > np.sin(np.radians(threshold_deg))) & ~on_bed
+    projected = np.where(overhang, areas[:, None] * down, 0.0)
+
+    mm2 = mm_multiplier ** 2
+    return {
+        "overhang_faces": overhang.sum(axis=0) * scale_up,
+        "overhang_area_cm2": (areas[:, None] * overhang).sum(axis=0) * scale_up * mm2 / 100.0,
+        "support_area_cm2": projected.sum(axis=0) * scale_up * mm2 / 100.0,
+        "support_volume_cm3": (projected * centroid_height).sum(axis=0) * scale_up * mm2 * mm_multiplier / 1000.0,
+        "footprint_cm2": (areas[:, None] * on_bed).sum(axis=0) * scale_up * mm2 / 100.0,
+        "height_mm": extent * mm_multiplier,
+    }
+
+
+def rank_orientations(
+    mesh,
+    *,
+    threshold_deg: float = 45.0,
+    mm_multiplier: float = 1.0,
+    top_k: int = 3,
+    fibonacci_count: Optional[int] = None,
+    time_budget_seconds: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Score candidate build directions for ``mesh`` and return the best
+    ``top_k`` (plus the current +Y orientation for comparison). Each entry
+    has ``up``, ``label`` (axis name or "custom"), ``rotation`` to apply,
+    ``overhang_pct`` (of faces), overhang / support / footprint areas in cm²,
+    ``support_volume_cm3``, ``height_mm`` and whether it is ``stable`` (has
+    enough bed contact to print without being propped up).
+    """
+    import numpy as np
+
+    started = time.monotonic()
+    budget = TIME_BUDGET_SECONDS if time_budget_seconds is None else time_budget_seconds
+    face_count = int(len(mesh.faces))
+    if face_count == 0:
+        return {"current": None, "best": [], "candidates_scored": 0, "truncated": False}
+
+    stable = stable_directions(mesh)
+    fib = fibonacci_directions(FIBONACCI_CANDIDATES if fibonacci_count is None else fibonacci_count)
+    ups = np.vstack([np.array(list(AXES.values())), stable, fib])
+
+    face_index = None
+    if face_count > MAX_SCORED_FACES:
+        face_index = np.random.default_rng(5).choice(face_count, MAX_SCORED_FACES, replace=False)
+
+    parts = []
+    scored = 0
+    for start in range(0, len(ups), CANDIDATE_CHUNK):
+        if start >= len(AXES) and time.monotonic() - started > budget:
+            break
+        chunk = ups[start:start + CANDIDATE_CHUNK]
+        parts.append(_score(mesh, chunk, threshold_deg=threshold_deg,
+                            mm_multiplier=mm_multiplier, face_index=face_index))
+        scored += len(chunk)
+    scores = {key: np.concatenate([p[key] for p in parts]) for key in parts[0]}
+
+    surface_cm2 = float(mesh.area) * mm_multiplier ** 2 / 100.0
+    is_stable = scores["footprint_cm2"] >= min(MIN_FOOTPRINT_CM2, MIN_FOOTPRINT_FRACTION * surface_cm2)
+    cost = scores["support_volume_cm3"] + HEIGHT_WEIGHT * scores["height_mm"]
+
+    def entry(i: int) -> Dict[str, Any]:
+        up = ups[i]
+        return {
+            "up": [round(float(v), 4) for v in up],
+            "label": _label(up),
+            "rotation": _rotation_to_y(up),
+            "overhang_pct": round(float(scores["overhang_faces"][i]) / face_count * 100, 1),
+            "overhang_area_cm2": round(float(scores["overhang_area_cm2"][i]), 2),
+            "support_area_cm2": round(float(scores["support_area_cm2"][i]), 2),
+            "support_volume_cm3": round(float(scores["support_volume_cm3"][i]), 3),
+            "footprint_cm2": round(float(scores["footprint_cm2"][i]), 2),
+            "height_mm": round(float(scores["height_mm"][i]), 2),
+            "stable": bool(is_stable[i]),
+        }
+
+    best: List[Dict[str, Any]] = []
+    seen = []
+    for i in np.lexsort((cost, ~is_stable)):
+        # Skip near-duplicates (within ~5°) of an orientation already chosen.
+        if any(float(ups[i] @ ups[j]) > 0.996 for j in seen):
+            continue
+        seen.append(int(i))
+        best.append(entry(int(i)))
+        if len(best) >= top_k:
+            break
+
+    return {
+        "current": entry(0),
+        "best": best,
+        "threshold_deg": threshold_deg,
+        "candidates_scored": scored,
+        "candidates_total": int(len(ups)),
+        "faces_scored": int(len(face_index)) if face_index is not None else face_count,
+        "truncated": scored < len(ups),
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+    }
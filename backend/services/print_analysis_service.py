@@ -32,6 +32,16 @@ def _env_int(name: str, default: int, minimum: int | None = None) -> int:
     return value
 
 
+# Feature keys a streaming scan measures over the whole file; they replace
+# the largest-part values when a big scene had to be loaded partially.
+_WHOLE_MODEL_KEYS = (
+    "face_count", "bounds", "extents", "detected_unit", "mm_multiplier", "extents_mm",
+    "is_watertight", "is_winding_consistent", "boundary_edges", "non_manifold_edges",
+    "component_count", "degenerate_faces", "volume", "volume_cm3",
+    "surface_area", "surface_area_cm2",
+)
+
+
 class _SkipWallThickness(Exception):
     """Sentinel to skip wall thickness analysis without failing the whole check."""
     pass
@@ -56,7 +66,15 @@ def _set_analysis_child_limits(memory_mb: int) -> None:
         logger.warning("[PRINT_ANALYSIS] Could not apply child memory limit: %s", exc)
 
 
-def _analysis_worker(conn, file_path: str, file_type: str | None, printer_type: str, memory_mb: int) -> None:
+def _analysis_worker(
+    conn,
+    file_path: str,
+    file_type: str | None,
+    printer_type: str,
+    memory_mb: int,
+    features: Dict[str, Any] | None = None,
+    lod_path: str | None = None,
+) -> None:
     """Run trimesh analysis in a disposable child process."""
     try:
         # Keep native numerical libraries from multiplying memory usage.
@@ -66,7 +84,9 @@ def _analysis_worker(conn, file_path: str, file_type: str | None, printer_type:
         os.environ.setdefault("NUMEXPR_NUM_THREADS", "1")
 
         _set_analysis_child_limits(memory_mb)
-        result = PrintAnalysisService.analyze(file_path, file_type=file_type, printer_type=printer_type)
+        result = PrintAnalysisService.analyze(
+            file_path, file_type=file_type, printer_type=printer_type, features=features, lod_path=lod_path,
+        )
         conn.send({"ok": True, "result": result})
     except MemoryError:
         conn.send({
@@ -97,9 +117,14 @@ class PrintAnalysisService:
 
     MAX_FACE_COUNT = _env_int("PRINT_ANALYSIS_MAX_FACES", 200000, minimum=1000)
     SCENE_CONCAT_FACE_LIMIT = _env_int("PRINT_ANALYSIS_SCENE_CONCAT_FACE_LIMIT", 120000, minimum=1000)
+    # Binary STL/GLB files above this many faces are never loaded as a mesh:
+    # whole-model checks come from mesh_stream_reader's chunked scan.
+    STREAM_FACE_LIMIT = _env_int("PRINT_ANALYSIS_STREAM_FACES", 1000000, minimum=1000)
+    # Above this many faces wall thickness runs on a decimated proxy mesh.
     WALL_THICKNESS_FACE_LIMIT = _env_int("PRINT_ANALYSIS_WALL_FACE_LIMIT", 25000, minimum=1000)
-    WALL_THICKNESS_MAX_SAMPLES = _env_int("PRINT_ANALYSIS_WALL_MAX_SAMPLES", 300, minimum=10)
-    WALL_THICKNESS_MIN_SAMPLES = _env_int("PRINT_ANALYSIS_WALL_MIN_SAMPLES", 80, minimum=10)
+    WALL_THICKNESS_MAX_SAMPLES = _env_int("PRINT_ANALYSIS_WALL_MAX_SAMPLES", 800, minimum=10)
+    WALL_THICKNESS_MIN_SAMPLES = _env_int("PRINT_ANALYSIS_WALL_MIN_SAMPLES", 200, minimum=10)
+    WALL_THICKNESS_MIN_FREE_MB = _env_int("PRINT_ANALYSIS_WALL_MIN_FREE_MB", 300, minimum=0)
     MIN_WALL_THICKNESS_MM = 0.8  # Minimum for FDM printing
 
     BASE_ALLOWED_MODEL_DOMAINS = {
@@ -202,10 +227,30 @@ class PrintAnalysisService:
             return max(meshes, key=lambda mesh: int(len(mesh.faces)))
 
     @staticmethod
-    def analyze(file_path: str, file_type: str | None = None, printer_type: str = "fdm") -> Dict[str, Any]:
+    def analyze(
+        file_path: str,
+        file_type: str | None = None,
+        printer_type: str = "fdm",
+        features: Dict[str, Any] | None = None,
+        lod_path: str | None = None,
+    ) -> Dict[str, Any]:
         """
         Analyze a mesh file for 3D printing readiness.
 
+        ``features`` are the stored mesh_feature_store features for this file,
+        when the caller has them. Whole-model geometry (watertightness, bounds,
+        volume, components, overhangs) is read from them instead of recomputed;
+        the loaded mesh is still used for wall thickness. Without them the
+        same features are computed from the loaded mesh.
+
+        Binary STL/GLB files above STREAM_FACE_LIMIT faces are not loaded at
+        all: whole-model features come from mesh_stream_reader.
+
+        Above MAX_FACE_COUNT faces the mesh-based checks (wall thickness,
+        overhangs, orientation) run on a mesh_lod_service LOD of the whole
+        model. ``lod_path`` is where the caller put a cached LOD, or where a
+        newly built one is written for the caller to store.
+
         Returns:
             {
                 "score": 0-100,
@@ -215,11 +260,24 @@ class PrintAnalysisService:
                 "suggestions": ["..."],
             }
         """
-        import numpy as np
-        import trimesh
+        from backend.services import mesh_lod_service, mesh_stream_reader
+        from backend.services.mesh_feature_store import compute_features, features_from_scan, overhang_stats
+
+        mesh = None
+        features_source = "store" if features else "analysis"
+        streamed_faces = mesh_stream_reader.face_count(file_path, file_type)
+        stream_only = (streamed_faces or 0) > PrintAnalysisService.STREAM_FACE_LIMIT
+        if stream_only and not features:
+            try:
+                features = features_from_scan(mesh_stream_reader.scan(file_path, file_type))
+                features_source = "stream"
+            except Exception as exc:
+                logger.warning("[PRINT_ANALYSIS] Streaming scan failed, loading the mesh: %s", exc)
+                stream_only = False
 
         try:
-            mesh = PrintAnalysisService._load_mesh(file_path, file_type=file_type)
+            if not stream_only:
+                mesh = PrintAnalysisService._load_mesh(file_path, file_type=file_type)
         except Exception as exc:
             logger.warning("[PRINT_ANALYSIS] Failed to parse mesh %s: %s", file_path, exc)
             return PrintAnalysisService._failed_result(
@@ -244,19 +302,82 @@ class PrintAnalysisService:
         score = 100
 
         try:
-            if mesh.metadata.get("timrx_analysis_limited_to_largest_part"):
+            limited = mesh is not None and bool(mesh.metadata.get("timrx_analysis_limited_to_largest_part"))
+            if not features:
+                features = compute_features(mesh, partial=limited)
+                if limited and streamed_faces:
+                    # Whole-model geometry from a streaming scan; the loaded
+                    # largest part still drives the mesh-based checks.
+                    try:
+                        whole = features_from_scan(mesh_stream_reader.scan(file_path, file_type))
+                        features.update({key: whole[key] for key in _WHOLE_MODEL_KEYS})
+                        checks["whole_model_source"] = "stream"
+                    except Exception as scan_exc:
+                        logger.warning("[PRINT_ANALYSIS] Whole-model streaming scan failed: %s", scan_exc)
+            checks["features_source"] = features_source
+            # Stored features cover the whole model even when the mesh below
+            # had to be limited to its largest part.
+            limited = limited and bool(features.get("partial"))
+
+            # A LOD always covers the whole model: it is clustered from the
+            # stream, or decimated from a mesh that wasn't cut to one part.
+            lod_target = mesh_lod_service.level_for(
+                int(features["face_count"]), PrintAnalysisService.MAX_FACE_COUNT,
+            )
+            if lod_target and (streamed_faces or not limited):
+                lod, lod_info = mesh_lod_service.obtain(
+                    lod_path,
+                    lod_target,
+                    source=file_path if streamed_faces else None,
+                    file_type=file_type,
+                    mesh=None if limited else mesh,
+                )
+                if lod is not None:
+                    lod_info["source_faces"] = int(features["face_count"])
+                    checks["lod"] = lod_info
+                    mesh = lod
+                    limited = False
+
+            if stream_only:
+                checks["analysis_streamed"] = True
+            if "lod" in checks:
+                suggestions.append(
+                    f"This model has {int(features['face_count']):,} faces, so wall thickness, overhang "
+                    f"and orientation were checked on a {checks['lod']['faces']:,}-face simplified copy; "
+                    "size, watertightness and volume cover the full-resolution model."
+                )
+            elif mesh is None:
+                suggestions.append(
+                    f"This model has {int(features['face_count']):,} faces, so the print check read it "
+                    "as a stream: size, watertightness, volume and face checks cover the whole model, "
+                    "but wall thickness, overhang and orientation checks were skipped. "
+                    "Remesh to a lower polygon count for the full check."
+                )
+
+            if limited:
                 checks["analysis_limited_to_largest_part"] = True
                 checks["scene_part_count"] = int(mesh.metadata.get("timrx_scene_part_count") or 0)
                 checks["scene_face_count"] = int(mesh.metadata.get("timrx_scene_face_count") or 0)
-                suggestions.append(
-                    "This file contains multiple high-poly mesh parts. To keep the server stable, "
-                    "the print check analyzed the largest part. Remesh or export as a single STL "
-                    "for complete whole-model diagnostics."
-                )
+                if checks.get("whole_model_source"):
+                    suggestions.append(
+                        "This file contains multiple high-poly mesh parts. Size, watertightness and "
+                        "volume cover the whole model; wall thickness, overhangs and orientation were "
+                        "checked on the largest part. Remesh or export as a single STL for complete "
+                        "diagnostics."
+                    )
+                else:
+                    suggestions.append(
+                        "This file contains multiple high-poly mesh parts. To keep the server stable, "
+                        "the print check analyzed the largest part. Remesh or export as a single STL "
+                        "for complete whole-model diagnostics."
+                    )
 
             # 1. Manifold check (watertight)
-            checks["is_manifold"] = bool(mesh.is_watertight)
-            if not mesh.is_watertight:
+            is_watertight = bool(features["is_watertight"])
+            checks["is_manifold"] = is_watertight
+            if features.get("component_count") is not None:
+                checks["component_count"] = int(features["component_count"])
+            if not is_watertight:
                 score -= 30
                 issues.append("Mesh is not watertight (has holes or open edges)")
                 suggestions.append(
@@ -267,16 +388,16 @@ class PrintAnalysisService:
                 )
 
             # 2. Face count
-            checks["face_count"] = int(len(mesh.faces))
-            checks["face_count_ok"] = len(mesh.faces) <= PrintAnalysisService.MAX_FACE_COUNT
+            face_count = int(features["face_count"])
+            checks["face_count"] = face_count
+            checks["face_count_ok"] = face_count <= PrintAnalysisService.MAX_FACE_COUNT
             if not checks["face_count_ok"]:
                 score -= 10
-                issues.append(f"High polygon count ({len(mesh.faces):,} faces) may slow slicing software")
+                issues.append(f"High polygon count ({face_count:,} faces) may slow slicing software")
                 suggestions.append("Use Remesh to reduce polygon count")
 
             # 3. Degenerate faces
-            areas = mesh.area_faces
-            degenerate_count = int(np.sum(areas < 1e-10))
+            degenerate_count = int(features["degenerate_faces"])
             checks["has_degenerate_faces"] = degenerate_count > 0
             checks["degenerate_face_count"] = degenerate_count
             if degenerate_count > 0:
@@ -284,33 +405,22 @@ class PrintAnalysisService:
                 issues.append(f"{degenerate_count} degenerate (zero-area) faces found")
 
             # 4. Volume check (positive = proper normals)
-            if mesh.is_watertight:
-                checks["is_volume_positive"] = bool(mesh.volume > 0)
-                if mesh.volume <= 0:
+            volume = features.get("volume")
+            if is_watertight and volume is not None:
+                checks["is_volume_positive"] = bool(volume > 0)
+                if volume <= 0:
                     score -= 20
                     issues.append("Mesh normals may be inverted (negative volume)")
                     suggestions.append("Flip normals before printing")
             else:
                 checks["is_volume_positive"] = None
 
-            # 5. Bounding box + unit detection
-            extents = mesh.bounding_box.extents
-            raw_extents = [round(float(x), 4) for x in extents]
+            # 5. Bounding box + unit detection (see mesh_feature_store.detect_unit)
+            raw_extents = [round(float(x), 4) for x in features["extents"]]
             max_extent = max(raw_extents)
-
-            # Detect likely unit system
-            # glTF/GLB standard: meters. Meshy models: normalized -1 to 1 range.
-            detected_unit = "mm"
-            mm_multiplier = 1.0
-
-            if max_extent > 0 and max_extent < 10:
-                detected_unit = "meters"
-                mm_multiplier = 1000.0
-            elif max_extent >= 10 and max_extent < 100:
-                detected_unit = "mm_or_cm"
-                mm_multiplier = 1.0  # Assume mm unless user says otherwise
-
-            extents_mm = [round(float(x) * mm_multiplier, 2) for x in extents]
+            detected_unit = features["detected_unit"]
+            mm_multiplier = float(features["mm_multiplier"])
+            extents_mm = list(features["extents_mm"])
             checks["bounding_box_raw"] = raw_extents
             checks["bounding_box_mm"] = extents_mm
             checks["detected_unit"] = detected_unit
@@ -322,16 +432,21 @@ class PrintAnalysisService:
                     f"Converted to mm for display: {extents_mm[0]} × {extents_mm[1]} × {extents_mm[2]} mm"
                 )
 
-            # 6. Volume estimate
-            if mesh.is_watertight and mesh.volume > 0:
-                checks["estimated_volume_cm3"] = round(float(mesh.volume / 1000), 2)
+            # 6. Volume estimate (unit-converted, like the bounding box)
+            if is_watertight and volume is not None and volume > 0:
+                checks["estimated_volume_cm3"] = round(float(features["volume_cm3"]), 2)
             else:
                 checks["estimated_volume_cm3"] = None
 
-            # 7. Wall thickness analysis (ray-based sampling)
+            # 7. Wall thickness analysis (chunked ray sampling, decimated proxy on high-poly meshes)
             try:
+                if mesh is None:
+                    checks["min_wall_thickness_mm"] = None
+                    checks["wall_thickness_ok"] = None
+                    raise _SkipWallThickness()
+
                 available_mb = PrintAnalysisService._get_available_memory_mb()
-                if available_mb is not None and available_mb < 700:
+                if available_mb is not None and available_mb < PrintAnalysisService.WALL_THICKNESS_MIN_FREE_MB:
                     logger.info(
                         "[PRINT_ANALYSIS] Skipping wall thickness — low available memory: %.0fMB",
                         available_mb,
@@ -344,92 +459,55 @@ class PrintAnalysisService:
                     )
                     raise _SkipWallThickness()
 
-                if len(mesh.faces) > PrintAnalysisService.WALL_THICKNESS_FACE_LIMIT:
-                    logger.info(
-                        "[PRINT_ANALYSIS] Skipping wall thickness — %d faces exceeds %d limit",
-                        len(mesh.faces), PrintAnalysisService.WALL_THICKNESS_FACE_LIMIT,
-                    )
-                    checks["min_wall_thickness_mm"] = None
-                    checks["wall_thickness_ok"] = None
-                    suggestions.append(
-                        "Wall thickness analysis was skipped because the model has too many "
-                        "polygons. Use Remesh to reduce polygon count, then re-run the print check."
-                    )
-                    raise _SkipWallThickness()
+                from backend.services.wall_thickness_service import measure_wall_thickness
 
-                # Sample surface points for thickness measurement
                 sample_count = min(
                     PrintAnalysisService.WALL_THICKNESS_MAX_SAMPLES,
                     max(PrintAnalysisService.WALL_THICKNESS_MIN_SAMPLES, len(mesh.faces) // 50),
                 )
-                points, face_indices = trimesh.sample.sample_surface(mesh, sample_count)
+                thickness = measure_wall_thickness(
+                    mesh,
+                    min_wall_mm=min_wall,
+                    mm_multiplier=mm_multiplier,
+                    sample_count=sample_count,
+                    proxy_face_limit=PrintAnalysisService.WALL_THICKNESS_FACE_LIMIT,
+                )
 
-                # Compute inward normals at sample points
-                face_normals = mesh.face_normals[face_indices]
-                inward_normals = -face_normals  # Point inward
+                if thickness is not None:
+                    min_thickness = thickness["min_mm"]
+                    pct_below_min = thickness["pct_below_min"]
 
-                # Cast rays inward from surface to find opposing wall
-                ray_origins = points + inward_normals * 0.001  # Offset slightly to avoid self-intersection
+                    checks["min_wall_thickness_mm"] = min_thickness
+                    checks["avg_wall_thickness_mm"] = thickness["avg_mm"]
+                    checks["pct_below_min_thickness"] = pct_below_min
+                    checks["wall_thickness_ok"] = pct_below_min < 5.0  # Less than 5% of surface below minimum
+                    checks["wall_thickness"] = thickness
 
-                # Try the default ray engine (rtree-backed), fall back to
-                # the slower embree-less engine that ships with trimesh.
-                try:
-                    locations, index_ray, index_tri = mesh.ray.intersects_location(
-                        ray_origins=ray_origins,
-                        ray_directions=inward_normals,
-                    )
-                except (ImportError, ModuleNotFoundError) as ray_dep_err:
-                    logger.info(
-                        "[PRINT_ANALYSIS] Default ray engine unavailable (%s), "
-                        "falling back to triangle-based intersection",
-                        ray_dep_err,
-                    )
-                    from trimesh.ray.ray_triangle import RayMeshIntersector
-                    ray_engine = RayMeshIntersector(mesh)
-                    locations, index_ray, index_tri = ray_engine.intersects_location(
-                        ray_origins=ray_origins,
-                        ray_directions=inward_normals,
-                    )
-
-                if len(locations) > 0:
-                    # Compute distances from origin points to hit points
-                    hit_distances = np.linalg.norm(
-                        locations - ray_origins[index_ray], axis=1
-                    )
-                    # Filter out very long rays (> 100mm = likely through-shots, not walls)
-                    valid_mask = hit_distances < 100.0
-                    if np.any(valid_mask):
-                        valid_distances = hit_distances[valid_mask]
-                        min_thickness = float(np.min(valid_distances))
-                        avg_thickness = float(np.mean(valid_distances))
-                        pct_below_min = float(np.sum(valid_distances < min_wall) / len(valid_distances) * 100)
-
-                        checks["min_wall_thickness_mm"] = round(min_thickness, 3)
-                        checks["avg_wall_thickness_mm"] = round(avg_thickness, 3)
-                        checks["pct_below_min_thickness"] = round(pct_below_min, 1)
-                        checks["wall_thickness_ok"] = pct_below_min < 5.0  # Less than 5% of surface below minimum
-
-                        if pct_below_min >= 20.0:
-                            score -= 15
-                            issues.append(
-                                f"Significant thin walls detected: {pct_below_min:.0f}% of surface "
-                                f"is below {min_wall}mm minimum "
-                                f"(thinnest: {min_thickness:.2f}mm)"
-                            )
-                            suggestions.append(
-                                "Thicken thin walls in a 3D editor before printing, "
-                                "or increase infill to 100% for very thin sections"
-                            )
-                        elif pct_below_min >= 5.0:
-                            score -= 5
-                            issues.append(
-                                f"Some thin walls detected: {pct_below_min:.0f}% of surface "
-                                f"below {min_wall}mm "
-                                f"(thinnest: {min_thickness:.2f}mm)"
-                            )
-                    else:
-                        checks["min_wall_thickness_mm"] = None
-                        checks["wall_thickness_ok"] = None
+                    thinnest = thickness["regions"][0]
+                    where = f", mostly {thinnest['region']}" if thinnest["pct_below_min"] > pct_below_min else ""
+                    if pct_below_min >= 20.0:
+                        score -= 15
+                        issues.append(
+                            f"Significant thin walls detected: {pct_below_min:.0f}% of surface "
+                            f"is below {min_wall}mm minimum "
+                            f"(thinnest: {min_thickness:.2f}mm{where})"
+                        )
+                        suggestions.append(
+                            "Thicken thin walls in a 3D editor before printing, "
+                            "or increase infill to 100% for very thin sections"
+                        )
+                    elif pct_below_min >= 5.0:
+                        score -= 5
+                        issues.append(
+                            f"Some thin walls detected: {pct_below_min:.0f}% of surface "
+                            f"below {min_wall}mm "
+                            f"(thinnest: {min_thickness:.2f}mm{where})"
+                        )
+                    if thickness["truncated"]:
+                        logger.info(
+                            "[PRINT_ANALYSIS] Wall thickness hit its time budget after %d/%d rays",
+                            thickness["rays_cast"], thickness["rays_requested"],
+                        )
                 else:
                     checks["min_wall_thickness_mm"] = None
                     checks["wall_thickness_ok"] = None
@@ -442,30 +520,26 @@ class PrintAnalysisService:
 
             # 8. Overhang detection (faces angled > threshold from vertical need support)
             fdm_overhang_pct = 0.0
-            try:
-                face_normals_arr = mesh.face_normals  # (N, 3) array
-                # Build direction is +Y (up). Compute angle of each face from vertical.
-                up = np.array([0.0, 1.0, 0.0])
-                dots = np.dot(face_normals_arr, up)
-                # Only consider downward-facing faces (dot < 0 means face points downward)
-                downward_mask = dots < 0
-                if np.any(downward_mask):
-                    # Angle from vertical for downward faces
-                    overhang_angles_deg = np.degrees(np.arccos(np.clip(np.abs(dots[downward_mask]), 0, 1)))
-                    # Faces where angle from vertical > threshold are overhangs
-                    fdm_overhang_threshold = 45.0
-                    resin_overhang_threshold = 30.0
-
-                    fdm_overhang_count = int(np.sum(overhang_angles_deg > fdm_overhang_threshold))
-                    resin_overhang_count = int(np.sum(overhang_angles_deg > resin_overhang_threshold))
-
-                    fdm_overhang_pct = round(fdm_overhang_count / len(mesh.faces) * 100, 1) if len(mesh.faces) > 0 else 0
-                    resin_overhang_pct = round(resin_overhang_count / len(mesh.faces) * 100, 1) if len(mesh.faces) > 0 else 0
+            overhang = features.get("overhang") or {}
+            if not overhang and "lod" in checks:
+                overhang = overhang_stats(mesh, float(features["mm_multiplier"]))
+                checks["overhang_source"] = "lod"
+            if not overhang:
+                # Streamed features carry no overhang data.
+                checks["overhang_fdm_pct"] = None
+                checks["overhang_resin_pct"] = None
+            else:
+                try:
+                    fdm = overhang.get("fdm") or {}
+                    resin = overhang.get("resin") or {}
+                    fdm_overhang_pct = float(fdm.get("pct") or 0.0)
 
                     checks["overhang_fdm_pct"] = fdm_overhang_pct
-                    checks["overhang_resin_pct"] = resin_overhang_pct
-                    checks["overhang_fdm_faces"] = fdm_overhang_count
-                    checks["overhang_resin_faces"] = resin_overhang_count
+                    checks["overhang_resin_pct"] = float(resin.get("pct") or 0.0)
+                    checks["overhang_fdm_faces"] = int(fdm.get("faces") or 0)
+                    checks["overhang_resin_faces"] = int(resin.get("faces") or 0)
+                    checks["overhang_fdm_area_cm2"] = fdm.get("area_cm2")
+                    checks["overhang_resin_area_cm2"] = resin.get("area_cm2")
 
                     if fdm_overhang_pct > 20:
                         issues.append(
@@ -481,13 +555,10 @@ class PrintAnalysisService:
                             f"{fdm_overhang_pct}% overhang faces detected — "
                             f"enable supports in slicer for best results"
                         )
-                else:
-                    checks["overhang_fdm_pct"] = 0.0
-                    checks["overhang_resin_pct"] = 0.0
-            except Exception as oh_exc:
-                logger.warning("[PRINT_ANALYSIS] Overhang check failed: %s", oh_exc)
-                checks["overhang_fdm_pct"] = None
-                checks["overhang_resin_pct"] = None
+                except Exception as oh_exc:
+                    logger.warning("[PRINT_ANALYSIS] Overhang check failed: %s", oh_exc)
+                    checks["overhang_fdm_pct"] = None
+                    checks["overhang_resin_pct"] = None
 
             # 9. Printer-type-specific slicer guidance
             if score >= 70:
@@ -510,31 +581,34 @@ class PrintAnalysisService:
                         f"verify it fits your printer's build volume before slicing."
                     )
 
-            # 10. Basic orientation suggestion
+            # 10. Orientation search: top build directions by support needed
             try:
-                best_orientation = "current"
-                best_overhang_pct = fdm_overhang_pct if fdm_overhang_pct is not None else 100.0
-
-                # Only run if overhangs are significant
-                if best_overhang_pct > 15:
-                    for axis_name, up_vec in [("rotate 90° around X (Z-up)", np.array([0, 0, 1.0])),
-                                               ("rotate 90° around Z (X-up)", np.array([1.0, 0, 0]))]:
-                        dots_alt = np.dot(face_normals_arr, up_vec)
-                        down_alt = dots_alt < 0
-                        if np.any(down_alt):
-                            angles_alt = np.degrees(np.arccos(np.clip(np.abs(dots_alt[down_alt]), 0, 1)))
-                            alt_pct = float(np.sum(angles_alt > 45.0) / len(mesh.faces) * 100)
-                            if alt_pct < best_overhang_pct:
-                                best_overhang_pct = alt_pct
-                                best_orientation = axis_name
-
-                    if best_orientation != "current":
-                        checks["suggested_orientation"] = best_orientation
-                        checks["suggested_orientation_overhang_pct"] = round(best_overhang_pct, 1)
-                        suggestions.append(
-                            f"Orientation tip: {best_orientation} would reduce overhangs "
-                            f"from {fdm_overhang_pct:.0f}% to {best_overhang_pct:.0f}% of faces"
-                        )
+                from backend.services import orientation_service
+
+                process_key = "resin" if printer_type == "resin" else "fdm"
+                ranking = (features.get("orientations") or {}).get(process_key)
+                if not ranking and mesh is not None:
+                    ranking = orientation_service.rank_orientations(
+                        mesh, threshold_deg=overhang_threshold, mm_multiplier=mm_multiplier,
+                    )
+                if ranking:
+                    checks["orientations"] = ranking
+
+                current = (ranking or {}).get("current") or {}
+                best = ((ranking or {}).get("best") or [None])[0]
+                # Only suggest a rotation that saves a meaningful amount of support.
+                if (
+                    current and best and best["label"] != "+y"
+                    and best["support_volume_cm3"] < current["support_volume_cm3"] * 0.8
+                ):
+                    tip = orientation_service.describe(best)
+                    checks["suggested_orientation"] = tip
+                    checks["suggested_orientation_overhang_pct"] = best["overhang_pct"]
+                    suggestions.append(
+                        f"Orientation tip: {tip} would cut support area from about "
+                        f"{current['support_area_cm2']:.0f} cm² to {best['support_area_cm2']:.0f} cm² "
+                        f"({current['overhang_pct']:.0f}% → {best['overhang_pct']:.0f}% overhang faces)"
+                    )
             except Exception as orient_exc:
                 logger.warning("[PRINT_ANALYSIS] Orientation check failed: %s", orient_exc)
 
@@ -551,7 +625,7 @@ class PrintAnalysisService:
         score = max(0, min(100, score))
 
         # Add actionable suggestions for common issues
-        if not mesh.is_watertight:
+        if not checks.get("is_manifold"):
             suggestions.append(
                 "Non-watertight meshes cannot be accurately measured for wall thickness "
                 "or volume. If you haven't remeshed yet, try Remesh with 'Print Ready' preset. "
@@ -560,7 +634,10 @@ class PrintAnalysisService:
                 "and use their automatic mesh repair tools before printing."
             )
 
-        if score < 90 and checks.get("is_manifold") and checks.get("min_wall_thickness_mm") is None:
+        if (
+            score < 90 and mesh is not None
+            and checks.get("is_manifold") and checks.get("min_wall_thickness_mm") is None
+        ):
             suggestions.append(
                 "Wall thickness analysis requires a closed mesh. Remesh the model first, "
                 "then re-run the print check for complete diagnostics."
@@ -652,10 +729,18 @@ class PrintAnalysisService:
         return None
 
     @staticmethod
-    def _analyze_file_safely(file_path: str, file_type: str | None, printer_type: str) -> Dict[str, Any]:
+    def _analyze_file_safely(
+        file_path: str,
+        file_type: str | None,
+        printer_type: str,
+        features: Dict[str, Any] | None = None,
+        lod_path: str | None = None,
+    ) -> Dict[str, Any]:
         """Run mesh analysis in a bounded child process so OOM does not kill Gunicorn."""
         if not PrintAnalysisService.USE_SUBPROCESS:
-            return PrintAnalysisService.analyze(file_path, file_type=file_type, printer_type=printer_type)
+            return PrintAnalysisService.analyze(
+                file_path, file_type=file_type, printer_type=printer_type, features=features, lod_path=lod_path,
+            )
 
         import multiprocessing as mp
         import time
@@ -669,7 +754,10 @@ class PrintAnalysisService:
         parent_conn, child_conn = ctx.Pipe(duplex=False)
         proc = ctx.Process(
             target=_analysis_worker,
-            args=(child_conn, file_path, file_type, printer_type, PrintAnalysisService.ANALYSIS_MEMORY_LIMIT_MB),
+            args=(
+                child_conn, file_path, file_type, printer_type,
+                PrintAnalysisService.ANALYSIS_MEMORY_LIMIT_MB, features, lod_path,
+            ),
             daemon=True,
         )
 
@@ -728,10 +816,13 @@ class PrintAnalysisService:
     @staticmethod
     def analyze_from_url(url: str, printer_type: str = "fdm") -> Dict[str, Any]:
         """Download a GLB/STL from URL and analyze it with memory isolation."""
+        import hashlib
         import tempfile
         import time
         import requests
 
+        from backend.services import mesh_feature_store, mesh_lod_service, mesh_stream_reader
+
         # Validate URL safety
         url_error = PrintAnalysisService._validate_url(url)
         if url_error:
@@ -772,6 +863,7 @@ class PrintAnalysisService:
             tmp = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
             tmp_path = tmp.name
             downloaded = 0
+            digest = hashlib.sha256()
             for chunk in resp.iter_content(chunk_size=1024 * 1024):  # 1MB chunks
                 downloaded += len(chunk)
                 if downloaded > PrintAnalysisService.MAX_DOWNLOAD_BYTES:
@@ -780,6 +872,7 @@ class PrintAnalysisService:
                         f"Model file exceeds {PrintAnalysisService.MAX_DOWNLOAD_BYTES / 1024 / 1024:.0f} MB limit."
                     )
                 tmp.write(chunk)
+                digest.update(chunk)
             tmp.close()
 
             # Re-detect file type from first bytes if needed
@@ -788,9 +881,32 @@ class PrintAnalysisService:
                     head = f.read(16)
                 file_type = PrintAnalysisService._detect_file_type(url, resp.headers.get("content-type"), head)
 
+            # Whole-model geometry comes from the feature store. On a miss the
+            # bytes are queued for the background worker once this analysis
+            # is done, so the next check, repair or quote of the model has them.
+            content_hash = digest.hexdigest()
+            features = mesh_feature_store.get(content_hash)
+
+            # High-poly models are checked on a LOD; a cached one is handed
+            # to the child, a new one is stored after it for the next check.
+            streamed_faces = mesh_stream_reader.face_count(tmp_path, file_type)
+            face_hint = features["face_count"] if features else streamed_faces
+            lod_target = mesh_lod_service.level_for(face_hint, PrintAnalysisService.MAX_FACE_COUNT)
+            lod_method = "cluster" if streamed_faces else "quadric"
+
             t0 = time.monotonic()
-            result = PrintAnalysisService._analyze_file_safely(tmp_path, file_type=file_type, printer_type=printer_type)
+            with mesh_lod_service.lod_slot(content_hash, lod_target, lod_method) as slot:
+                result = PrintAnalysisService._analyze_file_safely(
+                    tmp_path, file_type=file_type, printer_type=printer_type, features=features,
+                    lod_path=slot.path if slot else None,
+                )
+                if slot:
+                    slot.update((result.get("checks") or {}).get("lod"))
+            result["content_hash"] = content_hash
             elapsed = time.monotonic() - t0
+            if features is None:
+                with open(tmp_path, "rb") as f:
+                    mesh_feature_store.schedule(content_hash, data=f.read(), file_type=file_type or "glb")
             logger.info("[PRINT_ANALYSIS] Completed in %.1fs", elapsed)
             return result
 
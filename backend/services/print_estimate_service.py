@@ -0,0 +1,274 @@
+"""
+Mesh-based material and print-time estimation for print-order pricing.
+
+print_order_pricing used to estimate weight as bounding-box volume × a fixed
+0.18 "object fraction", which misprices hollow, thin and chunky models
+alike. With stored mesh features (mesh_feature_store) the model's real
+volume, surface area and per-orientation support volume are known, so the
+estimate can follow what a slicer does, at the level of volumes:
+
+    shell    = surface area × shell thickness (perimeters / skins), ≤ volume
+    infill   = (volume − shell) × infill %
+    support  = support column volume × support density, ≤ empty bbox space
+
+The default orientation is "auto": the best stable build direction from
+orientation_service (stored with the features), since that is how the part
+would be printed; "+y", "-x" etc. pin an axis.
+
+FDM time is the extruded volume over the volumetric flow for the quality's
+layer height plus a per-layer overhead. Resin parts are priced hollowed (a
+fixed shell, no infill) with a per-layer exposure + peel time.
+
+estimate_grid() evaluates every quality × infill combination in one
+vectorised pass. Results are cached in-process per (model hash,
+orientation, scale, process, density); features without a content hash are
+computed without caching.
+
+Environment:
+    PRINT_ESTIMATE_CACHE_SIZE   default 512 entries
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+
+def _env_int(name: str, default: int, minimum: int | None = None) -> int:
+    raw = os.getenv(name)
+    if raw is None or str(raw).strip() == "":
+        return default
+    try:
+        value = int(str(raw).strip())
+    except (TypeError, ValueError):
+        print(f"[PRINT_ESTIMATE] Invalid {name}={raw!r}; using default {default}")
+        return default
+    if minimum is not None and value < minimum:
+        return minimum
+    return value
+
+
+CACHE_SIZE = _env_int("PRINT_ESTIMATE_CACHE_SIZE", 512, minimum=16)
+
+QUALITIES = ("draft", "standard", "fine", "ultra")
+INFILL_STEPS = (10, 15, 20, 25, 30, 40, 50, 60, 80, 100)
+
+# Bambu P1S-style profiles, 0.4 mm nozzle. flow_mm3_s is the average
+# volumetric rate for perimeters; sparse infill and support run faster.
+FDM_PROFILES: Dict[str, Dict[str, float]] = {
+    "draft":    {"layer_mm": 0.28, "walls": 2, "flow_mm3_s": 14.0},
+    "standard": {"layer_mm": 0.20, "walls": 2, "flow_mm3_s": 10.0},
+    "fine":     {"layer_mm": 0.12, "walls": 3, "flow_mm3_s": 6.0},
+    "ultra":    {"layer_mm": 0.08, "walls": 3, "flow_mm3_s": 4.0},
+}
+FDM_LINE_WIDTH_MM = 0.42
+FDM_SKIN_MM = 0.8              # top / bottom solid skin
+FDM_SPARSE_FLOW_MULT = 1.5     # infill + support print faster than walls
+FDM_LAYER_OVERHEAD_S = 4.0     # layer change, travel, retraction
+
+RESIN_PROFILES: Dict[str, Dict[str, float]] = {
+    "draft":    {"layer_mm": 0.100, "layer_s": 7.0},
+    "standard": {"layer_mm": 0.050, "layer_s": 8.0},
+    "fine":     {"layer_mm": 0.035, "layer_s": 8.5},
+    "ultra":    {"layer_mm": 0.025, "layer_s": 9.0},
+}
+RESIN_SHELL_MM = 2.0
+
+SUPPORT_DENSITY = {"fdm": 0.15, "resin": 0.08}
+
+_AXIS_INDEX = {"x": 0, "y": 1, "z": 2}
+
+
+def _geometry(features: Optional[Dict[str, Any]], process: str, orientation: str) -> Optional[Dict[str, float]]:
+    """Native-scale volumes (mm³), area (mm²) and build height (mm), or None."""
+    if not features or features.get("partial"):
+        return None
+    try:
+        volume = float(features.get("volume_cm3") or 0) * 1000.0
+        area = float(features.get("surface_area_cm2") or 0) * 100.0
+        extents = [float(v) for v in features.get("extents_mm") or ()]
+    except (TypeError, ValueError):
+        return None
+    if volume <= 0 or area <= 0 or len(extents) != 3 or not all(v > 0 for v in extents):
+        return None
+    bbox_volume = extents[0] * extents[1] * extents[2]
+    if volume > bbox_volume * 1.01:
+        return None  # inverted or self-intersecting shells; not trustworthy
+
+    label, up, best = orientation, None, None
+    if orientation == "auto":
+        ranked = ((features.get("orientations") or {}).get(process) or {}).get("best") or []
+        best = ranked[0] if ranked else None
+        label = "+y"  # features from before the orientation search
+    height = extents[_AXIS_INDEX.get(label[-1:], 1)]
+    try:
+        if best:
+            label, up = best.get("label") or "custom", best.get("up")
+            support_volume = float(best.get("support_volume_cm3") or 0) * 1000.0
+            height = float(best.get("height_mm") or height)
+        else:
+            support = ((features.get("support") or {}).get(label) or {}).get(process) or {}
+            support_volume = float(support.get("volume_cm3") or 0) * 1000.0
+    except (TypeError, ValueError):
+        support_volume = 0.0
+    return {
+        "volume_mm3": volume,
+        "area_mm2": area,
+        "support_mm3": min(support_volume, max(0.0, bbox_volume - volume)),
+        "height_mm": height,
+        "orientation": label,
+        "up": up,
+    }
+
+
+def _compute_grid(
+    geo: Dict[str, float],
+    *,
+    process: str,
+    density: float,
+    scale: float,
+    qualities: Sequence[str],
+    infills: Sequence[int],
+) -> Dict[str, Any]:
+    import numpy as np
+
+    volume = geo["volume_mm3"] * scale ** 3
+    area = geo["area_mm2"] * scale ** 2
+    height = geo["height_mm"] * scale
+    support = geo["support_mm3"] * scale ** 3 * SUPPORT_DENSITY.get(process, 0.15)
+    infill_frac = np.clip(np.asarray(infills, dtype=float), 10, 100) / 100.0
+
+    if process == "resin":
+        profiles = [RESIN_PROFILES.get(q, RESIN_PROFILES["standard"]) for q in qualities]
+        shell = np.full(len(qualities), min(volume, area * RESIN_SHELL_MM))
+        infill = np.zeros((len(qualities), len(infills)))
+        layers = np.array([height / p["layer_mm"] for p in profiles])
+        seconds = np.repeat((layers * np.array([p["layer_s"] for p in profiles]))[:, None], len(infills), axis=1)
+    else:
+        profiles = [FDM_PROFILES.get(q, FDM_PROFILES["standard"]) for q in qualities]
+        shell_mm = np.array([max(p["walls"] * FDM_LINE_WIDTH_MM, FDM_SKIN_MM) for p in profiles])
+        flow = np.array([p["flow_mm3_s"] for p in profiles])
+        layers = height / np.array([p["layer_mm"] for p in profiles])
+        shell = np.minimum(volume, area * shell_mm)
+        infill = (volume - shell)[:, None] * infill_frac[None, :]
+        seconds = (
+            (shell / flow)[:, None]
+            + (infill + support) / (flow * FDM_SPARSE_FLOW_MULT)[:, None]
+            + (layers * FDM_LAYER_OVERHEAD_S)[:, None]
+        )
+
+    grams_per_mm3 = density / 1000.0
+    result = {
+        "qualities": list(qualities),
+        "infills": [int(i) for i in infills],
+        "weight_g": (shell[:, None] + infill + support) * grams_per_mm3,
+        "time_min": seconds / 60.0,
+        "shell_g": shell * grams_per_mm3,
+        "infill_g": infill * grams_per_mm3,
+        "support_g": support * grams_per_mm3,
+        "layers": layers,
+    }
+    for value in result.values():
+        if isinstance(value, np.ndarray):
+            value.setflags(write=False)
+    return result
+
+
+_lock = threading.Lock()
+_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+_counters: Dict[str, int] = {"hits": 0, "misses": 0, "uncached": 0}
+
+
+def estimate_grid(
+    features: Optional[Dict[str, Any]],
+    *,
+    process: str,
+    density: float,
+    scale: float = 1.0,
+    orientation: str = "auto",
+    qualities: Optional[Iterable[str]] = None,
+    infills: Optional[Iterable[int]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Weight / time for every quality × infill combination (numpy arrays shaped
+    [quality, infill]), or None when the features can't support a mesh-based
+    estimate (partial, not watertight, implausible volume). ``scale`` is the
+    print size relative to the model's native size.
+    """
+    geo = _geometry(features, process, orientation)
+    if geo is None or scale <= 0:
+        return None
+    qualities = tuple(qualities or QUALITIES)
+    infills = tuple(int(i) for i in (infills or INFILL_STEPS))
+
+    content_hash = features.get("content_hash") if features else None
+    key = (content_hash, features.get("version"), orientation, process, round(float(density), 4),
+           round(float(scale), 5), qualities, infills)
+    if content_hash:
+        with _lock:
+            cached = _cache.get(key)
+            if cached is not None:
+                _cache.move_to_end(key)
+                _counters["hits"] += 1
+                return cached
+
+    result = _compute_grid(geo, process=process, density=density, scale=scale,
+                           qualities=qualities, infills=infills)
+    result["orientation"] = geo["orientation"]
+    result["up"] = geo["up"]
+    with _lock:
+        if not content_hash:
+            _counters["uncached"] += 1
+            return result
+        _counters["misses"] += 1
+        _cache[key] = result
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def estimate(
+    features: Optional[Dict[str, Any]],
+    *,
+    process: str,
+    density: float,
+    quality: str,
+    infill_pct: int,
+    scale: float = 1.0,
+    orientation: str = "auto",
+) -> Optional[Dict[str, float]]:
+    """Single-combination view of estimate_grid() (served from the full grid)."""
+    quality = quality if quality in QUALITIES else "standard"
+    infill = max(10, min(100, int(infill_pct or 20)))
+    infills = INFILL_STEPS if infill in INFILL_STEPS else (infill,)
+    grid = estimate_grid(features, process=process, density=density, scale=scale,
+                         orientation=orientation, infills=infills)
+    if grid is None:
+        return None
+    qi = grid["qualities"].index(quality)
+    ii = grid["infills"].index(infill)
+    return {
+        "weight_g": float(grid["weight_g"][qi, ii]),
+        "time_min": float(grid["time_min"][qi, ii]),
+        "shell_g": float(grid["shell_g"][qi]),
+        "infill_g": float(grid["infill_g"][qi, ii]),
+        "support_g": float(grid["support_g"]),
+        "layers": int(round(float(grid["layers"][qi]))),
+        "orientation": grid["orientation"],
+        "up": grid["up"],
+    }
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        return {**_counters, "entries": len(_cache), "max_entries": CACHE_SIZE}
+
+
+def reset() -> None:
+    """Drop cached estimates and counters (tests)."""
+    with _lock:
+        _cache.clear()
+        for name in _counters:
+            _counters[name] = 0
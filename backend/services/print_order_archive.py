@@ -6,27 +6,28 @@ upstream provider URL (Meshy etc.) expires.
 
 S3 layout (under the existing models bucket):
   models/print-orders/<order_number>/model.glb
-  models/print-orders/<order_number>/model.stl
+  models/derived/<glb_sha256>/<variant>.stl   (shared by every order of the model)
   thumbnails/print-orders/<order_number>/thumb.jpg
+
+The STL comes from mesh_conversion_service, keyed on the GLB's content hash,
+so reprints and repeat orders of the same model reuse one conversion; the
+order's models.content_hash is passed along so a stored STL is found first. The
+same hash keys mesh_feature_store: the archive reports the stored model
+dimensions for the operator and, on a miss, hands the already-downloaded GLB
+to the feature worker.
 """
 
 from __future__ import annotations
 
-import io
 from datetime import datetime, timezone
 from typing import Any, Dict, Optional, Tuple
 
 import requests
 
 from backend.db import get_conn, Tables
-from backend.services import s3_service
-
-try:
-    import trimesh  # noqa: F401  (presence check)
-    TRIMESH_OK = True
-except Exception as _e:
-    print(f"[PRINT-ARCHIVE] trimesh import failed: {_e}")
-    TRIMESH_OK = False
+from backend.services import mesh_feature_store, s3_service
+from backend.services.mesh_conversion_service import ConversionOptions, convert_model
+from backend.utils import compute_sha256
 
 
 def _download(url: str, timeout: int = 180) -> Tuple[bytes, str]:
@@ -36,30 +37,6 @@ def _download(url: str, timeout: int = 180) -> Tuple[bytes, str]:
     return resp.content, resp.headers.get("Content-Type", "application/octet-stream")
 
 
-def _glb_to_stl_bytes(glb_bytes: bytes) -> Optional[bytes]:
-    """Convert GLB bytes to STL bytes using trimesh.  Returns None on failure."""
-    if not TRIMESH_OK:
-        return None
-    try:
-        import trimesh
-        scene_or_mesh = trimesh.load(io.BytesIO(glb_bytes), file_type="glb")
-        # Scenes need to be merged into a single mesh for STL.
-        if isinstance(scene_or_mesh, trimesh.Scene):
-            if not scene_or_mesh.geometry:
-                return None
-            mesh = trimesh.util.concatenate(
-                [g for g in scene_or_mesh.geometry.values() if hasattr(g, "vertices")]
-            )
-        else:
-            mesh = scene_or_mesh
-        if mesh is None or not hasattr(mesh, "export"):
-            return None
-        return mesh.export(file_type="stl")
-    except Exception as e:
-        print(f"[PRINT-ARCHIVE] GLB→STL conversion failed: {e}")
-        return None
-
-
 def archive_for_order(order_id: str) -> Dict[str, Any]:
     """
     Idempotently archive an order's model + thumbnail and persist S3 keys.
@@ -72,11 +49,14 @@ def archive_for_order(order_id: str) -> Dict[str, Any]:
         with conn.cursor() as cur:
             cur.execute(
                 f"""
-                SELECT id, order_number, model_glb_url, model_thumb_url,
-                       archived_glb_key, archived_stl_key, archived_thumb_key,
-                       archived_at
-                FROM {Tables.PRINT_ORDERS}
-                WHERE id = %s
+                SELECT o.id, o.order_number, o.model_glb_url, o.model_thumb_url,
+                       o.archived_glb_key, o.archived_stl_key, o.archived_thumb_key,
+                       o.archived_at, m.content_hash AS model_content_hash
+                FROM {Tables.PRINT_ORDERS} o
+                LEFT JOIN {Tables.HISTORY_ITEMS} h
+                  ON h.id::text = o.model_id::text AND h.identity_id = o.identity_id
+                LEFT JOIN {Tables.MODELS} m ON m.id = h.model_id
+                WHERE o.id = %s
                 LIMIT 1
                 """,
                 (order_id,),
@@ -117,24 +97,26 @@ def archive_for_order(order_id: str) -> Dict[str, Any]:
             print(f"[PRINT-ARCHIVE] {order_number} GLB upload failed: {e}")
 
     # ── STL (derived from GLB) ───────────────────────────────────────
+    features: Optional[Dict[str, Any]] = None
     if glb_bytes is not None:
-        stl_bytes = _glb_to_stl_bytes(glb_bytes)
-        if stl_bytes:
-            try:
-                key = f"models/print-orders/{order_number}/model.stl"
-                res = s3_service.upload_bytes_to_s3(
-                    data_bytes=stl_bytes,
-                    content_type="model/stl",
-                    prefix="models",
-                    key=key,
-                )
-                stl_key = res.get("s3_key") if isinstance(res, dict) else key
-                print(f"[PRINT-ARCHIVE] {order_number} STL → s3:{stl_key}")
-            except Exception as e:
-                errors.append(f"stl: {e}")
-                print(f"[PRINT-ARCHIVE] {order_number} STL upload failed: {e}")
+        converted = convert_model(
+            glb_bytes,
+            source_hash=r.get("model_content_hash"),
+            options=ConversionOptions(fmt="stl"),
+        )
+        glb_hash = converted.get("source_hash") or compute_sha256(glb_bytes)
+        features = mesh_feature_store.get(glb_hash)
+        if features is None:
+            mesh_feature_store.schedule(glb_hash, data=glb_bytes)
+        if converted.get("ok"):
+            stl_key = converted["s3_key"]
+            print(
+                f"[PRINT-ARCHIVE] {order_number} STL → s3:{stl_key}"
+                f"{' (reused)' if converted.get('cached') else ''}"
+            )
         else:
-            errors.append("stl: conversion failed")
+            errors.append(f"stl: {converted.get('error') or 'conversion failed'}")
+            print(f"[PRINT-ARCHIVE] {order_number} STL conversion failed: {converted.get('error')}")
 
     # ── Thumbnail ────────────────────────────────────────────────────
     if thumb_url:
@@ -182,6 +164,7 @@ def archive_for_order(order_id: str) -> Dict[str, Any]:
         "glb_key":   glb_key,
         "stl_key":   stl_key,
         "thumb_key": thumb_key,
+        "dimensions_mm": features.get("extents_mm") if features else None,
         "errors":    errors,
     }
 
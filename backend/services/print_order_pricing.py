@@ -33,7 +33,9 @@ a low-cost commodity print.
 from __future__ import annotations
 
 from dataclasses import dataclass, asdict
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from backend.services import print_estimate_service
 
 
 # ─────────────────────────────────────────────────────────────────────
@@ -246,6 +248,20 @@ class PriceBreakdown:
     # Trust-building copy fragments the frontend / email can use
     trust_points: List[str]
 
+    # Dimensions the price was computed from, and where they came from:
+    # "mesh" = stored model geometry scaled to the requested size,
+    # "client" = scaled_dimensions_mm as posted.
+    dimensions_mm: Optional[List[float]] = None
+    dimensions_source: str = "client"
+
+    # How weight/time were estimated: "mesh" = shell + infill + support
+    # volumes from stored features (print_estimate_service), "bbox" = the
+    # bounding-box heuristic. material_g is the per-unit mesh breakdown and
+    # orientation the build direction it assumes (orientation_service).
+    estimate_source: str = "bbox"
+    material_g: Optional[Dict[str, float]] = None
+    orientation: Optional[Dict[str, Any]] = None
+
     def to_dict(self) -> Dict[str, Any]:
         return asdict(self)
 
@@ -300,21 +316,51 @@ def _validate_spec(spec: Dict[str, Any]) -> Tuple[Dict[str, Any], str, Dict[str,
     }
 
 
-def _bbox_mm(spec: Dict[str, Any]) -> Optional[Tuple[float, float, float]]:
+def _bbox_mm(
+    spec: Dict[str, Any],
+    features: Optional[Dict[str, Any]] = None,
+) -> Optional[Tuple[float, float, float]]:
+    """
+    Print bounding box in mm. With stored mesh features (mesh_feature_store)
+    the shape comes from the model itself and the client dimensions only set
+    the size: the model's extents are scaled uniformly so its longest side
+    matches the longest requested side (or kept at native size when no
+    dimensions were posted).
+    """
+    d: Optional[Tuple[float, float, float]] = None
     dims = spec.get("scaled_dimensions_mm") or spec.get("dimensions_mm")
     if isinstance(dims, (list, tuple)) and len(dims) == 3:
         try:
-            d = tuple(float(x) for x in dims)
-            if all(v > 0 for v in d):
-                over = [v for v, max_v in zip(d, BUILD_VOLUME_MM) if v > max_v]
-                if over:
-                    raise PriceError("Scaled dimensions exceed the current 256 × 256 × 256mm printer volume")
-                return d  # type: ignore[return-value]
-        except PriceError:
-            raise
+            parsed = tuple(float(x) for x in dims)
+            if all(v > 0 for v in parsed):
+                d = parsed  # type: ignore[assignment]
         except (TypeError, ValueError):
             pass
-    return None
+
+    model_extents = _model_extents_mm(features)
+    if model_extents:
+        scale = max(d) / max(model_extents) if d else 1.0
+        d = tuple(v * scale for v in model_extents)  # type: ignore[assignment]
+
+    if d is None:
+        return None
+    over = [v for v, max_v in zip(d, BUILD_VOLUME_MM) if v > max_v]
+    if over:
+        raise PriceError("Scaled dimensions exceed the current 256 × 256 × 256mm printer volume")
+    return d
+
+
+def _model_extents_mm(features: Optional[Dict[str, Any]]) -> Optional[Tuple[float, float, float]]:
+    """Whole-model extents from stored mesh features, if usable for pricing."""
+    if not features or features.get("partial"):
+        return None
+    try:
+        extents = tuple(float(v) for v in features.get("extents_mm") or ())
+    except (TypeError, ValueError):
+        return None
+    if len(extents) != 3 or not all(v > 0 for v in extents):
+        return None
+    return extents  # type: ignore[return-value]
 
 
 def _estimate_weight_and_time(
@@ -327,8 +373,9 @@ def _estimate_weight_and_time(
     """
     Return (weight_g, time_minutes).
 
-    Calibration note: bounding-box volume × an "object fraction" is the
-    only thing we can compute without an actual slicer. We use:
+    Fallback for models without usable mesh features (see
+    print_estimate_service). Bounding-box volume × an "object fraction" is
+    the only thing we can compute without the geometry. We use:
       FDM:   object_fraction = 0.18  (was 0.32 — was 80% high vs reality)
       Resin: object_fraction = 0.12  (resin parts are usually hollowed)
     """
@@ -354,6 +401,14 @@ def _estimate_weight_and_time(
     return weight_g, time_min
 
 
+def _mesh_scale(bbox_mm: Tuple[float, float, float], features: Optional[Dict[str, Any]]) -> Optional[float]:
+    """Print size relative to the model's native size, when features are usable."""
+    extents = _model_extents_mm(features)
+    if not extents:
+        return None
+    return max(bbox_mm) / max(extents)
+
+
 def _size_class(bbox_mm: Tuple[float, float, float]) -> str:
     max_dim = max(bbox_mm)
     if max_dim < 75:
@@ -393,26 +448,127 @@ def compute(
     spec: Dict[str, Any],
     country: Optional[str],
     speed: str = "standard",
+    features: Optional[Dict[str, Any]] = None,
 ) -> PriceBreakdown:
     """
     Compute the authoritative price for an order.
 
+    ``features`` are the model's stored mesh features, when known; they make
+    the bounding box server-derived instead of client-supplied, and (for
+    watertight models) replace the bounding-box weight/time heuristic with
+    print_estimate_service's shell + infill + support estimate.
+
     Raises PriceError on invalid spec / dimensions.
     """
     mat, process, sv = _validate_spec(spec)
-    bbox = _bbox_mm(spec)
+    bbox = _bbox_mm(spec, features)
     if not bbox:
         raise PriceError("Missing or invalid scaled_dimensions_mm in spec")
 
+    # ── Geometry → weight + time ────────────────────────────────────
+    scale = _mesh_scale(bbox, features)
+    mesh_estimate = None
+    if scale is not None:
+        mesh_estimate = print_estimate_service.estimate(
+            features, process=process, density=float(mat["density"]),
+            quality=sv["quality"], infill_pct=sv["infill_pct"], scale=scale,
+        )
+    if mesh_estimate:
+        weight_g, time_min = mesh_estimate["weight_g"], mesh_estimate["time_min"]
+    else:
+        weight_g, time_min = _estimate_weight_and_time(
+            bbox, process, sv["infill_pct"], float(mat["density"]),
+            QUALITY_MULT.get(sv["quality"], 1.0),
+        )
+
+    return _price(
+        mat, process, sv, bbox, country, speed, weight_g, time_min,
+        dimensions_source="mesh" if _model_extents_mm(features) else "client",
+        mesh_estimate=mesh_estimate,
+    )
+
+
+def compute_options(
+    spec: Dict[str, Any],
+    country: Optional[str],
+    speed: str = "standard",
+    features: Optional[Dict[str, Any]] = None,
+    qualities: Optional[Iterable[str]] = None,
+    infills: Optional[Iterable[int]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Price every quality × infill combination for ``spec`` in one call, for
+    the order modal's option pickers. The mesh estimate for all combinations
+    comes from a single print_estimate_service grid; without usable features
+    each combination falls back to the bounding-box heuristic.
+
+    Raises PriceError on invalid spec / dimensions.
+    """
+    mat, process, sv = _validate_spec(spec)
+    bbox = _bbox_mm(spec, features)
+    if not bbox:
+        raise PriceError("Missing or invalid scaled_dimensions_mm in spec")
+
+    qualities = [q for q in (qualities or QUALITY_MULT) if q in QUALITY_MULT]
+    infills = [max(10, min(100, int(i))) for i in (infills or print_estimate_service.INFILL_STEPS)]
+    if process == "resin":
+        infills = infills[:1]  # no infill on resin
+
+    scale = _mesh_scale(bbox, features)
+    grid = None
+    if scale is not None:
+        grid = print_estimate_service.estimate_grid(
+            features, process=process, density=float(mat["density"]), scale=scale,
+            qualities=qualities, infills=infills,
+        )
+
+    options = []
+    dimensions_source = "mesh" if _model_extents_mm(features) else "client"
+    for qi, quality in enumerate(qualities):
+        for ii, infill in enumerate(infills):
+            option_sv = {**sv, "quality": quality, "infill_pct": infill}
+            if grid is not None:
+                weight_g = float(grid["weight_g"][qi, ii])
+                time_min = float(grid["time_min"][qi, ii])
+            else:
+                weight_g, time_min = _estimate_weight_and_time(
+                    bbox, process, infill, float(mat["density"]), QUALITY_MULT[quality],
+                )
+            price = _price(mat, process, option_sv, bbox, country, speed, weight_g, time_min,
+                           dimensions_source=dimensions_source)
+            options.append({
+                "quality": quality,
+                "infill_pct": infill,
+                "weight_g": price.weight_g,
+                "time_min": price.time_min,
+                "per_unit_base": price.per_unit_base,
+                "total": price.total,
+                "total_cents": price.total_cents,
+                "currency": price.currency,
+                "estimate_source": "mesh" if grid is not None else "bbox",
+            })
+    return options
+
+
+def _price(
+    mat: Dict[str, Any],
+    process: str,
+    sv: Dict[str, Any],
+    bbox: Tuple[float, float, float],
+    country: Optional[str],
+    speed: str,
+    weight_g: float,
+    time_min: float,
+    *,
+    dimensions_source: str,
+    mesh_estimate: Optional[Dict[str, Any]] = None,
+) -> PriceBreakdown:
+    """Per-unit weight/time → the full priced breakdown."""
     currency = pick_currency(country)
     P = _table(currency)
 
-    # ── Geometry → weight + time ────────────────────────────────────
     quality_mult = QUALITY_MULT.get(sv["quality"], 1.0)
     finish_mult  = FINISH_MULT.get(sv["finish"], 1.0)
-    weight_g, time_min = _estimate_weight_and_time(
-        bbox, process, sv["infill_pct"], float(mat["density"]), quality_mult,
-    )
     size_class = _size_class(bbox)
     size_mult = SIZE_CLASS_MULT.get(size_class, 1.0)
 
@@ -494,6 +650,18 @@ def compute(
         shipping_cents=int(round(shipping * 100)),
         total_cents=int(round(total * 100)),
         trust_points=trust_points,
+        dimensions_mm=[round(v, 1) for v in bbox],
+        dimensions_source=dimensions_source,
+        estimate_source="mesh" if mesh_estimate else "bbox",
+        material_g={
+            "shell": round(mesh_estimate["shell_g"], 1),
+            "infill": round(mesh_estimate["infill_g"], 1),
+            "support": round(mesh_estimate["support_g"], 1),
+        } if mesh_estimate else None,
+        orientation={
+            "label": mesh_estimate["orientation"],
+            "up": mesh_estimate["up"],
+        } if mesh_estimate else None,
     )
 
 
@@ -23,6 +23,7 @@ from backend.db import get_conn, Tables, transaction
 from backend.services.email_service import EmailService
 from backend.services.paypal_service import PayPalService, PayPalError
 from backend.services.print_order_pricing import PriceBreakdown, PriceError, compute as compute_price
+from backend.services import mesh_feature_store
 from backend.services import print_offer_service
 from backend.services import print_order_emails
 
@@ -106,10 +107,11 @@ def _resolve_model_from_history(
     history_items / models — DO NOT trust the URLs the frontend posted
     (they may be empty or expired).
 
-    Returns {id, name, glb_url, thumb_url}.  Falls back to empty dict if
-    nothing is found (the caller is responsible for refusing the order).
+    Returns {id, name, glb_url, thumb_url, content_hash}.  Falls back to empty
+    dict if nothing is found (the caller is responsible for refusing the order).
+    content_hash is models.content_hash, the key for mesh_feature_store.
     """
-    out: Dict[str, Any] = {"id": None, "name": None, "glb_url": None, "thumb_url": None}
+    out: Dict[str, Any] = {"id": None, "name": None, "glb_url": None, "thumb_url": None, "content_hash": None}
     if not model_id:
         return out
 
@@ -120,21 +122,23 @@ def _resolve_model_from_history(
                 cur.execute(
                     f"""
                     SELECT
-                        id,
-                        title,
-                        thumbnail_url,
+                        h.id,
+                        h.title,
+                        h.thumbnail_url,
                         COALESCE(
-                            glb_url,
-                            payload->>'glb_url',
-                            payload->>'textured_glb_url',
-                            payload->'model_urls'->>'glb',
-                            payload->'textured_model_urls'->>'glb'
+                            h.glb_url,
+                            h.payload->>'glb_url',
+                            h.payload->>'textured_glb_url',
+                            h.payload->'model_urls'->>'glb',
+                            h.payload->'textured_model_urls'->>'glb'
                         ) AS resolved_glb_url,
-                        payload->>'prompt' AS prompt_text
-                    FROM {Tables.HISTORY_ITEMS}
-                    WHERE (id = %s OR payload->>'original_job_id' = %s)
-                      AND identity_id = %s
-                    ORDER BY created_at DESC
+                        h.payload->>'prompt' AS prompt_text,
+                        m.content_hash
+                    FROM {Tables.HISTORY_ITEMS} h
+                    LEFT JOIN {Tables.MODELS} m ON m.id = h.model_id
+                    WHERE (h.id = %s OR h.payload->>'original_job_id' = %s)
+                      AND h.identity_id = %s
+                    ORDER BY h.created_at DESC
                     LIMIT 1
                     """,
                     (model_id, model_id, identity_id),
@@ -146,6 +150,7 @@ def _resolve_model_from_history(
                     out["name"]      = r.get("title") or r.get("prompt_text")
                     out["thumb_url"] = r.get("thumbnail_url")
                     out["glb_url"]   = r.get("resolved_glb_url")
+                    out["content_hash"] = r.get("content_hash")
 
                 # 2) models table fallback for GLB if still missing
                 if not out["glb_url"]:
@@ -157,7 +162,8 @@ def _resolve_model_from_history(
                             meta->>'textured_glb_url',
                             meta->'model_urls'->>'glb',
                             meta->'textured_model_urls'->>'glb'
-                        ) AS resolved_glb_url
+                        ) AS resolved_glb_url,
+                        content_hash
                         FROM {Tables.MODELS}
                         WHERE (id = %s OR upstream_job_id = %s)
                           AND identity_id = %s
@@ -170,12 +176,24 @@ def _resolve_model_from_history(
                     if row:
                         r = dict(row)
                         out["glb_url"] = r.get("resolved_glb_url")
+                        out["content_hash"] = r.get("content_hash")
     except Exception as e:
         print(f"[PRINT-ORDER] history lookup failed for id={model_id!r}: {e}")
 
     return out
 
 
+def model_features(model_id: Optional[str], identity_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Stored mesh features for a history/model id, or None. A miss queues the
+    background computation so a later quote prices from real geometry.
+    """
+    if not model_id:
+        return None
+    resolved = _resolve_model_from_history(model_id, identity_id)
+    return mesh_feature_store.get_or_schedule(resolved.get("content_hash"), resolved.get("glb_url"))
+
+
 def _fetch_mollie_payment(payment_id: str) -> Dict[str, Any]:
     resp = requests.get(
         f"{MOLLIE_API_BASE}/payments/{payment_id}",
@@ -222,16 +240,6 @@ def create_order(
     if provider == "mollie" and not config.MOLLIE_CONFIGURED:
         raise PrintOrderError("Mollie is not configured")
 
-    # ── Authoritative base price recomputation ───────────────────────
-    try:
-        base_price: PriceBreakdown = compute_price(
-            spec=spec,
-            country=(shipping.get("country") or "").upper(),
-            speed=(shipping.get("speed") or "standard"),
-        )
-    except PriceError as e:
-        raise PrintOrderError(f"Invalid order: {e}")
-
     # ── Resolve the model authoritatively from history_items / models.
     # The frontend may have an empty or stale URL — never trust it for the
     # value we'll archive and send to the operator.  Fall back to the
@@ -253,6 +261,20 @@ def create_order(
             "placing the order."
         )
 
+    # ── Authoritative base price recomputation ───────────────────────
+    # Geometry comes from the stored mesh features when the model has them;
+    # otherwise the client dimensions are used as before.
+    features = mesh_feature_store.get_or_schedule(resolved.get("content_hash"), final_model["glb_url"])
+    try:
+        base_price: PriceBreakdown = compute_price(
+            spec=spec,
+            country=(shipping.get("country") or "").upper(),
+            speed=(shipping.get("speed") or "standard"),
+            features=features,
+        )
+    except PriceError as e:
+        raise PrintOrderError(f"Invalid order: {e}")
+
     # ── Insert order row + reserve automatic offers/credit ───────────
     order_id = str(uuid.uuid4())
     with transaction("print_order_create") as cur:
@@ -940,10 +940,11 @@ def _warn_message(categories):
 # Tables are created by migrations; these IF NOT EXISTS guards
 # are no-ops under timrx_admin (no CREATE privilege on schemas).
 # ─────────────────────────────────────────────────────────────
-def ensure_safety_schema():
+def ensure_safety_schema() -> bool:
+    """Create the strike/rejection tables; returns False if the DDL failed."""
     try:
         from backend.db import USE_DB, transaction_direct
-        if not USE_DB: return
+        if not USE_DB: return True
         with transaction_direct() as cur:
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS timrx_app.safety_strikes (
@@ -983,5 +984,7 @@ def ensure_safety_schema():
                 ON timrx_app.safety_rejections (provider, created_at DESC)
             """)
         print("[SAFETY] safety schema ensured (strikes + rejections)")
+        return True
     except Exception as e:
         print(f"[SAFETY] Warning: could not ensure safety schema: {e}")
+        return False
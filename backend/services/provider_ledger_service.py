@@ -20,6 +20,8 @@ from datetime import date, datetime, timezone
 from typing import Any, Dict, List, Optional
 
 from backend.db import USE_DB, get_conn, query_all, query_one, Tables
+from backend.services import analytics_rollup_service as rollups
+from backend.services.csv_export_service import ExportQuery
 
 _TABLE = Tables.PROVIDER_LEDGER
 _VALID_ENTRY_TYPES = {"topup", "invoice", "balance_snapshot", "adjustment", "note"}
@@ -161,6 +163,80 @@ def list_ledger_entries(
     offset: int = 0,
 ) -> Dict[str, Any]:
     """List provider ledger entries with optional filters."""
+    where, params = _ledger_filters(
+        provider=provider, entry_type=entry_type, month=month,
+        date_from=date_from, date_to=date_to,
+    )
+
+    count_row = query_one(
+        f"SELECT COUNT(*) AS total FROM {_TABLE} {where}",
+        tuple(params),
+    )
+    total = count_row["total"] if count_row else 0
+
+    params.extend([limit, offset])
+    rows = query_all(
+        f"""
+        {_ledger_list_select()}
+        {where}
+        ORDER BY created_at DESC
+        LIMIT %s OFFSET %s
+        """,
+        tuple(params),
+    )
+
+    entries = [format_ledger_entry(r) for r in rows]
+
+    print(f"[ADMIN_PROVIDER_LEDGER] listed entries={len(entries)} total={total}")
+    return {"entries": entries, "total": total}
+
+
+def ledger_export_query(**filters) -> ExportQuery:
+    """Unpaginated ledger query (same filters as list_ledger_entries) for CSV export."""
+    where, params = _ledger_filters(**filters)
+    return ExportQuery(f"{_ledger_list_select()} {where}", tuple(params))
+
+
+def _ledger_list_select() -> str:
+    amount_col, balance_col = _ledger_money_columns()
+    return f"""
+        SELECT id, provider, entry_type, {amount_col} AS amount_usd, currency,
+               {balance_col} AS balance_snapshot_usd, description, reference,
+               period_month, metadata, recorded_by, created_at
+        FROM {_TABLE}
+    """
+
+
+def format_ledger_entry(r: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a ledger row for the admin list / export."""
+    display = get_provider_display(r["provider"])
+    return {
+        "id": str(r["id"]),
+        "provider": normalize_provider_account(r["provider"]),
+        "display_label": display["display_label"],
+        "display_subtitle": display["display_subtitle"],
+        "entry_type": r["entry_type"],
+        "amount_usd": float(r["amount_usd"]) if r["amount_usd"] is not None else None,
+        "currency": r["currency"],
+        "balance_snapshot_usd": float(r["balance_snapshot_usd"]) if r["balance_snapshot_usd"] is not None else None,
+        "description": r["description"],
+        "reference": r["reference"],
+        "period_month": _iso(r["period_month"]),
+        "metadata": r["metadata"],
+        "recorded_by": r["recorded_by"],
+        "created_at": _iso(r["created_at"]),
+    }
+
+
+def _ledger_filters(
+    *,
+    provider: Optional[str] = None,
+    entry_type: Optional[str] = None,
+    month: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+) -> tuple:
+    """WHERE clause and params for the ledger list filters."""
     conditions: list = []
     params: list = []
 
@@ -198,50 +274,7 @@ def list_ledger_entries(
             pass
 
     where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
-    amount_col, balance_col = _ledger_money_columns()
-
-    count_row = query_one(
-        f"SELECT COUNT(*) AS total FROM {_TABLE} {where}",
-        tuple(params),
-    )
-    total = count_row["total"] if count_row else 0
-
-    params.extend([limit, offset])
-    rows = query_all(
-        f"""
-        SELECT id, provider, entry_type, {amount_col} AS amount_usd, currency,
-               {balance_col} AS balance_snapshot_usd, description, reference,
-               period_month, metadata, recorded_by, created_at
-        FROM {_TABLE}
-        {where}
-        ORDER BY created_at DESC
-        LIMIT %s OFFSET %s
-        """,
-        tuple(params),
-    )
-
-    entries = []
-    for r in rows:
-        display = get_provider_display(r["provider"])
-        entries.append({
-            "id": str(r["id"]),
-            "provider": normalize_provider_account(r["provider"]),
-            "display_label": display["display_label"],
-            "display_subtitle": display["display_subtitle"],
-            "entry_type": r["entry_type"],
-            "amount_usd": float(r["amount_usd"]) if r["amount_usd"] is not None else None,
-            "currency": r["currency"],
-            "balance_snapshot_usd": float(r["balance_snapshot_usd"]) if r["balance_snapshot_usd"] is not None else None,
-            "description": r["description"],
-            "reference": r["reference"],
-            "period_month": _iso(r["period_month"]),
-            "metadata": r["metadata"],
-            "recorded_by": r["recorded_by"],
-            "created_at": _iso(r["created_at"]),
-        })
-
-    print(f"[ADMIN_PROVIDER_LEDGER] listed entries={len(entries)} total={total}")
-    return {"entries": entries, "total": total}
+    return where, params
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -378,24 +411,44 @@ def get_monthly_spend_report(
         ledger_params = (normalized_provider,)
     amount_col, balance_col = _ledger_money_columns()
 
-    # 1. Estimated usage from jobs (grouped by provider + month)
-    usage_rows = query_all(
-        f"""
-        SELECT
-            provider,
-            DATE_TRUNC('month', created_at)::date AS month,
-            COALESCE(SUM(estimated_provider_cost_usd), 0) AS estimated_usage_usd,
-            COUNT(*) AS job_count
-        FROM {Tables.JOBS}
-        WHERE status IN ('succeeded', 'ready')
-          AND created_at >= DATE_TRUNC('month', NOW()) - INTERVAL '%s months'
-          AND provider IS NOT NULL
-          {usage_filter}
-        GROUP BY provider, DATE_TRUNC('month', created_at)::date
-        ORDER BY month DESC, provider
-        """,
-        (months, *usage_params),
-    )
+    # 1. Estimated usage from jobs (grouped by provider + month), read from
+    # the hourly rollup once it is backfilled
+    if rollups.ready("jobs"):
+        usage_rows = query_all(
+            f"""
+            SELECT
+                provider,
+                DATE_TRUNC('month', bucket)::date AS month,
+                COALESCE(SUM(cost_usd), 0) AS estimated_usage_usd,
+                COALESCE(SUM(jobs), 0) AS job_count
+            FROM {Tables.JOB_ROLLUP_HOURLY}
+            WHERE status IN ('succeeded', 'ready')
+              AND bucket >= DATE_TRUNC('month', NOW()) - INTERVAL '%s months'
+              AND provider <> ''
+              {usage_filter}
+            GROUP BY provider, DATE_TRUNC('month', bucket)::date
+            ORDER BY month DESC, provider
+            """,
+            (months, *usage_params),
+        )
+    else:
+        usage_rows = query_all(
+            f"""
+            SELECT
+                provider,
+                DATE_TRUNC('month', created_at)::date AS month,
+                COALESCE(SUM(estimated_provider_cost_usd), 0) AS estimated_usage_usd,
+                COUNT(*) AS job_count
+            FROM {Tables.JOBS}
+            WHERE status IN ('succeeded', 'ready')
+              AND created_at >= DATE_TRUNC('month', NOW()) - INTERVAL '%s months'
+              AND provider IS NOT NULL
+              {usage_filter}
+            GROUP BY provider, DATE_TRUNC('month', created_at)::date
+            ORDER BY month DESC, provider
+            """,
+            (months, *usage_params),
+        )
 
     # 2. Ledger entries aggregated by provider + month + entry_type
     ledger_rows = query_all(
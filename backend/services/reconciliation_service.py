@@ -20,12 +20,23 @@ from datetime import datetime, timezone, timedelta
 import json
 
 from backend.db import (
-    fetch_one, transaction, query_one, query_all, execute, execute_returning, Tables
+    background_work, fetch_one, transaction, query_one, query_all, execute, execute_returning, Tables
 )
+from backend.services import admission_control
 from backend.services.wallet_service import WalletService, LedgerEntryType
 from backend.services.reservation_service import ReservationService, ReservationStatus
 from backend.config import config
 
+# Mollie payments reconciled between admission checks.
+_MOLLIE_PACE_EVERY = 25
+
+
+def _pace(step: str) -> None:
+    """Wait out pool pressure (bounded by ADMISSION_MAX_WAIT_S) before the
+    next reconciliation step. The step runs regardless once the wait ends:
+    reconciliation is the safety net and must not be starved."""
+    admission_control.admit(f"reconcile:{step}", max_wait_s=admission_control.MAX_WAIT_S)
+
 
 class ReconciliationService:
     """
@@ -44,6 +55,7 @@ class ReconciliationService:
     # ─────────────────────────────────────────────────────────────
 
     @staticmethod
+    @background_work("reconcile")
     def reconcile_safety(
         dry_run: bool = False,
         send_alert: bool = True,
@@ -81,6 +93,7 @@ class ReconciliationService:
             results["errors"].append({"check": "purchases_missing_ledger", "error": str(e)})
 
         # 2. Check wallet balance mismatches
+        _pace("wallet_mismatches")
         try:
             wallet_fixes = ReconciliationService._fix_wallet_mismatches(dry_run)
             results["wallet_mismatches_fixed"] = wallet_fixes
@@ -89,6 +102,7 @@ class ReconciliationService:
             results["errors"].append({"check": "wallet_mismatches", "error": str(e)})
 
         # 3. Check stale held reservations
+        _pace("stale_reservations")
         try:
             reservation_fixes = ReconciliationService._fix_stale_reservations(dry_run)
             results["stale_reservations_released"] = reservation_fixes
@@ -97,6 +111,7 @@ class ReconciliationService:
             results["errors"].append({"check": "stale_reservations", "error": str(e)})
 
         # 4. Check completed jobs missing history_items
+        _pace("missing_history_items")
         try:
             history_fixes = ReconciliationService._fix_missing_history_items(dry_run)
             results["missing_history_items_created"] = history_fixes
@@ -105,6 +120,7 @@ class ReconciliationService:
             results["errors"].append({"check": "missing_history_items", "error": str(e)})
 
         # 5. Detect ready_unbilled jobs (detection only - no automatic fix)
+        _pace("ready_unbilled")
         try:
             unbilled = ReconciliationService._detect_ready_unbilled_jobs()
             results["ready_unbilled_jobs"] = unbilled
@@ -1144,6 +1160,7 @@ class ReconciliationService:
     # ─────────────────────────────────────────────────────────────
 
     @staticmethod
+    @background_work("reconcile")
     def detect_anomalies(
         stale_minutes: int = 30,
         check_s3: bool = False,
@@ -1626,6 +1643,7 @@ class ReconciliationService:
     # ═══════════════════════════════════════════════════════════════
 
     @staticmethod
+    @background_work("reconcile")
     def reconcile_mollie_payments(
         days_back: int = 30,
         dry_run: bool = False,
@@ -1691,7 +1709,9 @@ class ReconciliationService:
             print(f"[RECONCILE:MOLLIE] Fetched {len(payments)} payments from Mollie")
 
             # Process each payment
-            for payment in payments:
+            for index, payment in enumerate(payments):
+                if index and index % _MOLLIE_PACE_EVERY == 0:
+                    _pace("mollie")
                 try:
                     fix_result = ReconciliationService._reconcile_mollie_payment(
                         payment=payment,
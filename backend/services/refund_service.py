@@ -25,6 +25,7 @@ from typing import Any, Dict, List, Optional
 from backend.db import (
     USE_DB, Tables, transaction, fetch_one, query_all, query_one,
 )
+from backend.services.csv_export_service import ExportQuery
 
 _TABLE = Tables.REFUNDS
 _VALID_REFUND_TYPES = {
@@ -484,6 +485,24 @@ def execute_refund(
 # LIST REFUND HISTORY
 # ─────────────────────────────────────────────────────────────────────────────
 
+_REFUND_LIST_SELECT = f"""
+SELECT r.id, r.purchase_id, r.subscription_id, r.identity_id,
+       r.payment_provider, r.payment_reference, r.refund_type, r.refund_status,
+       r.amount_usd, r.currency, r.credits_reversed, r.credit_type,
+       r.reason, r.admin_note, r.executed_by, r.external_refund_id,
+       r.metadata, r.created_at, r.executed_at,
+       i.email AS identity_email,
+       EXISTS(
+           SELECT 1 FROM {Tables.EMAIL_OUTBOX} eo
+           WHERE eo.template = 'refund_review'
+             AND eo.payload->>'refund_id' = r.id::text
+             AND eo.status IN ('pending', 'sent')
+       ) AS review_email_sent
+FROM {_TABLE} r
+LEFT JOIN {Tables.IDENTITIES} i ON i.id = r.identity_id
+"""
+
+
 def list_refunds(
     *,
     status: Optional[str] = None,
@@ -502,6 +521,48 @@ def list_refunds(
     stored metadata + external_refund_id. Adds display_summary for
     human-readable status.
     """
+    where, email_join, params = _refund_filters(
+        status=status, identity_id=identity_id, purchase_id=purchase_id,
+        email=email, date_from=date_from, date_to=date_to,
+    )
+
+    count_row = query_one(
+        f"SELECT COUNT(*) AS total FROM {_TABLE} r {email_join} {where}",
+        tuple(params),
+    )
+    total = count_row["total"] if count_row else 0
+
+    params.extend([limit, offset])
+    rows = query_all(
+        f"""
+        {_REFUND_LIST_SELECT}
+        {where}
+        ORDER BY r.created_at DESC
+        LIMIT %s OFFSET %s
+        """,
+        tuple(params),
+    )
+
+    refunds = [format_refund(r) for r in rows]
+    return {"refunds": refunds, "total": total}
+
+
+def refunds_export_query(**filters) -> ExportQuery:
+    """Unpaginated refunds query (same filters as list_refunds) for CSV export."""
+    where, _, params = _refund_filters(**filters)
+    return ExportQuery(f"{_REFUND_LIST_SELECT} {where}", tuple(params))
+
+
+def _refund_filters(
+    *,
+    status: Optional[str] = None,
+    identity_id: Optional[str] = None,
+    purchase_id: Optional[str] = None,
+    email: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+) -> tuple:
+    """WHERE clause, identities join for the count query, and params."""
     conditions: list = []
     params: list = []
 
@@ -540,91 +601,61 @@ def list_refunds(
 
     where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
     email_join = f"LEFT JOIN {Tables.IDENTITIES} i ON i.id = r.identity_id" if needs_email_join else ""
+    return where, email_join, params
 
-    count_row = query_one(
-        f"SELECT COUNT(*) AS total FROM {_TABLE} r {email_join} {where}",
-        tuple(params),
-    )
-    total = count_row["total"] if count_row else 0
 
-    params.extend([limit, offset])
-    rows = query_all(
-        f"""
-        SELECT r.id, r.purchase_id, r.subscription_id, r.identity_id,
-               r.payment_provider, r.payment_reference, r.refund_type, r.refund_status,
-               r.amount_usd, r.currency, r.credits_reversed, r.credit_type,
-               r.reason, r.admin_note, r.executed_by, r.external_refund_id,
-               r.metadata, r.created_at, r.executed_at,
-               i.email AS identity_email,
-               EXISTS(
-                   SELECT 1 FROM {Tables.EMAIL_OUTBOX} eo
-                   WHERE eo.template = 'refund_review'
-                     AND eo.payload->>'refund_id' = r.id::text
-                     AND eo.status IN ('pending', 'sent')
-               ) AS review_email_sent
-        FROM {_TABLE} r
-        LEFT JOIN {Tables.IDENTITIES} i ON i.id = r.identity_id
-        {where}
-        ORDER BY r.created_at DESC
-        LIMIT %s OFFSET %s
-        """,
-        tuple(params),
-    )
+def format_refund(r: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a refund row for the admin list / export."""
+    meta = r["metadata"] or {}
+    ext_id = r["external_refund_id"]
 
-    refunds = []
-    for r in rows:
-        meta = r["metadata"] or {}
-        ext_id = r["external_refund_id"]
-
-        # Build structured external_refund from stored metadata
-        external_refund = {
-            "provider": r["payment_provider"],
-            "attempted": bool(meta.get("external_refund_attempted", False)),
-            "executed": bool(meta.get("external_refund_executed", False)) or bool(ext_id),
-            "external_refund_id": ext_id,
-            "error": meta.get("external_refund_error"),
-        }
+    # Build structured external_refund from stored metadata
+    external_refund = {
+        "provider": r["payment_provider"],
+        "attempted": bool(meta.get("external_refund_attempted", False)),
+        "executed": bool(meta.get("external_refund_executed", False)) or bool(ext_id),
+        "external_refund_id": ext_id,
+        "error": meta.get("external_refund_error"),
+    }
 
-        # Determine purchase_type
-        purchase_type = "unknown"
-        if r["purchase_id"] and not r["subscription_id"]:
-            purchase_type = "one_time"
-        elif r["subscription_id"]:
-            purchase_type = "subscription"
-
-        refunds.append({
-            "id": str(r["id"]),
-            "purchase_id": str(r["purchase_id"]) if r["purchase_id"] else None,
-            "subscription_id": str(r["subscription_id"]) if r["subscription_id"] else None,
-            "identity_id": str(r["identity_id"]) if r["identity_id"] else None,
-            "email": r["identity_email"],
-            "purchase_type": purchase_type,
-            "payment_provider": r["payment_provider"],
-            "payment_reference": r["payment_reference"],
-            "refund_type": r["refund_type"],
-            "refund_status": r["refund_status"],
-            "amount_usd": float(r["amount_usd"]) if r["amount_usd"] is not None else 0,
-            "currency": r["currency"],
-            "credits_reversed": r["credits_reversed"],
-            "credit_type": r["credit_type"],
-            "credits_granted": meta.get("credits_granted"),
-            "credits_used": meta.get("credits_used"),
-            "reason": r["reason"],
-            "admin_note": r["admin_note"],
-            "executed_by": r["executed_by"],
-            "external_refund_id": ext_id,
-            "external_refund": external_refund,
-            "display_summary": _build_display_summary(r, external_refund),
-            "review_email_sent": bool(r.get("review_email_sent", False)),
-            "resolved_by": meta.get("resolved_by"),
-            "resolved_at": meta.get("resolved_at"),
-            "resolution_reason": meta.get("resolution_reason"),
-            "follow_up_email_queued": bool(meta.get("follow_up_email_queued", False)),
-            "created_at": _iso(r["created_at"]),
-            "executed_at": _iso(r["executed_at"]),
-        })
+    # Determine purchase_type
+    purchase_type = "unknown"
+    if r["purchase_id"] and not r["subscription_id"]:
+        purchase_type = "one_time"
+    elif r["subscription_id"]:
+        purchase_type = "subscription"
 
-    return {"refunds": refunds, "total": total}
+    return {
+        "id": str(r["id"]),
+        "purchase_id": str(r["purchase_id"]) if r["purchase_id"] else None,
+        "subscription_id": str(r["subscription_id"]) if r["subscription_id"] else None,
+        "identity_id": str(r["identity_id"]) if r["identity_id"] else None,
+        "email": r["identity_email"],
+        "purchase_type": purchase_type,
+        "payment_provider": r["payment_provider"],
+        "payment_reference": r["payment_reference"],
+        "refund_type": r["refund_type"],
+        "refund_status": r["refund_status"],
+        "amount_usd": float(r["amount_usd"]) if r["amount_usd"] is not None else 0,
+        "currency": r["currency"],
+        "credits_reversed": r["credits_reversed"],
+        "credit_type": r["credit_type"],
+        "credits_granted": meta.get("credits_granted"),
+        "credits_used": meta.get("credits_used"),
+        "reason": r["reason"],
+        "admin_note": r["admin_note"],
+        "executed_by": r["executed_by"],
+        "external_refund_id": ext_id,
+        "external_refund": external_refund,
+        "display_summary": _build_display_summary(r, external_refund),
+        "review_email_sent": bool(r.get("review_email_sent", False)),
+        "resolved_by": meta.get("resolved_by"),
+        "resolved_at": meta.get("resolved_at"),
+        "resolution_reason": meta.get("resolution_reason"),
+        "follow_up_email_queued": bool(meta.get("follow_up_email_queued", False)),
+        "created_at": _iso(r["created_at"]),
+        "executed_at": _iso(r["executed_at"]),
+    }
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -11,6 +11,11 @@ Rules:
 - Idempotent: repeated calls return existing reservation
 - wallet.balance >= required credits (checked at reservation time)
 - Expired reservations are automatically released
+- wallets.reserved_total / reserved_video_total hold the sum of held
+  reservation costs (migration 093): reserve_credits claims against them
+  with one conditional UPDATE and only falls back to the locked
+  reservation sum when that refuses. Until migration 093 is applied the
+  locked path is the only one and the totals are left alone.
 
 Statuses:
 - held: Credits are reserved, job in progress
@@ -21,6 +26,7 @@ Statuses:
 from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime, timedelta
 import json
+import threading
 import uuid
 
 from backend.db import fetch_one, fetch_all, transaction, query_one, query_all, Tables
@@ -44,6 +50,58 @@ def _derive_provider_from_action_code(action_code: str) -> str:
         return "unknown"
 
 
+def _reserved_column(credit_type: str) -> str:
+    """Maintained reserved-total column on wallets for a credit type."""
+    return "reserved_video_total" if credit_type == CreditType.VIDEO else "reserved_total"
+
+
+_totals_columns: Optional[bool] = None
+
+
+def _reserved_totals_ready() -> bool:
+    """Whether wallets has the migration 093 reserved-total columns (checked once per process)."""
+    global _totals_columns
+    if _totals_columns is None:
+        row = query_one(
+            """
+            SELECT COUNT(*) AS n FROM pg_attribute
+            WHERE attrelid = to_regclass(%s)
+              AND attname IN ('reserved_total', 'reserved_video_total')
+              AND NOT attisdropped
+            """,
+            (Tables.WALLETS,),
+        )
+        _totals_columns = int((row or {}).get("n") or 0) == 2
+        if not _totals_columns:
+            print("[RESERVATION] wallets.reserved_total missing (run migration 093); using the locked reservation sum")
+    return _totals_columns
+
+
+class _ExactCheckRequired(Exception):
+    """The conditional reserved-total claim refused; roll back and use the locked path."""
+
+
+_reserve_stats = {"fast": 0, "exact": 0, "rejected": 0, "resynced_wallets": 0}
+_reserve_stats_lock = threading.Lock()
+
+
+def _count_reserve(outcome: str, n: int = 1) -> None:
+    with _reserve_stats_lock:
+        _reserve_stats[outcome] += n
+
+
+def reserve_path_stats() -> Dict[str, int]:
+    """How reservations were decided: fast (conditional UPDATE), exact (locked fallback), rejected."""
+    with _reserve_stats_lock:
+        return dict(_reserve_stats)
+
+
+def reset_reserve_path_stats() -> None:
+    with _reserve_stats_lock:
+        for key in _reserve_stats:
+            _reserve_stats[key] = 0
+
+
 class ReservationStatus:
     """Valid reservation statuses."""
     HELD = "held"
@@ -224,15 +282,79 @@ class ReservationService:
 
         meta_json = json.dumps(meta) if meta else None
         expiry_minutes = getattr(config, 'RESERVATION_EXPIRY_MINUTES', ReservationService.DEFAULT_EXPIRY_MINUTES)
+        provider = _derive_provider_from_action_code(action_code)
+        hold = (identity_id, job_id, provider, action_code, cost_credits, credit_type, expiry_minutes, meta_json)
 
-        # Determine which balance column to check
+        # Determine which balance / reserved-total columns to use
         balance_column = "balance_video_credits" if credit_type == CreditType.VIDEO else "balance_credits"
+        if not _reserved_totals_ready():
+            return ReservationService._reserve_with_exact_check(hold, balance_column, None, action_key)
+        reserved_column = _reserved_column(credit_type)
+
+        # Fast path: write the hold, then claim its cost against the wallet's
+        # maintained reserved total in one conditional UPDATE (migration 093).
+        # The wallet row is locked only from that last statement to commit,
+        # and no reservation rows are scanned or locked.
+        try:
+            with transaction("reserve_credits") as cur:
+                reservation = ReservationService._insert_hold(cur, *hold)
+                cur.execute(
+                    f"""
+                    UPDATE {Tables.WALLETS}
+                    SET {reserved_column} = {reserved_column} + %s
+                    WHERE identity_id = %s
+                      AND {balance_column} - {reserved_column} >= %s
+                    RETURNING {balance_column} AS balance, {reserved_column} AS reserved
+                    """,
+                    (cost_credits, identity_id, cost_credits),
+                )
+                claimed = fetch_one(cur)
+                if not claimed:
+                    raise _ExactCheckRequired()
+        except _ExactCheckRequired:
+            # Short on credits, no wallet, or the total still counts expired
+            # holds -- the exact check decides (rolled-back hold is redone there).
+            return ReservationService._reserve_with_exact_check(
+                hold, balance_column, reserved_column, action_key
+            )
 
-        with transaction() as cur:
-            # 1. Lock wallet and check balance for the correct credit type
+        _count_reserve("fast")
+        from backend.services.wallet_service import invalidate_wallet_cache
+        invalidate_wallet_cache(identity_id)
+
+        balance = int(claimed["balance"] or 0)
+        reserved = int(claimed["reserved"] or 0)
+        return {
+            "reservation": ReservationService._format_reservation(reservation),
+            "balance": balance,
+            "reserved": reserved,
+            "available": balance - reserved,
+            "is_existing": False,
+            "credit_type": credit_type,
+        }
+
+    @staticmethod
+    def _reserve_with_exact_check(
+        hold: Tuple[Any, ...],
+        balance_column: str,
+        reserved_column: Optional[str],
+        action_key: str,
+    ) -> Dict[str, Any]:
+        """
+        Locked reservation path: the wallet row lock serialises this against
+        every other reserver and every hold status change (the migration 093
+        trigger updates the same row), so summing the held reservations under
+        it is exact without locking them. Ignores expired holds, and re-syncs
+        the wallet's reserved total while it holds the lock (reserved_column
+        is None before migration 093).
+        """
+        identity_id, job_id, _provider, _action_code, cost_credits, credit_type, _expiry, _meta = hold
+
+        with transaction("reserve_credits_exact") as cur:
+            # 1. Lock wallet and read balance for the correct credit type
             cur.execute(
                 f"""
-                SELECT identity_id, balance_credits, balance_video_credits
+                SELECT identity_id, {balance_column} AS balance
                 FROM {Tables.WALLETS}
                 WHERE identity_id = %s
                 FOR UPDATE
@@ -244,96 +366,113 @@ class ReservationService:
             if not wallet:
                 raise ValueError(f"Wallet not found for identity {identity_id}")
 
-            balance = wallet.get(balance_column, 0) or 0
+            balance = wallet.get("balance", 0) or 0
 
-            # 2. Get current reserved amount for this credit type (excluding expired)
-            # CRITICAL: Lock all held reservations for this identity/credit_type to prevent race condition.
+            # 2. Held amount for this credit type: unexpired (what availability
+            # means) and all (what the maintained total tracks)
             cur.execute(
                 f"""
-                SELECT id, cost_credits
+                SELECT COALESCE(SUM(cost_credits) FILTER (WHERE expires_at > NOW()), 0) AS live,
+                       COALESCE(SUM(cost_credits), 0) AS held
                 FROM {Tables.CREDIT_RESERVATIONS}
                 WHERE identity_id = %s
                   AND status = %s
                   AND credit_type = %s
-                  AND expires_at > NOW()
-                FOR UPDATE
                 """,
                 (identity_id, ReservationStatus.HELD, credit_type),
             )
-            locked_reservations = fetch_all(cur)
-            current_reserved = sum(
-                int(r.get("cost_credits", 0) or 0)
-                for r in locked_reservations
-            )
+            sums = fetch_one(cur) or {}
+            current_reserved = int(sums.get("live", 0) or 0)
+            held = int(sums.get("held", 0) or 0)
 
             # 3. Check available balance for this credit type
             available = balance - current_reserved
             if available < cost_credits:
+                _count_reserve("rejected")
                 credit_type_label = "video" if credit_type == CreditType.VIDEO else "general"
                 print(f"[RESERVATION] REJECTED: insufficient {credit_type_label} credits for {action_key} (need {cost_credits}, have {available})")
                 raise ValueError(
                     f"INSUFFICIENT_{credit_type_label.upper()}_CREDITS:required={cost_credits}:balance={balance}:reserved={current_reserved}:available={available}"
                 )
 
-            # 4. Create job row FIRST (to satisfy FK constraint on credit_reservations.ref_job_id)
-            provider = _derive_provider_from_action_code(action_code)
-            cur.execute(
-                f"""
-                INSERT INTO {Tables.JOBS}
-                (id, identity_id, provider, action_code, status, cost_credits, meta, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, 'queued', %s, %s, NOW(), NOW())
-                ON CONFLICT (id) DO NOTHING
-                RETURNING id
-                """,
-                (job_id, identity_id, provider, action_code, cost_credits, meta_json),
-            )
-            job_row = fetch_one(cur)
-            if not job_row:
-                # Job already existed (idempotent case) - that's fine, FK will be satisfied
-                pass
+            # 4. Job + reservation rows, then the re-synced reserved total
+            reservation = ReservationService._insert_hold(cur, *hold)
+            if reserved_column:
+                cur.execute(
+                    f"""
+                    UPDATE {Tables.WALLETS}
+                    SET {reserved_column} = %s
+                    WHERE identity_id = %s
+                    """,
+                    (held + cost_credits, identity_id),
+                )
 
-            # 5. Create reservation with ref_job_id pointing to the job, including credit_type
-            cur.execute(
-                f"""
-                INSERT INTO {Tables.CREDIT_RESERVATIONS}
-                (identity_id, action_code, cost_credits, status, credit_type, created_at, expires_at, ref_job_id, meta)
-                VALUES (%s, %s, %s, %s, %s, NOW(), NOW() + %s * INTERVAL '1 minute', %s, %s)
-                RETURNING *
-                """,
-                (identity_id, action_code, cost_credits, ReservationStatus.HELD, credit_type, expiry_minutes, job_id, meta_json),
-            )
-            reservation = fetch_one(cur)
-            assert reservation is not None, "Reservation insert failed"
+        _count_reserve("exact")
+        from backend.services.wallet_service import invalidate_wallet_cache
+        invalidate_wallet_cache(identity_id)
 
-            # Debug: Log reservation creation
-            print(f"[RESERVATION] CREATED: id={reservation['id']}, action={action_code}, cost={cost_credits}, "
-                  f"credit_type={credit_type}, identity={identity_id[:8]}..., job={job_id[:8]}...")
+        new_reserved = current_reserved + cost_credits
+        return {
+            "reservation": ReservationService._format_reservation(reservation),
+            "balance": balance,
+            "reserved": new_reserved,
+            "available": balance - new_reserved,
+            "is_existing": False,
+            "credit_type": credit_type,
+        }
 
-            # 6. Update job with reservation_id for bidirectional link
-            cur.execute(
-                f"""
-                UPDATE {Tables.JOBS}
-                SET reservation_id = %s, updated_at = NOW()
-                WHERE id = %s
-                """,
-                (reservation["id"], job_id),
-            )
+    @staticmethod
+    def _insert_hold(
+        cur,
+        identity_id: str,
+        job_id: str,
+        provider: str,
+        action_code: str,
+        cost_credits: int,
+        credit_type: str,
+        expiry_minutes: int,
+        meta_json: Optional[str],
+    ) -> Dict[str, Any]:
+        """Insert the job row (if new) and its held reservation, and link them."""
+        # Job row FIRST (to satisfy FK constraint on credit_reservations.ref_job_id);
+        # an existing job (idempotent case) is fine, the FK is satisfied either way
+        cur.execute(
+            f"""
+            INSERT INTO {Tables.JOBS}
+            (id, identity_id, provider, action_code, status, cost_credits, meta, created_at, updated_at)
+            VALUES (%s, %s, %s, %s, 'queued', %s, %s, NOW(), NOW())
+            ON CONFLICT (id) DO NOTHING
+            """,
+            (job_id, identity_id, provider, action_code, cost_credits, meta_json),
+        )
 
-            new_reserved = current_reserved + cost_credits
-            new_available = balance - new_reserved
+        # Reservation with ref_job_id pointing to the job, including credit_type
+        cur.execute(
+            f"""
+            INSERT INTO {Tables.CREDIT_RESERVATIONS}
+            (identity_id, action_code, cost_credits, status, credit_type, created_at, expires_at, ref_job_id, meta)
+            VALUES (%s, %s, %s, %s, %s, NOW(), NOW() + %s * INTERVAL '1 minute', %s, %s)
+            RETURNING *
+            """,
+            (identity_id, action_code, cost_credits, ReservationStatus.HELD, credit_type, expiry_minutes, job_id, meta_json),
+        )
+        reservation = fetch_one(cur)
+        assert reservation is not None, "Reservation insert failed"
 
-            # Invalidate wallet cache — reserved credits just changed
-            from backend.services.wallet_service import invalidate_wallet_cache
-            invalidate_wallet_cache(identity_id)
+        # Debug: Log reservation creation
+        print(f"[RESERVATION] CREATED: id={reservation['id']}, action={action_code}, cost={cost_credits}, "
+              f"credit_type={credit_type}, identity={identity_id[:8]}..., job={job_id[:8]}...")
 
-            return {
-                "reservation": ReservationService._format_reservation(reservation),
-                "balance": balance,
-                "reserved": new_reserved,
-                "available": new_available,
-                "is_existing": False,
-                "credit_type": credit_type,
-            }
+        # Update job with reservation_id for bidirectional link
+        cur.execute(
+            f"""
+            UPDATE {Tables.JOBS}
+            SET reservation_id = %s, updated_at = NOW()
+            WHERE id = %s
+            """,
+            (reservation["id"], job_id),
+        )
+        return reservation
 
     @staticmethod
     def reserve_system_trial_credits(
@@ -403,7 +542,19 @@ class ReservationService:
                 (identity_id, action_code, cost_credits, ReservationStatus.HELD, credit_type, expiry_minutes, job_id, meta_json),
             )
             reservation = fetch_one(cur)
-            if not reservation:
+            if reservation and _reserved_totals_ready():
+                # Inserted holds are counted by the inserter (migration 093);
+                # system-funded, so no availability condition.
+                reserved_column = _reserved_column(credit_type)
+                cur.execute(
+                    f"""
+                    UPDATE {Tables.WALLETS}
+                    SET {reserved_column} = {reserved_column} + %s
+                    WHERE identity_id = %s
+                    """,
+                    (cost_credits, identity_id),
+                )
+            elif not reservation:
                 cur.execute(
                     f"""
                     SELECT id, identity_id, action_code, cost_credits, status,
@@ -736,7 +887,89 @@ class ReservationService:
                         reservation.get("ref_job_id"),
                     )
 
-            return count
+        try:
+            ReservationService.resync_reserved_totals()
+        except Exception as e:
+            print(f"[RESERVATION] reserved total resync failed (non-fatal): {e}")
+
+        return count
+
+    @staticmethod
+    def resync_reserved_totals() -> int:
+        """
+        Correct wallets whose maintained reserved totals drifted from their
+        held reservations (rows written by pre-093 code, manual SQL).
+        Returns the number of wallets corrected.
+
+        Candidates are found without locks; each is then re-checked after
+        locking its wallet row, so a reservation committing in between is
+        counted rather than overwritten. Only wallets with a held reservation
+        (idx_reservations_expires) or a nonzero total
+        (idx_wallets_reserved_nonzero) are summed; every other wallet is
+        already in sync at zero.
+        """
+        if not _reserved_totals_ready():
+            return 0
+        # Held sums per wallet w, split the way the migration 093 trigger splits them
+        held_sums = f"""
+            CROSS JOIN LATERAL (
+                SELECT COALESCE(SUM(r.cost_credits) FILTER (WHERE r.credit_type IS DISTINCT FROM '{CreditType.VIDEO}'), 0) AS general,
+                       COALESCE(SUM(r.cost_credits) FILTER (WHERE r.credit_type = '{CreditType.VIDEO}'), 0) AS video
+                FROM {Tables.CREDIT_RESERVATIONS} r
+                WHERE r.identity_id = w.identity_id AND r.status = '{ReservationStatus.HELD}'
+            ) t
+        """
+        drifted = query_all(
+            f"""
+            WITH candidates AS (
+                SELECT identity_id FROM {Tables.CREDIT_RESERVATIONS} WHERE status = %s
+                UNION
+                SELECT identity_id FROM {Tables.WALLETS}
+                WHERE reserved_total <> 0 OR reserved_video_total <> 0
+            )
+            SELECT w.identity_id
+            FROM candidates c
+            JOIN {Tables.WALLETS} w ON w.identity_id = c.identity_id
+            {held_sums}
+            WHERE (w.reserved_total, w.reserved_video_total) IS DISTINCT FROM (t.general, t.video)
+            """,
+            (ReservationStatus.HELD,),
+        )
+        if not drifted:
+            return 0
+
+        fixed = 0
+        with transaction("reservation_resync") as cur:
+            ids = [row["identity_id"] for row in drifted]
+            cur.execute(
+                f"""
+                SELECT identity_id FROM {Tables.WALLETS}
+                WHERE identity_id = ANY(%s)
+                ORDER BY identity_id
+                FOR UPDATE
+                """,
+                (ids,),
+            )
+            # New statement, new snapshot: sees everything committed before the locks.
+            cur.execute(
+                f"""
+                UPDATE {Tables.WALLETS} target
+                SET reserved_total = t.general, reserved_video_total = t.video
+                FROM {Tables.WALLETS} w
+                {held_sums}
+                WHERE target.identity_id = w.identity_id
+                  AND w.identity_id = ANY(%s)
+                  AND (w.reserved_total, w.reserved_video_total) IS DISTINCT FROM (t.general, t.video)
+                RETURNING target.identity_id
+                """,
+                (ids,),
+            )
+            fixed = len(fetch_all(cur))
+
+        if fixed:
+            _count_reserve("resynced_wallets", fixed)
+            print(f"[RESERVATION] re-synced reserved totals on {fixed} wallet(s)")
+        return fixed
 
     @staticmethod
     def _mark_homepage_trial_completed(reservation_id: str, job_id: Any = None) -> None:
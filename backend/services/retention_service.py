@@ -0,0 +1,366 @@
+"""
+Retention: move cold rows from hot tables into partitioned archives (migration 092).
+
+The hot paths (worker claims, rescue, stall detection, video limits, admin
+windows) only read the last few days of jobs, but the table kept every row
+ever written. The ops loop leader now moves rows out in small batches:
+
+    jobs                     terminal jobs older than JOBS_RETENTION_DAYS
+                             (not ready_unbilled, not succeeded-but-never-
+                             billed, no held reservation -- reconciliation
+                             still needs those)
+    notification_deliveries  deliveries of campaigns that are no longer
+                             sending, older than
+                             NOTIFICATION_DELIVERY_RETENTION_DAYS
+
+Each batch is one transaction: the oldest eligible rows are locked with
+SKIP LOCKED, deleted from the hot table and inserted into the archive in a
+single statement, so a row is always in exactly one of the two. Monthly
+archive partitions are created just before the batch that needs them.
+Batches after the first go through admission_control, so a run stops
+early (and resumes next interval) when user traffic needs the pool.
+Readers that need history use the *_all views (Tables.JOBS_ALL,
+Tables.NOTIFICATION_DELIVERIES_ALL): the rollup recompute, campaign
+analytics, and the admin job search, counts, analytics and diagnostics.
+
+A hot table with a column its archive lacks is skipped (and reported)
+rather than moved lossily, and so is a hot table that a foreign key still
+references: moving a row is a DELETE, which would fire the key's ON DELETE
+action (credit_reservations.ref_job_id was ON DELETE SET NULL until
+migration 095 dropped it).
+
+Config:
+    RETENTION_ENABLED                     (default true)
+    RETENTION_INTERVAL_S                  (default 3600)  ops-loop cadence
+    RETENTION_BATCH_ROWS                  (default 2000)  rows per transaction
+    RETENTION_MAX_BATCHES                 (default 20)    batches per table per run
+    JOBS_RETENTION_DAYS                   (default 90)
+    NOTIFICATION_DELIVERY_RETENTION_DAYS  (default 180)
+    RETENTION_ARCHIVE_MONTHS              (default 0)     drop archive partitions
+                                                          older than this; 0 keeps all
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+from backend.db import USE_DB, Tables, is_transient_db_error, transaction
+from backend.services import admission_control
+from backend.services.video_errors import TERMINAL_STATES
+
+
+def _env_int(name: str, default: int, minimum: int | None = None) -> int:
+    try:
+        value = int(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        value = default
+    if minimum is not None:
+        value = max(minimum, value)
+    return value
+
+
+ENABLED = os.getenv("RETENTION_ENABLED", "true").lower() not in ("0", "false", "no")
+INTERVAL_S = _env_int("RETENTION_INTERVAL_S", 3600, 60)
+BATCH_ROWS = _env_int("RETENTION_BATCH_ROWS", 2000, 1)
+MAX_BATCHES = _env_int("RETENTION_MAX_BATCHES", 20, 1)
+ARCHIVE_MONTHS = _env_int("RETENTION_ARCHIVE_MONTHS", 0, 0)
+
+# ready_unbilled jobs are still worked by reconciliation.
+ARCHIVABLE_JOB_STATUSES = sorted(TERMINAL_STATES - {"ready_unbilled"})
+
+# Statuses reconciliation's implicit-unbilled check looks at
+# (ReconciliationService._detect_ready_unbilled_jobs).
+_BILLABLE_DONE_STATUSES = ("ready", "done", "succeeded", "completed")
+
+
+@dataclass(frozen=True)
+class Retention:
+    name: str
+    source: str
+    archive: str
+    days: int
+    eligible: str        # extra predicate on the hot row, alias t
+
+
+JOBS = Retention(
+    name="jobs",
+    source=Tables.JOBS,
+    archive=Tables.JOBS_ARCHIVE,
+    days=_env_int("JOBS_RETENTION_DAYS", 90, 7),
+    eligible=f"""
+        t.status = ANY(%(statuses)s)
+        AND NOT EXISTS (
+            SELECT 1 FROM {Tables.CREDIT_RESERVATIONS} r
+            WHERE r.ref_job_id = t.id AND r.status = 'held'
+        )
+        AND NOT (
+            t.status IN {_BILLABLE_DONE_STATUSES}
+            AND t.reservation_id IS NULL
+            AND t.cost_credits > 0
+            AND t.identity_id IS NOT NULL
+            AND NOT EXISTS (
+                SELECT 1 FROM {Tables.LEDGER_ENTRIES} le
+                WHERE le.identity_id = t.identity_id
+                  AND le.ref_type = 'job'
+                  AND le.ref_id = t.id::text
+                  AND le.amount_credits < 0
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM {Tables.CREDIT_RESERVATIONS} r
+                WHERE r.ref_job_id = t.id AND r.status = 'finalized'
+            )
+        )
+    """,
+)
+
+NOTIFICATION_DELIVERIES = Retention(
+    name="notification_deliveries",
+    source=Tables.NOTIFICATION_DELIVERIES,
+    archive=Tables.NOTIFICATION_DELIVERIES_ARCHIVE,
+    days=_env_int("NOTIFICATION_DELIVERY_RETENTION_DAYS", 180, 7),
+    eligible="""
+        NOT EXISTS (
+            SELECT 1 FROM timrx_billing.notification_campaigns c
+            WHERE c.id = t.campaign_id AND c.status IN ('draft', 'scheduled', 'publishing')
+        )
+    """,
+)
+
+POLICIES = (JOBS, NOTIFICATION_DELIVERIES)
+
+_stats = {"runs": 0, "batches": 0, "moved": 0, "partitions_created": 0, "partitions_dropped": 0, "errors": 0}
+_moved_by_table: Dict[str, int] = {}
+_lock = threading.Lock()
+
+
+# ─────────────────────────────────────────────────────────────
+# Partitions
+# ─────────────────────────────────────────────────────────────
+def _month_start(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def _add_months(month: datetime, n: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + n
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _partition_name(policy: Retention, month: datetime) -> str:
+    return f"{policy.archive}_p{month:%Y%m}"
+
+
+def _ensure_partitions(policy: Retention, lo: datetime, hi: datetime) -> int:
+    """Create the monthly archive partitions covering [lo, hi]; returns how
+    many were missing. Runs in its own short transaction because attaching
+    a partition briefly locks the archive parent."""
+    created = 0
+    month, last = _month_start(lo), _month_start(hi)
+    with transaction(f"retention:{policy.name}:partitions") as cur:
+        while month <= last:
+            name = _partition_name(policy, month)
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL AS present", (name,))
+            if not cur.fetchone()["present"]:
+                cur.execute(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {policy.archive} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+                )
+                created += 1
+            month = _add_months(month, 1)
+    return created
+
+
+def _drop_expired_partitions(policy: Retention) -> int:
+    """Drop archive partitions that end more than ARCHIVE_MONTHS ago."""
+    if ARCHIVE_MONTHS <= 0:
+        return 0
+    horizon = _add_months(_month_start(datetime.now(timezone.utc)), -ARCHIVE_MONTHS)
+    schema, table = policy.archive.split(".", 1)
+    dropped = 0
+    with transaction(f"retention:{policy.name}:drop") as cur:
+        cur.execute(
+            """
+            SELECT c.relname AS name
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            JOIN pg_namespace n ON n.oid = p.relnamespace
+            WHERE n.nspname = %s AND p.relname = %s
+            """,
+            (schema, table),
+        )
+        for row in cur.fetchall():
+            try:
+                month = datetime.strptime(row["name"].rsplit("_p", 1)[-1], "%Y%m").replace(tzinfo=timezone.utc)
+            except ValueError:
+                continue
+            if _add_months(month, 1) <= horizon:
+                cur.execute(f"DROP TABLE IF EXISTS {schema}.{row['name']}")
+                dropped += 1
+    return dropped
+
+
+# ─────────────────────────────────────────────────────────────
+# Mover (ops loop leader)
+# ─────────────────────────────────────────────────────────────
+def _columns(cur, table: str) -> List[str]:
+    schema, name = table.split(".", 1)
+    cur.execute(
+        """
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = %s AND table_name = %s
+        ORDER BY ordinal_position
+        """,
+        (schema, name),
+    )
+    return [r["column_name"] for r in cur.fetchall()]
+
+
+def _referencing_keys(cur, table: str) -> List[str]:
+    """Foreign keys that point at ``table``; deleting from it would fire them."""
+    cur.execute(
+        """
+        SELECT conname AS name FROM pg_constraint
+        WHERE contype = 'f' AND confrelid = to_regclass(%s)
+        ORDER BY conname
+        """,
+        (table,),
+    )
+    return [r["name"] for r in cur.fetchall()]
+
+
+def _params(cutoff: datetime, **extra: Any) -> Dict[str, Any]:
+    return {"cutoff": cutoff, "limit": BATCH_ROWS, "statuses": ARCHIVABLE_JOB_STATUSES, **extra}
+
+
+def _move_batch(policy: Retention, columns: str, cutoff: datetime) -> Tuple[int, int]:
+    """Move up to BATCH_ROWS of the oldest eligible rows; returns
+    (rows moved, partitions created)."""
+    with transaction(f"retention:{policy.name}") as cur:
+        cur.execute(
+            f"""
+            SELECT MIN(created_at) AS lo, MAX(created_at) AS hi
+            FROM (
+                SELECT t.created_at FROM {policy.source} t
+                WHERE t.created_at < %(cutoff)s AND {policy.eligible}
+                ORDER BY t.created_at
+                LIMIT %(limit)s
+            ) b
+            """,
+            _params(cutoff),
+        )
+        bounds = cur.fetchone()
+    if not bounds or bounds["lo"] is None:
+        return 0, 0
+    lo, hi = bounds["lo"], bounds["hi"]
+    created = _ensure_partitions(policy, lo, hi)
+    with transaction(f"retention:{policy.name}") as cur:
+        # lo/hi keep the batch inside the partitions that were just ensured.
+        cur.execute(
+            f"""
+            WITH batch AS (
+                SELECT t.id FROM {policy.source} t
+                WHERE t.created_at >= %(lo)s AND t.created_at <= %(hi)s
+                  AND t.created_at < %(cutoff)s AND {policy.eligible}
+                ORDER BY t.created_at
+                LIMIT %(limit)s
+                FOR UPDATE SKIP LOCKED
+            ), moved AS (
+                DELETE FROM {policy.source} t
+                USING batch WHERE t.id = batch.id
+                RETURNING t.*
+            )
+            INSERT INTO {policy.archive} ({columns})
+            SELECT {columns} FROM moved
+            """,
+            _params(cutoff, lo=lo, hi=hi),
+        )
+        moved = max(cur.rowcount, 0)
+    return moved, created
+
+
+def _run_policy(policy: Retention) -> Dict[str, Any]:
+    started = time.monotonic()
+    result: Dict[str, Any] = {"table": policy.name, "moved": 0, "batches": 0, "partitions_created": 0}
+    with transaction(f"retention:{policy.name}:columns") as cur:
+        hot = _columns(cur, policy.source)
+        archived = set(_columns(cur, policy.archive))
+        referenced_by = _referencing_keys(cur, policy.source) if hot else []
+        cur.execute("SELECT NOW() - %s * INTERVAL '1 day' AS cutoff", (policy.days,))
+        cutoff = cur.fetchone()["cutoff"]
+    if not hot or not archived:
+        result["skipped"] = "no_table"
+        return result
+    if referenced_by:
+        print(f"[RETENTION] {policy.name} skipped: {policy.source} is referenced by {referenced_by}")
+        result["skipped"] = "referenced_by_foreign_key"
+        result["foreign_keys"] = referenced_by
+        return result
+    missing = [c for c in hot if c not in archived]
+    if missing:
+        print(f"[RETENTION] {policy.name} skipped: {policy.archive} is missing columns {missing}")
+        result["skipped"] = "archive_missing_columns"
+        result["missing"] = missing
+        return result
+
+    columns = ", ".join(hot)
+    for batch in range(MAX_BATCHES):
+        if batch and not admission_control.admit(f"retention:{policy.name}"):
+            result["deferred"] = True
+            break
+        moved, created = _move_batch(policy, columns, cutoff)
+        result["partitions_created"] += created
+        if not moved:
+            break
+        result["moved"] += moved
+        result["batches"] += 1
+        if moved < BATCH_ROWS:
+            break
+    result["partitions_dropped"] = _drop_expired_partitions(policy)
+    result["ms"] = int((time.monotonic() - started) * 1000)
+    return result
+
+
+def run() -> List[Dict[str, Any]]:
+    """Archive cold rows of every table; at most MAX_BATCHES per table."""
+    if not ENABLED or not USE_DB:
+        return []
+    results = []
+    for policy in POLICIES:
+        try:
+            result = _run_policy(policy)
+        except Exception as e:
+            with _lock:
+                _stats["errors"] += 1
+            print(f"[RETENTION] {policy.name} failed: {type(e).__name__}: {e}")
+            results.append({"table": policy.name, "error": str(e), "transient": is_transient_db_error(e)})
+            continue
+        with _lock:
+            _stats["batches"] += result["batches"]
+            _stats["moved"] += result["moved"]
+            _stats["partitions_created"] += result["partitions_created"]
+            _stats["partitions_dropped"] += result.get("partitions_dropped", 0)
+            _moved_by_table[policy.name] = _moved_by_table.get(policy.name, 0) + result["moved"]
+        results.append(result)
+    with _lock:
+        _stats["runs"] += 1
+    return results
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        return dict(_stats, moved_by_table=dict(_moved_by_table))
+
+
+def reset() -> None:
+    with _lock:
+        for key in _stats:
+            _stats[key] = 0
+        _moved_by_table.clear()
@@ -0,0 +1,298 @@
+"""
+Content-hash → S3 key index.
+
+Every upload path (finalize, rescue, backfill, print archive) content-addresses
+its objects, so the same bytes keep mapping to the same key — yet each upload
+used to pay an S3 HEAD to rediscover that. This index remembers keys we know
+exist, so a repeat upload resolves without touching S3.
+
+Two tiers:
+- an in-process LRU (s3_key → content_hash, plus hash+scope → s3_key) whose
+  entries expire after S3_CONTENT_INDEX_LRU_TTL_S, and
+- timrx_app.s3_content_index (deploy_migrations/086), shared by all workers.
+
+Lookups never raise: any DB problem is a miss and the caller falls back to
+HEAD exactly as before. Deletes must call forget() (delete_s3_objects_safe
+and the history cleanup path do) so the index never vouches for a removed
+object. forget() only reaches this process's LRU and the table; the TTL
+bounds how long another worker or instance can keep vouching for a key
+deleted elsewhere before it re-asks the table.
+
+Only rows with verified_at set count as hits (deploy_migrations/096): the
+086 seed copied keys from the asset tables without checking S3, so those
+rows stay unverified until a PUT or a HEAD that finds the object records
+them.
+
+Environment:
+    S3_CONTENT_INDEX_ENABLED    default true
+    S3_CONTENT_INDEX_LRU_SIZE   default 20000 keys
+    S3_CONTENT_INDEX_LRU_TTL_S  default 60 seconds
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+ENABLED = os.getenv("S3_CONTENT_INDEX_ENABLED", "true").lower() not in ("0", "false", "no")
+LRU_SIZE = max(100, int(os.getenv("S3_CONTENT_INDEX_LRU_SIZE", "20000")))
+LRU_TTL_S = max(0.0, float(os.getenv("S3_CONTENT_INDEX_LRU_TTL_S", "60")))
+
+_lock = threading.Lock()
+# Values carry the monotonic time the entry stops being trusted.
+_keys: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()          # s3_key -> (content_hash, expires)
+_hash_scopes: "OrderedDict[tuple, Tuple[str, float]]" = OrderedDict()  # (content_hash, scope) -> (s3_key, expires)
+_counters: Dict[str, int] = {
+    "lru_hits": 0,
+    "db_hits": 0,
+    "misses": 0,
+    "records": 0,
+    "forgets": 0,
+    "db_errors": 0,
+}
+_db_disabled_reason: Optional[str] = None
+
+
+def _bump(name: str, n: int = 1) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def _remember(s3_key: str, content_hash: Optional[str]) -> None:
+    expires = time.monotonic() + LRU_TTL_S
+    with _lock:
+        _keys[s3_key] = (content_hash or _keys.get(s3_key, ("", 0.0))[0], expires)
+        _keys.move_to_end(s3_key)
+        while len(_keys) > LRU_SIZE:
+            _keys.popitem(last=False)
+
+
+def _remember_scope(content_hash: str, scope: str, s3_key: str) -> None:
+    with _lock:
+        _hash_scopes[(content_hash, scope)] = (s3_key, time.monotonic() + LRU_TTL_S)
+        _hash_scopes.move_to_end((content_hash, scope))
+        while len(_hash_scopes) > LRU_SIZE:
+            _hash_scopes.popitem(last=False)
+
+
+def _bucket() -> Optional[str]:
+    from backend.config import config
+
+    return config.AWS_BUCKET_MODELS or None
+
+
+def _db_ready() -> bool:
+    if _db_disabled_reason is not None:
+        return False
+    from backend.db import USE_DB
+
+    return bool(USE_DB)
+
+
+def _db_failed(exc: Exception) -> None:
+    """Count a DB error; stop using the table if it hasn't been migrated yet."""
+    global _db_disabled_reason
+    _bump("db_errors")
+    if "verified_at" in str(exc) and "does not exist" in str(exc):
+        _db_disabled_reason = "verified_at_missing"
+        print("[S3_INDEX] s3_content_index.verified_at missing (run migration 096); using in-process index only")
+    elif "s3_content_index" in str(exc) and "does not exist" in str(exc):
+        _db_disabled_reason = "table_missing"
+        print("[S3_INDEX] timrx_app.s3_content_index missing (run migration 086); using in-process index only")
+    else:
+        print(f"[S3_INDEX] DB lookup failed, falling back to HEAD: {exc}")
+
+
+def lookup_key(s3_key: str) -> bool:
+    """True if s3_key is known to exist. A False means "unknown", not "absent"."""
+    if not ENABLED or not s3_key:
+        return False
+    with _lock:
+        entry = _keys.get(s3_key)
+        if entry is not None:
+            if entry[1] > time.monotonic():
+                _keys.move_to_end(s3_key)
+                _counters["lru_hits"] += 1
+                return True
+            del _keys[s3_key]
+
+    bucket = _bucket()
+    if bucket and _db_ready():
+        try:
+            from backend.db import Tables, get_conn
+
+            with get_conn("s3_content_index") as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f"SELECT content_hash FROM {Tables.S3_CONTENT_INDEX} "
+                        f"WHERE s3_bucket = %s AND s3_key = %s AND verified_at IS NOT NULL",
+                        (bucket, s3_key),
+                    )
+                    row = cur.fetchone()
+            if row:
+                _remember(s3_key, row["content_hash"])
+                _bump("db_hits")
+                return True
+        except Exception as exc:
+            _db_failed(exc)
+
+    _bump("misses")
+    return False
+
+
+def lookup_hash(content_hash: str, scope: str, suffix: str = "") -> Optional[str]:
+    """
+    Resolve content_hash to an existing key under ``scope`` (a key prefix such
+    as ``images/{user_id}/``) ending in ``suffix``. Used by uploads that would
+    otherwise mint a fresh random key for bytes we already hold.
+    """
+    if not ENABLED or not content_hash or not scope:
+        return None
+    with _lock:
+        entry = _hash_scopes.get((content_hash, scope))
+        if entry is not None and entry[1] <= time.monotonic():
+            del _hash_scopes[(content_hash, scope)]
+            entry = None
+        if entry is not None and entry[0].endswith(suffix):
+            _hash_scopes.move_to_end((content_hash, scope))
+            _counters["lru_hits"] += 1
+            return entry[0]
+
+    bucket = _bucket()
+    if bucket and _db_ready():
+        try:
+            from backend.db import Tables, get_conn
+
+            with get_conn("s3_content_index") as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f"""
+                        SELECT s3_key FROM {Tables.S3_CONTENT_INDEX}
+                        WHERE content_hash = %s AND s3_bucket = %s
+                          AND starts_with(s3_key, %s) AND s3_key LIKE %s
+                          AND verified_at IS NOT NULL
+                        ORDER BY created_at
+                        LIMIT 1
+                        """,
+                        (content_hash, bucket, scope, "%" + suffix.replace("%", r"\%").replace("_", r"\_")),
+                    )
+                    row = cur.fetchone()
+            if row:
+                _remember(row["s3_key"], content_hash)
+                _remember_scope(content_hash, scope, row["s3_key"])
+                _bump("db_hits")
+                return row["s3_key"]
+        except Exception as exc:
+            _db_failed(exc)
+
+    _bump("misses")
+    return None
+
+
+def record(
+    s3_key: str,
+    content_hash: Optional[str] = None,
+    content_type: Optional[str] = None,
+    size_bytes: Optional[int] = None,
+    scope: Optional[str] = None,
+) -> None:
+    """Remember that s3_key exists (after a PUT, or a HEAD that found it)."""
+    if not ENABLED or not s3_key:
+        return
+    _remember(s3_key, content_hash)
+    if content_hash and scope:
+        _remember_scope(content_hash, scope, s3_key)
+    _bump("records")
+
+    bucket = _bucket()
+    if not (bucket and _db_ready()):
+        return
+    try:
+        from backend.db import Tables, get_conn
+
+        with get_conn("s3_content_index") as conn:
+            with conn.cursor() as cur:
+                if content_hash:
+                    cur.execute(
+                        f"""
+                        INSERT INTO {Tables.S3_CONTENT_INDEX}
+                            (s3_bucket, s3_key, content_hash, content_type, size_bytes, verified_at)
+                        VALUES (%s, %s, %s, %s, %s, NOW())
+                        ON CONFLICT (s3_bucket, s3_key) DO UPDATE SET verified_at = NOW()
+                        """,
+                        (bucket, s3_key, content_hash, content_type, size_bytes),
+                    )
+                else:
+                    # A HEAD without a hash can still confirm a seeded row.
+                    cur.execute(
+                        f"UPDATE {Tables.S3_CONTENT_INDEX} SET verified_at = NOW() "
+                        f"WHERE s3_bucket = %s AND s3_key = %s",
+                        (bucket, s3_key),
+                    )
+            conn.commit()
+    except Exception as exc:
+        _db_failed(exc)
+
+
+def forget(s3_keys: Iterable[str]) -> None:
+    """Drop deleted keys from both tiers."""
+    keys = [k for k in (s3_keys or []) if k]
+    if not ENABLED or not keys:
+        return
+    key_set = set(keys)
+    with _lock:
+        for key in keys:
+            _keys.pop(key, None)
+        for scope_key in [sk for sk, v in _hash_scopes.items() if v[0] in key_set]:
+            _hash_scopes.pop(scope_key, None)
+        _counters["forgets"] += len(keys)
+
+    bucket = _bucket()
+    if not (bucket and _db_ready()):
+        return
+    try:
+        from backend.db import Tables, get_conn
+
+        with get_conn("s3_content_index") as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"DELETE FROM {Tables.S3_CONTENT_INDEX} WHERE s3_bucket = %s AND s3_key = ANY(%s)",
+                    (bucket, keys),
+                )
+            conn.commit()
+    except Exception as exc:
+        _db_failed(exc)
+
+
+def stats() -> Dict[str, object]:
+    """Hit/miss counters for the admin storage metrics."""
+    with _lock:
+        counters = dict(_counters)
+        lru_keys = len(_keys)
+    hits = counters["lru_hits"] + counters["db_hits"]
+    lookups = hits + counters["misses"]
+    return {
+        "enabled": ENABLED,
+        "db_enabled": _db_disabled_reason is None,
+        "db_disabled_reason": _db_disabled_reason,
+        "lru_keys": lru_keys,
+        "lru_capacity": LRU_SIZE,
+        "lookups": lookups,
+        "hits": hits,
+        "hit_ratio": round(hits / lookups, 4) if lookups else None,
+        **counters,
+    }
+
+
+def reset() -> None:
+    """Clear the in-process tier and counters (tests)."""
+    global _db_disabled_reason
+    with _lock:
+        _keys.clear()
+        _hash_scopes.clear()
+        for name in _counters:
+            _counters[name] = 0
+    _db_disabled_reason = None
@@ -8,15 +8,18 @@ changing the monolith yet. Routes can migrate gradually.
 from __future__ import annotations
 
 import os
+import threading
+import time
 import uuid
+from collections import OrderedDict
 from typing import Any
 from urllib.parse import urlparse
 
-import boto3
 import requests
 from botocore.exceptions import ClientError
 
 from backend.config import config
+from backend.services import s3_content_index
 from backend.utils import (
     compute_sha256,
     get_content_type_for_extension,
@@ -32,13 +35,33 @@ from backend.utils import (
 )
 
 
-# Create a dedicated S3 client for the modular service layer.
-_s3 = boto3.client(
-    "s3",
-    region_name=config.AWS_REGION,
-    aws_access_key_id=config.AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=config.AWS_SECRET_ACCESS_KEY,
-)
+# Dedicated S3 client for the modular service layer. Created on first use,
+# not at import: boto3 is a large import, and a client built in a preloading
+# master would share its connection pool with every forked worker.
+_s3 = None
+_s3_lock = threading.Lock()
+
+
+def get_s3_client():
+    global _s3
+    if _s3 is None:
+        with _s3_lock:
+            if _s3 is None:
+                import boto3
+
+                _s3 = boto3.client(
+                    "s3",
+                    region_name=config.AWS_REGION,
+                    aws_access_key_id=config.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=config.AWS_SECRET_ACCESS_KEY,
+                )
+    return _s3
+
+
+def reset_client() -> None:
+    """Drop the client so the next call builds a new one (after fork)."""
+    global _s3
+    _s3 = None
 
 
 def _effective_validation_prefix(prefix: str | None, key: str | None) -> str:
@@ -115,7 +138,7 @@ def build_s3_url(key: str) -> str:
 
 def s3_key_exists(key: str) -> bool:
     try:
-        _s3.head_object(Bucket=config.AWS_BUCKET_MODELS, Key=key)
+        get_s3_client().head_object(Bucket=config.AWS_BUCKET_MODELS, Key=key)
         return True
     except ClientError as e:
         code = e.response.get("Error", {}).get("Code", "")
@@ -124,6 +147,35 @@ def s3_key_exists(key: str) -> bool:
         raise
 
 
+def content_key_exists(key: str, content_hash: str | None = None) -> bool:
+    """
+    s3_key_exists() fronted by the content index: a key we already know about
+    resolves without a HEAD, and a HEAD that finds the object teaches the index.
+    """
+    if s3_content_index.lookup_key(key):
+        return True
+    if s3_key_exists(key):
+        s3_content_index.record(key, content_hash)
+        return True
+    return False
+
+
+def _put_and_index(key: str, data_bytes: bytes, content_type: str, content_hash: str | None, scope: str | None = None) -> None:
+    get_s3_client().put_object(
+        Bucket=config.AWS_BUCKET_MODELS,
+        Key=key,
+        Body=data_bytes,
+        ContentType=content_type,
+    )
+    s3_content_index.record(
+        key,
+        content_hash or compute_sha256(data_bytes),
+        content_type=content_type,
+        size_bytes=len(data_bytes),
+        scope=scope,
+    )
+
+
 def is_s3_url(url: str) -> bool:
     if not isinstance(url, str):
         return False
@@ -144,18 +196,90 @@ def get_s3_key_from_url(url: str) -> str | None:
     return parse_s3_key(url)
 
 
-def presign_s3_key(key: str, expires_in: int = 3600) -> str | None:
-    if not key or not config.AWS_BUCKET_MODELS:
+# ─────────────────────────────────────────────────────────────
+# Presigned URLs (batched + TTL-aware cache)
+# ─────────────────────────────────────────────────────────────
+# Each URL is signed for expires_in + a reuse window and handed out again
+# until its remaining lifetime drops to expires_in, so every caller still gets
+# at least the lifetime it asked for. SigV4 caps URLs at 7 days, which leaves
+# no reuse window for week-long email links — those are signed fresh.
+_PRESIGN_MAX_SECONDS = 7 * 24 * 3600
+_PRESIGN_REUSE_SECONDS = int(os.getenv("S3_PRESIGN_CACHE_REUSE_SECONDS", "900"))
+_PRESIGN_CACHE_MAX = int(os.getenv("S3_PRESIGN_CACHE_MAX_ENTRIES", "20000"))
+_presign_cache: "OrderedDict[tuple, tuple[str, float]]" = OrderedDict()
+_presign_lock = threading.Lock()
+_presign_counters = {"hits": 0, "signed": 0, "errors": 0}
+
+
+def _presign_cache_get(cache_key: tuple, expires_in: int, now: float) -> str | None:
+    entry = _presign_cache.get(cache_key)
+    if entry is None:
         return None
-    try:
-        return _s3.generate_presigned_url(
-            "get_object",
-            Params={"Bucket": config.AWS_BUCKET_MODELS, "Key": key},
-            ExpiresIn=expires_in,
-        )
-    except Exception as e:
-        print(f"[S3] Failed to presign key {key}: {e}")
+    url, expires_at = entry
+    if expires_at - now < expires_in:
+        _presign_cache.pop(cache_key, None)
+        return None
+    _presign_cache.move_to_end(cache_key)
+    return url
+
+
+def presign_s3_keys(
+    keys: list[str],
+    expires_in: int = 3600,
+    response_disposition: str | None = None,
+) -> dict[str, str | None]:
+    """
+    Presign many keys in one pass. Cached URLs are reused; only the misses
+    are signed. Returns {key: url-or-None} for every distinct input key.
+    """
+    bucket = config.AWS_BUCKET_MODELS
+    unique_keys = [k for k in dict.fromkeys(keys or []) if k]
+    if not unique_keys or not bucket:
+        return {k: None for k in unique_keys}
+
+    expires_in = int(expires_in)
+    reuse = max(0, min(_PRESIGN_REUSE_SECONDS, _PRESIGN_MAX_SECONDS - expires_in))
+    now = time.monotonic()
+    result: dict[str, str | None] = {}
+    missing: list[str] = []
+    with _presign_lock:
+        for key in unique_keys:
+            cached = _presign_cache_get((bucket, key, expires_in, response_disposition), expires_in, now)
+            if cached:
+                result[key] = cached
+            else:
+                missing.append(key)
+        _presign_counters["hits"] += len(unique_keys) - len(missing)
+
+    signed: dict[tuple, tuple[str, float]] = {}
+    for key in missing:
+        params = {"Bucket": bucket, "Key": key}
+        if response_disposition:
+            params["ResponseContentDisposition"] = response_disposition
+        try:
+            url = get_s3_client().generate_presigned_url("get_object", Params=params, ExpiresIn=expires_in + reuse)
+        except Exception as e:
+            print(f"[S3] Failed to presign key {key}: {e}")
+            with _presign_lock:
+                _presign_counters["errors"] += 1
+            result[key] = None
+            continue
+        result[key] = url
+        if reuse:
+            signed[(bucket, key, expires_in, response_disposition)] = (url, now + expires_in + reuse)
+
+    with _presign_lock:
+        _presign_counters["signed"] += len(missing)
+        _presign_cache.update(signed)
+        while len(_presign_cache) > _PRESIGN_CACHE_MAX:
+            _presign_cache.popitem(last=False)
+    return result
+
+
+def presign_s3_key(key: str, expires_in: int = 3600, response_disposition: str | None = None) -> str | None:
+    if not key or not config.AWS_BUCKET_MODELS:
         return None
+    return presign_s3_keys([key], expires_in=expires_in, response_disposition=response_disposition).get(key)
 
 
 def presign_s3_url(url: str, expires_in: int = 3600) -> str | None:
@@ -165,6 +289,27 @@ def presign_s3_url(url: str, expires_in: int = 3600) -> str | None:
     return presign_s3_key(key, expires_in=expires_in)
 
 
+def presign_s3_urls(urls: list[str], expires_in: int = 3600) -> dict[str, str | None]:
+    """Batch form of presign_s3_url: {url: signed-or-None}; non-S3 URLs map to None."""
+    keys_by_url = {url: parse_s3_key(url) for url in dict.fromkeys(urls or []) if url}
+    signed = presign_s3_keys([k for k in keys_by_url.values() if k], expires_in=expires_in)
+    return {url: signed.get(key) if key else None for url, key in keys_by_url.items()}
+
+
+def presign_cache_stats() -> dict:
+    with _presign_lock:
+        counters = dict(_presign_counters)
+        size = len(_presign_cache)
+    requests_total = counters["hits"] + counters["signed"]
+    return {
+        "entries": size,
+        "capacity": _PRESIGN_CACHE_MAX,
+        "reuse_window_seconds": _PRESIGN_REUSE_SECONDS,
+        "hit_ratio": round(counters["hits"] / requests_total, 4) if requests_total else None,
+        **counters,
+    }
+
+
 def collect_s3_keys(history_row: dict) -> list[str]:
     """
     Collect S3 keys from a history row for deletion.
@@ -227,10 +372,21 @@ def upload_bytes_to_s3(
     validation_prefix = _effective_validation_prefix(prefix, key)
     content_type = validate_and_normalize_upload_bytes(data_bytes, content_type, validation_prefix)
 
+    content_hash = compute_sha256(data_bytes)
+    dedup_scope = None
     if not key:
         if not user_id:
             raise ValueError("user_id required for S3 upload")
         ext = get_extension_for_content_type(content_type)
+        # Same bytes already uploaded by this user under this prefix: reuse
+        # that object instead of minting another random key.
+        dedup_scope = f"{prefix}/{user_id}/"
+        known_key = s3_content_index.lookup_hash(content_hash, dedup_scope, suffix=ext)
+        if known_key:
+            return wrap_upload_result(
+                build_s3_url(known_key), content_hash if return_hash else None, return_hash,
+                s3_key=known_key, reused=True,
+            )
         unique_id = uuid.uuid4().hex[:12]
         if name:
             safe_name = sanitize_filename(name)
@@ -244,25 +400,96 @@ def upload_bytes_to_s3(
     else:
         key = ensure_s3_key_ext(key.lstrip("/"), content_type)
 
-    content_hash = compute_sha256(data_bytes) if return_hash else None
-    if s3_key_exists(key):
+    if dedup_scope is None and content_key_exists(key, content_hash):
         s3_url = build_s3_url(key)
         # print(f"[S3] SKIP: Key exists -> {s3_url}")
-        return wrap_upload_result(s3_url, content_hash, return_hash, s3_key=key, reused=True)
+        return wrap_upload_result(s3_url, content_hash if return_hash else None, return_hash, s3_key=key, reused=True)
 
     # print(
     #     f"[S3] Uploading {len(data_bytes)} bytes to bucket={config.AWS_BUCKET_MODELS}, "
     #     f"key={key}, content_type={content_type}"
     # )
-    _s3.put_object(
-        Bucket=config.AWS_BUCKET_MODELS,
-        Key=key,
-        Body=data_bytes,
-        ContentType=content_type,
-    )
+    _put_and_index(key, data_bytes, content_type, content_hash, scope=dedup_scope)
     s3_url = build_s3_url(key)
     # print(f"[S3] SUCCESS: Uploaded {len(data_bytes)} bytes -> {s3_url}")
-    return wrap_upload_result(s3_url, content_hash, return_hash, s3_key=key, reused=False)
+    return wrap_upload_result(s3_url, content_hash if return_hash else None, return_hash, s3_key=key, reused=False)
+
+
+def upload_fileobj_to_s3(
+    fileobj,
+    key: str,
+    content_type: str,
+    content_hash: str | None = None,
+    size_bytes: int | None = None,
+) -> str:
+    """
+    Stream a server-generated file (conversion output, spooled to disk) to S3
+    with a multipart upload instead of holding it in memory. Skips the upload
+    validation sniffing — callers only pass artifacts they produced.
+    """
+    if not config.AWS_BUCKET_MODELS:
+        raise RuntimeError("AWS_BUCKET_MODELS not configured")
+    key = key.lstrip("/")
+    if content_key_exists(key, content_hash):
+        return build_s3_url(key)
+    fileobj.seek(0)
+    get_s3_client().upload_fileobj(
+        fileobj,
+        config.AWS_BUCKET_MODELS,
+        key,
+        ExtraArgs={"ContentType": content_type},
+    )
+    s3_content_index.record(key, content_hash, content_type=content_type, size_bytes=size_bytes)
+    return build_s3_url(key)
+
+
+def upload_artifact_bytes_to_s3(
+    data_bytes: bytes,
+    key: str,
+    content_type: str,
+    content_hash: str | None = None,
+):
+    """
+    Upload server-rendered bytes (image derivatives) to a content-addressed
+    key. Like upload_fileobj_to_s3 this skips the upload validation sniffing,
+    which only admits formats users may upload (no AVIF). Returns the same
+    result as upload_bytes_to_s3(..., return_hash=True).
+    """
+    if not config.AWS_BUCKET_MODELS:
+        raise RuntimeError("AWS_BUCKET_MODELS not configured")
+    key = ensure_s3_key_ext(key.lstrip("/"), content_type)
+    content_hash = content_hash or compute_sha256(data_bytes)
+    if content_key_exists(key, content_hash):
+        return wrap_upload_result(build_s3_url(key), content_hash, True, s3_key=key, reused=True)
+    _put_and_index(key, data_bytes, content_type, content_hash)
+    return wrap_upload_result(build_s3_url(key), content_hash, True, s3_key=key, reused=False)
+
+
+def upload_transient_fileobj_to_s3(fileobj, key: str, content_type: str) -> str:
+    """
+    Stream a short-lived, per-user file (a conversion waiting for download,
+    an admin export) to S3. No dedup HEAD and no s3_content_index row: these
+    objects are deleted by their owner's cleanup, not content-addressed.
+    Returns the key.
+    """
+    if not config.AWS_BUCKET_MODELS:
+        raise RuntimeError("AWS_BUCKET_MODELS not configured")
+    key = key.lstrip("/")
+    fileobj.seek(0)
+    get_s3_client().upload_fileobj(
+        fileobj,
+        config.AWS_BUCKET_MODELS,
+        key,
+        ExtraArgs={"ContentType": content_type},
+    )
+    return key
+
+
+def download_s3_key_to_fileobj(key: str, fileobj) -> None:
+    """Stream an object from the models bucket into a writable file object."""
+    if not config.AWS_BUCKET_MODELS:
+        raise RuntimeError("AWS_BUCKET_MODELS not configured")
+    get_s3_client().download_fileobj(config.AWS_BUCKET_MODELS, key.lstrip("/"), fileobj)
 
 
 def upload_url_to_s3(
@@ -276,7 +503,7 @@ def upload_url_to_s3(
 ):
     if key:
         key = ensure_s3_key_ext(key.lstrip("/"), content_type or "application/octet-stream")
-        if s3_key_exists(key):
+        if content_key_exists(key):
             s3_url = build_s3_url(key)
             # print(f"[S3] SKIP: Key exists -> {s3_url}")
             return wrap_upload_result(s3_url, None, return_hash, s3_key=key, reused=True)
@@ -361,17 +588,12 @@ def safe_upload_to_s3(
 
     content_hash = compute_sha256(data_bytes)
     s3_key = build_hash_s3_key(prefix, provider, content_hash, resolved_type)
-    if s3_key_exists(s3_key):
+    if content_key_exists(s3_key, content_hash):
         s3_url = build_s3_url(s3_key)
         # print(f"[S3] SKIP: Key exists -> {s3_url}")
         return wrap_upload_result(s3_url, content_hash if return_hash else None, return_hash, s3_key=s3_key, reused=True)
 
-    _s3.put_object(
-        Bucket=config.AWS_BUCKET_MODELS,
-        Key=s3_key,
-        Body=data_bytes,
-        ContentType=resolved_type,
-    )
+    _put_and_index(s3_key, data_bytes, resolved_type, content_hash)
     s3_url = build_s3_url(s3_key)
     # print(f"[S3] SUCCESS: Uploaded {len(data_bytes)} bytes -> {s3_url}")
     return wrap_upload_result(s3_url, content_hash if return_hash else None, return_hash, s3_key=s3_key, reused=False)
@@ -645,16 +867,11 @@ def upload_video_to_s3(
     ext = ".webm" if "webm" in content_type else ".mp4"
     s3_key = f"videos/{safe_provider}/{content_hash}{ext}"
 
-    if s3_key_exists(s3_key):
+    if content_key_exists(s3_key, content_hash):
         s3_url = build_s3_url(s3_key)
         return {"url": s3_url, "hash": content_hash, "key": s3_key, "reused": True}
 
-    _s3.put_object(
-        Bucket=config.AWS_BUCKET_MODELS,
-        Key=s3_key,
-        Body=video_bytes,
-        ContentType=content_type,
-    )
+    _put_and_index(s3_key, video_bytes, content_type, content_hash)
     s3_url = build_s3_url(s3_key)
     return {"url": s3_url, "hash": content_hash, "key": s3_key, "reused": False}
 
@@ -686,16 +903,11 @@ def upload_thumbnail_to_s3(
     content_hash = compute_sha256(thumb_bytes)
     s3_key = f"thumbnails/{safe_provider}/{content_hash}.jpg"
 
-    if s3_key_exists(s3_key):
+    if content_key_exists(s3_key, content_hash):
         s3_url = build_s3_url(s3_key)
         return {"url": s3_url, "hash": content_hash, "key": s3_key, "reused": True}
 
-    _s3.put_object(
-        Bucket=config.AWS_BUCKET_MODELS,
-        Key=s3_key,
-        Body=thumb_bytes,
-        ContentType="image/jpeg",
-    )
+    _put_and_index(s3_key, thumb_bytes, "image/jpeg", content_hash)
     s3_url = build_s3_url(s3_key)
     return {"url": s3_url, "hash": content_hash, "key": s3_key, "reused": False}
 
@@ -832,6 +1044,10 @@ def delete_s3_objects_safe(keys: list[str], source: str = "unknown") -> dict:
 
     result["keys_attempted"] = len(valid_keys)
 
+    # Drop from the content index first: a failed delete only costs a HEAD
+    # later, while a stale entry would vouch for a missing object.
+    s3_content_index.forget(valid_keys)
+
     # Process in chunks of 1000 (S3 limit)
     for i in range(0, len(valid_keys), 1000):
         chunk = [{"Key": key} for key in valid_keys[i : i + 1000]]
@@ -839,7 +1055,7 @@ def delete_s3_objects_safe(keys: list[str], source: str = "unknown") -> dict:
             continue
 
         try:
-            resp = _s3.delete_objects(
+            resp = get_s3_client().delete_objects(
                 Bucket=config.AWS_BUCKET_MODELS,
                 Delete={"Objects": chunk, "Quiet": False},  # Get detailed response
             )
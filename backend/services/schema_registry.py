@@ -0,0 +1,252 @@
+"""
+Schema version registry for deploy_migrations/*.sql and the boot DDL.
+
+Applied migration files are recorded in timrx_app.schema_migrations (089) with
+the sha256 of their contents, so scripts/apply_migrations.py runs only the
+pending files and reports files that were edited after they were applied.
+
+The row with version = BOOT_VERSION stores a fingerprint of everything a
+worker used to re-run on every start: the recorded migration checksums, the
+in-code DDL (db._ensure_schema_direct, ensure_safety_schema) and the pricing
+seed data. check_boot() compares it with one SELECT; when it matches,
+init_db() and create_app() skip the DDL and seeding entirely. Any change to a
+migration file, the boot DDL or the seed tables changes the fingerprint, and
+the next boot runs the slow path once and stamps the new value.
+
+Config:
+    SCHEMA_BOOT_CHECK  (default true)  set to 0 to always run boot DDL + seeds
+"""
+
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BOOT_CHECK_ENABLED = os.getenv("SCHEMA_BOOT_CHECK", "true").lower() not in ("0", "false", "no")
+
+TABLE = "timrx_app.schema_migrations"
+BOOT_VERSION = "boot"
+# Bump to force one slow boot without touching the DDL or seed data.
+BOOT_SCHEMA_VERSION = 1
+# The migration that creates TABLE; applied first on a fresh registry.
+REGISTRY_MIGRATION = "089"
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[2] / "deploy_migrations"
+_FILE_RE = re.compile(r"^(\d{3,})_([\w.-]+)\.sql$")
+
+_state: Dict[str, Any] = {"checked": False, "current": False, "fingerprint": None, "failure": None}
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: str
+    name: str
+    path: Path
+    checksum: str
+
+
+def file_checksum(path) -> str:
+    """sha256 of a migration file, ignoring CRLF vs LF line endings."""
+    data = Path(path).read_bytes().replace(b"\r\n", b"\n")
+    return hashlib.sha256(data).hexdigest()
+
+
+def discover(directory=None) -> List[Migration]:
+    """All NNN_name.sql files in *directory*, ordered by version."""
+    directory = Path(directory or MIGRATIONS_DIR)
+    found = []
+    if not directory.is_dir():
+        return found
+    for path in directory.iterdir():
+        match = _FILE_RE.match(path.name)
+        if match and path.is_file():
+            found.append(Migration(match.group(1), match.group(2), path, file_checksum(path)))
+    found.sort(key=lambda m: (int(m.version), m.name))
+    return found
+
+
+def _boot_sources() -> List[str]:
+    """Source text of the boot DDL and the seed data, for the fingerprint."""
+    from backend import db
+    from backend.services.pricing_service import DEFAULT_ACTION_COSTS, DEFAULT_PLANS
+    from backend.services.prompt_safety_service import ensure_safety_schema
+
+    sources = []
+    for func in (db._ensure_schema_direct, ensure_safety_schema):
+        try:
+            sources.append(inspect.getsource(func))
+        except (OSError, TypeError):
+            # No source (frozen build): fall back to the bytecode.
+            sources.append(func.__code__.co_code.hex())
+    sources.append(json.dumps(DEFAULT_PLANS, sort_keys=True, default=str))
+    sources.append(json.dumps(DEFAULT_ACTION_COSTS, sort_keys=True, default=str))
+    return sources
+
+
+def boot_fingerprint(migrations: Optional[List[Migration]] = None) -> str:
+    """Fingerprint of the migrations on disk plus the boot DDL and seeds."""
+    if migrations is None:
+        migrations = discover()
+    digest = hashlib.sha256(f"boot-v{BOOT_SCHEMA_VERSION}\n".encode())
+    for m in migrations:
+        digest.update(f"{m.version}:{m.checksum}\n".encode())
+    for source in _boot_sources():
+        digest.update(hashlib.sha256(source.encode()).digest())
+    return digest.hexdigest()
+
+
+def check_boot(conn) -> bool:
+    """One SELECT: is the stored boot fingerprint the one this code expects?
+
+    Remembers the answer for boot_current(). A missing registry table (089
+    not applied yet) or any error counts as "not current".
+    """
+    fingerprint = boot_fingerprint()
+    current = False
+    if BOOT_CHECK_ENABLED:
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT checksum FROM {TABLE} WHERE version = %s", (BOOT_VERSION,))
+                row = cur.fetchone()
+            current = bool(row) and row["checksum"] == fingerprint
+        except Exception as e:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            print(f"[SCHEMA] Version check unavailable ({type(e).__name__}); running boot DDL")
+    _state.update(checked=True, current=current, fingerprint=fingerprint, failure=None)
+    return current
+
+
+def boot_current() -> bool:
+    """Result of the last check_boot() in this process."""
+    return bool(_state["checked"] and _state["current"])
+
+
+def note_boot_failure(reason: str) -> None:
+    """A boot DDL or seed step failed: do not stamp this boot as current."""
+    _state["failure"] = reason
+
+
+def applied(cur) -> Dict[str, Dict[str, Any]]:
+    cur.execute(f"SELECT version, name, checksum, applied_at FROM {TABLE} WHERE version <> %s", (BOOT_VERSION,))
+    return {row["version"]: row for row in cur.fetchall()}
+
+
+def status(cur, migrations: Optional[List[Migration]] = None) -> Dict[str, List[Migration]]:
+    """Split migrations on disk into applied, pending and mismatched."""
+    if migrations is None:
+        migrations = discover()
+    recorded = applied(cur)
+    result: Dict[str, List[Migration]] = {"applied": [], "pending": [], "mismatched": []}
+    for m in migrations:
+        row = recorded.get(m.version)
+        if row is None:
+            result["pending"].append(m)
+        elif row["checksum"] != m.checksum:
+            result["mismatched"].append(m)
+        else:
+            result["applied"].append(m)
+    return result
+
+
+def record(cur, migration: Migration, execution_ms: Optional[int] = None) -> None:
+    cur.execute(
+        f"""
+        INSERT INTO {TABLE} (version, name, checksum, execution_ms)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (version) DO UPDATE SET
+            name = EXCLUDED.name,
+            checksum = EXCLUDED.checksum,
+            execution_ms = EXCLUDED.execution_ms,
+            applied_by = CURRENT_USER,
+            applied_at = NOW()
+        """,
+        (migration.version, migration.name, migration.checksum, execution_ms),
+    )
+
+
+def registry_exists(cur) -> bool:
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL AS ok", (TABLE,))
+    row = cur.fetchone()
+    return bool(row and row["ok"])
+
+
+def apply(conn, migrations: Optional[List[Migration]] = None, *, baseline: bool = False) -> List[Migration]:
+    """Run (or with baseline=True, only record) every pending migration.
+
+    *conn* must be in autocommit mode: the files carry their own
+    BEGIN/COMMIT. Stops at the first failure; files applied before it stay
+    recorded. Mismatched files are never re-run, only reported by status().
+    """
+    if migrations is None:
+        migrations = discover()
+    done: List[Migration] = []
+    with conn.cursor() as cur:
+        if not registry_exists(cur):
+            bootstrap = next((m for m in migrations if m.version == REGISTRY_MIGRATION), None)
+            if bootstrap is None:
+                raise RuntimeError(f"{TABLE} is missing and migration {REGISTRY_MIGRATION} was not found")
+            cur.execute(bootstrap.path.read_text())
+        pending = status(cur, migrations)["pending"]
+        for m in pending:
+            started = time.monotonic()
+            if not baseline:
+                cur.execute(m.path.read_text())
+            record(cur, m, None if baseline else int((time.monotonic() - started) * 1000))
+            done.append(m)
+    return done
+
+
+def stamp_boot(conn=None) -> bool:
+    """Record the boot fingerprint once the DDL and seeding have succeeded.
+
+    Refuses (returns False) while migrations are pending or mismatched, so a
+    deploy that ships a new file keeps running the boot DDL until the file
+    has been applied and recorded.
+    """
+    if not BOOT_CHECK_ENABLED:
+        return False
+    if _state["failure"]:
+        print(f"[SCHEMA] Boot fingerprint not stamped: {_state['failure']}")
+        return False
+    own = conn is None
+    try:
+        if own:
+            from backend.db import _create_connection
+            conn = _create_connection("schema_registry")
+        migrations = discover()
+        with conn.cursor() as cur:
+            state = status(cur, migrations)
+            if state["pending"] or state["mismatched"]:
+                names = [m.path.name for m in state["pending"] + state["mismatched"]]
+                print(f"[SCHEMA] Boot fingerprint not stamped; unapplied or changed migrations: {', '.join(names)}")
+                conn.rollback()
+                return False
+            fingerprint = boot_fingerprint(migrations)
+            record(cur, Migration(BOOT_VERSION, "boot ddl and seeds", Path(), fingerprint))
+        conn.commit()
+        _state.update(checked=True, current=True, fingerprint=fingerprint)
+        print(f"[SCHEMA] Boot fingerprint stamped ({fingerprint[:12]})")
+        return True
+    except Exception as e:
+        print(f"[SCHEMA] Warning: could not stamp boot fingerprint: {e}")
+        return False
+    finally:
+        if own and conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+def reset() -> None:
+    _state.update(checked=False, current=False, fingerprint=None, failure=None)
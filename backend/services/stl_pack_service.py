@@ -18,6 +18,7 @@ frontend catalog in js/stl-packs.js.
 
 from __future__ import annotations
 
+import importlib.util
 import uuid
 from typing import Optional, Dict, Any, List
 
@@ -26,14 +27,10 @@ import requests
 from backend.config import config
 from backend.db import query_one, query_all, execute_returning, transaction
 
-# boto3 is only needed to mint R2 download links. Import is guarded so a
-# missing dependency never blocks app startup — it only disables downloads.
-try:
-    import boto3
-    from botocore.config import Config as _BotoConfig
-    _BOTO_AVAILABLE = True
-except Exception:  # pragma: no cover
-    _BOTO_AVAILABLE = False
+# boto3 is only needed to mint R2 download links. It is imported on first
+# use so it never slows or blocks app startup — a missing dependency only
+# disables downloads.
+_BOTO_AVAILABLE = importlib.util.find_spec("boto3") is not None
 
 
 _TABLE = f"{config.BILLING_SCHEMA}.stl_pack_entitlements"
@@ -299,6 +296,9 @@ class StlPackService:
             raise RuntimeError("boto3 is not installed")
         if not config.R2_CONFIGURED:
             raise RuntimeError("Cloudflare R2 is not configured (set R2_* env vars)")
+        import boto3
+        from botocore.config import Config as _BotoConfig
+
         return boto3.client(
             "s3",
             endpoint_url=config.R2_ENDPOINT,
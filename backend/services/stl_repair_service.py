@@ -8,6 +8,7 @@ process, and returns binary STL bytes plus a compact before/after report.
 from __future__ import annotations
 
 import gc
+import hashlib
 import io
 import logging
 import os
@@ -33,7 +34,21 @@ def _env_int(name: str, default: int, minimum: int | None = None) -> int:
     return value
 
 
-def _mesh_report(mesh) -> Dict[str, Any]:
+def _mesh_report(mesh, features: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    if features:
+        # Stored mesh_feature_store features of the source model: skips the
+        # edge count and the component split on the unrepaired mesh.
+        volume = features.get("volume") if features.get("is_watertight") else None
+        return {
+            "vertices": int(features["vertex_count"]),
+            "faces": int(features["face_count"]),
+            "is_watertight": bool(features["is_watertight"]),
+            "is_winding_consistent": bool(features.get("is_winding_consistent")),
+            "boundary_edges": features.get("boundary_edges"),
+            "non_manifold_edges": features.get("non_manifold_edges"),
+            "components": features.get("component_count"),
+            "volume_cm3": round(float(volume) / 1000.0, 3) if volume is not None else None,
+        }
     try:
         volume_cm3 = float(mesh.volume) / 1000.0 if bool(mesh.is_watertight) else None
     except Exception:
@@ -417,16 +432,147 @@ def _solid_rebuild_with_pymeshlab(mesh):
     return None, None, []
 
 
+def _repair_component(part):
+    """pymeshfix → pymeshlab → trimesh for one component, within the per-component face limits."""
+    face_count = int(len(getattr(part, "faces", [])))
+    fixed = None
+    engine = None
+    if face_count <= StlRepairService.PYMESHFIX_COMPONENT_FACE_LIMIT:
+        fixed, engine = _repair_with_pymeshfix(part)
+    if fixed is None and face_count <= StlRepairService.PYMESHLAB_COMPONENT_FACE_LIMIT:
+        fixed, engine = _repair_with_pymeshlab(part)
+    if fixed is None:
+        fixed, engine = _repair_with_trimesh(part)
+    return fixed, engine
+
+
+def _component_pool_init(memory_mb: int) -> None:
+    """Pool child setup: single-threaded BLAS, the per-child memory cap, and
+    die with the repair process if the parent kills it on timeout."""
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+    os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
+    os.environ.setdefault("MKL_NUM_THREADS", "1")
+    os.environ.setdefault("NUMEXPR_NUM_THREADS", "1")
+    try:
+        from backend.services.print_analysis_service import _set_analysis_child_limits
+
+        _set_analysis_child_limits(memory_mb)
+    except Exception:
+        pass
+    try:
+        import ctypes
+        import signal
+
+        ctypes.CDLL("libc.so.6", use_errno=True).prctl(1, signal.SIGKILL)  # PR_SET_PDEATHSIG
+    except Exception:
+        pass
+
+
+def _repair_component_task(vertices, faces):
+    """Pool entry point. Arrays in, arrays out — Trimesh caches don't cross the pipe."""
+    import time
+    import trimesh
+
+    started = time.monotonic()
+    part = trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+    try:
+        fixed, engine = _repair_component(part)
+    except MemoryError:
+        return None, None, "memory", round(time.monotonic() - started, 3)
+    if fixed is None or len(fixed.faces) == 0:
+        return None, None, engine, round(time.monotonic() - started, 3)
+    return fixed.vertices, fixed.faces, engine, round(time.monotonic() - started, 3)
+
+
+def _kill_pool(executor) -> None:
+    executor.shutdown(wait=False, cancel_futures=True)
+    # shutdown() can't interrupt a running task; the workers are ours to kill.
+    for proc in list((getattr(executor, "_processes", None) or {}).values()):
+        try:
+            proc.kill()
+        except Exception:
+            pass
+
+
+def _repair_parts_parallel(parts: list, timings: list, workers: int) -> Dict[int, tuple]:
+    """
+    Repair the large components on a process pool while the small ones run
+    inline. Returns {index: (mesh, engine)}; indices that missed the pool
+    deadline are absent so the caller can fall back for them.
+    """
+    import multiprocessing as mp
+    import time
+    from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+    from concurrent.futures.process import BrokenProcessPool
+
+    import trimesh
+
+    start_method = os.getenv("STL_REPAIR_MP_START_METHOD", "spawn")
+    try:
+        ctx = mp.get_context(start_method)
+    except ValueError:
+        ctx = mp.get_context("spawn")
+
+    results: Dict[int, tuple] = {}
+    deadline = time.monotonic() + StlRepairService.REPAIR_TIMEOUT * StlRepairService.PARALLEL_BUDGET_FRACTION
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_component_pool_init,
+        initargs=(StlRepairService.COMPONENT_MEMORY_LIMIT_MB,),
+    )
+    try:
+        futures = {}
+        inline = []
+        for index, part in enumerate(parts):
+            if part is None:
+                continue
+            if len(part.faces) >= StlRepairService.PARALLEL_MIN_COMPONENT_FACES:
+                futures[index] = executor.submit(_repair_component_task, part.vertices, part.faces)
+            else:
+                inline.append(index)
+
+        for index in inline:
+            started = time.monotonic()
+            results[index] = _repair_component(parts[index])
+            timings[index].update({"seconds": round(time.monotonic() - started, 3), "worker": "inline"})
+
+        for index, future in futures.items():
+            try:
+                vertices, faces, engine, seconds = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FuturesTimeout:
+                timings[index]["worker"] = "pool-timeout"
+                continue
+            except BrokenProcessPool:
+                timings[index]["worker"] = "pool-crashed"
+                continue
+            if engine == "memory":
+                timings[index]["worker"] = "pool-memory"
+                continue
+            timings[index].update({"seconds": seconds, "worker": "pool"})
+            if vertices is None:
+                results[index] = (None, engine)
+            else:
+                results[index] = (trimesh.Trimesh(vertices=vertices, faces=faces, process=False), engine)
+    finally:
+        if all(index in results for index in futures):
+            executor.shutdown(wait=True)
+        else:
+            _kill_pool(executor)
+    return results
+
+
 def _repair_components(mesh):
+    import time
     import trimesh
 
     try:
         components = mesh.split(only_watertight=False)
     except Exception:
-        return None, None, []
+        return None, None, [], None
 
     if not components or len(components) <= 1:
-        return None, None, []
+        return None, None, [], None
 
     mesh_bounds = getattr(mesh, "bounds", None)
     try:
@@ -436,13 +582,16 @@ def _repair_components(mesh):
     min_faces = max(12, StlRepairService.MIN_COMPONENT_FACES)
     min_extent = max(0.01, diag * StlRepairService.MIN_COMPONENT_EXTENT_RATIO) if diag > 0 else 0.01
 
-    repaired_parts = []
     dropped = 0
     meshfix_parts = 0
     pymeshlab_parts = 0
     trimesh_parts = 0
 
+    # Deterministic order: largest first, kept through the parallel path so
+    # the concatenated output is identical however the work was scheduled.
     components = sorted(components, key=lambda part: int(len(getattr(part, "faces", []))), reverse=True)
+    parts = []
+    timings = []
     for index, part in enumerate(components):
         face_count = int(len(getattr(part, "faces", [])))
         try:
@@ -453,16 +602,42 @@ def _repair_components(mesh):
         if index > 0 and not bool(getattr(part, "is_watertight", False)) and (face_count < min_faces or extent < min_extent):
             dropped += 1
             continue
+        parts.append(part)
+        timings.append({"index": len(timings), "faces": face_count})
+
+    large = [len(part.faces) for part in parts if len(part.faces) >= StlRepairService.PARALLEL_MIN_COMPONENT_FACES]
+    workers = min(StlRepairService.PARALLEL_WORKERS, len(large))
+    mode = "serial"
+    results: Dict[int, tuple] = {}
+    started = time.monotonic()
+    # Spawning the pool costs a few seconds of imports; only worth it when
+    # there is enough geometry to keep the workers busy for longer than that.
+    if workers >= 2 and sum(large) >= StlRepairService.PARALLEL_MIN_TOTAL_FACES:
+        mode = "parallel"
+        try:
+            results = _repair_parts_parallel(parts, timings, workers)
+        except Exception as exc:
+            logger.warning("[STL_REPAIR] parallel component repair unavailable, running serially: %s", exc)
+            mode = "serial-fallback"
+            results = {}
 
-        fixed = None
-        engine = None
-        if face_count <= StlRepairService.PYMESHFIX_COMPONENT_FACE_LIMIT:
-            fixed, engine = _repair_with_pymeshfix(part)
-        if fixed is None and face_count <= StlRepairService.PYMESHLAB_COMPONENT_FACE_LIMIT:
-            fixed, engine = _repair_with_pymeshlab(part)
-        if fixed is None:
-            fixed, engine = _repair_with_trimesh(part)
+    for index, part in enumerate(parts):
+        if index in results:
+            continue
+        part_started = time.monotonic()
+        # Components that ran out of pool time or memory only get the cheap
+        # trimesh pass; a crashed pool just means running them here.
+        if timings[index].get("worker") in ("pool-timeout", "pool-memory"):
+            results[index] = _repair_with_trimesh(part)
+        else:
+            results[index] = _repair_component(part)
+            timings[index].setdefault("worker", "inline")
+        timings[index]["seconds"] = round(time.monotonic() - part_started, 3)
 
+    repaired_parts = []
+    for index in range(len(parts)):
+        fixed, engine = results[index]
+        timings[index]["engine"] = engine
         if fixed is not None and len(fixed.faces) > 0:
             repaired_parts.append(fixed)
             if engine == "pymeshfix":
@@ -472,8 +647,17 @@ def _repair_components(mesh):
             else:
                 trimesh_parts += 1
 
+    component_report = {
+        "mode": mode,
+        "workers": workers if mode == "parallel" else 1,
+        "wall_seconds": round(time.monotonic() - started, 3),
+        "cpu_seconds": round(sum(t.get("seconds") or 0.0 for t in timings), 3),
+        "dropped_fragments": dropped,
+        "components": timings,
+    }
+
     if not repaired_parts:
-        return None, None, []
+        return None, None, [], component_report
 
     try:
         repaired = trimesh.util.concatenate(repaired_parts)
@@ -484,6 +668,9 @@ def _repair_components(mesh):
     warnings = []
     if dropped:
         warnings.append(f"Dropped {dropped} tiny open mesh fragment(s) during repair.")
+    degraded = sum(1 for t in timings if t.get("worker") in ("pool-timeout", "pool-memory"))
+    if degraded:
+        warnings.append(f"{degraded} component(s) exceeded the parallel repair budget and got a basic repair only.")
 
     # Post-stitch: independently-repaired components, once concatenated, often
     # leave a small number of non-manifold edges at the seams. Run a cheap
@@ -492,7 +679,8 @@ def _repair_components(mesh):
     if stitched is not None:
         repaired = stitched
 
-    return repaired, f"components:pymeshfix={meshfix_parts},pymeshlab={pymeshlab_parts},trimesh={trimesh_parts}", warnings
+    engine = f"components:pymeshfix={meshfix_parts},pymeshlab={pymeshlab_parts},trimesh={trimesh_parts}"
+    return repaired, engine, warnings, component_report
 
 
 def _repair_with_trimesh(mesh):
@@ -535,27 +723,56 @@ def _repair_with_trimesh(mesh):
     return repaired, "trimesh"
 
 
-def _repair_file(file_path: str, file_type: str | None, target_height_mm: float | None = None) -> Dict[str, Any]:
+def _repair_file(
+    file_path: str,
+    file_type: str | None,
+    target_height_mm: float | None = None,
+    features: Dict[str, Any] | None = None,
+    lod_path: str | None = None,
+) -> Dict[str, Any]:
+    from backend.services import mesh_lod_service
+
     mesh = _load_mesh(file_path, file_type=file_type)
-    before = _mesh_report(mesh)
+    before = _mesh_report(mesh, features)
     warnings = []
 
-    repaired, engine, component_warnings = _repair_components(mesh)
+    # Above the MeshFix limit the deliverable is still repaired at full
+    # resolution (MeshLab / trimesh below). MeshFix runs on a quadric LOD
+    # (it keeps the topology) only to report what a remesh to that face
+    # count would fix. Not when only the largest part of a scene was loaded.
+    lod_info = None
+    lod_target = mesh_lod_service.level_for(before["faces"], StlRepairService.PYMESHFIX_FACE_LIMIT)
+    if lod_target and not (mesh.metadata or {}).get("timrx_analysis_limited_to_largest_part"):
+        lod, lod_info = mesh_lod_service.obtain(lod_path, lod_target, mesh=mesh)
+        if lod is not None:
+            lod_repaired, lod_engine = _repair_with_pymeshfix(lod)
+            if lod_repaired is not None:
+                lod_info = {**(lod_info or {}), "repair": {"engine": lod_engine, "after": _mesh_report(lod_repaired)}}
+            del lod
+
+    face_count = int(len(mesh.faces))
+    repaired, engine, component_warnings, component_report = _repair_components(mesh)
     warnings.extend(component_warnings)
     if repaired is None:
         max_meshfix_faces = StlRepairService.PYMESHFIX_FACE_LIMIT
-        if before["faces"] <= max_meshfix_faces:
+        if face_count <= max_meshfix_faces:
             repaired, engine = _repair_with_pymeshfix(mesh)
+        elif ((lod_info or {}).get("repair") or {}).get("after", {}).get("is_watertight"):
+            warnings.append(
+                f"MeshFix skipped because this model has {face_count:,} faces. A "
+                f"{lod_info['faces']:,}-face simplified copy repairs cleanly with it, so Remesh "
+                f"to about that polygon count for aggressive repair."
+            )
         else:
             warnings.append(
-                f"MeshFix skipped because this model has {before['faces']:,} faces. "
+                f"MeshFix skipped because this model has {face_count:,} faces. "
                 f"Use Remesh with a lower polygon target for aggressive repair."
             )
-    if repaired is None and before["faces"] <= StlRepairService.PYMESHLAB_FACE_LIMIT:
+    if repaired is None and face_count <= StlRepairService.PYMESHLAB_FACE_LIMIT:
         repaired, engine = _repair_with_pymeshlab(mesh)
     elif repaired is None:
         warnings.append(
-            f"MeshLab skipped because this model has {before['faces']:,} faces, "
+            f"MeshLab skipped because this model has {face_count:,} faces, "
             f"above STL_REPAIR_MESHLAB_FACE_LIMIT={StlRepairService.PYMESHLAB_FACE_LIMIT:,}."
         )
     if repaired is None:
@@ -669,11 +886,21 @@ def _repair_file(file_path: str, file_type: str | None, target_height_mm: float
         "after": after,
         "warnings": warnings,
         "scaled_dimensions": scaled_dimensions,
+        "component_repair": component_report,
+        "lod": lod_info,
         "stl_bytes": bytes(stl_bytes),
     }
 
 
-def _repair_worker(conn, file_path: str, file_type: str | None, memory_mb: int, target_height_mm: float | None = None) -> None:
+def _repair_worker(
+    conn,
+    file_path: str,
+    file_type: str | None,
+    memory_mb: int,
+    target_height_mm: float | None = None,
+    features: Dict[str, Any] | None = None,
+    lod_path: str | None = None,
+) -> None:
     try:
         os.environ.setdefault("OMP_NUM_THREADS", "1")
         os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
@@ -685,7 +912,9 @@ def _repair_worker(conn, file_path: str, file_type: str | None, memory_mb: int,
             _set_analysis_child_limits(memory_mb)
         except Exception:
             pass
-        conn.send(_repair_file(file_path, file_type=file_type, target_height_mm=target_height_mm))
+        conn.send(_repair_file(
+            file_path, file_type=file_type, target_height_mm=target_height_mm, features=features, lod_path=lod_path,
+        ))
     except MemoryError:
         conn.send({
             "ok": False,
@@ -702,6 +931,20 @@ def _repair_worker(conn, file_path: str, file_type: str | None, memory_mb: int,
         gc.collect()
 
 
+def repair_artifact_options(target_height_mm: float | None = None):
+    """
+    Derived-artifact options for a repaired STL, or None when the target
+    height is outside what the artifact store keys on (repair still runs,
+    the result just isn't cached).
+    """
+    from backend.services.mesh_conversion_service import ConversionOptions
+
+    try:
+        return ConversionOptions(fmt="stl", target_height_mm=target_height_mm, repair=True)
+    except ValueError:
+        return None
+
+
 class StlRepairService:
     MAX_DOWNLOAD_BYTES = _env_int("STL_REPAIR_MAX_DOWNLOAD_MB", 30, minimum=1) * 1024 * 1024
     REPAIR_TIMEOUT = _env_int("STL_REPAIR_TIMEOUT_SECONDS", 90, minimum=30)
@@ -721,11 +964,34 @@ class StlRepairService:
     # the mesh has no open holes. Slicers handle a small number trivially.
     MAX_NON_MANIFOLD_EDGES = _env_int("STL_REPAIR_MAX_NON_MANIFOLD_EDGES", 10, minimum=0)
     USE_SUBPROCESS = os.getenv("STL_REPAIR_SUBPROCESS", "true").lower() not in ("0", "false", "no")
+    # Parallel component repair: when the components with at least
+    # PARALLEL_MIN_COMPONENT_FACES faces add up to PARALLEL_MIN_TOTAL_FACES,
+    # they fan out to a process pool of PARALLEL_WORKERS children, each
+    # capped at COMPONENT_MEMORY_LIMIT_MB. That defaults to an equal share of
+    # REPAIR_MEMORY_LIMIT_MB between the children and the repair process
+    # that spawned them, so the pool can't use several times the budget.
+    # The pool gets PARALLEL_BUDGET_FRACTION of REPAIR_TIMEOUT; stragglers get
+    # a trimesh-only repair. PARALLEL_WORKERS=1 keeps the serial path.
+    PARALLEL_WORKERS = _env_int("STL_REPAIR_PARALLEL_WORKERS", min(4, os.cpu_count() or 1), minimum=1)
+    PARALLEL_MIN_COMPONENT_FACES = _env_int("STL_REPAIR_PARALLEL_MIN_COMPONENT_FACES", 5000, minimum=1)
+    PARALLEL_MIN_TOTAL_FACES = _env_int("STL_REPAIR_PARALLEL_MIN_TOTAL_FACES", 150000, minimum=0)
+    COMPONENT_MEMORY_LIMIT_MB = _env_int(
+        "STL_REPAIR_COMPONENT_MEMORY_MB", REPAIR_MEMORY_LIMIT_MB // (PARALLEL_WORKERS + 1), minimum=0,
+    )
+    PARALLEL_BUDGET_FRACTION = float(os.getenv("STL_REPAIR_PARALLEL_BUDGET_FRACTION", "0.6") or "0.6")
 
     @staticmethod
-    def _repair_file_safely(file_path: str, file_type: str | None, target_height_mm: float | None = None) -> Dict[str, Any]:
+    def _repair_file_safely(
+        file_path: str,
+        file_type: str | None,
+        target_height_mm: float | None = None,
+        features: Dict[str, Any] | None = None,
+        lod_path: str | None = None,
+    ) -> Dict[str, Any]:
         if not StlRepairService.USE_SUBPROCESS:
-            return _repair_file(file_path, file_type=file_type, target_height_mm=target_height_mm)
+            return _repair_file(
+                file_path, file_type=file_type, target_height_mm=target_height_mm, features=features, lod_path=lod_path,
+            )
 
         import multiprocessing as mp
         import time
@@ -739,8 +1005,13 @@ class StlRepairService:
         parent_conn, child_conn = ctx.Pipe(duplex=False)
         proc = ctx.Process(
             target=_repair_worker,
-            args=(child_conn, file_path, file_type, StlRepairService.REPAIR_MEMORY_LIMIT_MB, target_height_mm),
-            daemon=True,
+            args=(
+                child_conn, file_path, file_type, StlRepairService.REPAIR_MEMORY_LIMIT_MB,
+                target_height_mm, features, lod_path,
+            ),
+            # Daemonic processes may not start children, which the parallel
+            # component pool needs. Either way the child is joined/killed below.
+            daemon=StlRepairService.PARALLEL_WORKERS <= 1,
         )
 
         started = time.monotonic()
@@ -788,6 +1059,7 @@ class StlRepairService:
             return {"ok": False, "error": f"Invalid model URL: {url_error}"}
 
         tmp_path = None
+        digest = hashlib.sha256()
         try:
             resp = requests.get(url, timeout=30, stream=True)
             resp.raise_for_status()
@@ -821,12 +1093,41 @@ class StlRepairService:
                         "error": f"Model file exceeds {StlRepairService.MAX_DOWNLOAD_BYTES / 1024 / 1024:.0f} MB limit.",
                     }
                 tmp.write(chunk)
+                digest.update(chunk)
             tmp.close()
 
             if not file_type:
                 file_type = PrintAnalysisService._detect_file_type(url, resp.headers.get("content-type"), head)
 
-            return StlRepairService._repair_file_safely(tmp_path, file_type=file_type, target_height_mm=target_height_mm)
+            # Same source bytes + same target height were repaired before:
+            # hand back the stored STL and its report instead of re-running.
+            source_hash = digest.hexdigest()
+            options = repair_artifact_options(target_height_mm)
+            if options is not None:
+                from backend.services.mesh_conversion_service import find_artifact
+
+                cached = find_artifact(source_hash, options)
+                if cached:
+                    report = dict((cached.get("meta") or {}).get("report") or {})
+                    return {**report, "ok": True, "cached": True, "artifact": cached, "source_hash": source_hash}
+
+            from backend.services import mesh_feature_store, mesh_lod_service, mesh_stream_reader
+
+            features = mesh_feature_store.get(source_hash)
+            face_hint = features["face_count"] if features else mesh_stream_reader.face_count(tmp_path, file_type)
+            lod_target = mesh_lod_service.level_for(face_hint, StlRepairService.PYMESHFIX_FACE_LIMIT)
+            with mesh_lod_service.lod_slot(source_hash, lod_target, "quadric") as slot:
+                result = StlRepairService._repair_file_safely(
+                    tmp_path, file_type=file_type, target_height_mm=target_height_mm, features=features,
+                    lod_path=slot.path if slot else None,
+                )
+                if slot:
+                    slot.update(result.get("lod"))
+            result["source_hash"] = source_hash
+            if features is None:
+                with open(tmp_path, "rb") as f:
+                    mesh_feature_store.schedule(source_hash, data=f.read(), file_type=file_type or "glb")
+            return result
         except requests.RequestException as exc:
             return {"ok": False, "error": f"Could not download model: {exc}"}
         except Exception as exc:
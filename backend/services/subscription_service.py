@@ -18,7 +18,7 @@ from datetime import datetime, timezone, timedelta
 from typing import Any, Dict, List, Optional, Tuple
 from contextlib import contextmanager
 
-from backend.db import USE_DB, get_conn, Tables
+from backend.db import USE_DB, connection_scope, get_conn, Tables
 
 
 def _stable_grant_ref_id(subscription_id: str, period_start: datetime, plan_code: str) -> str:
@@ -1173,7 +1173,10 @@ class SubscriptionService:
                 print("[SUB] process_due_credit_allocations: Lock not acquired (another run in progress)")
                 return {"processed": 0, "granted": 0, "errors": 0, "skipped": 0, "status": "locked"}
 
-            return SubscriptionService._process_due_credit_allocations_impl()
+            # One connection for the whole batch instead of several
+            # checkouts per subscription (lookup, pause, grant, event log).
+            with connection_scope("subscription_credits"):
+                return SubscriptionService._process_due_credit_allocations_impl()
 
     @staticmethod
     def _process_due_credit_allocations_impl() -> Dict[str, Any]:
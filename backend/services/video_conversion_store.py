@@ -0,0 +1,168 @@
+"""
+Shared state for queued AVI → MP4 conversions.
+
+ConversionQueue (ffmpeg_service) runs ffmpeg in the worker that took the
+upload, but with WEB_CONCURRENCY workers, and more than one instance, the
+status poll and the download can land anywhere. The queue writes every state
+change to timrx_app.video_conversions (deploy_migrations/097) and uploads a
+finished MP4 to the models bucket under video-conversions/, so any worker can
+answer GET /video/convert/jobs/<id> and hand out the file.
+
+The outputs are transient and per user: they are not content-addressed, so
+they skip s3_content_index, and they are deleted with their row after a
+download or once expires_at (VIDEO_CONVERT_RESULT_TTL_SECONDS) has passed.
+
+Nothing here raises: without the table or the bucket, polls that reach the
+owning worker keep working from its memory, as before.
+
+Environment:
+    VIDEO_CONVERT_PROGRESS_STEP   progress points between row updates (default 5)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Any, Dict, Optional
+
+S3_PREFIX = "video-conversions/"
+PROGRESS_STEP = max(1, int(os.getenv("VIDEO_CONVERT_PROGRESS_STEP", "5")))
+
+_db_disabled_reason: Optional[str] = None
+
+
+def _db_ready() -> bool:
+    if _db_disabled_reason is not None:
+        return False
+    from backend.db import USE_DB
+
+    return bool(USE_DB)
+
+
+def _db_failed(exc: Exception) -> None:
+    global _db_disabled_reason
+    if "video_conversions" in str(exc) and "does not exist" in str(exc):
+        _db_disabled_reason = "table_missing"
+        print("[VIDEO_CONVERT] timrx_app.video_conversions missing (run migration 097); jobs stay per-process")
+    else:
+        print(f"[VIDEO_CONVERT] conversion state write/read failed: {exc}")
+
+
+def s3_key_for(job_id: str) -> str:
+    return f"{S3_PREFIX}{job_id}.mp4"
+
+
+def save(job, ttl_seconds: int) -> None:
+    """Upsert the job's current state; the row expires ttl_seconds from now."""
+    if not _db_ready():
+        return
+    try:
+        from backend.db import Tables, transaction
+
+        with transaction("video_conversions") as cur:
+            cur.execute(
+                f"""
+                INSERT INTO {Tables.VIDEO_CONVERSIONS}
+                    (id, identity_id, status, state, s3_key, expires_at)
+                VALUES (%s, %s, %s, %s::jsonb, %s, NOW() + make_interval(secs => %s))
+                ON CONFLICT (id) DO UPDATE SET
+                    status = EXCLUDED.status,
+                    state = EXCLUDED.state,
+                    s3_key = COALESCE(EXCLUDED.s3_key, {Tables.VIDEO_CONVERSIONS}.s3_key),
+                    updated_at = NOW(),
+                    expires_at = EXCLUDED.expires_at
+                """,
+                (job.job_id, job.owner_id, job.status, json.dumps(job.to_dict()), job.s3_key, ttl_seconds),
+            )
+    except Exception as exc:
+        _db_failed(exc)
+
+
+def publish(job) -> Optional[str]:
+    """Upload a finished output so other workers can serve it; returns the key."""
+    from backend.config import config
+
+    if not (config.AWS_BUCKET_MODELS and _db_ready()):
+        return None
+    try:
+        from backend.services.s3_service import upload_transient_fileobj_to_s3
+
+        with open(job.output_path, "rb") as fh:
+            return upload_transient_fileobj_to_s3(fh, s3_key_for(job.job_id), "video/mp4")
+    except Exception as exc:
+        print(f"[VIDEO_CONVERT] output upload failed job={job.job_id[:8]}: {exc}")
+        return None
+
+
+def load(job_id: str, owner_id: str) -> Optional[Dict[str, Any]]:
+    """The stored state of another worker's job: {"status", "state", "s3_key"}, or None."""
+    if not (job_id and _db_ready()):
+        return None
+    try:
+        from backend.db import Tables, transaction
+
+        with transaction("video_conversions") as cur:
+            cur.execute(
+                f"""
+                SELECT status, state, s3_key FROM {Tables.VIDEO_CONVERSIONS}
+                WHERE id = %s AND identity_id = %s AND expires_at > NOW()
+                """,
+                (job_id, owner_id),
+            )
+            row = cur.fetchone()
+    except Exception as exc:
+        _db_failed(exc)
+        return None
+    if not row:
+        return None
+    return {"status": row["status"], "state": dict(row["state"] or {}), "s3_key": row["s3_key"]}
+
+
+def delete(job_id: str) -> None:
+    """Drop a job's row and its uploaded output (after download or cancel)."""
+    if not _db_ready():
+        return
+    try:
+        from backend.db import Tables, transaction
+
+        with transaction("video_conversions") as cur:
+            cur.execute(
+                f"DELETE FROM {Tables.VIDEO_CONVERSIONS} WHERE id = %s RETURNING s3_key",
+                (job_id,),
+            )
+            row = cur.fetchone()
+    except Exception as exc:
+        _db_failed(exc)
+        return
+    if row and row["s3_key"]:
+        from backend.services.s3_service import delete_s3_objects_safe
+
+        delete_s3_objects_safe([row["s3_key"]], source="video_convert_download")
+
+
+def reap_expired() -> int:
+    """Delete expired rows from every worker and their outputs; returns rows removed."""
+    if not _db_ready():
+        return 0
+    try:
+        from backend.db import Tables, transaction
+
+        with transaction("video_conversions") as cur:
+            cur.execute(
+                f"DELETE FROM {Tables.VIDEO_CONVERSIONS} WHERE expires_at <= NOW() RETURNING s3_key"
+            )
+            rows = cur.fetchall()
+    except Exception as exc:
+        _db_failed(exc)
+        return 0
+    keys = [row["s3_key"] for row in rows if row["s3_key"]]
+    if keys:
+        from backend.services.s3_service import delete_s3_objects_safe
+
+        delete_s3_objects_safe(keys, source="video_convert_expired")
+    return len(rows)
+
+
+def reset() -> None:
+    global _db_disabled_reason
+    _db_disabled_reason = None
@@ -0,0 +1,247 @@
+"""
+Wall-thickness engine for print analysis.
+
+Samples points on the surface, casts one ray inward from each, and takes the
+first opposing hit as the local wall thickness. Built for the high-poly
+meshes print analysis used to skip:
+
+- The ray-acceleration structure is built once per mesh and rays are cast in
+  fixed-size chunks, so peak memory depends on the chunk size, not on the
+  sample count or how many triangles a long ray passes near.
+- Above ``proxy_face_limit`` faces the rays run against a quadric-decimated
+  proxy. The proxy's deviation from the original surface is measured on a
+  sample and reported as an error bound (a wall can be off by at most twice
+  the max deviation, one per side).
+- Results come back as a histogram over fixed millimetre bins, overall and per
+  bounding-box octant, instead of only min/avg/pct.
+
+All distances are reported in millimetres (raw units × ``mm_multiplier``).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int, minimum: int | None = None) -> int:
+    raw = os.getenv(name)
+    if raw is None or str(raw).strip() == "":
+        return default
+    try:
+        value = int(str(raw).strip())
+    except (TypeError, ValueError):
+        logger.warning("[WALL_THICKNESS] Invalid %s=%r; using default %s", name, raw, default)
+        return default
+    if minimum is not None and value < minimum:
+        return minimum
+    return value
+
+
+RAY_CHUNK = _env_int("PRINT_ANALYSIS_WALL_RAY_CHUNK", 1024, minimum=64)
+PROXY_TARGET_FACES = _env_int("PRINT_ANALYSIS_WALL_PROXY_FACES", 20000, minimum=1000)
+DEVIATION_SAMPLES = _env_int("PRINT_ANALYSIS_WALL_DEVIATION_SAMPLES", 1000, minimum=50)
+TIME_BUDGET_SECONDS = float(os.getenv("PRINT_ANALYSIS_WALL_TIME_BUDGET_SECONDS", "12") or "12")
+
+# Histogram bin edges (mm). The last bin is open-ended.
+BIN_EDGES_MM = (0.0, 0.4, 0.8, 1.2, 2.0, 3.0, 5.0, 10.0)
+# Hits further than this are through-shots across a cavity, not a wall.
+MAX_WALL_MM = 100.0
+
+_AXIS_LABELS = (("left", "right"), ("lower", "upper"), ("back", "front"))  # x, y (up), z
+
+
+def _ray_intersector(mesh):
+    """Embree when available, else trimesh's rtree-backed intersector. Built once."""
+    try:
+        from trimesh.ray.ray_pyembree import RayMeshIntersector
+
+        return RayMeshIntersector(mesh), "embree"
+    except Exception:
+        from trimesh.ray.ray_triangle import RayMeshIntersector
+
+        return RayMeshIntersector(mesh), "rtree"
+
+
+def decimate(mesh, target_faces: int):
+    """Quadric-decimate to about ``target_faces``; None if no decimator is available."""
+    import numpy as np
+    import trimesh
+
+    try:
+        import pymeshlab
+
+        ms = pymeshlab.MeshSet()
+        ms.add_mesh(pymeshlab.Mesh(
+            vertex_matrix=np.asarray(mesh.vertices, dtype=np.float64),
+            face_matrix=np.asarray(mesh.faces, dtype=np.int32),
+        ))
+        ms.apply_filter(
+            "meshing_decimation_quadric_edge_collapse",
+            targetfacenum=int(target_faces),
+            preserveboundary=True,
+            preservenormal=True,
+            preservetopology=True,
+            planarquadric=True,
+        )
+        out = ms.current_mesh()
+        return trimesh.Trimesh(vertices=out.vertex_matrix(), faces=out.face_matrix(), process=False)
+    except ImportError:
+        pass
+    except Exception as exc:
+        logger.warning("[WALL_THICKNESS] pymeshlab decimation failed: %s", exc)
+
+    try:
+        return mesh.simplify_quadric_decimation(face_count=int(target_faces))
+    except Exception as exc:
+        logger.info("[WALL_THICKNESS] trimesh decimation unavailable: %s", exc)
+    return None
+
+
+def _proxy_deviation(original, proxy, samples: int) -> Optional[Dict[str, float]]:
+    """One-sided surface deviation original → proxy on a point sample (raw units)."""
+    import numpy as np
+    import trimesh
+
+    try:
+        points, _ = trimesh.sample.sample_surface(original, samples, seed=7)
+        distances = np.empty(len(points))
+        for start in range(0, len(points), RAY_CHUNK):
+            _, dist, _ = trimesh.proximity.closest_point(proxy, points[start:start + RAY_CHUNK])
+            distances[start:start + RAY_CHUNK] = dist
+        return {"max": float(distances.max()), "mean": float(distances.mean())}
+    except Exception as exc:
+        logger.warning("[WALL_THICKNESS] proxy deviation check failed: %s", exc)
+        return None
+
+
+def _histogram(values, edges) -> list[int]:
+    import numpy as np
+
+    counts, _ = np.histogram(values, bins=list(edges) + [np.inf])
+    return [int(c) for c in counts]
+
+
+def _summary(values, min_wall_mm: float) -> Dict[str, Any]:
+    import numpy as np
+
+    return {
+        "samples": int(len(values)),
+        "min_mm": round(float(values.min()), 3),
+        "p10_mm": round(float(np.percentile(values, 10)), 3),
+        "median_mm": round(float(np.median(values)), 3),
+        "avg_mm": round(float(values.mean()), 3),
+        "pct_below_min": round(float((values < min_wall_mm).mean() * 100), 1),
+        "histogram": _histogram(values, BIN_EDGES_MM),
+    }
+
+
+def _regions(points_mm, values, min_wall_mm: float) -> list[Dict[str, Any]]:
+    """Split samples into bounding-box octants and summarise each one."""
+    import numpy as np
+
+    lo = points_mm.min(axis=0)
+    hi = points_mm.max(axis=0)
+    mid = (lo + hi) / 2.0
+    octant = (points_mm > mid).astype(np.int8)
+    codes = octant[:, 0] * 4 + octant[:, 1] * 2 + octant[:, 2]
+
+    regions = []
+    for code in np.unique(codes):
+        mask = codes == code
+        bits = ((code >> 2) & 1, (code >> 1) & 1, code & 1)
+        name = "-".join(_AXIS_LABELS[axis][bit] for axis, bit in ((1, bits[1]), (0, bits[0]), (2, bits[2])))
+        region = {"region": name, **_summary(values[mask], min_wall_mm)}
+        region["center_mm"] = [round(float(c), 1) for c in points_mm[mask].mean(axis=0)]
+        regions.append(region)
+    regions.sort(key=lambda r: (-r["pct_below_min"], r["min_mm"]))
+    return regions
+
+
+def measure_wall_thickness(
+    mesh,
+    *,
+    min_wall_mm: float,
+    mm_multiplier: float = 1.0,
+    sample_count: int = 2000,
+    proxy_face_limit: int = 25000,
+    time_budget_seconds: float | None = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Measure wall thickness on ``mesh``. Returns None when no ray found an
+    opposing wall; otherwise a dict with the overall summary, per-region
+    summaries, histogram bin edges and engine details.
+    """
+    import numpy as np
+    import trimesh
+
+    started = time.monotonic()
+    budget = TIME_BUDGET_SECONDS if time_budget_seconds is None else time_budget_seconds
+    source_faces = int(len(mesh.faces))
+
+    target = mesh
+    proxy_info = None
+    if source_faces > proxy_face_limit:
+        proxy = decimate(mesh, min(PROXY_TARGET_FACES, proxy_face_limit))
+        if proxy is not None and len(proxy.faces) > 0:
+            deviation = _proxy_deviation(mesh, proxy, DEVIATION_SAMPLES)
+            proxy_info = {
+                "source_faces": source_faces,
+                "faces": int(len(proxy.faces)),
+                "max_deviation_mm": round(deviation["max"] * mm_multiplier, 3) if deviation else None,
+                "mean_deviation_mm": round(deviation["mean"] * mm_multiplier, 3) if deviation else None,
+                "error_bound_mm": round(2 * deviation["max"] * mm_multiplier, 3) if deviation else None,
+            }
+            target = proxy
+
+    intersector, engine = _ray_intersector(target)
+
+    points, face_index = trimesh.sample.sample_surface(target, int(sample_count), seed=11)
+    inward = -target.face_normals[face_index]
+    # Offset origins by a tiny fraction of the model size (not a fixed 0.001,
+    # which is a whole millimetre on metre-scale GLBs) and add it back.
+    eps = max(float(np.linalg.norm(target.extents)) * 1e-6, 1e-9)
+    origins = points + inward * eps
+
+    thickness = np.full(len(points), np.nan)
+    cast = 0
+    for start in range(0, len(points), RAY_CHUNK):
+        if time.monotonic() - started > budget:
+            break
+        stop = start + RAY_CHUNK
+        locations, index_ray, index_tri = intersector.intersects_location(
+            ray_origins=origins[start:stop],
+            ray_directions=inward[start:stop],
+            multiple_hits=False,
+        )
+        cast = min(stop, len(points))
+        if len(index_ray) == 0:
+            continue
+        ray_ids = index_ray + start
+        # Ignore a grazing re-hit of the face the ray started on.
+        keep = index_tri != face_index[ray_ids]
+        distances = np.linalg.norm(locations[keep] - origins[ray_ids[keep]], axis=1) + eps
+        thickness[ray_ids[keep]] = distances * mm_multiplier
+
+    valid = ~np.isnan(thickness) & (thickness < MAX_WALL_MM)
+    if not np.any(valid):
+        return None
+
+    values = thickness[valid]
+    points_mm = points[valid] * mm_multiplier
+    result = {
+        **_summary(values, min_wall_mm),
+        "bin_edges_mm": list(BIN_EDGES_MM),
+        "regions": _regions(points_mm, values, min_wall_mm),
+        "rays_cast": int(cast),
+        "rays_requested": int(len(points)),
+        "truncated": cast < len(points),
+        "engine": engine,
+        "proxy": proxy_info,
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+    }
+    return result
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.services import admin_dashboard_service as dashboard
+
+
+class _Store:
+    """In-memory admin_dashboard_snapshots table behind query_all/execute."""
+
+    def __init__(self, rows=None):
+        self.rows = {r["section"]: r for r in rows or []}
+        self.writes = []
+
+    def query_all(self, sql, params=None):
+        if "AS age_s" in sql:
+            now = datetime.now(timezone.utc)
+            return [{"section": s, "age_s": (now - r["attempted_at"]).total_seconds()} for s, r in self.rows.items()]
+        return list(self.rows.values())
+
+    def execute(self, sql, params=None):
+        section = params[0]
+        self.writes.append(section)
+        row = self.rows.setdefault(section, {"section": section, "data": {}, "computed_at": None})
+        now = datetime.now(timezone.utc)
+        if "data = EXCLUDED.data" in sql:
+            row.update(data=json.loads(params[1]), computed_at=now, compute_ms=params[2], error=None)
+        else:
+            row.update(compute_ms=params[1], error=params[2])
+        row["attempted_at"] = now
+        return 1
+
+
+def _install(monkeypatch, store, builders):
+    monkeypatch.setattr(dashboard, "USE_DB", True)
+    monkeypatch.setattr(dashboard, "query_all", store.query_all)
+    monkeypatch.setattr(dashboard, "execute", store.execute)
+    monkeypatch.setattr(dashboard, "_SECTION_BUILDERS", builders)
+
+
+def test_summary_reads_snapshots_and_reports_age(monkeypatch):
+    computed = datetime.now(timezone.utc) - timedelta(seconds=90)
+    store = _Store([
+        {"section": name, "data": {"jobs_today": 3} if name == "operational" else {},
+         "computed_at": computed, "compute_ms": 12, "error": None, "attempted_at": computed}
+        for name in dashboard.SECTION_INTERVALS
+    ])
+    _install(monkeypatch, store, {name: lambda: 1 / 0 for name in dashboard.SECTION_INTERVALS})
+
+    summary = dashboard.get_dashboard_summary()
+
+    assert summary["operational"] == {"jobs_today": 3}
+    assert summary["cached"] and store.writes == []
+    assert 89 <= summary["age_seconds"] < 120
+    assert summary["sections"]["operational"]["compute_ms"] == 12
+
+
+def test_refresh_runs_due_sections_and_keeps_data_on_failure(monkeypatch):
+    old = datetime.now(timezone.utc) - timedelta(hours=1)
+    fresh = datetime.now(timezone.utc)
+    store = _Store([
+        {"section": "operational", "data": {"jobs_today": 1}, "computed_at": old, "attempted_at": old},
+        {"section": "economics", "data": {"purchases_7d": 2}, "computed_at": fresh, "attempted_at": fresh},
+    ])
+
+    def broken():
+        raise RuntimeError("statement timeout")
+
+    _install(monkeypatch, store, {
+        "operational": broken,
+        "economics": lambda: {"purchases_7d": 9},
+        "safety": lambda: {"blocks_today": 0},
+    })
+
+    results = dashboard.refresh_snapshots()
+
+    assert sorted(r["section"] for r in results) == ["operational", "safety"]
+    assert store.rows["operational"]["data"] == {"jobs_today": 1}
+    assert "statement timeout" in store.rows["operational"]["error"]
+    assert store.rows["economics"]["data"] == {"purchases_7d": 2}
+    assert store.rows["safety"]["data"] == {"blocks_today": 0}
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend import db
+from backend.services import admission_control as admission
+
+
+def _pool(size=10, available=3, waiting=0):
+    return {"pooling": True, "pool_min": 4, "pool_max": 10, "pool_size": size,
+            "pool_available": available, "requests_waiting": waiting}
+
+
+@pytest.fixture(autouse=True)
+def _reset(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(admission, "ENABLED", True)
+    monkeypatch.setattr(admission, "_PRESSURE_TTL_S", 0.0)
+    monkeypatch.setattr(admission.time, "sleep", sleeps.append)
+    monkeypatch.setattr(db, "pool_stats", lambda: _pool())
+    admission.reset()
+    db.reset_query_stats()
+    yield sleeps
+    admission.reset()
+    db.reset_query_stats()
+
+
+def test_pool_waiters_defer_and_exhaustion_throttles(monkeypatch, _reset):
+    assert admission.pressure()["level"] == "ok"
+    assert admission.admit("ops:rescue") is True
+
+    monkeypatch.setattr(db, "pool_stats", lambda: _pool(available=0))
+    assert admission.pressure()["reasons"] == ["pool_exhausted"]
+    assert admission.admit("ops:rescue") is True
+    assert _reset == [admission.THROTTLE_MS / 1000.0]
+
+    monkeypatch.setattr(db, "pool_stats", lambda: _pool(available=0, waiting=2))
+    assert admission.admit("ops:rescue") is False
+    assert admission.stats()["tasks"]["ops:rescue"] == {"admitted": 1, "throttled": 1, "deferred": 1}
+
+
+def test_request_db_time_p99_and_pool_fallbacks_raise_pressure(monkeypatch):
+    monkeypatch.setattr(admission, "MIN_SAMPLES", 10)
+    monkeypatch.setattr(admission, "DB_P99_MS", 100)
+    for _ in range(10):
+        admission.request_finished(admission.request_started(), db_ms=20.0)
+    assert admission.pressure()["level"] == "ok"
+
+    admission.request_finished(admission.request_started(), db_ms=150.0)
+    assert admission.pressure()["reasons"] == ["db_p99_ms=150.0"]
+
+    admission.request_finished(admission.request_started(), db_ms=900.0)
+    state = admission.pressure()
+    assert state["level"] == "defer" and state["inflight"] == 0
+
+    admission.reset()
+    for _ in range(admission.DEFER_FALLBACKS):
+        db._record_pool_wait("history", 150.0, fallback=True)
+    assert admission.pressure()["reasons"] == [f"pool_fallbacks={admission.DEFER_FALLBACKS}"]
+
+
+def test_deferral_waits_for_pressure_to_clear(monkeypatch, _reset):
+    states = iter([_pool(waiting=1), _pool(waiting=1), _pool()])
+    monkeypatch.setattr(db, "pool_stats", lambda: next(states))
+
+    assert admission.admit("campaign_publish", max_wait_s=60) is True
+    assert len(_reset) == 2
+
+
+class _Conn:
+    def __init__(self):
+        self.autocommit = True
+        self.closed = False
+        self.info = SimpleNamespace(transaction_status=0)
+
+
+class _Pool:
+    def getconn(self, timeout=None):
+        return _Conn()
+
+    def putconn(self, conn):
+        pass
+
+
+def test_background_work_is_capped_to_its_connection_budget(monkeypatch):
+    monkeypatch.setattr(db, "_get_pool", lambda: _Pool())
+    monkeypatch.setattr(db, "_background_slots", threading.BoundedSemaphore(1))
+    monkeypatch.setattr(db, "_DB_BACKGROUND_SLOT_TIMEOUT", 0.05)
+    held, release, errors = threading.Event(), threading.Event(), []
+
+    def sweep():
+        with db.background_work("retention"), db.get_conn("retention"):
+            with db.get_conn("retention_nested"):  # same thread: no second slot
+                held.set()
+                release.wait(5)
+
+    def second_sweep():
+        try:
+            with db.background_work("rescue"), db.get_conn("rescue"):
+                pass
+        except db.BackgroundBudgetExhausted as e:
+            errors.append(e)
+
+    first = threading.Thread(target=sweep)
+    first.start()
+    assert held.wait(5)
+    second = threading.Thread(target=second_sweep)
+    second.start()
+    second.join(5)
+    with db.get_conn("user_request"):  # foreground is never budgeted
+        pass
+    release.set()
+    first.join(5)
+
+    assert len(errors) == 1 and db.is_transient_db_error(errors[0])
+    assert db.background_budget_stats()["in_use"] == 0
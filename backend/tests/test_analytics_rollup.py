@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.services import analytics_rollup_service as rollups
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class _Cursor:
+    """Answers the rollup refresh queries from a dict of canned results."""
+
+    def __init__(self, state, touched=(), first=None, now=None):
+        self.state = state
+        self.touched = list(touched)
+        self.first, self.now = first, now
+        self.executed = []
+        self.rowcount = 0
+        self._result = None
+
+    def execute(self, sql, params=None):
+        self.executed.append((" ".join(sql.split()), params))
+        if "pg_try_advisory_xact_lock" in sql:
+            self._result = [{"ok": True}]
+        elif "SELECT watermark, backfill_cursor" in sql:
+            self._result = [dict(self.state)]
+        elif "MIN(created_at)" in sql:
+            self._result = [{"first": self.first, "now": self.now}]
+        elif "AS hi" in sql:
+            self._result = [{"hi": params[1] + timedelta(hours=params[2])}]
+        elif "AS seen" in sql:
+            self._result = self.touched
+        elif sql.lstrip().startswith("INSERT INTO") and "SELECT" in sql:
+            self.rowcount = 3
+
+    def fetchone(self):
+        return self._result[0]
+
+    def fetchall(self):
+        return self._result
+
+
+@pytest.fixture(autouse=True)
+def _reset():
+    rollups.reset()
+    yield
+    rollups.reset()
+
+
+def _run(monkeypatch, cur):
+    @contextmanager
+    def fake_transaction(source=""):
+        yield cur
+
+    monkeypatch.setattr(rollups, "transaction", fake_transaction)
+    monkeypatch.setattr(rollups, "USE_DB", True)
+    return rollups._refresh_one(rollups.JOBS)
+
+
+def _statements(cur, prefix):
+    return [(sql, params) for sql, params in cur.executed if sql.startswith(prefix)]
+
+
+def test_backfill_step_recomputes_range_and_finishes(monkeypatch):
+    cur = _Cursor(
+        {"watermark": None, "backfill_cursor": None, "backfill_until": None},
+        first=T0, now=T0 + timedelta(hours=10),
+    )
+
+    result = _run(monkeypatch, cur)
+
+    (delete_sql, delete_params), = _statements(cur, "DELETE FROM")
+    assert "bucket >= %(lo)s AND bucket < %(hi)s" in delete_sql
+    assert delete_params["lo"] == T0 and delete_params["hi"] == T0 + timedelta(hours=rollups.BACKFILL_HOURS)
+    (_, state_params), = _statements(cur, "UPDATE")
+    assert state_params[:3] == (T0 + timedelta(hours=10), None, None)
+    assert result["backfill"] and result["ready"] and result["rows"] == 3
+    assert rollups.ready("jobs")
+
+
+def test_incremental_refresh_only_touches_changed_buckets(monkeypatch):
+    watermark = T0 + timedelta(days=3)
+    cur = _Cursor(
+        {"watermark": watermark, "backfill_cursor": None, "backfill_until": None},
+        touched=[
+            {"bucket": T0 + timedelta(hours=5), "seen": watermark + timedelta(minutes=2)},
+            {"bucket": T0 + timedelta(hours=71), "seen": watermark + timedelta(minutes=9)},
+        ],
+    )
+
+    result = _run(monkeypatch, cur)
+
+    (scan_sql, scan_params), = [e for e in cur.executed if "AS seen" in e[0]]
+    assert "WHERE updated_at > %s" in scan_sql
+    assert scan_params == (watermark - timedelta(seconds=rollups.OVERLAP_S),)
+    (delete_sql, delete_params), = _statements(cur, "DELETE FROM")
+    assert "bucket = ANY(%(buckets)s)" in delete_sql
+    assert delete_params["buckets"] == [T0 + timedelta(hours=5), T0 + timedelta(hours=71)]
+    (insert_sql, insert_params), = [e for e in _statements(cur, "INSERT INTO") if "GROUP BY" in e[0]]
+    assert insert_params["lo"] == T0 + timedelta(hours=5) and insert_params["hi"] == T0 + timedelta(hours=72)
+    (_, state_params), = _statements(cur, "UPDATE")
+    assert state_params[0] == watermark + timedelta(minutes=9)
+    assert result["buckets"] == 2 and not result["backfill"]
+
+
+def test_readers_fall_back_without_database(monkeypatch):
+    monkeypatch.setattr(rollups, "USE_DB", False)
+    monkeypatch.setattr(rollups, "query_one", lambda *a, **k: pytest.fail("no query expected"))
+
+    assert rollups.ready("jobs") is False
+    assert rollups.refresh() == []
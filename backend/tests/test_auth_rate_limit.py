@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.services import auth_rate_limit_service as limiter
+from backend.services.auth_rate_limit_service import AuthRateLimitService
+
+
+class _Db:
+    """auth_rate_limits as a dict; counts statements per kind."""
+
+    def __init__(self):
+        self.rows = {}
+        self.upserts = 0
+        self.flushes = 0
+        self._result = []
+
+    def execute(self, sql, params=None):
+        if "unnest" in sql:
+            self.flushes += 1
+            self._result = []
+            for scope, key_hash, ws, start, n in zip(*params):
+                key = (scope, key_hash, ws, start)
+                self.rows[key] = self.rows.get(key, 0) + n
+                self._result.append({"scope": scope, "key_hash": key_hash, "window_seconds": ws,
+                                     "window_start": start, "request_count": self.rows[key]})
+        else:
+            self.upserts += 1
+            *key, n = params
+            key = tuple(key)
+            self.rows[key] = self.rows.get(key, 0) + n
+            self._result = [{"request_count": self.rows[key]}]
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def fetchall(self):
+        return self._result
+
+    def count(self):
+        return sum(self.rows.values())
+
+
+@pytest.fixture
+def db(monkeypatch):
+    fake = _Db()
+
+    @contextmanager
+    def fake_transaction(source=""):
+        yield fake
+
+    monkeypatch.setattr(limiter, "transaction", fake_transaction)
+    monkeypatch.setattr(limiter, "_flush_loop", lambda: None)  # flush explicitly
+    monkeypatch.setattr(limiter, "LOCAL_SHARE", 50)
+    monkeypatch.setattr(limiter, "SYNC_S", 60)
+    limiter.reset()
+    yield fake
+    limiter.reset()
+
+
+def _hit(limit=5):
+    return AuthRateLimitService.hit("auth_restore_request", ["ip:1.2.3.4", "email:a@b.c"],
+                                    limit=limit, window_seconds=900)
+
+
+def test_limit_holds_with_fewer_writes_and_flush_catches_the_row_up(db):
+    results = [_hit() for _ in range(9)]
+
+    assert [r["ok"] for r in results] == [True] * 5 + [False] * 4
+    assert [r["count"] for r in results] == list(range(1, 10))
+    # first of the window, then twice once the local allowance ran out;
+    # the rest were decided locally, including every refusal
+    assert db.upserts == 3
+    assert limiter.flush() == 1 and db.count() == 9
+    assert limiter.stats()["local_denied"] == 4
+
+
+def test_flush_folds_in_other_instances_and_tightens_the_allowance(db):
+    assert _hit(limit=10)["count"] == 1            # synced, allowance 4
+    assert _hit(limit=10)["count"] == 2            # local
+    (row_key,) = db.rows
+    db.rows[row_key] += 6                          # another instance's attempts
+
+    limiter.flush()                                # row: 1 + 6 + 1 -> allowance (10 - 8) / 2
+    assert _hit(limit=10)["count"] == 9            # local
+    assert _hit(limit=10)["count"] == 10           # synced
+    result = _hit(limit=10)
+    assert (result["ok"], result["count"]) == (False, 11)
+    assert db.upserts == 2
+
+
+def test_default_admits_only_through_the_database_and_refuses_locally(db, monkeypatch):
+    monkeypatch.setattr(limiter, "LOCAL_SHARE", 0)
+
+    results = [_hit(limit=3) for _ in range(6)]
+
+    assert [r["ok"] for r in results] == [True, True, True, False, False, False]
+    assert db.upserts == 3                         # every admission was a DB decision
+    stats = limiter.stats()
+    assert (stats["local_allowed"], stats["local_denied"]) == (0, 3)
+    assert limiter.flush() == 1 and db.count() == 6
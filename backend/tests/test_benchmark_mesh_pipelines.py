@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+trimesh = pytest.importorskip("trimesh")
+
+from scripts import benchmark_mesh_pipelines as bench
+
+
+def _results(seconds, rss, engine="binary_stl"):
+    stage = {"ok": True, "seconds": seconds, "stage_rss_mb": rss, "engine": {"engine": engine}}
+    return {"cases": {"box": {"convert": stage}}}
+
+
+def test_compare_flags_slowdowns_beyond_tolerance_and_noise():
+    baseline = _results(1.0, 100.0)
+
+    assert bench.compare(_results(1.2, 110.0), baseline, tolerance=0.25) == ([], [])
+    regressions, _ = bench.compare(_results(1.5, 200.0), baseline, tolerance=0.25)
+    assert len(regressions) == 2
+    # Tiny stages: a 3x ratio below the noise floor is not a regression.
+    assert bench.compare(_results(0.03, 5.0), _results(0.01, 1.0)) == ([], [])
+    _, changes = bench.compare(_results(1.0, 100.0, engine="ascii_stl"), baseline)
+    assert changes == ["box/convert: engine binary_stl -> ascii_stl"]
+
+
+def test_stage_runs_in_a_separate_process(tmp_path):
+    corpus = bench.build_corpus(["box"], str(tmp_path))
+    path, file_type, faces = corpus["box"]
+
+    result = bench.measure("convert", path, file_type, timeout=120)
+
+    assert faces == 12
+    assert result["ok"] and result["engine"] == {"engine": "binary_stl", "output_bytes": 84 + 50 * 12}
+    assert result["peak_rss_mb"] > 0 and result["seconds"] >= 0
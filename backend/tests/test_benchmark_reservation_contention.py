@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from scripts import benchmark_reservation_contention as bench
+
+
+def test_summary_and_invariants():
+    summary = bench.summarize([float(ms) for ms in range(1, 101)], wall_seconds=2.0)
+
+    assert summary["requests"] == 100 and summary["per_second"] == 50.0
+    assert (summary["p50_ms"], summary["p99_ms"], summary["max_ms"]) == (51.0, 100.0, 100.0)
+    assert bench.check_invariants(balance=100, cost=10, accepted=10, reserved_total=100, held_sum=100) == []
+    assert bench.check_invariants(balance=100, cost=10, accepted=11, reserved_total=110, held_sum=100) == [
+        "overspend: 11 x 10 held against a balance of 100",
+        "reserved_total 110 != held reservations 100",
+    ]
+
+
+@pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="needs a real database")
+def test_concurrent_reservations_on_one_identity_never_overspend():
+    result = bench.run(threads=8, requests=40)
+
+    assert result["problems"] == []
+    assert result["outcomes"]["errors"] == 0
+    assert result["outcomes"]["accepted"] == 20 and result["outcomes"]["insufficient"] == 20
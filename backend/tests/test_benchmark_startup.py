@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from scripts import benchmark_startup as bench
+
+
+def test_parse_importtime_rows():
+    text = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       155 |     150592 |   backend.services\n"
+        "import time:      2413 |     761953 |     backend.services.mesh_conversion_service\n"
+    )
+
+    rows = bench.parse_importtime(text)
+
+    assert [r["module"] for r in rows] == ["backend.services", "backend.services.mesh_conversion_service"]
+    assert rows[1]["cumulative_seconds"] == 0.761953 and rows[1]["depth"] == rows[0]["depth"] + 1
+
+
+def test_app_starts_without_heavy_libraries():
+    result = bench.measure(repeat=1, top=5)
+
+    assert result["ok"], result.get("error")
+    assert result["heavy"] == []
+    assert [p["phase"] for p in result["phases"]][:2] == ["init_db", "blueprints"]
+    assert bench.compare(result, {"ok": False}) == []
+    slower = dict(result, import_seconds=result["import_seconds"] * 2 + 1)
+    assert bench.compare(slower, result)
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend import db
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append(sql)
+        if not self.conn.autocommit:
+            self.conn.info.transaction_status = 2
+
+
+class _Conn:
+    def __init__(self, name):
+        self.name = name
+        self.autocommit = True
+        self.closed = False
+        self.broken = False
+        self.info = SimpleNamespace(transaction_status=0)
+        self.executed = []
+        self.commits = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        self.commits += 1
+        self.info.transaction_status = 0
+
+    def rollback(self):
+        self.info.transaction_status = 0
+
+
+class _Pool:
+    def __init__(self):
+        self.lent = []
+        self.returned = []
+
+    def getconn(self, timeout=None):
+        conn = _Conn(f"c{len(self.lent)}")
+        self.lent.append(conn)
+        return conn
+
+    def putconn(self, conn):
+        self.returned.append(conn)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = _Pool()
+    monkeypatch.setattr(db, "_get_pool", lambda: pool)
+    yield pool
+    db.end_scope()
+
+
+def test_sequential_blocks_in_a_scope_share_one_checkout(pool):
+    with db.connection_scope("task") as scope:
+        with db.get_conn("a") as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+        with db.transaction("b") as cur:
+            cur.execute("UPDATE t SET x = 1")
+        with db.get_conn("c") as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 2")
+        assert pool.returned == []
+
+    (conn,) = pool.lent
+    assert pool.returned == [conn]
+    assert conn.executed == ["SELECT 1", "UPDATE t SET x = 1", "SELECT 2"]
+    assert conn.commits == 1 and conn.autocommit is True
+    assert scope.checkouts == 1 and db.current_scope() is None
+
+
+def test_get_conn_inside_a_scoped_transaction_gets_its_own_connection(pool):
+    with db.connection_scope("task"):
+        with db.transaction("outer") as cur:
+            cur.execute("UPDATE t SET x = 1")
+            with db.get_conn("inner") as inner:
+                assert inner is not cur.conn
+        with db.get_conn("after") as conn:
+            assert conn is pool.lent[0]
+
+    assert len(pool.lent) == 2 and set(pool.returned) == set(pool.lent)
+
+
+def test_broken_scoped_connection_is_replaced_and_released_early(pool):
+    with db.connection_scope("task"):
+        with db.get_conn("a") as first:
+            first.broken = True
+        with db.get_conn("b") as second:
+            assert second is not first
+        db.release_scope_connection()
+        assert pool.returned == [first, second]
+        with db.get_conn("c") as third:
+            assert third is pool.lent[2]
+
+
+def test_scope_counts_statements_for_timing_headers():
+    with db.connection_scope("request") as scope:
+        db._count_scope_query(2.5)
+        db._count_scope_query(4.0)
+    db._count_scope_query(100.0)
+
+    assert scope.stats() == {"source": "request", "queries": 2, "db_ms": 6.5, "checkouts": 0}
+
+
+def test_counting_only_scope_returns_each_connection_and_explicit_scopes_share(pool):
+    scope = db.begin_scope("GET /api/other", share=False)
+    with db.get_conn("a") as first:
+        assert pool.returned == []
+    assert pool.returned == [first]           # not held until teardown
+
+    with db.connection_scope("task"):
+        with db.get_conn("b") as conn:
+            pass
+        with db.transaction("c") as cur:
+            assert cur.conn is conn
+    assert pool.returned == [first, conn] and scope.conn is None and not scope.share
+
+    db._count_scope_query(1.0)
+    assert db.end_scope() is scope and scope.queries == 1
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import csv
+import io
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.services import csv_export_service as exports
+
+
+class _Cursor:
+    def __init__(self, conn, name=None):
+        self.conn, self.name = conn, name
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append((self.name, sql, params))
+
+    def fetchmany(self, size):
+        self.conn.fetch_sizes.append(size)
+        batch, self.conn.rows = self.conn.rows[:size], self.conn.rows[size:]
+        return batch
+
+
+class _Conn:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.executed = []
+        self.fetch_sizes = []
+        self.in_transaction = False
+
+    @contextmanager
+    def transaction(self):
+        self.in_transaction = True
+        yield
+        self.in_transaction = False
+
+    def cursor(self, name=None):
+        assert self.in_transaction, "named cursors need a transaction"
+        return _Cursor(self, name)
+
+
+def _install(monkeypatch, rows):
+    conn = _Conn(rows)
+
+    @contextmanager
+    def fake_direct(source=""):
+        yield conn
+
+    monkeypatch.setattr(exports, "get_conn_direct", fake_direct)
+    return conn
+
+
+def test_batches_come_from_a_named_cursor_in_keyset_order(monkeypatch):
+    conn = _install(monkeypatch, [{"id": str(n)} for n in range(5)])
+    query = exports.ExportQuery("SELECT * FROM t WHERE status = %s", ("completed",))
+
+    batches = list(exports.iter_batches(
+        query, after="2026-03-01T10:00:00+00:00|abc", limit=100, batch_size=2,
+    ))
+
+    assert [len(b) for b in batches] == [2, 2, 1]
+    name, sql, params = conn.executed[-1]
+    assert name and name.startswith("csv_export_")
+    assert "WHERE (created_at, id::text) < (%s, %s)" in sql
+    assert sql.endswith("ORDER BY created_at DESC, id::text DESC LIMIT %s")
+    assert params == ["completed", datetime(2026, 3, 1, 10, tzinfo=timezone.utc), "abc", 100]
+    assert "idle_in_transaction_session_timeout" in conn.executed[0][1]
+
+
+def test_csv_chunks_write_header_then_one_chunk_per_batch():
+    batches = [[{"id": 1, "extra": "x"}], [{"id": 2}, {"id": 3}]]
+
+    chunks = list(exports.iter_csv(["id"], batches, lambda rows: [{"id": r["id"] * 10} for r in rows]))
+
+    assert len(chunks) == 3
+    assert list(csv.reader(io.StringIO("".join(chunks)))) == [["id"], ["10"], ["20"], ["30"]]
+
+
+@pytest.mark.parametrize("token", ["2026-03-01", "not-a-date|abc", "2026-03-01T00:00:00|"])
+def test_parse_after_rejects_malformed_tokens(token):
+    with pytest.raises(ValueError):
+        exports.parse_after(token)
+
+
+def test_tracker_reports_the_token_that_resumes_after_the_last_row():
+    when = datetime(2026, 3, 1, 10, tzinfo=timezone.utc)
+    tracked = exports.KeysetTracker(iter([[{"id": "a", "created_at": when}], [], [{"id": "b", "created_at": when}]]))
+
+    assert [len(b) for b in tracked] == [1, 0, 1]
+    assert (tracked.rows, tracked.after) == (2, "2026-03-01T10:00:00+00:00|b")
+    assert exports.parse_after(tracked.after) == (when, "b")
+
+
+def test_upload_skips_the_content_index(monkeypatch):
+    from backend.services import s3_service
+
+    uploaded = []
+    monkeypatch.setattr(s3_service, "upload_transient_fileobj_to_s3",
+                        lambda fh, key, content_type: fh.seek(0) or uploaded.append((fh.read(), key)) or key)
+    monkeypatch.setattr(s3_service, "upload_fileobj_to_s3",
+                        lambda *a, **k: pytest.fail("exports must not be indexed"))
+    monkeypatch.setattr(s3_service, "presign_s3_key", lambda key, **kw: f"https://s3/{key}")
+
+    result = exports.upload_csv(iter(["id\r\n", "1\r\n"]), "jobs.csv")
+
+    assert uploaded == [(b"id\r\n1\r\n", result["key"])]
+    assert result["key"].startswith(exports.S3_PREFIX) and result["bytes"] == 7
+
+
+def test_sweep_deletes_only_exports_past_retention(monkeypatch):
+    from backend.config import config
+    from backend.services import s3_service
+
+    now = 1_800_000_000.0
+    old = datetime.fromtimestamp(now - exports.S3_RETAIN_S - 1, timezone.utc)
+    new = datetime.fromtimestamp(now - 60, timezone.utc)
+    pages = [{"Contents": [{"Key": "admin-exports/old.csv", "LastModified": old},
+                           {"Key": "admin-exports/new.csv", "LastModified": new}]}]
+
+    class _Client:
+        def get_paginator(self, name):
+            assert name == "list_objects_v2"
+            return type("P", (), {"paginate": lambda self, **kw: iter(pages)})()
+
+    deleted = []
+    monkeypatch.setattr(config, "AWS_BUCKET_MODELS", "models")
+    monkeypatch.setattr(s3_service, "get_s3_client", lambda: _Client())
+    monkeypatch.setattr(s3_service, "delete_s3_objects_safe",
+                        lambda keys, source="": deleted.extend(keys) or {"deleted": len(keys)})
+
+    assert exports.sweep_expired(now=now) == 1
+    assert deleted == ["admin-exports/old.csv"]
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.services import video_conversion_store
+from backend.services.ffmpeg_service import ConversionQueue, _input_args, _parse_probe, pick_poster_timestamp
+
+
+def test_parse_probe_extracts_video_metadata():
+    probe = _parse_probe({
+        "format": {"duration": "5.041", "format_name": "mov,mp4", "bit_rate": "2048000", "size": "1290496"},
+        "streams": [
+            {"codec_type": "video", "codec_name": "h264", "width": 1280, "height": 720, "avg_frame_rate": "24000/1001"},
+            {"codec_type": "audio", "codec_name": "aac"},
+        ],
+    })
+
+    assert probe["duration_seconds"] == 5.041
+    assert probe["resolution"] == "1280x720"
+    assert probe["video_codec"] == "h264"
+    assert probe["fps"] == 23.976
+    assert probe["has_audio"] is True
+    assert probe["size_bytes"] == 1290496
+
+
+def test_parse_probe_tolerates_missing_fields():
+    probe = _parse_probe({"streams": [{"codec_type": "video", "avg_frame_rate": "0/0"}]})
+
+    assert probe["duration_seconds"] is None
+    assert probe["resolution"] is None
+    assert probe["fps"] is None
+    assert probe["has_audio"] is False
+
+
+def test_poster_timestamp_is_clamped_into_short_clips():
+    assert pick_poster_timestamp(None, 1.0) == 1.0
+    assert pick_poster_timestamp({"duration_seconds": 8.0}, 1.0) == 1.0
+    assert pick_poster_timestamp({"duration_seconds": 0.8}, 1.0) == 0.4
+
+
+def test_input_args_pipe_bytes_and_range_seek_urls():
+    assert _input_args(b"\x00\x00") == ["-i", "pipe:0"]
+    url_args = _input_args("https://bucket.s3.amazonaws.com/videos/a.mp4?X-Amz-Signature=x")
+    assert url_args[-2:] == ["-i", "https://bucket.s3.amazonaws.com/videos/a.mp4?X-Amz-Signature=x"]
+    assert "-reconnect" in url_args
+
+
+def test_queued_job_state_is_shared_and_discard_cleans_it_up(tmp_path, monkeypatch):
+    saved, deleted = [], []
+    monkeypatch.setattr(video_conversion_store, "save", lambda job, ttl: saved.append((job.status, ttl)))
+    monkeypatch.setattr(video_conversion_store, "delete", deleted.append)
+    monkeypatch.setattr(video_conversion_store, "reap_expired", lambda: 0)
+    queue = ConversionQueue(max_parallel=1, max_queued=2)
+    monkeypatch.setattr(queue, "_pump", lambda: None)  # keep the job waiting
+    work_dir = tmp_path / "job"
+    work_dir.mkdir()
+
+    job = queue.submit("owner-1", str(work_dir / "in.avi"), str(work_dir / "out.mp4"), str(work_dir), [],
+                       is_async=True)
+
+    assert saved and saved[0][0] == "queued"
+    assert queue.queue_position(job) == 1
+    # e.g. the synchronous request gave up waiting
+    queue.discard(job)
+    assert queue.get(job.job_id) is None and queue.queue_position(job) is None
+    assert deleted == [job.job_id] and not work_dir.exists()
+
+
+def test_synchronous_job_is_not_shared_or_uploaded(tmp_path, monkeypatch):
+    calls = []
+    for name in ("save", "publish", "delete"):
+        monkeypatch.setattr(video_conversion_store, name, lambda *a, _n=name: calls.append(_n))
+    monkeypatch.setattr(video_conversion_store, "reap_expired", lambda: 0)
+    queue = ConversionQueue(max_parallel=1, max_queued=2)
+    monkeypatch.setattr(queue, "_pump", lambda: None)
+
+    def fake_ffmpeg(job):
+        job.status, job.progress = "done", 100
+
+    monkeypatch.setattr(queue, "_run_ffmpeg", fake_ffmpeg)
+    monkeypatch.setattr("backend.services.ffmpeg_service.probe_media", lambda path: None)
+    work_dir = tmp_path / "job"
+    work_dir.mkdir()
+
+    job = queue.submit("owner-1", str(work_dir / "in.avi"), str(work_dir / "out.mp4"), str(work_dir), [])
+    queue._running += 1
+    queue._run_job(job)
+
+    assert job.done.is_set() and job.status == "done" and job.s3_key is None
+    assert calls == []
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import io
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from PIL import Image
+
+from backend.services import image_derivative_service, s3_service
+from backend.services.image_derivative_service import (
+    build_derivative_s3_key,
+    primary_thumbnail_key,
+    render_derivatives,
+)
+
+
+def _jpeg_bytes(width: int, height: int) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 40, 90)).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def test_render_derivatives_sizes_and_aspect():
+    out = render_derivatives(_jpeg_bytes(2000, 1000), sizes=[800, 400], formats=["jpeg", "webp"])
+
+    assert out["source_width"] == 2000
+    assert out["source_height"] == 1000
+    dims = {(item["size"], item["format"]): (item["width"], item["height"]) for item in out["items"]}
+    assert dims[(800, "JPEG")] == (800, 400)
+    assert dims[(400, "WEBP")] == (400, 200)
+    for item in out["items"]:
+        decoded = Image.open(io.BytesIO(item["data"]))
+        assert decoded.format == item["format"]
+        assert decoded.size == (item["width"], item["height"])
+
+
+def test_render_derivatives_never_upscales():
+    out = render_derivatives(_jpeg_bytes(300, 150), sizes=[400], formats=["jpeg"])
+
+    assert [(i["width"], i["height"]) for i in out["items"]] == [(300, 150)]
+
+
+def test_render_derivatives_keeps_alpha_for_webp():
+    buf = io.BytesIO()
+    Image.new("RGBA", (600, 600), (0, 0, 0, 0)).save(buf, format="PNG")
+    out = render_derivatives(buf.getvalue(), sizes=[400], formats=["webp", "jpeg"])
+
+    by_fmt = {item["format"]: Image.open(io.BytesIO(item["data"])) for item in out["items"]}
+    assert by_fmt["WEBP"].mode == "RGBA"
+    assert by_fmt["JPEG"].mode == "RGB"
+
+
+def test_derivative_keys_are_content_addressed():
+    assert build_derivative_s3_key("openai", "abc123", 800, "webp") == "thumbnails/derivatives/openai/abc123/800.webp"
+    assert primary_thumbnail_key("openai", "abc123") == "thumbnails/derivatives/openai/abc123/400.jpg"
+
+
+def test_stored_derivatives_skip_user_upload_validation(monkeypatch):
+    # AVIF isn't an accepted user upload format; derivatives never pass through that check.
+    items = [{"size": 400, "format": "JPEG", "content_type": "image/jpeg", "data": b"jpeg"},
+             {"size": 400, "format": "AVIF", "content_type": "image/avif", "data": b"avif"}]
+    put = []
+    monkeypatch.setattr(image_derivative_service, "render_derivatives_isolated", lambda data: {"items": items})
+    monkeypatch.setattr(s3_service.config, "AWS_BUCKET_MODELS", "bucket")
+    monkeypatch.setattr(s3_service, "content_key_exists", lambda key, content_hash=None: False)
+    monkeypatch.setattr(s3_service, "_put_and_index", lambda key, data, ctype, content_hash, scope=None: put.append((key, ctype)))
+
+    manifest = image_derivative_service.store_image_derivatives(b"source", "openai", source_hash="abc")
+
+    assert put == [("thumbnails/derivatives/openai/abc/400.jpg", "image/jpeg"),
+                   ("thumbnails/derivatives/openai/abc/400.avif", "image/avif")]
+    assert manifest["variants"]["400"] == {"jpeg": put[0][0], "avif": put[1][0]}
+    assert manifest["created_keys"] == [key for key, _ in put]
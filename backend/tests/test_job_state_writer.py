@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import json
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.services import job_state_writer as writer
+from backend.services import job_worker
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None, prepare=None):
+        self.conn.statements.append((" ".join(sql.split()), params, prepare, self.conn.in_pipeline))
+
+
+class _Conn:
+    def __init__(self):
+        self.statements = []
+        self.in_pipeline = False
+        self.pipelines = 0
+        self.commits = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    @contextmanager
+    def pipeline(self):
+        self.pipelines += 1
+        self.in_pipeline = True
+        yield
+        self.in_pipeline = False
+
+    def commit(self):
+        self.commits += 1
+
+
+@pytest.fixture
+def conns(monkeypatch):
+    opened = []
+
+    @contextmanager
+    def fake_get_conn(source=""):
+        conn = _Conn()
+        opened.append(conn)
+        yield conn
+
+    writer.reset()
+    monkeypatch.setattr(writer, "USE_DB", True)
+    monkeypatch.setattr(writer, "COALESCE_MS", 60_000)
+    monkeypatch.setattr(writer, "get_conn", fake_get_conn)
+    yield opened
+    writer.reset()
+
+
+def test_progress_is_coalesced_per_job_and_flushed_in_one_pipeline(conns):
+    writer.queue_progress("job-a", "provider_pending", {"progress": 5, "pending_seconds": 10})
+    writer.queue_progress("job-a", "processing", {"progress": 40})
+    writer.queue_progress("job-b", "processing", {"progress": 70})
+
+    assert writer.flush_progress() == 2
+
+    (conn,) = conns
+    assert conn.pipelines == 1 and conn.commits == 1
+    by_job = {params[2]: params for _, params, _, _ in conn.statements}
+    assert by_job["job-a"][0] == "processing"
+    assert json.loads(by_job["job-a"][1]) == {"progress": 40, "pending_seconds": 10}
+    assert all(prepare and piped for _, _, prepare, piped in conn.statements)
+    assert "NOT (status = ANY(%s))" in conn.statements[0][0]
+    assert "finalizing" in by_job["job-a"][3] and "ready" in by_job["job-a"][3]
+    assert writer.stats()["progress_coalesced"] == 1
+
+
+def test_meta_write_sends_pending_progress_first_in_same_round_trip(conns):
+    writer.queue_progress("job-a", "processing", {"progress": 90})
+    writer.write_meta("job-a", {"error_code": "seedance_poll_error"})
+
+    (conn,) = conns
+    assert conn.pipelines == 1
+    assert [sql.split(" SET ")[1][:6] for sql, *_ in conn.statements] == ["status", "meta ="]
+    assert writer.flush_progress() == 0
+
+
+def test_worker_cycle_writes_state_and_release_in_one_round_trip(monkeypatch):
+    writes = []
+    monkeypatch.setattr(job_worker, "USE_DB", True)
+    monkeypatch.setattr(job_worker.job_state_writer, "run_writes",
+                        lambda batch, source="": writes.append((source, batch)) or len(batch))
+
+    job_worker._begin_job_cycle("job-1")
+    job_worker._update_heartbeat("job-1")
+    job_worker._update_job_state("job-1", "provider_pending", "queued", 0, 15, {"queued_upstream": True})
+    job_worker._update_job_state("job-1", "provider_processing", "running", 30, 10, {"consecutive_errors": 0})
+    assert writes == []
+
+    job_worker._release_claim("job-1")
+
+    (source, batch), = writes
+    (sql, params), (release_sql, release_params) = batch
+    assert source == "job_worker_release"
+    assert "next_poll_at" in sql and "NOT (status = ANY(%s))" in sql
+    assert params[:4] == ("provider_processing", "running", 30, 10)
+    assert json.loads(params[4]) == {
+        "progress": 30, "provider_status": "running", "queued_upstream": True, "consecutive_errors": 0,
+    }
+    assert params[5] == "job-1" and "finalizing" in params[6] and "failed" in params[6]
+    # the claim release doesn't depend on the state write matching
+    assert "claimed_by = NULL" in release_sql and release_params == ("job-1", job_worker.WORKER_ID)
+
+    job_worker._update_job_state("job-1", "provider_pending", "queued", 0, 15)
+    assert len(writes) == 2 and "claimed_by" not in writes[1][1][0][0]
+
+
+def test_failed_cycle_keeps_the_stall_and_its_backoff(monkeypatch):
+    writes, transitions = [], []
+    monkeypatch.setattr(job_worker, "USE_DB", True)
+    monkeypatch.setattr(job_worker.job_state_writer, "run_writes",
+                        lambda batch, source="": writes.append(batch) or len(batch))
+    monkeypatch.setattr(job_worker, "_transition_job",
+                        lambda job_id, status, fields=None, meta=None: transitions.append((status, fields)))
+
+    def poll_then_raise(job):
+        job_worker._update_job_state("job-1", "provider_processing", "running", 40, 10)
+        raise RuntimeError("provider exploded")
+
+    monkeypatch.setattr(job_worker, "_process_job", poll_then_raise)
+
+    job_worker._run_claimed_job({"id": "job-1", "provider": "meshy", "attempt_count": 0})
+
+    (status, fields), = transitions
+    assert status == "stalled" and "INTERVAL" in fields["next_poll_at"]
+    # only the release: the buffered poll state would have reset status and next_poll_at
+    (batch,) = writes
+    assert [sql for sql, _ in batch] == [job_worker._RELEASE_SQL]
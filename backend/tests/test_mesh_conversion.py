@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import io
+import struct
+import sys
+import zipfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+trimesh = pytest.importorskip("trimesh")
+
+from backend.services import derived_artifact_store, mesh_conversion_service
+from backend.services.mesh_conversion_service import ConversionOptions, convert_model
+
+
+@pytest.fixture(autouse=True)
+def _in_memory_store(monkeypatch):
+    monkeypatch.setattr(derived_artifact_store, "_bucket", lambda: None)
+    derived_artifact_store.reset()
+    uploaded = {}
+
+    def fake_upload(fileobj, key, content_type, content_hash=None, size_bytes=None):
+        fileobj.seek(0)
+        uploaded[key] = fileobj.read()
+        return f"https://bucket.s3.test.amazonaws.com/{key}"
+
+    monkeypatch.setattr(mesh_conversion_service.s3_service, "upload_fileobj_to_s3", fake_upload)
+    monkeypatch.setattr(mesh_conversion_service.s3_service, "content_key_exists", lambda key, h=None: key in uploaded)
+    yield uploaded
+    derived_artifact_store.reset()
+
+
+def _glb_bytes() -> bytes:
+    scene = trimesh.Scene()
+    scene.add_geometry(trimesh.creation.box(extents=(10, 20, 30)))
+    scene.add_geometry(trimesh.creation.box(extents=(1, 1, 1)), transform=trimesh.transformations.translation_matrix((50, 0, 0)))
+    return scene.export(file_type="glb")
+
+
+def test_variant_is_stable_and_option_sensitive():
+    assert ConversionOptions(scale=2).variant() == ConversionOptions(scale=2.0).variant()
+    assert ConversionOptions().variant() != ConversionOptions(source_units="cm").variant()
+    assert ConversionOptions(fmt="3mf").variant().startswith("3mf-")
+    with pytest.raises(ValueError):
+        ConversionOptions(source_units="furlong")
+
+
+def test_binary_stl_applies_scene_transforms_and_units(_in_memory_store):
+    result = convert_model(_glb_bytes(), options=ConversionOptions(source_units="cm"))
+
+    assert result["ok"] and result["cached"] is False
+    data = _in_memory_store[result["s3_key"]]
+    (count,) = struct.unpack("<I", data[80:84])
+    assert len(data) == 84 + 50 * count == result["size_bytes"]
+    mesh = trimesh.load(io.BytesIO(data), file_type="stl")
+    # Offset box ends at x = 50.5 cm → 505 mm.
+    assert mesh.bounds[1][0] == pytest.approx(505.0, rel=1e-4)
+
+
+def test_repeat_conversion_reuses_artifact(_in_memory_store, monkeypatch):
+    glb = _glb_bytes()
+    first = convert_model(glb)
+    calls = []
+    monkeypatch.setattr(mesh_conversion_service, "_convert_and_store", lambda *a: calls.append(a))
+
+    again = convert_model(glb)
+    by_hash = convert_model(source_hash=first["source_hash"], source_url="https://unused.example/model.glb")
+
+    assert again["cached"] and by_hash["cached"]
+    assert again["s3_key"] == by_hash["s3_key"] == first["s3_key"]
+    assert calls == []
+
+
+def test_3mf_output_is_a_valid_package(_in_memory_store):
+    result = convert_model(_glb_bytes(), options=ConversionOptions(fmt="3mf", target_height_mm=100))
+
+    with zipfile.ZipFile(io.BytesIO(_in_memory_store[result["s3_key"]])) as zf:
+        assert {"[Content_Types].xml", "_rels/.rels", "3D/3dmodel.model"} <= set(zf.namelist())
+        model_xml = zf.read("3D/3dmodel.model").decode()
+    assert 'unit="millimeter"' in model_xml
+    assert model_xml.count("<triangle ") == 24
+    assert result["content_type"] == "model/3mf"
+
+
+def test_inflight_lock_outlives_its_waiters():
+    first = mesh_conversion_service._inflight_lock("h", "stl-x")
+    waiter = mesh_conversion_service._inflight_lock("h", "stl-x")
+    assert first is waiter
+
+    # The holder finishes before the waiter has acquired: the entry stays,
+    # so a third request still queues on the same lock.
+    mesh_conversion_service._release_inflight("h", "stl-x", first)
+    assert mesh_conversion_service._inflight_lock("h", "stl-x") is waiter
+
+    mesh_conversion_service._release_inflight("h", "stl-x", waiter)
+    mesh_conversion_service._release_inflight("h", "stl-x", waiter)
+    assert ("h", "stl-x") not in mesh_conversion_service._inflight
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+trimesh = pytest.importorskip("trimesh")
+
+from backend.services import mesh_feature_store
+from backend.services.mesh_feature_store import compute_features
+from backend.services.print_analysis_service import PrintAnalysisService
+from backend.services.print_order_pricing import compute as compute_price
+
+
+@pytest.fixture(autouse=True)
+def _fresh_store():
+    mesh_feature_store.reset()
+    yield
+    mesh_feature_store.reset()
+
+
+def _t_shape():
+    # 10 mm stem with a 40 mm slab on top: the slab's underside overhangs.
+    stem = trimesh.creation.box(extents=(10, 20, 10)).apply_translation((0, 10, 0))
+    slab = trimesh.creation.box(extents=(40, 5, 40)).apply_translation((0, 22.5, 0))
+    return trimesh.util.concatenate([stem, slab])
+
+
+def test_box_features():
+    features = compute_features(trimesh.creation.box(extents=(10, 20, 30)))
+
+    assert features["extents_mm"] == [10.0, 20.0, 30.0]
+    assert features["detected_unit"] == "mm_or_cm"
+    assert features["is_watertight"] and features["component_count"] == 1
+    assert features["volume_cm3"] == pytest.approx(6.0)
+    assert features["surface_area_cm2"] == pytest.approx(22.0)
+    assert features["boundary_edges"] == 0
+    # The bottom face rests on the build plate, so nothing needs support.
+    assert features["overhang"]["fdm"]["faces"] == 0
+
+
+def test_overhang_and_components():
+    features = compute_features(_t_shape())
+
+    assert features["component_count"] == 2
+    fdm = features["overhang"]["fdm"]
+    assert fdm["faces"] == 2  # the slab's underside (two triangles)
+    assert fdm["area_cm2"] == pytest.approx(16.0)
+
+
+def test_metre_scale_models_are_converted():
+    features = compute_features(trimesh.creation.box(extents=(0.1, 0.2, 0.05)))
+
+    assert features["mm_multiplier"] == 1000.0
+    assert features["extents_mm"] == [100.0, 200.0, 50.0]
+    assert features["volume_cm3"] == pytest.approx(1000.0)
+
+
+def test_ensure_computes_once(monkeypatch):
+    data = trimesh.creation.box(extents=(10, 20, 30)).export(file_type="glb")
+    calls = []
+
+    def inline(payload, file_type):
+        calls.append(file_type)
+        return mesh_feature_store.features_from_bytes(payload, file_type)
+
+    monkeypatch.setattr(mesh_feature_store, "compute_isolated", inline)
+
+    first = mesh_feature_store.ensure("hash-a", data)
+    again = mesh_feature_store.ensure("hash-a", data)
+
+    assert first["face_count"] == 12 and again == first
+    assert calls == ["glb"]
+    assert mesh_feature_store.get("hash-a")["extents_mm"] == [10.0, 20.0, 30.0]
+    assert mesh_feature_store.get("missing") is None
+    assert mesh_feature_store.stats()["computed"] == 1
+
+
+def test_analysis_reads_stored_features(tmp_path):
+    path = tmp_path / "t.stl"
+    path.write_bytes(_t_shape().export(file_type="stl"))
+
+    computed = PrintAnalysisService.analyze(str(path), file_type="stl")
+    assert computed["checks"]["features_source"] == "analysis"
+    assert computed["checks"]["component_count"] == 2
+
+    stored = compute_features(_t_shape())
+    stored["extents_mm"] = [80.0, 55.0, 80.0]
+    reused = PrintAnalysisService.analyze(str(path), file_type="stl", features=stored)
+    assert reused["checks"]["features_source"] == "store"
+    assert reused["checks"]["bounding_box_mm"] == [80.0, 55.0, 80.0]
+
+
+def test_pricing_uses_model_shape_when_features_exist():
+    spec = {"process": "fdm", "material": "pla", "scaled_dimensions_mm": [100, 100, 100]}
+    features = {"extents_mm": [20.0, 40.0, 80.0], "partial": False}
+
+    client = compute_price(spec, "GB")
+    mesh = compute_price(spec, "GB", features=features)
+
+    assert client.dimensions_source == "client" and client.dimensions_mm == [100.0, 100.0, 100.0]
+    assert mesh.dimensions_source == "mesh" and mesh.dimensions_mm == [25.0, 50.0, 100.0]
+    assert mesh.weight_g < client.weight_g
+    # Partial features (largest scene part only) are not trusted for pricing.
+    assert compute_price(spec, "GB", features={**features, "partial": True}).dimensions_source == "client"
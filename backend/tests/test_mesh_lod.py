@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+trimesh = pytest.importorskip("trimesh")
+
+from backend.services import mesh_lod_service
+from backend.services.print_analysis_service import PrintAnalysisService
+from backend.services.stl_repair_service import StlRepairService, _repair_file
+
+
+@pytest.fixture(autouse=True)
+def _levels(monkeypatch):
+    monkeypatch.setattr(mesh_lod_service, "LEVELS", (20000, 5000))
+    mesh_lod_service.reset()
+    yield
+    mesh_lod_service.reset()
+
+
+def _sphere_stl(tmp_path):
+    path = tmp_path / "sphere.stl"
+    path.write_bytes(trimesh.creation.icosphere(subdivisions=6, radius=20).export(file_type="stl"))  # 81,920 faces
+    return path
+
+
+def test_level_for_picks_the_largest_level_within_the_limit():
+    assert mesh_lod_service.level_for(100000, 30000) == 20000
+    assert mesh_lod_service.level_for(100000, 10000) == 5000
+    assert mesh_lod_service.level_for(8000, 6000) == 5000
+    assert mesh_lod_service.level_for(10000, 20000) is None
+    assert mesh_lod_service.level_for(None, 20000) is None
+
+
+@pytest.mark.parametrize("streamed", [True, False])
+def test_lod_keeps_the_shape(tmp_path, streamed):
+    path = _sphere_stl(tmp_path)
+    sphere = trimesh.load(str(path))
+
+    if streamed:
+        lod, info = mesh_lod_service.build(5000, source=str(path), file_type="stl")
+        assert info["method"].startswith("cluster")
+    else:
+        lod, info = mesh_lod_service.build(5000, mesh=sphere)
+        assert info["method"] == "quadric"
+
+    assert 2500 <= info["faces"] <= 5000 * mesh_lod_service.CLUSTER_OVERSHOOT
+    assert np.allclose(lod.extents, sphere.extents, rtol=0.02)
+    assert lod.area == pytest.approx(sphere.area, rel=0.03)
+
+
+def test_analysis_runs_mesh_checks_on_a_reusable_lod(tmp_path, monkeypatch):
+    path = _sphere_stl(tmp_path)
+    lod_path = tmp_path / "lod.stl"
+    monkeypatch.setattr(PrintAnalysisService, "MAX_FACE_COUNT", 10000)
+    monkeypatch.setattr(PrintAnalysisService, "STREAM_FACE_LIMIT", 50000)
+
+    first = PrintAnalysisService.analyze(str(path), file_type="stl", lod_path=str(lod_path))
+    checks = first["checks"]
+    assert checks["features_source"] == "stream" and checks["analysis_streamed"]
+    assert checks["face_count"] == 81920 and checks["is_manifold"]
+    assert checks["lod"]["target_faces"] == 5000 and not checks["lod"]["cached"]
+    assert checks["lod"]["source_faces"] == 81920
+    assert checks["overhang_source"] == "lod" and checks["overhang_fdm_pct"] is not None
+    assert checks["min_wall_thickness_mm"] is not None
+    assert lod_path.stat().st_size == 84 + 50 * checks["lod"]["faces"]
+
+    second = PrintAnalysisService.analyze(str(path), file_type="stl", lod_path=str(lod_path))
+    assert second["checks"]["lod"]["cached"]
+    assert second["checks"]["lod"]["faces"] == checks["lod"]["faces"]
+    assert mesh_lod_service.stats()["built"] == 1
+
+
+def test_repair_keeps_full_resolution_above_the_meshfix_limit(tmp_path, monkeypatch):
+    path = tmp_path / "sphere.glb"  # indexed, so the full-resolution pass sees one shell
+    path.write_bytes(trimesh.creation.icosphere(subdivisions=6, radius=20).export(file_type="glb"))
+    monkeypatch.setattr(StlRepairService, "PYMESHFIX_FACE_LIMIT", 30000)
+
+    result = _repair_file(str(path), file_type="glb")
+
+    assert result["ok"] and result["lod"]["target_faces"] == 20000
+    assert result["before"]["faces"] == 81920
+    # the LOD only feeds the diagnostic MeshFix pass; the STL is full size
+    assert result["after"]["faces"] == 81920
+    assert len(result["stl_bytes"]) == 84 + 50 * 81920
+    assert result["lod"]["repair"]["after"]["faces"] <= 20000 * mesh_lod_service.CLUSTER_OVERSHOOT
+    assert any("simplified copy repairs cleanly" in w for w in result["warnings"])
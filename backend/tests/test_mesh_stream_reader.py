@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+trimesh = pytest.importorskip("trimesh")
+
+from backend.services import mesh_stream_reader
+from backend.services.mesh_conversion_service import load_mesh
+from backend.services.mesh_feature_store import compute_features, features_from_scan
+from backend.services.print_analysis_service import PrintAnalysisService
+
+KEYS = ("face_count", "is_watertight", "boundary_edges", "non_manifold_edges", "degenerate_faces")
+
+
+def _assert_matches(features, expected):
+    for key in KEYS:
+        assert features[key] == expected[key], key
+    assert np.allclose(features["bounds"], expected["bounds"])
+    assert features["surface_area"] == pytest.approx(expected["surface_area"])
+    if expected["volume"] is None:
+        assert features["volume"] is None
+    else:
+        assert features["volume"] == pytest.approx(expected["volume"])
+
+
+@pytest.mark.parametrize("file_type", ["stl", "glb"])
+def test_scan_matches_loaded_mesh(file_type):
+    sphere = trimesh.creation.icosphere(subdivisions=3)
+    open_sphere = sphere.copy()
+    open_sphere.update_faces(np.arange(5, len(sphere.faces)))
+
+    for mesh in (trimesh.creation.box(extents=(10, 20, 30)), sphere, open_sphere):
+        scan = mesh_stream_reader.scan(mesh.export(file_type=file_type), file_type)
+        _assert_matches(features_from_scan(scan), compute_features(mesh))
+
+
+def test_glb_node_transforms_are_applied():
+    box = trimesh.creation.box(extents=(10, 20, 30))
+    scene = trimesh.Scene()
+    scene.add_geometry(box, transform=trimesh.transformations.translation_matrix((100, 0, 0)))
+    scene.add_geometry(trimesh.creation.icosphere(), transform=np.diag([2.0, 2.0, 2.0, 1.0]))
+    scene.add_geometry(box, transform=np.diag([-1.0, 1.0, 1.0, 1.0]))  # mirrored instance
+    data = scene.export(file_type="glb")
+
+    scan = mesh_stream_reader.scan(data, "glb")
+    assert scan["is_winding_consistent"]
+    _assert_matches(features_from_scan(scan), compute_features(load_mesh(data, "glb")))
+
+
+def test_edge_table_spills_to_disk(monkeypatch):
+    data = trimesh.creation.icosphere(subdivisions=4).export(file_type="stl")
+    in_memory = mesh_stream_reader.scan(data, "stl")
+
+    monkeypatch.setattr(mesh_stream_reader, "CHUNK_FACES", 1000)
+    monkeypatch.setattr(mesh_stream_reader, "SPILL_EDGES", 10000)
+    spilled = mesh_stream_reader.scan(data, "stl")
+
+    assert spilled["edges_spilled"] and not in_memory["edges_spilled"]
+    assert spilled["chunks"] == 6
+    for key in ("edge_count", "boundary_edges", "manifold_edges", "non_manifold_edges", "is_watertight"):
+        assert spilled[key] == in_memory[key]
+
+
+def test_ascii_stl_is_not_streamed():
+    data = trimesh.creation.box().export(file_type="stl_ascii")
+    if isinstance(data, str):
+        data = data.encode()
+
+    assert mesh_stream_reader.face_count(data, "stl") is None
+    with pytest.raises(mesh_stream_reader.StreamUnsupported):
+        mesh_stream_reader.scan(data, "stl")
+
+
+def test_analysis_streams_files_above_the_face_limit(tmp_path, monkeypatch):
+    path = tmp_path / "big.stl"
+    path.write_bytes(trimesh.creation.box(extents=(10, 20, 30)).export(file_type="stl"))
+    monkeypatch.setattr(PrintAnalysisService, "STREAM_FACE_LIMIT", 10)
+
+    result = PrintAnalysisService.analyze(str(path), file_type="stl")
+
+    checks = result["checks"]
+    assert checks["features_source"] == "stream" and checks["analysis_streamed"]
+    assert checks["is_manifold"] and checks["face_count"] == 12
+    assert checks["bounding_box_mm"] == [10.0, 20.0, 30.0]
+    assert checks["estimated_volume_cm3"] == pytest.approx(6.0)
+    assert checks["min_wall_thickness_mm"] is None and checks["overhang_fdm_pct"] is None
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+trimesh = pytest.importorskip("trimesh")
+
+from backend.services import orientation_service
+from backend.services.orientation_service import fibonacci_directions, rank_orientations
+from backend.services.print_analysis_service import PrintAnalysisService
+
+
+def _t_shape():
+    # 10 mm stem with a 40 mm slab on top: upside down it needs no support.
+    stem = trimesh.creation.box(extents=(10, 20, 10)).apply_translation((0, 10, 0))
+    slab = trimesh.creation.box(extents=(40, 5, 40)).apply_translation((0, 22.5, 0))
+    return trimesh.util.concatenate([stem, slab])
+
+
+def test_fibonacci_directions_are_unit_vectors():
+    directions = fibonacci_directions(64)
+
+    assert directions.shape == (64, 3)
+    assert (abs((directions ** 2).sum(axis=1) - 1) < 1e-9).all()
+    assert abs(directions.mean(axis=0)).max() < 0.05
+
+
+def test_t_shape_is_best_printed_upside_down():
+    ranking = rank_orientations(_t_shape(), top_k=3)
+
+    current, best = ranking["current"], ranking["best"][0]
+    assert current["label"] == "+y" and current["support_area_cm2"] == pytest.approx(16.0)
+    assert best["label"] == "-y" and best["stable"]
+    assert best["support_volume_cm3"] < current["support_volume_cm3"]
+    assert best["footprint_cm2"] == pytest.approx(16.0)
+    assert best["rotation"]["angle_deg"] == 180.0
+    assert len(ranking["best"]) == 3 and ranking["truncated"] is False
+
+
+def test_time_budget_keeps_axis_candidates(monkeypatch):
+    monkeypatch.setattr(orientation_service, "CANDIDATE_CHUNK", 6)
+    ranking = rank_orientations(_t_shape(), time_budget_seconds=0)
+
+    assert ranking["truncated"] is True
+    assert ranking["candidates_scored"] == 6
+    assert ranking["best"][0]["label"] == "-y"
+
+
+def test_print_check_reports_orientations(tmp_path):
+    path = tmp_path / "t.stl"
+    path.write_bytes(_t_shape().export(file_type="stl"))
+
+    result = PrintAnalysisService.analyze(str(path), file_type="stl")
+
+    checks = result["checks"]
+    assert checks["orientations"]["best"][0]["label"] == "-y"
+    assert checks["suggested_orientation"] == "rotate 180° around X"
+    assert any(s.startswith("Orientation tip: rotate 180° around X") for s in result["suggestions"])
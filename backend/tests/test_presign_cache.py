@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.services import s3_service
+
+
+class _FakeS3:
+    def __init__(self):
+        self.calls = []
+
+    def generate_presigned_url(self, op, Params, ExpiresIn):
+        self.calls.append((Params["Key"], ExpiresIn, Params.get("ResponseContentDisposition")))
+        return f"https://signed.example/{Params['Key']}?n={len(self.calls)}"
+
+
+@pytest.fixture
+def fake_s3(monkeypatch):
+    fake = _FakeS3()
+    monkeypatch.setattr(s3_service, "_s3", fake)
+    monkeypatch.setattr(s3_service.config, "AWS_BUCKET_MODELS", "test-bucket")
+    monkeypatch.setattr(s3_service, "_PRESIGN_REUSE_SECONDS", 900)
+    s3_service._presign_cache.clear()
+    yield fake
+    s3_service._presign_cache.clear()
+
+
+def test_batch_dedupes_and_signs_with_reuse_window(fake_s3):
+    urls = s3_service.presign_s3_keys(["a.glb", "b.png", "a.glb", ""], expires_in=3600)
+
+    assert set(urls) == {"a.glb", "b.png"}
+    assert [c[:2] for c in fake_s3.calls] == [("a.glb", 4500), ("b.png", 4500)]
+
+
+def test_cached_urls_reused_until_remaining_lifetime_drops(fake_s3, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(s3_service.time, "monotonic", lambda: clock[0])
+
+    first = s3_service.presign_s3_key("a.glb", expires_in=3600)
+    clock[0] += 600
+    assert s3_service.presign_s3_key("a.glb", expires_in=3600) == first
+    assert len(fake_s3.calls) == 1
+
+    clock[0] += 301  # 899s of the 900s window used: < 3600s would remain
+    assert s3_service.presign_s3_key("a.glb", expires_in=3600) != first
+    assert len(fake_s3.calls) == 2
+
+
+def test_disposition_is_signed_and_cached_separately(fake_s3):
+    s3_service.presign_s3_key("a.stl", expires_in=3600)
+    s3_service.presign_s3_key("a.stl", expires_in=3600, response_disposition='attachment; filename="a.stl"')
+
+    assert [c[2] for c in fake_s3.calls] == [None, 'attachment; filename="a.stl"']
+
+
+def test_week_long_links_are_not_extended_past_sigv4_limit(fake_s3):
+    s3_service.presign_s3_key("a.stl", expires_in=7 * 24 * 3600)
+    s3_service.presign_s3_key("a.stl", expires_in=7 * 24 * 3600)
+
+    assert [c[1] for c in fake_s3.calls] == [604800, 604800]
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import math
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+trimesh = pytest.importorskip("trimesh")
+
+from backend.services import print_estimate_service
+from backend.services.mesh_feature_store import compute_features
+from backend.services.print_order_pricing import compute as compute_price, compute_options
+
+SPEC = {"process": "fdm", "material": "pla", "scaled_dimensions_mm": [60, 60, 60]}
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    print_estimate_service.reset()
+    yield
+    print_estimate_service.reset()
+
+
+def _y_up(mesh):
+    # trimesh primitives are built along +Z; the build direction is +Y.
+    return mesh.apply_transform(trimesh.transformations.rotation_matrix(-math.pi / 2, (1, 0, 0)))
+
+
+def _features(mesh, content_hash=None):
+    features = compute_features(mesh)
+    if content_hash:
+        features["content_hash"] = content_hash
+    return features
+
+
+def test_shell_and_infill_volumes_for_solid_box():
+    features = _features(trimesh.creation.box(extents=(60, 60, 60)))
+    result = print_estimate_service.estimate(features, process="fdm", density=1.0, quality="standard", infill_pct=20)
+
+    # 216 cm² × 0.84 mm shell, 20% of the remaining interior, no support.
+    shell_cm3 = 216 * 0.084
+    assert result["shell_g"] == pytest.approx(shell_cm3, rel=1e-6)
+    assert result["infill_g"] == pytest.approx((216 - shell_cm3) * 0.2, rel=1e-6)
+    assert result["support_g"] == 0
+    assert result["layers"] == 300
+
+
+def test_hollow_model_prices_lighter_than_solid():
+    solid = compute_price(SPEC, "GB", features=_features(_y_up(trimesh.creation.cylinder(radius=30, height=60))))
+    hollow = compute_price(SPEC, "GB", features=_features(_y_up(trimesh.creation.annulus(r_min=28, r_max=30, height=60))))
+    bbox_only = compute_price(SPEC, "GB")
+
+    assert solid.estimate_source == hollow.estimate_source == "mesh"
+    assert bbox_only.estimate_source == "bbox" and bbox_only.material_g is None
+    assert hollow.weight_g < solid.weight_g
+    assert hollow.material_g["infill"] < solid.material_g["infill"]
+    assert hollow.material_g["support"] == solid.material_g["support"] == 0
+
+
+def test_support_depends_on_orientation():
+    stem = trimesh.creation.box(extents=(10, 20, 10)).apply_translation((0, 10, 0))
+    slab = trimesh.creation.box(extents=(40, 5, 40)).apply_translation((0, 22.5, 0))
+    features = _features(trimesh.util.concatenate([stem, slab]))
+
+    upright = features["support"]["+y"]["fdm"]
+    flipped = features["support"]["-y"]["fdm"]
+    assert upright["area_cm2"] == pytest.approx(16.0)
+    assert upright["volume_cm3"] == pytest.approx(16.0 * 2.0)  # 40×40 mm underside, 20 mm up
+    assert flipped["volume_cm3"] < upright["volume_cm3"]
+
+
+def test_options_grid_is_batched_and_cached():
+    features = _features(trimesh.creation.box(extents=(60, 60, 60)), content_hash="hash-a")
+
+    options = compute_options(SPEC, "GB", features=features)
+    assert len(options) == 4 * len(print_estimate_service.INFILL_STEPS)
+    assert {o["estimate_source"] for o in options} == {"mesh"}
+    standard = [o["weight_g"] for o in options if o["quality"] == "standard"]
+    assert standard == sorted(standard)
+
+    compute_options(SPEC, "GB", features=features)
+    single = compute_price({**SPEC, "quality": "fine", "infill_pct": 40}, "GB", features=features)
+    match = next(o for o in options if o["quality"] == "fine" and o["infill_pct"] == 40)
+    assert single.weight_g == match["weight_g"] and single.total == match["total"]
+    assert print_estimate_service.stats()["hits"] >= 1
+
+
+def test_pricing_prints_in_the_best_orientation():
+    stem = trimesh.creation.box(extents=(10, 20, 10)).apply_translation((0, 10, 0))
+    slab = trimesh.creation.box(extents=(40, 5, 40)).apply_translation((0, 22.5, 0))
+    features = _features(trimesh.util.concatenate([stem, slab]))
+
+    auto = compute_price(SPEC, "GB", features=features)
+    pinned = print_estimate_service.estimate(
+        features, process="fdm", density=1.24, quality="standard", infill_pct=20, orientation="+y",
+    )
+
+    # Flipped onto the slab, the part needs almost no support.
+    assert auto.orientation["label"] == "-y"
+    assert auto.material_g["support"] < pinned["support_g"]
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend import db
+
+
+@pytest.fixture(autouse=True)
+def _reset(monkeypatch):
+    monkeypatch.setattr(db, "_QUERY_STATS_ENABLED", True)
+    db.reset_query_stats()
+    yield
+    db.reset_query_stats()
+
+
+def test_fingerprint_collapses_literals_lists_and_whitespace():
+    a = db.fingerprint_sql("SELECT * FROM jobs  WHERE id IN (%s, %s, %s) AND status = 'done' LIMIT 50 -- hot")
+    b = db.fingerprint_sql("select * from jobs\nWHERE id IN (%s,%s) AND status = 'failed' LIMIT 10")
+
+    assert a == "SELECT * FROM jobs WHERE id IN (...) AND status = ? LIMIT ?"
+    assert a.lower() == b.lower()
+    assert db.fingerprint_sql("SELECT col_2 FROM t2") == "SELECT col_2 FROM t2"
+
+
+def test_stats_group_by_source_and_rank_by_total_time():
+    db._record_query("wallet", "SELECT balance FROM wallets WHERE id = 7", 3.0, 1)
+    db._record_query("wallet", "SELECT balance FROM wallets WHERE id = 9", 7.0, 1)
+    db._record_query("history", "SELECT * FROM history_items LIMIT 100", 40.0, 100)
+    db._record_query("history", "SELECT * FROM history_items LIMIT 100", 2.0, 0, error=True)
+
+    stats = db.query_stats(limit=5)
+
+    top, second = stats["queries"]
+    assert (top["source"], top["calls"], top["rows"], top["errors"]) == ("history", 2, 100, 1)
+    assert top["histogram"]["le_50ms"] == 1 and top["histogram"]["le_5ms"] == 1
+    assert (second["source"], second["calls"], second["mean_ms"], second["max_ms"]) == ("wallet", 2, 5.0, 7.0)
+    assert stats["total_calls"] == 4
+    assert db.query_stats(sort="calls", limit=1)["queries"][0]["calls"] == 2
+
+
+def test_pool_wait_is_tracked_per_source():
+    db._record_pool_wait("credits", 4.0)
+    db._record_pool_wait("credits", 150.0, fallback=True)
+
+    (entry,) = db.query_stats()["sources"]
+
+    assert entry["checkouts"] == 2 and entry["fallbacks"] == 1
+    assert entry["pool_wait_max_ms"] == 150.0 and entry["pool_wait_mean_ms"] == 77.0
+
+
+def test_slow_queries_sample_one_plan_per_interval(monkeypatch):
+    started = []
+    monkeypatch.setattr(db, "USE_DB", True)
+    monkeypatch.setattr(db, "_explain_running", False)
+    monkeypatch.setattr(db, "_start_plan_capture", lambda *args: started.append(args))
+
+    db._record_query("admin", "SELECT * FROM purchases WHERE created_at > %s", 900.0, 10, params=("x",))
+    db._record_query("admin", "SELECT * FROM purchases WHERE created_at > %s", 950.0, 10, params=("y",))
+    db._record_query("admin", "UPDATE jobs SET status = 'x'", 10.0, 1)
+    db._record_query("admin", "VACUUM jobs", 5000.0, 0)
+
+    assert len(started) == 1
+    assert started[0][2].startswith("SELECT * FROM purchases") and started[0][3] == ("x",)
+    slow = {q["fingerprint"].split()[0]: q["slow"] for q in db.query_stats()["queries"]}
+    assert slow == {"VACUUM": 1, "SELECT": 2, "UPDATE": 0}
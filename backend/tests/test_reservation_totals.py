@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import sys
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.services import reservation_service as rs
+from backend.services import wallet_service
+from backend.services.reservation_service import ReservationService
+
+IDENTITY = "11111111-2222-3333-4444-555555555555"
+
+
+class _Db:
+    """One wallet and its reservations; a transaction's holds vanish on rollback."""
+
+    def __init__(self, balance, reserved_total, holds=()):
+        self.balance = balance
+        self.reserved_total = reserved_total
+        self.holds = [dict(h) for h in holds]   # {"cost": int, "expired": bool}
+        self.pending = []
+        self.statements = []
+        self._result = []
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        self.statements.append(sql)
+        self._result = []
+        if sql.startswith("INSERT INTO timrx_billing.credit_reservations"):
+            cost = params[2]
+            self.pending.append({"cost": cost, "expired": False})
+            self._result = [{"id": uuid.uuid4(), "identity_id": params[0], "action_code": params[1],
+                             "cost_credits": cost, "status": "held", "credit_type": params[4],
+                             "ref_job_id": params[6]}]
+        elif sql.startswith("UPDATE timrx_billing.wallets SET reserved_total = reserved_total +"):
+            cost = params[0]
+            if self.balance - self.reserved_total >= cost:
+                self.reserved_total += cost
+                self._result = [{"balance": self.balance, "reserved": self.reserved_total}]
+        elif "FOR UPDATE" in sql and "FROM timrx_billing.wallets" in sql:
+            self._result = [{"identity_id": IDENTITY, "balance": self.balance}]
+        elif "AS live" in sql:
+            self._result = [{"live": sum(h["cost"] for h in self.holds if not h["expired"]),
+                             "held": sum(h["cost"] for h in self.holds)}]
+        elif sql.startswith("UPDATE timrx_billing.wallets SET reserved_total = %s"):
+            self.reserved_total = params[0]
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def fetchall(self):
+        return self._result
+
+
+@pytest.fixture
+def wallet(monkeypatch):
+    def install(**kwargs):
+        fake = _Db(**kwargs)
+
+        @contextmanager
+        def fake_transaction(source=""):
+            fake.pending = []
+            try:
+                yield fake
+            except Exception:
+                fake.pending = []
+                raise
+            fake.holds.extend(fake.pending)
+
+        monkeypatch.setattr(rs, "transaction", fake_transaction)
+        monkeypatch.setattr(rs.PricingService, "get_db_action_code", staticmethod(lambda key: "MESHY_TEXT_TO_3D"))
+        monkeypatch.setattr(rs.PricingService, "get_action_cost", staticmethod(lambda key: 10))
+        monkeypatch.setattr(ReservationService, "get_active_reservation_for_job", staticmethod(lambda *a: None))
+        monkeypatch.setattr(wallet_service, "invalidate_wallet_cache", lambda identity_id: None)
+        monkeypatch.setattr(rs, "_totals_columns", True)
+        return fake
+
+    rs.reset_reserve_path_stats()
+    yield install
+    rs.reset_reserve_path_stats()
+
+
+def test_fast_path_claims_the_maintained_total_without_scanning_holds(wallet):
+    fake = wallet(balance=25, reserved_total=10, holds=[{"cost": 10, "expired": False}])
+
+    result = ReservationService.reserve_credits(IDENTITY, "text_to_3d_generate", "job-1")
+
+    assert (result["balance"], result["reserved"], result["available"]) == (25, 20, 5)
+    assert not any("FROM timrx_billing.credit_reservations" in sql for sql in fake.statements)
+    # the wallet row is touched last, so its lock is held only until commit
+    assert fake.statements[-1].startswith("UPDATE timrx_billing.wallets SET reserved_total = reserved_total +")
+    assert "balance_credits - reserved_total >= %s" in fake.statements[-1]
+    assert rs.reserve_path_stats()["fast"] == 1
+
+
+def test_refused_claim_falls_back_to_exact_check_and_resyncs(wallet):
+    # 10 of the 20 counted are an expired hold the cleanup hasn't released yet
+    fake = wallet(balance=25, reserved_total=20,
+                  holds=[{"cost": 10, "expired": False}, {"cost": 10, "expired": True}])
+
+    result = ReservationService.reserve_credits(IDENTITY, "text_to_3d_generate", "job-2")
+
+    assert (result["reserved"], result["available"]) == (20, 5)
+    assert len(fake.holds) == 3          # the fast path's hold was rolled back, not duplicated
+    assert fake.reserved_total == 30     # expired hold stays counted until it is released
+    assert rs.reserve_path_stats() == {"fast": 0, "exact": 1, "rejected": 0, "resynced_wallets": 0}
+
+
+def test_insufficient_credits_still_raise_with_the_exact_breakdown(wallet):
+    fake = wallet(balance=15, reserved_total=10, holds=[{"cost": 10, "expired": False}])
+
+    with pytest.raises(ValueError) as exc:
+        ReservationService.reserve_credits(IDENTITY, "text_to_3d_generate", "job-3")
+
+    assert str(exc.value) == "INSUFFICIENT_GENERAL_CREDITS:required=10:balance=15:reserved=10:available=5"
+    assert len(fake.holds) == 1 and fake.reserved_total == 10
+    assert rs.reserve_path_stats()["rejected"] == 1
+
+
+def test_without_migration_093_only_the_locked_path_runs(wallet, monkeypatch):
+    fake = wallet(balance=25, reserved_total=0, holds=[{"cost": 10, "expired": False}])
+    monkeypatch.setattr(rs, "_totals_columns", False)
+
+    result = ReservationService.reserve_credits(IDENTITY, "text_to_3d_generate", "job-4")
+
+    assert (result["reserved"], result["available"]) == (20, 5)
+    assert len(fake.holds) == 2
+    assert not any("reserved_total" in sql for sql in fake.statements)
+    assert ReservationService.resync_reserved_totals() == 0
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.db import Tables
+from backend.services import retention_service as retention
+
+UTC = timezone.utc
+
+
+class _Db:
+    """Scripted cursor: column lists, batch bounds and move row counts."""
+
+    def __init__(self, columns, bounds, moves, partitions=(), foreign_keys=None):
+        self.columns = columns
+        self.foreign_keys = foreign_keys or {}
+        self.bounds = list(bounds)
+        self.moves = list(moves)
+        self.partitions = set(partitions)
+        self.statements = []
+        self.transactions = 0
+        self._result = None
+        self.rowcount = -1
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        self.statements.append((sql, params))
+        if "information_schema.columns" in sql:
+            self._result = [{"column_name": c} for c in self.columns.get(".".join(params), [])]
+        elif "pg_constraint" in sql:
+            self._result = [{"name": n} for n in self.foreign_keys.get(params[0], [])]
+        elif "AS cutoff" in sql:
+            self._result = [{"cutoff": datetime(2026, 7, 20, tzinfo=UTC)}]
+        elif "AS lo" in sql:
+            lo, hi = self.bounds.pop(0) if self.bounds else (None, None)
+            self._result = [{"lo": lo, "hi": hi}]
+        elif "to_regclass" in sql:
+            self._result = [{"present": params[0] in self.partitions}]
+        elif sql.startswith("CREATE TABLE"):
+            self.partitions.add(sql.split()[5])
+        elif sql.startswith("WITH batch"):
+            self.rowcount = self.moves.pop(0)
+
+    def fetchone(self):
+        return self._result[0]
+
+    def fetchall(self):
+        return self._result
+
+
+@pytest.fixture
+def db(monkeypatch):
+    def install(**kwargs):
+        fake = _Db(**kwargs)
+
+        @contextmanager
+        def fake_transaction(source=""):
+            fake.transactions += 1
+            yield fake
+
+        monkeypatch.setattr(retention, "USE_DB", True)
+        monkeypatch.setattr(retention, "transaction", fake_transaction)
+        monkeypatch.setattr(retention, "BATCH_ROWS", 100)
+        monkeypatch.setattr(retention, "ARCHIVE_MONTHS", 0)
+        return fake
+
+    retention.reset()
+    yield install
+    retention.reset()
+
+
+def test_moves_batches_until_drained_and_creates_monthly_partitions(db):
+    fake = db(
+        columns={Tables.JOBS: ["id", "status", "created_at"], Tables.JOBS_ARCHIVE: ["id", "status", "created_at", "note"]},
+        bounds=[
+            (datetime(2026, 1, 30, tzinfo=UTC), datetime(2026, 3, 2, tzinfo=UTC)),
+            (datetime(2026, 3, 2, tzinfo=UTC), datetime(2026, 3, 9, tzinfo=UTC)),
+        ],
+        moves=[100, 40],
+        partitions={f"{Tables.JOBS_ARCHIVE}_p202601"},
+    )
+
+    result = retention._run_policy(retention.JOBS)
+
+    assert (result["moved"], result["batches"], result["partitions_created"]) == (140, 2, 2)
+    assert fake.partitions == {f"{Tables.JOBS_ARCHIVE}_p2026{m:02d}" for m in (1, 2, 3)}
+    create = next(sql for sql, _ in fake.statements if sql.startswith("CREATE TABLE"))
+    assert "FOR VALUES FROM ('2026-02-01T00:00:00+00:00') TO ('2026-03-01T00:00:00+00:00')" in create
+
+    (move_sql, params), _ = [(s, p) for s, p in fake.statements if s.startswith("WITH batch")]
+    assert f"INSERT INTO {Tables.JOBS_ARCHIVE} (id, status, created_at) SELECT id, status, created_at FROM moved" in move_sql
+    assert "FOR UPDATE SKIP LOCKED" in move_sql and "r.status = 'held'" in move_sql
+    # succeeded-but-never-billed jobs stay for reconciliation
+    assert "t.reservation_id IS NULL" in move_sql and "le.amount_credits < 0" in move_sql
+    assert "ready_unbilled" not in params["statuses"] and "failed" in params["statuses"]
+    assert params["hi"] == datetime(2026, 3, 2, tzinfo=UTC)
+
+
+def test_table_is_skipped_when_archive_lacks_a_hot_column(db):
+    fake = db(
+        columns={Tables.JOBS: ["id", "created_at", "new_col"], Tables.JOBS_ARCHIVE: ["id", "created_at"]},
+        bounds=[], moves=[],
+    )
+
+    result = retention._run_policy(retention.JOBS)
+
+    assert result["skipped"] == "archive_missing_columns" and result["missing"] == ["new_col"]
+    assert not any(sql.startswith("WITH batch") for sql, _ in fake.statements)
+
+
+def test_expired_archive_partitions_are_dropped_whole(db, monkeypatch):
+    fake = db(columns={}, bounds=[], moves=[])
+    monkeypatch.setattr(retention, "ARCHIVE_MONTHS", 12)
+    now = datetime.now(UTC)
+    old = retention._add_months(retention._month_start(now), -13)
+    recent = retention._add_months(retention._month_start(now), -6)
+    fake.execute = lambda sql, params=None: fake.statements.append((" ".join(sql.split()), params))
+    fake.fetchall = lambda: [{"name": f"jobs_archive_p{old:%Y%m}"}, {"name": f"jobs_archive_p{recent:%Y%m}"}]
+
+    assert retention._drop_expired_partitions(retention.JOBS) == 1
+    assert fake.statements[-1][0] == f"DROP TABLE IF EXISTS timrx_billing.jobs_archive_p{old:%Y%m}"
+
+
+
+def test_jobs_are_not_moved_while_reservations_reference_them(db):
+    # ON DELETE SET NULL would null ref_job_id on every finalized/released
+    # reservation of an archived job; until migration 095 drops the key the
+    # mover must not delete from jobs at all.
+    fake = db(
+        columns={Tables.JOBS: ["id", "created_at"], Tables.JOBS_ARCHIVE: ["id", "created_at"]},
+        bounds=[(datetime(2026, 1, 30, tzinfo=UTC), datetime(2026, 1, 31, tzinfo=UTC))], moves=[5],
+        foreign_keys={Tables.JOBS: ["fk_reservations_ref_job"]},
+    )
+
+    result = retention._run_policy(retention.JOBS)
+
+    assert result["skipped"] == "referenced_by_foreign_key"
+    assert result["foreign_keys"] == ["fk_reservations_ref_job"]
+    assert not any(sql.startswith(("WITH batch", "DELETE")) for sql, _ in fake.statements)
+    assert not any(Tables.CREDIT_RESERVATIONS in sql and "UPDATE" in sql for sql, _ in fake.statements)
+
+
+def test_admin_job_search_includes_archived_jobs(monkeypatch):
+    from backend.services import admin_service
+
+    seen = []
+    monkeypatch.setattr(admin_service, "query_one", lambda sql, params=None: seen.append(sql) or {"count": 0})
+    monkeypatch.setattr(admin_service, "query_all", lambda sql, params=None: seen.append(sql) or [])
+
+    admin_service.AdminService.list_jobs(status="completed")
+
+    assert len(seen) == 2
+    assert all(f"FROM {Tables.JOBS_ALL} j" in sql for sql in seen)
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.services import s3_content_index
+
+
+@pytest.fixture(autouse=True)
+def _fresh_index(monkeypatch):
+    # In-process tier only: no bucket means the DB tier is never consulted.
+    monkeypatch.setattr(s3_content_index, "_bucket", lambda: None)
+    s3_content_index.reset()
+    yield
+    s3_content_index.reset()
+
+
+def test_recorded_key_resolves_without_head():
+    assert s3_content_index.lookup_key("images/openai/abc.png") is False
+
+    s3_content_index.record("images/openai/abc.png", "abc")
+
+    assert s3_content_index.lookup_key("images/openai/abc.png") is True
+    stats = s3_content_index.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_hash_lookup_is_scoped_and_suffix_checked():
+    s3_content_index.record("images/user-1/photo_1a2b.png", "h1", scope="images/user-1/")
+
+    assert s3_content_index.lookup_hash("h1", "images/user-1/", suffix=".png") == "images/user-1/photo_1a2b.png"
+    assert s3_content_index.lookup_hash("h1", "images/user-2/", suffix=".png") is None
+    assert s3_content_index.lookup_hash("h1", "images/user-1/", suffix=".jpg") is None
+
+
+def test_forget_drops_key_and_scope_entries():
+    s3_content_index.record("images/user-1/a.png", "h1", scope="images/user-1/")
+
+    s3_content_index.forget(["images/user-1/a.png"])
+
+    assert s3_content_index.lookup_key("images/user-1/a.png") is False
+    assert s3_content_index.lookup_hash("h1", "images/user-1/", suffix=".png") is None
+
+
+def test_lru_evicts_oldest(monkeypatch):
+    monkeypatch.setattr(s3_content_index, "LRU_SIZE", 2)
+    for key in ("k1", "k2", "k3"):
+        s3_content_index.record(key, key)
+
+    assert s3_content_index.lookup_key("k1") is False
+    assert s3_content_index.lookup_key("k3") is True
+
+
+def test_lru_entries_expire_so_deletes_elsewhere_are_not_vouched_for(monkeypatch):
+    # forget() on another worker never reaches this LRU; the TTL bounds it.
+    now = [1000.0]
+    monkeypatch.setattr(s3_content_index.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(s3_content_index, "LRU_TTL_S", 60.0)
+    s3_content_index.record("images/openai/abc.png", "abc", scope="images/openai/")
+
+    now[0] += 59
+    assert s3_content_index.lookup_key("images/openai/abc.png") is True
+    now[0] += 2
+    assert s3_content_index.lookup_key("images/openai/abc.png") is False
+    assert s3_content_index.lookup_hash("abc", "images/openai/", suffix=".png") is None
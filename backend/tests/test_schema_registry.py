@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from backend.services import schema_registry
+
+
+class _Cursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if isinstance(self.rows, Exception):
+            raise self.rows
+        self.executed.append((sql, params))
+
+    def fetchone(self):
+        return next((r for r in self.rows if r["version"] == schema_registry.BOOT_VERSION), None)
+
+    def fetchall(self):
+        return [r for r in self.rows if r["version"] != schema_registry.BOOT_VERSION]
+
+
+class _Conn:
+    def __init__(self, rows):
+        self.cur = _Cursor(rows)
+        self.committed = False
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def _state():
+    schema_registry.reset()
+    yield
+    schema_registry.reset()
+
+
+def _rows(migrations):
+    return [{"version": m.version, "name": m.name, "checksum": m.checksum} for m in migrations]
+
+
+def test_discover_orders_versions_and_ignores_line_endings(tmp_path):
+    (tmp_path / "010_b.sql").write_bytes(b"SELECT 1;\n")
+    (tmp_path / "009_a.sql").write_bytes(b"SELECT 1;\r\n")
+    (tmp_path / "notes.sql").write_text("-- not a migration")
+
+    found = schema_registry.discover(tmp_path)
+
+    assert [m.version for m in found] == ["009", "010"]
+    assert found[0].checksum == found[1].checksum
+    assert schema_registry.discover(schema_registry.MIGRATIONS_DIR)[-1].version >= schema_registry.REGISTRY_MIGRATION
+
+
+def test_fingerprint_follows_migration_contents(tmp_path):
+    (tmp_path / "001_a.sql").write_text("SELECT 1;")
+    before = schema_registry.boot_fingerprint(schema_registry.discover(tmp_path))
+    (tmp_path / "001_a.sql").write_text("SELECT 2;")
+
+    assert schema_registry.boot_fingerprint(schema_registry.discover(tmp_path)) != before
+
+
+def test_boot_check_is_one_query_and_fails_closed():
+    migrations = schema_registry.discover()
+    fingerprint = schema_registry.boot_fingerprint(migrations)
+    conn = _Conn(_rows(migrations) + [{"version": "boot", "name": "boot", "checksum": fingerprint}])
+
+    assert schema_registry.check_boot(conn) and schema_registry.boot_current()
+    assert len(conn.cur.executed) == 1
+
+    assert not schema_registry.check_boot(_Conn([{"version": "boot", "name": "boot", "checksum": "old"}]))
+    assert not schema_registry.check_boot(_Conn(RuntimeError("relation does not exist")))
+    assert not schema_registry.boot_current()
+
+
+def test_stamp_requires_applied_migrations_and_a_clean_boot():
+    migrations = schema_registry.discover()
+
+    assert not schema_registry.stamp_boot(_Conn(_rows(migrations[:-1])))
+
+    schema_registry.note_boot_failure("pricing seed failed")
+    assert not schema_registry.stamp_boot(_Conn(_rows(migrations)))
+
+    schema_registry.reset()
+    conn = _Conn(_rows(migrations))
+    assert schema_registry.stamp_boot(conn) and conn.committed
+    sql, params = conn.cur.executed[-1]
+    assert params[0] == "boot" and params[2] == schema_registry.boot_fingerprint(migrations)
+    assert schema_registry.boot_current()
+
+
+def test_boot_ddl_reports_a_failed_safety_schema(monkeypatch):
+    from backend import db
+    from backend.services import prompt_safety_service
+
+    conn = _Conn([])
+    conn.close = lambda: None
+    monkeypatch.setattr(db, "_create_connection", lambda source="": conn)
+
+    monkeypatch.setattr(prompt_safety_service, "ensure_safety_schema", lambda: False)
+    assert db._ensure_schema_direct() is False
+
+    monkeypatch.setattr(prompt_safety_service, "ensure_safety_schema", lambda: True)
+    assert db._ensure_schema_direct() is True
+    assert conn.committed
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+trimesh = pytest.importorskip("trimesh")
+
+from backend.services import stl_repair_service
+from backend.services.stl_repair_service import StlRepairService, _repair_components
+
+
+def _multi_part_mesh():
+    parts = [
+        trimesh.creation.icosphere(subdivisions=3 + (i % 2)).apply_translation((i * 3.0, 0, 0))
+        for i in range(4)
+    ]
+    return trimesh.util.concatenate(parts)
+
+
+def test_serial_mode_reports_per_component_timing(monkeypatch):
+    monkeypatch.setattr(StlRepairService, "PARALLEL_WORKERS", 1)
+
+    repaired, engine, _warnings, report = _repair_components(_multi_part_mesh())
+
+    assert repaired is not None and engine.startswith("components:")
+    assert report["mode"] == "serial"
+    faces = [c["faces"] for c in report["components"]]
+    assert faces == sorted(faces, reverse=True)
+    assert all(c["worker"] == "inline" and c["seconds"] is not None and c["engine"] for c in report["components"])
+
+
+def test_parallel_mode_matches_serial_output(monkeypatch):
+    monkeypatch.setattr(StlRepairService, "PARALLEL_MIN_COMPONENT_FACES", 1000)
+    monkeypatch.setattr(StlRepairService, "PARALLEL_MIN_TOTAL_FACES", 0)
+    mesh = _multi_part_mesh()
+
+    monkeypatch.setattr(StlRepairService, "PARALLEL_WORKERS", 1)
+    serial, _, _, _ = _repair_components(mesh)
+    monkeypatch.setattr(StlRepairService, "PARALLEL_WORKERS", 2)
+    parallel, _, _, report = _repair_components(mesh)
+
+    assert report["mode"] == "parallel" and report["workers"] == 2
+    assert {c["worker"] for c in report["components"]} <= {"pool", "inline"}
+    assert (serial.faces == parallel.faces).all()
+    assert serial.vertices == pytest.approx(parallel.vertices)
+
+
+def test_pool_failure_falls_back_to_serial(monkeypatch):
+    monkeypatch.setattr(StlRepairService, "PARALLEL_MIN_COMPONENT_FACES", 1)
+    monkeypatch.setattr(StlRepairService, "PARALLEL_MIN_TOTAL_FACES", 0)
+    monkeypatch.setattr(StlRepairService, "PARALLEL_WORKERS", 2)
+
+    def no_pool(*_args):
+        raise OSError("cannot start processes")
+
+    monkeypatch.setattr(stl_repair_service, "_repair_parts_parallel", no_pool)
+    repaired, _, _, report = _repair_components(_multi_part_mesh())
+
+    assert repaired is not None
+    assert report["mode"] == "serial-fallback"
+
+
+@pytest.mark.skipif("STL_REPAIR_COMPONENT_MEMORY_MB" in os.environ, reason="explicitly configured")
+def test_pool_children_share_the_repair_memory_budget():
+    workers = StlRepairService.PARALLEL_WORKERS
+    total = StlRepairService.COMPONENT_MEMORY_LIMIT_MB * (workers + 1)
+
+    assert total <= StlRepairService.REPAIR_MEMORY_LIMIT_MB
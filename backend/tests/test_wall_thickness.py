@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+trimesh = pytest.importorskip("trimesh")
+
+from backend.services import wall_thickness_service
+from backend.services.wall_thickness_service import measure_wall_thickness
+
+
+def _hollow_box(outer: float, wall: float):
+    shell = trimesh.creation.box(extents=(outer, outer, outer))
+    cavity = trimesh.creation.box(extents=[outer - 2 * wall] * 3)
+    cavity.invert()
+    return trimesh.util.concatenate([shell, cavity])
+
+
+def _hollow_sphere(radius: float, wall: float, subdivisions: int):
+    shell = trimesh.creation.icosphere(subdivisions=subdivisions, radius=radius)
+    cavity = trimesh.creation.icosphere(subdivisions=subdivisions, radius=radius - wall)
+    cavity.invert()
+    return trimesh.util.concatenate([shell, cavity])
+
+
+def test_hollow_box_reports_wall_and_regions():
+    result = measure_wall_thickness(_hollow_box(20.0, 2.0), min_wall_mm=0.8, sample_count=400)
+
+    assert result["median_mm"] == pytest.approx(2.0, abs=0.01)
+    assert result["pct_below_min"] == 0.0
+    assert sum(result["histogram"]) == result["samples"]
+    assert len(result["histogram"]) == len(result["bin_edges_mm"])
+    assert len(result["regions"]) == 8
+    assert sum(r["samples"] for r in result["regions"]) == result["samples"]
+    assert result["truncated"] is False and result["proxy"] is None
+
+
+def test_distances_are_converted_to_millimetres():
+    # 2 cm box with 0.05 cm walls: thin once expressed in mm.
+    result = measure_wall_thickness(_hollow_box(2.0, 0.05), min_wall_mm=0.8, mm_multiplier=10.0, sample_count=300)
+
+    assert result["median_mm"] == pytest.approx(0.5, abs=0.01)
+    assert result["pct_below_min"] > 50
+
+
+def test_high_poly_mesh_runs_on_proxy_with_error_bound():
+    mesh = _hollow_sphere(10.0, 1.5, subdivisions=5)
+    result = measure_wall_thickness(mesh, min_wall_mm=0.8, sample_count=300, proxy_face_limit=5000)
+
+    assert result["median_mm"] == pytest.approx(1.5, abs=0.1)
+    if result["proxy"] is not None:
+        assert result["proxy"]["faces"] < len(mesh.faces)
+        assert 0 <= result["proxy"]["error_bound_mm"] < 0.2
+
+
+def test_time_budget_truncates_between_chunks(monkeypatch):
+    monkeypatch.setattr(wall_thickness_service, "RAY_CHUNK", 64)
+    result = measure_wall_thickness(_hollow_box(20.0, 2.0), min_wall_mm=0.8, sample_count=400, time_budget_seconds=0)
+
+    assert result is None
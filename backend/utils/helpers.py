@@ -187,6 +187,7 @@ def get_extension_for_content_type(content_type: str) -> str:
         "image/jpeg": ".jpg",
         "image/jpg": ".jpg",
         "image/webp": ".webp",
+        "image/avif": ".avif",
         "application/x-fbx": ".fbx",
         "model/vnd.usdz+zip": ".usdz",
         "model/obj": ".obj",
@@ -211,6 +212,7 @@ def get_content_type_for_extension(ext: str) -> str:
         ".jpg": "image/jpeg",
         ".jpeg": "image/jpeg",
         ".webp": "image/webp",
+        ".avif": "image/avif",
     }
     return ext_map.get((ext or "").lower(), "application/octet-stream")
 
@@ -8,8 +8,6 @@ import io
 import struct
 from urllib.parse import unquote_to_bytes
 
-from PIL import Image
-
 
 IMAGE_PREFIXES = {"images", "thumbnails", "textures", "source_images"}
 IMAGE_MIME_BY_FORMAT = {
@@ -92,6 +90,8 @@ def sniff_image_content_type(data_bytes: bytes) -> str:
     if len(data_bytes) > MAX_IMAGE_BYTES:
         raise UploadValidationError("Image upload exceeds maximum size")
 
+    from PIL import Image
+
     try:
         with Image.open(io.BytesIO(data_bytes)) as img:
             img.load()
@@ -123,6 +123,8 @@ def normalize_image_bytes(data_bytes: bytes) -> tuple[bytes, str]:
     if not data_bytes:
         raise UploadValidationError("Empty image upload")
 
+    from PIL import Image
+
     try:
         with Image.open(io.BytesIO(data_bytes)) as img:
             img.load()
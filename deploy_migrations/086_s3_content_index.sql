@@ -0,0 +1,54 @@
+-- Migration 086: content-hash -> S3 key index
+--
+-- Every upload path content-addresses its objects (build_hash_s3_key and the
+-- derivative keys), so the same bytes keep landing on the same key. Until now
+-- each upload still paid an S3 HEAD to rediscover that. This table lets
+-- backend/services/s3_content_index.py answer "does this key exist?" and
+-- "do we already hold these bytes under this prefix?" without touching S3.
+--
+-- Rows are written after a successful PUT (or a HEAD that found the object)
+-- and removed by delete_s3_objects_safe / the history cleanup path. The seed
+-- below copies every key we already track with a content_hash, so the index is
+-- warm from the first deploy.
+--
+-- Idempotent: safe to run more than once.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS timrx_app.s3_content_index (
+  s3_bucket     TEXT        NOT NULL,
+  s3_key        TEXT        NOT NULL,
+  content_hash  TEXT        NOT NULL,
+  content_type  TEXT,
+  size_bytes    BIGINT,
+  created_at    TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (s3_bucket, s3_key)
+);
+
+-- Hash lookups ("which key holds these bytes?") are scoped by key prefix in
+-- the query, so the hash alone is the right entry point.
+CREATE INDEX IF NOT EXISTS idx_s3_content_index_hash
+  ON timrx_app.s3_content_index (content_hash, s3_bucket);
+
+-- Seed from the asset tables. Only the primary object of each row carries
+-- the row's content_hash; thumbnails are hashed separately and get indexed
+-- the next time they're uploaded.
+INSERT INTO timrx_app.s3_content_index (s3_bucket, s3_key, content_hash, content_type)
+SELECT s3_bucket, glb_s3_key, content_hash, 'model/gltf-binary'
+FROM timrx_app.models
+WHERE s3_bucket IS NOT NULL AND glb_s3_key IS NOT NULL AND content_hash IS NOT NULL
+ON CONFLICT (s3_bucket, s3_key) DO NOTHING;
+
+INSERT INTO timrx_app.s3_content_index (s3_bucket, s3_key, content_hash)
+SELECT s3_bucket, image_s3_key, content_hash
+FROM timrx_app.images
+WHERE s3_bucket IS NOT NULL AND image_s3_key IS NOT NULL AND content_hash IS NOT NULL
+ON CONFLICT (s3_bucket, s3_key) DO NOTHING;
+
+INSERT INTO timrx_app.s3_content_index (s3_bucket, s3_key, content_hash, content_type)
+SELECT s3_bucket, video_s3_key, content_hash, COALESCE(mime_type, 'video/mp4')
+FROM timrx_app.videos
+WHERE s3_bucket IS NOT NULL AND video_s3_key IS NOT NULL AND content_hash IS NOT NULL
+ON CONFLICT (s3_bucket, s3_key) DO NOTHING;
+
+COMMIT;
@@ -0,0 +1,40 @@
+-- Migration 087: derived-artifact store (STL / 3MF conversions, STL repairs)
+--
+-- Print-order archiving, model downloads and STL repair all derive files from
+-- a source model that is already content-hashed. This table maps
+-- (source content hash, variant) to the S3 object holding the result, where
+-- the variant is a digest of the output options (format, units, scale, ...).
+-- backend/services/derived_artifact_store.py reads it before converting, so
+-- the same model is never converted twice with the same options.
+--
+-- artifact_s3_key follows the *_s3_key naming so scripts/detect_s3_orphans.py
+-- can treat these objects as referenced.
+--
+-- Idempotent: safe to run more than once.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS timrx_app.derived_artifacts (
+  source_hash      TEXT        NOT NULL,
+  variant          TEXT        NOT NULL,
+  kind             TEXT        NOT NULL,
+  s3_bucket        TEXT        NOT NULL,
+  artifact_s3_key  TEXT        NOT NULL,
+  content_hash     TEXT,
+  content_type     TEXT,
+  size_bytes       BIGINT,
+  options          JSONB       NOT NULL DEFAULT '{}'::jsonb,
+  meta             JSONB       NOT NULL DEFAULT '{}'::jsonb,
+  hit_count        INTEGER     NOT NULL DEFAULT 0,
+  created_at       TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  last_used_at     TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (source_hash, variant)
+);
+
+CREATE INDEX IF NOT EXISTS idx_derived_artifacts_key
+  ON timrx_app.derived_artifacts (s3_bucket, artifact_s3_key);
+
+CREATE INDEX IF NOT EXISTS idx_derived_artifacts_last_used
+  ON timrx_app.derived_artifacts (last_used_at);
+
+COMMIT;
@@ -0,0 +1,34 @@
+-- Migration 088: mesh feature store
+--
+-- Print-check, STL repair, print-order pricing and the multi-color flow each
+-- re-downloaded and re-parsed the model to get the same basic geometry. This
+-- table keeps those features once per model content hash (models.content_hash),
+-- computed by backend/services/mesh_feature_store.py in a background worker:
+-- bounding box, volume, surface area, face/vertex counts, watertightness,
+-- manifold edge counts, component count and overhang stats.
+--
+-- features holds the full JSON document; the scalar columns duplicate the
+-- fields admin queries filter on. partial = the features describe only the
+-- largest part of a scene that was too large to merge.
+--
+-- Idempotent: safe to run more than once.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS timrx_app.mesh_features (
+  content_hash     TEXT        PRIMARY KEY,
+  feature_version  INTEGER     NOT NULL,
+  features         JSONB       NOT NULL,
+  face_count       INTEGER,
+  is_watertight    BOOLEAN,
+  component_count  INTEGER,
+  partial          BOOLEAN     NOT NULL DEFAULT FALSE,
+  compute_seconds  REAL,
+  created_at       TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  updated_at       TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_mesh_features_version
+  ON timrx_app.mesh_features (feature_version);
+
+COMMIT;
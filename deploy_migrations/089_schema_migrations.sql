@@ -0,0 +1,28 @@
+-- Migration 089: schema version registry
+--
+-- Every Gunicorn worker re-ran the boot DDL in db._ensure_schema_direct()
+-- (indexes, inspire columns, stl_pack_entitlements), ensure_safety_schema()
+-- and the pricing seeds on each start. This table records which
+-- deploy_migrations/*.sql files have been applied, with the sha256 of each
+-- file, so scripts/apply_migrations.py can apply only the pending ones and
+-- flag files edited after they ran.
+--
+-- The row with version = 'boot' holds the fingerprint of the boot DDL, the
+-- seed data and every recorded migration checksum
+-- (backend/services/schema_registry.py). When it matches the running code,
+-- create_app() skips all boot DDL and seeding after a single SELECT.
+--
+-- Idempotent: safe to run more than once.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS timrx_app.schema_migrations (
+  version       TEXT        PRIMARY KEY,
+  name          TEXT        NOT NULL,
+  checksum      TEXT        NOT NULL,
+  execution_ms  INTEGER,
+  applied_by    TEXT        NOT NULL DEFAULT CURRENT_USER,
+  applied_at    TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+COMMIT;
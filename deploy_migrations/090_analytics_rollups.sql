@@ -0,0 +1,64 @@
+-- Migration 090: analytics rollups
+--
+-- Admin credit/margin analytics, provider health and the monthly spend
+-- report aggregated the whole jobs and ledger_entries tables on every call.
+-- These tables hold the same aggregates pre-computed, maintained by the ops
+-- loop leader (backend/services/analytics_rollup_service.py):
+--
+--   job_rollup_hourly    jobs per hour of created_at, provider, action_code,
+--                        status and (for failed jobs) last_error_code
+--   ledger_rollup_daily  ledger_entries per day and entry_type
+--
+-- Refresh is incremental: buckets touched since the watermark in
+-- analytics_rollup_state (jobs.updated_at / ledger_entries.created_at) are
+-- recomputed from the source rows. Readers fall back to the live queries
+-- until the first backfill has finished.
+--
+-- Idempotent: safe to run more than once.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS timrx_billing.job_rollup_hourly (
+  bucket           TIMESTAMPTZ NOT NULL,
+  provider         TEXT        NOT NULL,            -- '' when jobs.provider is NULL
+  action_code      TEXT        NOT NULL,
+  status           TEXT        NOT NULL,
+  error_code       TEXT        NOT NULL DEFAULT '', -- last_error_code of failed jobs
+  jobs             INTEGER     NOT NULL,
+  cost_credits     BIGINT      NOT NULL DEFAULT 0,
+  cost_usd         NUMERIC     NOT NULL DEFAULT 0,  -- estimated_provider_cost_usd
+  latency_ms       BIGINT      NOT NULL DEFAULT 0,  -- sum of updated_at - created_at
+  last_updated_at  TIMESTAMPTZ,
+  PRIMARY KEY (bucket, provider, action_code, status, error_code)
+);
+
+CREATE TABLE IF NOT EXISTS timrx_billing.ledger_rollup_daily (
+  day          DATE    NOT NULL,
+  entry_type   TEXT    NOT NULL,
+  entries      INTEGER NOT NULL,
+  credits_in   BIGINT  NOT NULL DEFAULT 0,  -- sum of positive amount_credits
+  credits_out  BIGINT  NOT NULL DEFAULT 0,  -- sum of |negative amount_credits|
+  PRIMARY KEY (day, entry_type)
+);
+
+CREATE TABLE IF NOT EXISTS timrx_billing.analytics_rollup_state (
+  name             TEXT        PRIMARY KEY,
+  watermark        TIMESTAMPTZ,              -- NULL until the backfill is done
+  backfill_cursor  TIMESTAMPTZ,
+  backfill_until   TIMESTAMPTZ,
+  refreshed_at     TIMESTAMPTZ,
+  refresh_ms       INTEGER,
+  rollup_rows      INTEGER
+);
+
+-- Source indexes for the watermark scan and bucket recompute.
+CREATE INDEX IF NOT EXISTS idx_jobs_updated_at
+  ON timrx_billing.jobs (updated_at);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_created_at
+  ON timrx_billing.jobs (created_at);
+
+CREATE INDEX IF NOT EXISTS idx_ledger_created_at
+  ON timrx_billing.ledger_entries (created_at);
+
+COMMIT;
@@ -0,0 +1,25 @@
+-- Migration 091: admin dashboard snapshots
+--
+-- The admin dashboard summary (operational, economics, safety sections)
+-- was computed inside the admin's request on every cache miss, with a
+-- per-process cache. The ops loop leader now computes each section on its
+-- own cadence and stores the latest result here; the dashboard endpoint
+-- reads these rows and reports their age
+-- (backend/services/admin_dashboard_service.py).
+--
+-- A failed refresh keeps the last good data and records the error.
+--
+-- Idempotent: safe to run more than once.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS timrx_billing.admin_dashboard_snapshots (
+  section        TEXT        PRIMARY KEY,          -- operational | economics | safety
+  data           JSONB       NOT NULL DEFAULT '{}'::jsonb,
+  computed_at    TIMESTAMPTZ,                      -- last successful compute
+  compute_ms     INTEGER,                          -- duration of the last attempt
+  attempted_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  error          TEXT                              -- last attempt's error, NULL when ok
+);
+
+COMMIT;
@@ -0,0 +1,80 @@
+-- Migration 092: hot/archive split for jobs and notification deliveries
+--
+-- jobs and notification_deliveries grow forever while every hot path
+-- (worker claims, rescue, stall detection, video limits, admin windows)
+-- only reads the last few days. The ops loop leader now moves cold rows
+-- into monthly RANGE-partitioned archive tables
+-- (backend/services/retention_service.py), so the hot tables and their
+-- indexes stay small:
+--
+--   jobs_archive                     terminal jobs older than
+--                                    JOBS_RETENTION_DAYS
+--   notification_deliveries_archive  deliveries of campaigns that are no
+--                                    longer sending, older than
+--                                    NOTIFICATION_DELIVERY_RETENTION_DAYS
+--
+-- The hot tables themselves are not partitioned: jobs.id is referenced by
+-- credit_reservations.ref_job_id and both tables carry unique indexes that
+-- do not include created_at. Archive partitions are created on demand by
+-- the mover, one per calendar month of created_at, and can be dropped
+-- whole once history is no longer needed.
+--
+-- jobs_all / notification_deliveries_all are the read path for history
+-- (analytics rollup recompute, campaign analytics); a created_at filter on
+-- them prunes archive partitions. A migration that adds a column to a hot
+-- table must add it to the archive too and recreate the view -- until it
+-- does, the mover skips that table.
+--
+-- ledger_entries stays in one table: balances and the charge / refund /
+-- chargeback idempotency checks read all of a wallet's rows. It is
+-- append-only, so a BRIN index covers the created_at range scans.
+--
+-- Idempotent: safe to run more than once.
+
+BEGIN;
+
+-- ── jobs ─────────────────────────────────────────────────────
+CREATE TABLE IF NOT EXISTS timrx_billing.jobs_archive (
+  LIKE timrx_billing.jobs INCLUDING DEFAULTS,
+  PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_archive_identity_created
+  ON timrx_billing.jobs_archive (identity_id, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_archive_upstream
+  ON timrx_billing.jobs_archive (provider, upstream_job_id);
+
+CREATE OR REPLACE VIEW timrx_billing.jobs_all AS
+  SELECT * FROM timrx_billing.jobs
+  UNION ALL
+  SELECT * FROM timrx_billing.jobs_archive;
+
+-- ── notification deliveries (only where migration 056 has run) ──
+DO $$
+BEGIN
+  IF to_regclass('timrx_billing.notification_deliveries') IS NOT NULL THEN
+    EXECUTE $sql$
+      CREATE TABLE IF NOT EXISTS timrx_billing.notification_deliveries_archive (
+        LIKE timrx_billing.notification_deliveries INCLUDING DEFAULTS,
+        PRIMARY KEY (id, created_at)
+      ) PARTITION BY RANGE (created_at)
+    $sql$;
+    EXECUTE $sql$
+      CREATE INDEX IF NOT EXISTS idx_notification_deliveries_archive_campaign
+        ON timrx_billing.notification_deliveries_archive (campaign_id, created_at)
+    $sql$;
+    EXECUTE $sql$
+      CREATE OR REPLACE VIEW timrx_billing.notification_deliveries_all AS
+        SELECT * FROM timrx_billing.notification_deliveries
+        UNION ALL
+        SELECT * FROM timrx_billing.notification_deliveries_archive
+    $sql$;
+  END IF;
+END $$;
+
+-- ── ledger_entries ───────────────────────────────────────────
+CREATE INDEX IF NOT EXISTS idx_ledger_entries_created_brin
+  ON timrx_billing.ledger_entries USING brin (created_at);
+
+COMMIT;
@@ -0,0 +1,109 @@
+-- Migration 093: Maintained reserved totals on wallets
+--
+-- reserve_credits used to lock the wallet row, then lock and sum every held
+-- reservation of the identity to work out what was still available. Under a
+-- burst of jobs for one identity that scan (and its row locks) serialised
+-- every request behind the slowest one.
+--
+-- wallets now carries the sum of held reservation costs per credit type:
+--
+--   * reserved_total        general credits held (credit_type <> 'video')
+--   * reserved_video_total  video credits held   (credit_type =  'video')
+--
+-- so availability is one conditional statement:
+--
+--   UPDATE wallets SET reserved_total = reserved_total + :cost
+--   WHERE identity_id = :id AND balance_credits - reserved_total >= :cost
+--
+-- Who keeps the totals right:
+--
+--   * INSERT of a held reservation — counted by the inserting code
+--     (ReservationService), because the conditional UPDATE above *is* the
+--     availability check; a trigger on insert would count it twice.
+--   * every later change (finalize, release, expiry cleanup, an identity
+--     merge moving reservations, a delete) — the trigger below, by the
+--     held-cost delta of the row.
+--   * drift (rows written by code that predates this migration, manual SQL)
+--     — ReservationService.resync_reserved_totals(), run with the expired
+--     reservation cleanup.
+--
+-- The totals include held reservations past expires_at until the cleanup
+-- releases them, so the fast path can only be stricter than the old check;
+-- when it refuses, reserve_credits falls back to the exact locked check.
+--
+-- The legacy wallets.reserved_credits column is not used for this: merges
+-- zero it and it was never maintained.
+--
+-- Idempotent: safe to run more than once.
+
+BEGIN;
+
+ALTER TABLE timrx_billing.wallets
+  ADD COLUMN IF NOT EXISTS reserved_total       BIGINT NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS reserved_video_total BIGINT NOT NULL DEFAULT 0;
+
+-- The resync only looks at wallets that think they hold something.
+CREATE INDEX IF NOT EXISTS idx_wallets_reserved_nonzero
+  ON timrx_billing.wallets (identity_id)
+  WHERE reserved_total <> 0 OR reserved_video_total <> 0;
+
+CREATE OR REPLACE FUNCTION timrx_billing.apply_reservation_hold_delta()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'held' THEN
+    UPDATE timrx_billing.wallets
+       SET reserved_total = CASE WHEN OLD.credit_type = 'video' THEN reserved_total
+                                 ELSE GREATEST(0, reserved_total - OLD.cost_credits) END,
+           reserved_video_total = CASE WHEN OLD.credit_type = 'video'
+                                       THEN GREATEST(0, reserved_video_total - OLD.cost_credits)
+                                       ELSE reserved_video_total END
+     WHERE identity_id = OLD.identity_id;
+  END IF;
+  IF TG_OP = 'UPDATE' AND NEW.status = 'held' THEN
+    UPDATE timrx_billing.wallets
+       SET reserved_total = CASE WHEN NEW.credit_type = 'video' THEN reserved_total
+                                 ELSE reserved_total + NEW.cost_credits END,
+           reserved_video_total = CASE WHEN NEW.credit_type = 'video'
+                                       THEN reserved_video_total + NEW.cost_credits
+                                       ELSE reserved_video_total END
+     WHERE identity_id = NEW.identity_id;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_credit_reservations_hold_delta ON timrx_billing.credit_reservations;
+CREATE TRIGGER trg_credit_reservations_hold_delta
+  AFTER UPDATE OF status, identity_id, credit_type, cost_credits OR DELETE
+  ON timrx_billing.credit_reservations
+  FOR EACH ROW EXECUTE FUNCTION timrx_billing.apply_reservation_hold_delta();
+
+-- Backfill from the reservations held right now (expired ones included,
+-- they are still 'held' until the cleanup releases them).
+UPDATE timrx_billing.wallets w
+   SET reserved_total = t.general,
+       reserved_video_total = t.video
+  FROM (
+    SELECT w2.identity_id,
+           COALESCE(SUM(r.cost_credits) FILTER (WHERE r.credit_type IS DISTINCT FROM 'video'), 0) AS general,
+           COALESCE(SUM(r.cost_credits) FILTER (WHERE r.credit_type = 'video'), 0) AS video
+      FROM timrx_billing.wallets w2
+      LEFT JOIN timrx_billing.credit_reservations r
+        ON r.identity_id = w2.identity_id AND r.status = 'held'
+     GROUP BY w2.identity_id
+  ) t
+ WHERE w.identity_id = t.identity_id
+   AND (w.reserved_total <> t.general OR w.reserved_video_total <> t.video);
+
+COMMIT;
+
+-- ---------------------------------------------------------------------------
+-- Verification — run after applying; should return no rows.
+-- ---------------------------------------------------------------------------
+-- SELECT w.identity_id, w.reserved_total, w.reserved_video_total
+--   FROM timrx_billing.wallets w
+--  WHERE (w.reserved_total, w.reserved_video_total) IS DISTINCT FROM (
+--        SELECT COALESCE(SUM(cost_credits) FILTER (WHERE credit_type IS DISTINCT FROM 'video'), 0),
+--               COALESCE(SUM(cost_credits) FILTER (WHERE credit_type = 'video'), 0)
+--          FROM timrx_billing.credit_reservations
+--         WHERE identity_id = w.identity_id AND status = 'held');
@@ -0,0 +1,31 @@
+-- Migration 094: auth_rate_limits DDL and expiry index
+--
+-- auth_rate_limits (one fixed-window counter per scope / key / window) was
+-- created by hand and never had a migration. The auth limiter now decides
+-- most attempts in-process and adds them to these rows in batches, and the
+-- ops loop deletes rows whose window ended more than
+-- AUTH_RATE_LIMIT_RETAIN_S ago (AuthRateLimitService / sweep_expired).
+--
+-- This records the table as the application uses it, and adds the index the
+-- sweep needs so it doesn't scan every counter ever written.
+--
+-- Idempotent: safe to run more than once.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS timrx_billing.auth_rate_limits (
+  scope           TEXT        NOT NULL,
+  key_hash        TEXT        NOT NULL,
+  window_seconds  INT         NOT NULL,
+  window_start    TIMESTAMPTZ NOT NULL,
+  request_count   INT         NOT NULL DEFAULT 0,
+  created_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  last_seen_at    TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (scope, key_hash, window_seconds, window_start)
+);
+
+-- Expiry sweep: "windows that started before the retention horizon".
+CREATE INDEX IF NOT EXISTS idx_auth_rate_limits_window_start
+  ON timrx_billing.auth_rate_limits (window_start);
+
+COMMIT;
@@ -0,0 +1,37 @@
+-- Migration 095: Keep credit_reservations.ref_job_id when jobs are archived
+--
+-- Migration 092 moves cold jobs into timrx_billing.jobs_archive, and moving a
+-- row is a DELETE on jobs. fk_reservations_ref_job was declared
+-- ON DELETE SET NULL, so every archived job would have nulled ref_job_id on
+-- all of its finalized and released reservations -- the reservation-to-job
+-- link reconciliation, the admin reservation lookup and refund/dispute
+-- investigation rely on.
+--
+-- A foreign key can't point at jobs_all (a view spanning the hot table and
+-- the archive), so the constraint is dropped. ref_job_id keeps its value and
+-- resolves through Tables.JOBS_ALL. Every writer still inserts the job row
+-- before its reservation (ReservationService._insert_hold), so new links
+-- keep pointing at real jobs.
+--
+-- The retention mover refuses to touch a table that any foreign key still
+-- references, so archiving stays off until this has been applied.
+--
+-- Idempotent: safe to run more than once.
+
+BEGIN;
+
+ALTER TABLE timrx_billing.credit_reservations
+  DROP CONSTRAINT IF EXISTS fk_reservations_ref_job;
+
+-- Lookups by job (admin diagnosis, reconciliation joins, retention's
+-- held-reservation check) had no index of their own.
+CREATE INDEX IF NOT EXISTS idx_credit_reservations_ref_job
+  ON timrx_billing.credit_reservations (ref_job_id);
+
+COMMIT;
+
+-- ---------------------------------------------------------------------------
+-- Verification — run after applying; should return no rows.
+-- ---------------------------------------------------------------------------
+-- SELECT conname FROM pg_constraint
+--  WHERE contype = 'f' AND confrelid = 'timrx_billing.jobs'::regclass;
@@ -0,0 +1,24 @@
+-- Migration 096: Only trust s3_content_index rows that S3 confirmed
+--
+-- Migration 086 seeded the index from the content_hash columns of the asset
+-- tables without checking that those objects still exist. A seeded row for a
+-- key that was deleted (or never uploaded) made content_key_exists skip both
+-- the HEAD and the re-upload, so the caller linked to a missing object.
+--
+-- verified_at is set when a PUT lands or a HEAD finds the object
+-- (s3_content_index.record). Lookups only count rows with it set, so the
+-- seeded rows are ignored until the normal HEAD-on-miss path confirms them.
+--
+-- Idempotent: safe to run more than once.
+
+BEGIN;
+
+ALTER TABLE timrx_app.s3_content_index
+  ADD COLUMN IF NOT EXISTS verified_at TIMESTAMPTZ;
+
+COMMIT;
+
+-- ---------------------------------------------------------------------------
+-- Verification — rows still waiting for a PUT or HEAD to confirm them.
+-- ---------------------------------------------------------------------------
+-- SELECT COUNT(*) FROM timrx_app.s3_content_index WHERE verified_at IS NULL;
@@ -0,0 +1,33 @@
+-- Migration 097: Shared state for queued AVI -> MP4 conversions
+--
+-- POST /video/convert/avi-to-mp4?async=1 runs ffmpeg in the worker that took
+-- the upload and used to keep the job and its output in that process only.
+-- The container runs WEB_CONCURRENCY workers (and deploys run more than one
+-- instance), so a status poll or download that reached another worker got a
+-- 404.
+--
+-- The queue now writes each job's state here and uploads a finished MP4 to
+-- the models bucket (key in s3_key), so any worker can answer the poll and
+-- hand out the file (backend/services/video_conversion_store.py). Rows and
+-- their objects are deleted after a download or once expires_at passes.
+--
+-- Idempotent: safe to run more than once.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS timrx_app.video_conversions (
+  id           TEXT        PRIMARY KEY,
+  identity_id  UUID        NOT NULL,
+  status       TEXT        NOT NULL,
+  state        JSONB       NOT NULL DEFAULT '{}'::jsonb,
+  s3_key       TEXT,
+  created_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  updated_at   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  expires_at   TIMESTAMPTZ NOT NULL
+);
+
+-- Reaper: "rows whose result window has passed".
+CREATE INDEX IF NOT EXISTS idx_video_conversions_expires
+  ON timrx_app.video_conversions (expires_at);
+
+COMMIT;
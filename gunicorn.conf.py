@@ -0,0 +1,29 @@
+"""Gunicorn settings picked up from the repo root (Procfile and Dockerfile).
+
+Command-line flags still win. APP_PRELOAD=1 turns on preload_app: the master
+imports and builds the app once (boot DDL, seeding, job recovery), workers
+fork from it warm, and post_worker_init gives each worker its own DB pool,
+S3 client, job-worker identity and background threads. Use APP_PRELOAD
+rather than a bare --preload flag so create_app() knows not to start the
+job threads in the master.
+"""
+
+import os
+import sys
+
+preload_app = os.getenv("APP_PRELOAD", "").lower() in ("1", "true", "yes", "on")
+
+
+def post_worker_init(worker):
+    if not worker.cfg.preload_app:
+        return
+    app = worker.wsgi
+    module = sys.modules.get(app.import_name)
+    if module is None or not hasattr(module, "init_worker"):
+        worker.log.warning("preloaded app %s has no init_worker(); background threads not started", app.import_name)
+        return
+    if not getattr(module, "PRELOAD", False):
+        # --preload without APP_PRELOAD: create_app() already started the
+        # threads in the master, where they do not survive the fork.
+        worker.log.warning("preload_app is on but APP_PRELOAD is not set; set APP_PRELOAD=1")
+    module.init_worker(app)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Apply pending deploy_migrations/*.sql files and record them in
+timrx_app.schema_migrations with their sha256 checksums.
+
+Files already recorded are skipped. A recorded file whose checksum no longer
+matches is reported and never re-run: edit-after-apply needs a new migration.
+Once nothing is pending, the next app boot runs the boot DDL and seeding one
+last time and stamps the boot fingerprint; later boots skip both.
+
+Usage:
+    DATABASE_URL=... python scripts/apply_migrations.py --status
+    DATABASE_URL=... python scripts/apply_migrations.py
+    DATABASE_URL=... python scripts/apply_migrations.py --baseline   # record only (files already run by hand)
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import psycopg
+    from psycopg.rows import dict_row
+except Exception as exc:
+    print(f"[apply_migrations] ERROR: psycopg not available: {exc}")
+    sys.exit(1)
+
+from backend.services import schema_registry
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Apply and record deploy_migrations/*.sql.")
+    parser.add_argument("--status", action="store_true", help="Show applied/pending/changed files and exit")
+    parser.add_argument("--baseline", action="store_true", help="Record pending files as applied without running them")
+    parser.add_argument("--dir", default=None, help="Migrations directory (default: deploy_migrations/)")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("[apply_migrations] ERROR: DATABASE_URL is not set")
+        return 1
+
+    migrations = schema_registry.discover(args.dir)
+    if not migrations:
+        print("[apply_migrations] No migration files found")
+        return 1
+
+    with psycopg.connect(database_url, autocommit=True, row_factory=dict_row) as conn:
+        with conn.cursor() as cur:
+            exists = schema_registry.registry_exists(cur)
+            state = schema_registry.status(cur, migrations) if exists else {
+                "applied": [], "pending": list(migrations), "mismatched": [],
+            }
+            if args.status:
+                if not exists:
+                    print(f"[apply_migrations] {schema_registry.TABLE} does not exist yet")
+                for m in state["applied"]:
+                    print(f"  applied   {m.path.name}")
+                for m in state["pending"]:
+                    print(f"  pending   {m.path.name}")
+                for m in state["mismatched"]:
+                    print(f"  CHANGED   {m.path.name}  (checksum differs from the applied file)")
+                return 1 if state["mismatched"] else 0
+
+        done = schema_registry.apply(conn, migrations, baseline=args.baseline)
+        verb = "Recorded" if args.baseline else "Applied"
+        for m in done:
+            print(f"[apply_migrations] {verb} {m.path.name}")
+        print(f"[apply_migrations] {verb} {len(done)} migration(s); {len(state['applied'])} already recorded")
+
+        if state["mismatched"]:
+            for m in state["mismatched"]:
+                print(f"[apply_migrations] WARNING: {m.path.name} changed after it was applied")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
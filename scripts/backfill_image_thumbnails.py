@@ -2,8 +2,18 @@
 """
 Backfill Image Thumbnails Script
 ---------------------------------
-Generates 400px JPEG thumbnails for existing images that currently have
-thumbnail_url == image_url (i.e., no real thumbnail).
+Generates sized thumbnail derivatives (400px JPEG plus the WebP/AVIF variants
+configured in image_derivative_service) for existing images that currently
+have thumbnail_url == image_url (i.e., no real thumbnail).
+
+Derivatives use content-hash keys, so re-running over the same rows never
+duplicates S3 objects. Fetch/render/upload runs on --workers threads (render
+itself goes through the derivative process pool); each row is then updated on
+the main thread by image_derivative_service.apply_image_derivatives, the same
+write the finalize path uses. Progress is checkpointed to --state-file as
+a (created_at, id) keyset cursor, so an interrupted run resumes where it
+stopped. Rows that failed are recorded there too and retried first on the
+next run.
 
 Usage:
     # Dry-run (shows what would be processed):
@@ -17,11 +27,19 @@ Usage:
 
     # Process only a specific provider:
     python scripts/backfill_image_thumbnails.py --apply --provider openai
+
+    # Parallel + resumable:
+    python scripts/backfill_image_thumbnails.py --apply --workers 8 --state-file /tmp/img_thumbs.json
+
+    # Also add WebP/AVIF variants to rows that only have a legacy thumbnail:
+    python scripts/backfill_image_thumbnails.py --apply --include-legacy
 """
 import argparse
+import json
 import os
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     import psycopg
@@ -35,14 +53,11 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
     import requests
-    from backend.services.s3_service import (
-        build_hash_s3_key,
-        generate_image_thumbnail,
-        get_s3_key_from_url,
-        is_s3_url,
-        upload_bytes_to_s3,
+    from backend.services.image_derivative_service import (
+        apply_image_derivatives,
+        store_image_derivatives,
     )
-    from backend.utils import compute_sha256, unpack_upload_result
+    from backend.services.s3_service import is_s3_url
     from backend.config import AWS_BUCKET_MODELS
 except Exception as exc:
     print(f"[backfill_image_thumbnails] ERROR: cannot import backend helpers: {exc}")
@@ -50,36 +65,78 @@ except Exception as exc:
 
 APP_SCHEMA = os.getenv("APP_SCHEMA", "timrx_app")
 
-# Images where thumbnail_url equals image_url (no real thumbnail)
-IMAGES_QUERY = f"""
-SELECT id, identity_id, provider, image_url, thumbnail_url, title
+# Images where thumbnail_url equals image_url (no real thumbnail).
+CANDIDATES = f"""
+SELECT id, identity_id, provider, image_url, thumbnail_url, title, content_hash, created_at
 FROM {APP_SCHEMA}.images
 WHERE image_url IS NOT NULL
   AND image_url != ''
-  AND (thumbnail_url IS NULL OR thumbnail_url = '' OR thumbnail_url = image_url)
-ORDER BY created_at DESC
+  AND (
+    thumbnail_url IS NULL OR thumbnail_url = '' OR thumbnail_url = image_url
+    OR (%(include_legacy)s AND NOT (COALESCE(meta, '{{}}'::jsonb) ? 'derivatives'))
+  )
+  AND (%(provider)s::text IS NULL OR provider = %(provider)s::text)
+"""
+
+# Newest first, paged by keyset so the scan is resumable and never loads the
+# whole table.
+IMAGES_QUERY = f"""
+{CANDIDATES}
+  AND (%(after_created_at)s::timestamptz IS NULL OR (created_at, id) < (%(after_created_at)s::timestamptz, %(after_id)s::uuid))
+ORDER BY created_at DESC, id DESC
+LIMIT %(batch_size)s
 """.strip()
 
-IMAGES_QUERY_PROVIDER = f"""
-SELECT id, identity_id, provider, image_url, thumbnail_url, title
-FROM {APP_SCHEMA}.images
-WHERE image_url IS NOT NULL
-  AND image_url != ''
-  AND (thumbnail_url IS NULL OR thumbnail_url = '' OR thumbnail_url = image_url)
-  AND provider = %s
-ORDER BY created_at DESC
+# Rows an earlier run failed on that still have no thumbnail.
+RETRY_QUERY = f"""
+{CANDIDATES}
+  AND id = ANY(%(ids)s::uuid[])
+ORDER BY created_at DESC, id DESC
 """.strip()
 
 
+def load_state(path: str | None) -> dict:
+    if not path or not os.path.exists(path):
+        return {"after_created_at": None, "after_id": None, "failed_ids": []}
+    with open(path, "r", encoding="utf-8") as fh:
+        state = json.load(fh)
+    state.setdefault("failed_ids", [])
+    return state
+
+
+def save_state(path: str | None, state: dict) -> None:
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(state, fh, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def render_image_derivatives(row: dict) -> dict:
+    """Worker: fetch the source image and store its derivatives. No DB access."""
+    image_url = row["image_url"]
+    provider = row.get("provider") or "unknown"
+    r = requests.get(image_url, timeout=30)
+    r.raise_for_status()
+    manifest = store_image_derivatives(r.content, provider, source_hash=row.get("content_hash"))
+    if not manifest or not manifest.get("thumbnail_url"):
+        raise RuntimeError("derivative generation returned no thumbnail")
+    if not is_s3_url(manifest["thumbnail_url"]):
+        raise RuntimeError(f"upload returned non-S3 URL: {manifest['thumbnail_url']}")
+    manifest["fetched_bytes"] = len(r.content)
+    return manifest
+
+
 def backfill_image_thumbnails(
-    cur,
-    conn,
     rows: list[dict],
     apply: bool,
-    rate_limit: float = 0.1,
+    executor: ThreadPoolExecutor | None = None,
+    state: dict | None = None,
+    rate_limit: float = 0.0,
 ) -> tuple[int, int, int]:
     """
-    Process images and generate thumbnails.
+    Process one page of images and generate thumbnails.
 
     Returns:
         (success_count, skip_count, error_count)
@@ -88,100 +145,34 @@ def backfill_image_thumbnails(
     skip_count = 0
     error_count = 0
 
-    for idx, row in enumerate(rows, start=1):
-        image_id = str(row["id"])
-        image_url = row["image_url"]
-        provider = row.get("provider") or "unknown"
-        title = (row.get("title") or "")[:40]
-
-        print(f"\n[{idx}/{len(rows)}] image={image_id[:8]}... provider={provider} title={title}")
-
-        if not image_url:
-            print(f"  SKIP: no image_url")
-            skip_count += 1
-            continue
-
-        if not apply:
-            print(f"  DRY-RUN: would generate thumbnail from {image_url[:60]}...")
+    if not apply:
+        for row in rows:
+            print(f"  DRY-RUN: image={str(row['id'])[:8]}... provider={row.get('provider') or 'unknown'} "
+                  f"would render derivatives from {row['image_url'][:60]}...")
             skip_count += 1
-            continue
+        return success_count, skip_count, error_count
 
+    # Workers fetch/render/upload concurrently; results are consumed in
+    # submission order so the keyset cursor only advances past finished rows.
+    futures = [(row, executor.submit(render_image_derivatives, row)) for row in rows]
+    for row, future in futures:
+        image_id = str(row["id"])
+        title = (row.get("title") or "")[:40]
         try:
-            # Fetch image bytes
-            r = requests.get(image_url, timeout=30)
-            r.raise_for_status()
-            image_bytes = r.content
-            print(f"  Fetched {len(image_bytes)} bytes")
-
-            # Generate thumbnail
-            thumb_bytes = generate_image_thumbnail(
-                image_bytes,
-                max_size=400,
-                quality=80,
-                output_format="JPEG",
-            )
-            if not thumb_bytes:
-                print(f"  SKIP: thumbnail generation returned None")
-                skip_count += 1
-                continue
-
-            # Upload thumbnail to S3
-            thumb_hash = compute_sha256(thumb_bytes)
-            thumb_s3_key = build_hash_s3_key("thumbnails", provider, thumb_hash, "image/jpeg")
-            thumb_result = upload_bytes_to_s3(
-                thumb_bytes,
-                content_type="image/jpeg",
-                prefix="thumbnails",
-                key=thumb_s3_key,
-                return_hash=False,
-            )
-            thumb_url = unpack_upload_result(thumb_result)[0]
-
-            if not thumb_url or not is_s3_url(thumb_url):
-                print(f"  ERROR: upload returned non-S3 URL: {thumb_url}")
-                error_count += 1
-                continue
-
-            thumb_s3_key_final = get_s3_key_from_url(thumb_url)
-            print(f"  Thumbnail uploaded: {thumb_s3_key_final} ({len(thumb_bytes)} bytes)")
-
-            # Update images table
-            cur.execute(
-                f"""
-                UPDATE {APP_SCHEMA}.images
-                SET thumbnail_url = %s,
-                    thumbnail_s3_key = %s,
-                    updated_at = NOW()
-                WHERE id = %s
-                """,
-                (thumb_url, thumb_s3_key_final, image_id),
-            )
-
-            # Update history_items table
-            cur.execute(
-                f"""
-                UPDATE {APP_SCHEMA}.history_items
-                SET thumbnail_url = %s,
-                    updated_at = NOW()
-                WHERE image_id = %s
-                """,
-                (thumb_url, image_id),
-            )
-
-            conn.commit()
+            manifest = future.result()
+            if not apply_image_derivatives(image_id, manifest):
+                raise RuntimeError("images row not updated")
             success_count += 1
-            print(f"  OK: DB updated")
-
-            # Rate-limit to avoid S3 throttling
-            time.sleep(rate_limit)
-
+            variant_count = sum(len(v) for v in manifest["variants"].values())
+            print(f"  OK: image={image_id[:8]}... title={title} thumb={manifest['thumbnail_s3_key']} "
+                  f"variants={variant_count} new={len(manifest['created_keys'])}")
         except Exception as e:
-            print(f"  ERROR: {e}")
+            print(f"  ERROR: image={image_id[:8]}... {e}")
             error_count += 1
-            try:
-                conn.rollback()
-            except Exception:
-                pass
+            if state is not None and image_id not in state["failed_ids"]:
+                state["failed_ids"].append(image_id)
+        if rate_limit:
+            time.sleep(rate_limit)
 
     return success_count, skip_count, error_count
 
@@ -191,6 +182,14 @@ def main():
     parser.add_argument("--apply", action="store_true", help="Actually apply changes (default: dry-run)")
     parser.add_argument("--limit", type=int, default=0, help="Max images to process (0 = all)")
     parser.add_argument("--provider", type=str, default=None, help="Filter by provider (openai, google, nano_banana)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent fetch/render/upload workers")
+    parser.add_argument("--batch-size", type=int, default=100, help="Rows fetched per keyset page")
+    parser.add_argument("--state-file", type=str, default=None, help="JSON checkpoint for resumable runs")
+    parser.add_argument(
+        "--include-legacy",
+        action="store_true",
+        help="Also process rows with a legacy thumbnail but no derivative variants",
+    )
     args = parser.parse_args()
 
     database_url = os.getenv("DATABASE_URL")
@@ -202,10 +201,14 @@ def main():
     if database_url.startswith("postgres://"):
         database_url = database_url.replace("postgres://", "postgresql://", 1)
 
+    state = load_state(args.state_file)
+
     print(f"Backfill Image Thumbnails")
     print(f"  Mode: {'APPLY' if args.apply else 'DRY-RUN'}")
     print(f"  Limit: {args.limit or 'all'}")
     print(f"  Provider: {args.provider or 'all'}")
+    print(f"  Workers: {args.workers}")
+    print(f"  Resume from: {state['after_created_at'] or '(start)'}")
     print(f"  S3 Bucket: {AWS_BUCKET_MODELS or '(not configured)'}")
     print()
 
@@ -213,29 +216,71 @@ def main():
         print("ERROR: AWS_BUCKET_MODELS not configured — cannot upload thumbnails")
         sys.exit(1)
 
-    with psycopg.connect(database_url, row_factory=dict_row) as conn:
-        with conn.cursor() as cur:
-            if args.provider:
-                cur.execute(IMAGES_QUERY_PROVIDER, (args.provider,))
-            else:
-                cur.execute(IMAGES_QUERY)
-
-            rows = cur.fetchall()
-            if args.limit:
-                rows = rows[:args.limit]
-
-            print(f"Found {len(rows)} images needing thumbnails")
-
-            if not rows:
-                print("Nothing to do.")
-                return
-
-            success, skipped, errors = backfill_image_thumbnails(
-                cur, conn, rows, apply=args.apply
-            )
+    success = skipped = errors = processed = 0
+    executor = ThreadPoolExecutor(max_workers=max(1, args.workers)) if args.apply else None
+    try:
+        with psycopg.connect(database_url, row_factory=dict_row) as conn:
+            with conn.cursor() as cur:
+                # Rows an earlier run failed on come first; the ones that
+                # fail again are recorded again.
+                if args.apply and state["failed_ids"]:
+                    retry_ids = state["failed_ids"]
+                    state["failed_ids"] = []
+                    cur.execute(RETRY_QUERY, {
+                        "include_legacy": args.include_legacy,
+                        "provider": args.provider,
+                        "ids": retry_ids,
+                    })
+                    rows = cur.fetchall()
+                    conn.commit()
+                    print(f"\n[retry] {len(rows)} of {len(retry_ids)} previously failed images still need thumbnails")
+                    s, k, e = backfill_image_thumbnails(rows, apply=True, executor=executor, state=state)
+                    success, skipped, errors = success + s, skipped + k, errors + e
+                    processed += len(rows)
+                    save_state(args.state_file, state)
+
+                while True:
+                    batch_size = args.batch_size
+                    if args.limit:
+                        batch_size = min(batch_size, args.limit - processed)
+                        if batch_size <= 0:
+                            break
+                    cur.execute(IMAGES_QUERY, {
+                        "include_legacy": args.include_legacy,
+                        "provider": args.provider,
+                        "after_created_at": state["after_created_at"],
+                        "after_id": state["after_id"],
+                        "batch_size": batch_size,
+                    })
+                    rows = cur.fetchall()
+                    conn.commit()
+                    if not rows:
+                        break
+
+                    print(f"\n[page] {len(rows)} images (processed so far: {processed})")
+                    s, k, e = backfill_image_thumbnails(
+                        rows, apply=args.apply, executor=executor, state=state
+                    )
+                    success, skipped, errors = success + s, skipped + k, errors + e
+                    processed += len(rows)
+
+                    # Dry-runs keep paging in memory but never move the saved cursor.
+                    last = rows[-1]
+                    state["after_created_at"] = last["created_at"].isoformat()
+                    state["after_id"] = str(last["id"])
+                    if args.apply:
+                        save_state(args.state_file, state)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    if processed == 0:
+        print("Nothing to do.")
 
     print(f"\n{'=' * 40}")
     print(f"Results: {success} succeeded, {skipped} skipped, {errors} errors")
+    if state["failed_ids"]:
+        print(f"Failed ids recorded in state: {len(state['failed_ids'])} (retried on the next run)")
     if not args.apply:
         print("(dry-run — no changes made. Use --apply to run for real)")
 
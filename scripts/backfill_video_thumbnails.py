@@ -4,6 +4,15 @@ Backfill Video Thumbnails Script
 ---------------------------------
 Generates thumbnails for all existing videos that don't have one.
 
+Videos already in our bucket are read through a presigned URL, so ffmpeg
+range-seeks to the poster frame instead of downloading the whole file; other
+URLs are downloaded and piped to ffmpeg. The frame goes through the image
+derivative pipeline, so every video gets the same content-hash keyed 400px
+JPEG (plus WebP/AVIF variants) that image thumbnails use. Probe, frame
+extraction and upload run on --workers threads; DB updates stay on the main
+thread and commit per row. --state-file checkpoints a (created_at, id) keyset
+cursor per table so an interrupted run resumes where it stopped.
+
 Usage:
     # Dry-run (shows what would be processed):
     python scripts/backfill_video_thumbnails.py
@@ -13,12 +22,15 @@ Usage:
 
     # Limit to N videos:
     python scripts/backfill_video_thumbnails.py --apply --limit 10
+
+    # Parallel + resumable:
+    python scripts/backfill_video_thumbnails.py --apply --workers 4 --state-file /tmp/video_thumbs.json
 """
 import argparse
-import base64
 import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     import psycopg
@@ -31,8 +43,10 @@ except Exception as exc:
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
-    from backend.services.gemini_video_service import extract_video_thumbnail, download_video_bytes
-    from backend.services.s3_service import safe_upload_to_s3, is_s3_url, get_s3_key_from_url
+    from backend.services.ffmpeg_service import inspect_video
+    from backend.services.gemini_video_service import download_video_bytes
+    from backend.services.s3_service import is_s3_url, presign_s3_url
+    from backend.services.image_derivative_service import store_image_derivatives
     from backend.config import AWS_BUCKET_MODELS
 except Exception as exc:
     print(f"[backfill_video_thumbnails] ERROR: cannot import backend helpers: {exc}")
@@ -40,165 +54,211 @@ except Exception as exc:
 
 APP_SCHEMA = os.getenv("APP_SCHEMA", "timrx_app")
 
-# Query videos that have video_url but no thumbnail_url
+# Query videos that have video_url but no thumbnail_url (keyset paged)
 VIDEO_QUERY = f"""
-SELECT v.id, v.identity_id, v.video_url, v.thumbnail_url, v.prompt, v.title
+SELECT v.id, v.identity_id, v.provider, v.video_url, v.thumbnail_url, v.prompt, v.title, v.created_at
 FROM {APP_SCHEMA}.videos v
 WHERE v.video_url IS NOT NULL
   AND v.video_url != ''
   AND (v.thumbnail_url IS NULL OR v.thumbnail_url = '')
-ORDER BY v.created_at DESC
+  AND (%(after_created_at)s::timestamptz IS NULL OR (v.created_at, v.id) < (%(after_created_at)s::timestamptz, %(after_id)s::uuid))
+ORDER BY v.created_at DESC, v.id DESC
+LIMIT %(batch_size)s
 """.strip()
 
 # Also query history_items for videos
 HISTORY_VIDEO_QUERY = f"""
-SELECT h.id, h.identity_id, h.video_url, h.thumbnail_url, h.video_id, h.prompt, h.title
+SELECT h.id, h.identity_id, h.video_url, h.thumbnail_url, h.video_id, h.prompt, h.title, h.created_at
 FROM {APP_SCHEMA}.history_items h
 WHERE h.item_type = 'video'
   AND h.video_url IS NOT NULL
   AND h.video_url != ''
   AND (h.thumbnail_url IS NULL OR h.thumbnail_url = '')
-ORDER BY h.created_at DESC
+  AND (%(after_created_at)s::timestamptz IS NULL OR (h.created_at, h.id) < (%(after_created_at)s::timestamptz, %(after_id)s::uuid))
+ORDER BY h.created_at DESC, h.id DESC
+LIMIT %(batch_size)s
 """.strip()
 
 
-def backfill_video_thumbnails(cur, rows: list[dict], apply: bool, source: str = "videos") -> int:
+def load_state(path: str | None) -> dict:
+    state = {}
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as fh:
+            state = json.load(fh)
+    for source in ("videos", "history_items"):
+        state.setdefault(source, {"after_created_at": None, "after_id": None, "failed_ids": []})
+    return state
+
+
+def save_state(path: str | None, state: dict) -> None:
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(state, fh, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def render_video_thumbnail(row: dict) -> dict:
+    """Worker: probe + extract the poster frame, store derivatives. No DB access."""
+    video_url = row["video_url"]
+    source = presign_s3_url(video_url) if is_s3_url(video_url) else None
+    if source:
+        fetched = "range"
+    else:
+        video_bytes, _ = download_video_bytes(video_url)
+        if not video_bytes:
+            raise RuntimeError("failed to download video")
+        source = video_bytes
+        fetched = len(video_bytes)
+    inspection = inspect_video(source, timestamp_sec=1.0)
+    if not inspection["poster"]:
+        raise RuntimeError("failed to extract thumbnail")
+    manifest = store_image_derivatives(inspection["poster"], row.get("provider") or "google")
+    if not manifest or not manifest.get("thumbnail_url"):
+        raise RuntimeError("failed to upload thumbnail to S3")
+    manifest["fetched"] = fetched
+    manifest["probe"] = inspection["probe"]
+    return manifest
+
+
+def apply_manifest(cur, row: dict, manifest: dict, source: str) -> None:
+    thumb_url = manifest["thumbnail_url"]
+    thumb_s3_key = manifest["thumbnail_s3_key"]
+    row_id = str(row["id"])
+
+    if source == "videos":
+        cur.execute(f"""
+            UPDATE {APP_SCHEMA}.videos
+            SET thumbnail_url = %s,
+                thumbnail_s3_key = %s,
+                updated_at = NOW()
+            WHERE id = %s
+        """, (thumb_url, thumb_s3_key, row_id))
+
+        # Also update corresponding history_items
+        cur.execute(f"""
+            UPDATE {APP_SCHEMA}.history_items
+            SET thumbnail_url = %s,
+                updated_at = NOW()
+            WHERE video_id = %s
+        """, (thumb_url, row_id))
+
+    else:  # history_items
+        cur.execute(f"""
+            UPDATE {APP_SCHEMA}.history_items
+            SET thumbnail_url = %s,
+                updated_at = NOW()
+            WHERE id = %s
+        """, (thumb_url, row_id))
+
+        # Also update videos table if video_id exists
+        video_fk = row.get("video_id")
+        if video_fk:
+            cur.execute(f"""
+                UPDATE {APP_SCHEMA}.videos
+                SET thumbnail_url = %s,
+                    thumbnail_s3_key = %s,
+                    updated_at = NOW()
+                WHERE id = %s
+            """, (thumb_url, thumb_s3_key, video_fk))
+
+
+def backfill_video_thumbnails(
+    conn,
+    cur,
+    rows: list[dict],
+    apply: bool,
+    source: str = "videos",
+    executor: ThreadPoolExecutor | None = None,
+    failed_ids: list | None = None,
+) -> int:
     """
-    Process videos and generate thumbnails.
+    Process one page of videos and generate thumbnails.
 
     Args:
+        conn: Database connection (committed per row)
         cur: Database cursor
         rows: List of video rows
         apply: Whether to actually apply changes
         source: "videos" or "history_items" table
+        executor: Worker pool for download/extract/upload
+        failed_ids: Collects ids that failed, for the state file
 
     Returns:
         Number of successfully processed videos
     """
     success_count = 0
 
-    for idx, row in enumerate(rows, start=1):
-        video_url = row.get("video_url")
-        if not video_url:
-            continue
-
-        video_id = str(row["id"])
-        user_id = row.get("identity_id")
-
-        print(f"[backfill_video_thumbnails] {source} {idx}: id={video_id} url={video_url[:80]}...")
-
-        if not apply:
-            continue
-
-        savepoint = f"bf_video_{source}_{idx}"
-        cur.execute(f"SAVEPOINT {savepoint}")
+    if not apply:
+        for row in rows:
+            print(f"[backfill_video_thumbnails] {source}: id={row['id']} url={row['video_url'][:80]}...")
+        return success_count
 
+    # Results are consumed in submission order so the cursor only advances
+    # past rows that are finished.
+    futures = [(row, executor.submit(render_video_thumbnail, row)) for row in rows]
+    for row, future in futures:
+        row_id = str(row["id"])
         try:
-            # Download video
-            print(f"  Downloading video...")
-            video_bytes, content_type = download_video_bytes(video_url)
-
-            if not video_bytes:
-                print(f"  Failed to download video, skipping")
-                cur.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
-                cur.execute(f"RELEASE SAVEPOINT {savepoint}")
-                continue
-
-            print(f"  Downloaded {len(video_bytes)} bytes")
-
-            # Extract thumbnail
-            print(f"  Extracting thumbnail...")
-            thumb_bytes = extract_video_thumbnail(video_bytes, timestamp_sec=1.0)
-
-            if not thumb_bytes:
-                print(f"  Failed to extract thumbnail, skipping")
-                cur.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
-                cur.execute(f"RELEASE SAVEPOINT {savepoint}")
-                continue
-
-            print(f"  Extracted thumbnail: {len(thumb_bytes)} bytes")
-
-            # Upload thumbnail to S3
-            thumb_b64 = f"data:image/jpeg;base64,{base64.b64encode(thumb_bytes).decode('utf-8')}"
-            user_folder = str(user_id) if user_id else "public"
-
-            s3_thumbnail_url = safe_upload_to_s3(
-                thumb_b64,
-                "image/jpeg",
-                "thumbnails",
-                f"veo_thumb_{video_id}",
-                user_id=user_id,
-                key_base=f"thumbnails/{user_folder}/{video_id}.jpg",
-                provider="google",
-            )
-
-            if not s3_thumbnail_url:
-                print(f"  Failed to upload thumbnail to S3, skipping")
-                cur.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
-                cur.execute(f"RELEASE SAVEPOINT {savepoint}")
-                continue
-
-            print(f"  Uploaded thumbnail: {s3_thumbnail_url}")
-
-            # Update database
-            thumb_s3_key = get_s3_key_from_url(s3_thumbnail_url)
-
-            if source == "videos":
-                cur.execute(f"""
-                    UPDATE {APP_SCHEMA}.videos
-                    SET thumbnail_url = %s,
-                        thumbnail_s3_key = %s,
-                        updated_at = NOW()
-                    WHERE id = %s
-                """, (s3_thumbnail_url, thumb_s3_key, video_id))
-
-                # Also update corresponding history_items
-                cur.execute(f"""
-                    UPDATE {APP_SCHEMA}.history_items
-                    SET thumbnail_url = %s,
-                        updated_at = NOW()
-                    WHERE video_id = %s
-                """, (s3_thumbnail_url, video_id))
-
-            else:  # history_items
-                cur.execute(f"""
-                    UPDATE {APP_SCHEMA}.history_items
-                    SET thumbnail_url = %s,
-                        updated_at = NOW()
-                    WHERE id = %s
-                """, (s3_thumbnail_url, video_id))
-
-                # Also update videos table if video_id exists
-                video_fk = row.get("video_id")
-                if video_fk:
-                    cur.execute(f"""
-                        UPDATE {APP_SCHEMA}.videos
-                        SET thumbnail_url = %s,
-                            thumbnail_s3_key = %s,
-                            updated_at = NOW()
-                        WHERE id = %s
-                    """, (s3_thumbnail_url, thumb_s3_key, video_fk))
-
-            cur.execute(f"RELEASE SAVEPOINT {savepoint}")
+            manifest = future.result()
+            apply_manifest(cur, row, manifest, source)
+            conn.commit()
             success_count += 1
-            print(f"  Updated database")
-
+            print(f"[backfill_video_thumbnails] {source}: id={row_id} thumb={manifest['thumbnail_s3_key']} "
+                  f"fetched={manifest['fetched']}")
         except Exception as exc:
-            cur.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
-            cur.execute(f"RELEASE SAVEPOINT {savepoint}")
-            print(f"  ERROR: {exc}")
-            import traceback
-            traceback.print_exc()
+            conn.rollback()
+            print(f"[backfill_video_thumbnails] {source}: id={row_id} ERROR: {exc}")
+            if failed_ids is not None and row_id not in failed_ids:
+                failed_ids.append(row_id)
 
     return success_count
 
 
+def run_source(conn, cur, query: str, source: str, args, state: dict, executor) -> int:
+    source_state = state[source]
+    processed = 0
+    success = 0
+    while True:
+        batch_size = args.batch_size
+        if args.limit:
+            batch_size = min(batch_size, args.limit - processed)
+            if batch_size <= 0:
+                break
+        cur.execute(query, {
+            "after_created_at": source_state["after_created_at"],
+            "after_id": source_state["after_id"],
+            "batch_size": batch_size,
+        })
+        rows = cur.fetchall()
+        conn.commit()
+        if not rows:
+            break
+        print(f"[backfill_video_thumbnails] {source} page: {len(rows)} candidates (processed so far: {processed})")
+        success += backfill_video_thumbnails(
+            conn, cur, rows, args.apply, source, executor, source_state["failed_ids"]
+        )
+        processed += len(rows)
+
+        # Dry-runs keep paging in memory but never move the saved cursor.
+        last = rows[-1]
+        source_state["after_created_at"] = last["created_at"].isoformat()
+        source_state["after_id"] = str(last["id"])
+        if args.apply:
+            save_state(args.state_file, state)
+    return success
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="Backfill video thumbnails for existing videos.")
     parser.add_argument("--apply", action="store_true", help="Actually generate and upload thumbnails.")
     parser.add_argument("--limit", type=int, default=0, help="Limit rows per pass (0 = no limit).")
     parser.add_argument("--videos-only", action="store_true", help="Only process videos table.")
     parser.add_argument("--history-only", action="store_true", help="Only process history_items table.")
+    parser.add_argument("--workers", type=int, default=2, help="Concurrent download/extract/upload workers.")
+    parser.add_argument("--batch-size", type=int, default=50, help="Rows fetched per keyset page.")
+    parser.add_argument("--state-file", type=str, default=None, help="JSON checkpoint for resumable runs.")
     args = parser.parse_args()
 
     db_url = os.getenv("DATABASE_URL", "").strip()
@@ -220,38 +280,40 @@ def main() -> int:
         safe_netloc = "unknown"
         safe_db = "unknown"
 
+    state = load_state(args.state_file)
+
     print(f"[backfill_video_thumbnails] Target DB: host={safe_netloc} db={safe_db} schema={APP_SCHEMA}")
-    print(f"[backfill_video_thumbnails] S3 bucket={AWS_BUCKET_MODELS or 'unset'} apply={args.apply} limit={args.limit}")
+    print(
+        f"[backfill_video_thumbnails] S3 bucket={AWS_BUCKET_MODELS or 'unset'} apply={args.apply} "
+        f"limit={args.limit} workers={args.workers} state_file={args.state_file or 'none'}"
+    )
 
     conn = psycopg.connect(db_url)
     with conn.cursor() as cur:
         cur.execute("SET search_path TO timrx_app, timrx_billing, public;")
+    conn.commit()
 
     total_success = 0
-
-    with conn, conn.cursor(row_factory=dict_row) as cur:
-        # Process videos table
-        if not args.history_only:
-            query = VIDEO_QUERY + (f" LIMIT {args.limit}" if args.limit else "")
-            cur.execute(query)
-            video_rows = cur.fetchall()
-            print(f"[backfill_video_thumbnails] videos table candidates: {len(video_rows)}")
-            total_success += backfill_video_thumbnails(cur, video_rows, args.apply, "videos")
-
-        # Process history_items table
-        if not args.videos_only:
-            query = HISTORY_VIDEO_QUERY + (f" LIMIT {args.limit}" if args.limit else "")
-            cur.execute(query)
-            history_rows = cur.fetchall()
-            print(f"[backfill_video_thumbnails] history_items candidates: {len(history_rows)}")
-            total_success += backfill_video_thumbnails(cur, history_rows, args.apply, "history_items")
-
-    conn.close()
+    executor = ThreadPoolExecutor(max_workers=max(1, args.workers)) if args.apply else None
+    try:
+        with conn.cursor(row_factory=dict_row) as cur:
+            # Process videos table
+            if not args.history_only:
+                total_success += run_source(conn, cur, VIDEO_QUERY, "videos", args, state, executor)
+
+            # Process history_items table
+            if not args.videos_only:
+                total_success += run_source(conn, cur, HISTORY_VIDEO_QUERY, "history_items", args, state, executor)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+        conn.close()
 
     if not args.apply:
         print("[backfill_video_thumbnails] Dry-run complete. Re-run with --apply to generate thumbnails.")
     else:
-        print(f"[backfill_video_thumbnails] Done. Successfully processed {total_success} videos.")
+        failed = len(state["videos"]["failed_ids"]) + len(state["history_items"]["failed_ids"])
+        print(f"[backfill_video_thumbnails] Done. Successfully processed {total_success} videos ({failed} failed ids in state).")
 
     return 0
 
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Mesh Pipeline Benchmark
+-----------------------
+Times the print check (PrintAnalysisService.analyze), STL repair
+(stl_repair_service._repair_file) and GLB → STL conversion
+(mesh_conversion_service.load_mesh + write_binary_stl) on a synthetic
+corpus built from trimesh primitives, so face-limit env vars can be tuned
+from numbers instead of guesswork.
+
+Every (case, stage) runs in a fresh spawned process, like production runs
+analysis and repair, so the peak RSS of one stage doesn't leak into the
+next. Per stage it records wall time (median of --repeat runs), peak RSS
+and which engine handled it (wall-thickness ray engine and proxy, LOD
+method, repair engine, ...).
+
+Runs offline on CPU-only Linux: no database, S3 or network is touched, and
+BLAS/OpenMP are pinned to one thread for stable timings.
+
+Usage:
+    # Whole corpus, results printed as a table:
+    python scripts/benchmark_mesh_pipelines.py
+
+    # Skip the high-poly cases (a few seconds instead of minutes):
+    python scripts/benchmark_mesh_pipelines.py --quick
+
+    # One case / stage:
+    python scripts/benchmark_mesh_pipelines.py --case open_shell --stage repair
+
+    # Record a baseline on this machine, then compare later runs with it
+    # (exit code 1 when a stage got slower or bigger than --tolerance):
+    python scripts/benchmark_mesh_pipelines.py --save-baseline mesh_baseline.json
+    python scripts/benchmark_mesh_pipelines.py --baseline mesh_baseline.json
+
+    # Try a different limit (applied in each stage process before import):
+    python scripts/benchmark_mesh_pipelines.py --env PRINT_ANALYSIS_WALL_FACE_LIMIT=50000
+
+    # Machine-readable results:
+    python scripts/benchmark_mesh_pipelines.py --output results.json
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STAGES = ("analyze", "repair", "convert")
+THREAD_ENV = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+# Differences below these are noise, whatever the ratio.
+MIN_SECONDS_DELTA = 0.05
+MIN_RSS_DELTA_MB = 20.0
+
+
+# ─────────────────────────────────────────────────────────────
+# Corpus
+# ─────────────────────────────────────────────────────────────
+def _box():
+    import trimesh
+
+    return trimesh.creation.box(extents=(40, 30, 20))
+
+
+def _multi_component():
+    import trimesh
+
+    parts = [
+        trimesh.creation.icosphere(subdivisions=3, radius=4).apply_translation((x * 10.0, 0, z * 10.0))
+        for x in range(6) for z in range(4)
+    ]
+    return trimesh.util.concatenate(parts)
+
+
+def _open_shell():
+    import numpy as np
+    import trimesh
+
+    sphere = trimesh.creation.icosphere(subdivisions=5, radius=25)
+    rng = np.random.default_rng(7)
+    keep = rng.random(len(sphere.faces)) > 0.02
+    return trimesh.Trimesh(vertices=sphere.vertices, faces=sphere.faces[keep], process=False)
+
+
+def _degenerate():
+    import numpy as np
+    import trimesh
+
+    box = trimesh.creation.box(extents=(30, 30, 30)).subdivide().subdivide().subdivide()
+    # Zero-area slivers: two corners on the same vertex, and three collinear points.
+    faces = np.asarray(box.faces)
+    slivers = np.column_stack([faces[:500, 0], faces[:500, 0], faces[:500, 1]])
+    vertices = np.vstack([box.vertices, [[0, 0, 0], [1, 0, 0], [2, 0, 0]]])
+    collinear = np.array([[len(box.vertices), len(box.vertices) + 1, len(box.vertices) + 2]])
+    return trimesh.Trimesh(vertices=vertices, faces=np.vstack([faces, slivers, collinear]), process=False)
+
+
+def _thin_walls():
+    import trimesh
+
+    return trimesh.creation.annulus(r_min=19.5, r_max=20, height=40, sections=256)
+
+
+def _high_poly():
+    import trimesh
+
+    return trimesh.creation.icosphere(subdivisions=7, radius=50)
+
+
+def _high_poly_scene():
+    import trimesh
+
+    scene = trimesh.Scene()
+    for i in range(4):
+        part = trimesh.creation.icosphere(subdivisions=6, radius=15)
+        scene.add_geometry(part, transform=trimesh.transformations.translation_matrix((i * 40.0, 0, 0)))
+    return scene
+
+
+# name -> (builder, file type, heavy, description)
+CASES = {
+    "box": (_box, "stl", False, "12-face watertight box"),
+    "multi_component": (_multi_component, "stl", False, "24 separate spheres, ~30k faces"),
+    "open_shell": (_open_shell, "stl", False, "sphere with 2% of faces removed (not watertight)"),
+    "degenerate": (_degenerate, "stl", False, "subdivided box plus zero-area faces"),
+    "thin_walls": (_thin_walls, "stl", False, "0.5 mm tube wall"),
+    "high_poly": (_high_poly, "stl", True, "327k-face sphere"),
+    "high_poly_scene": (_high_poly_scene, "glb", True, "4-part GLB scene, 328k faces"),
+}
+
+
+def build_corpus(names, directory):
+    """Write each case to ``directory``; returns {name: (path, file_type, faces)}."""
+    corpus = {}
+    for name in names:
+        builder, file_type, _, _ = CASES[name]
+        geometry = builder()
+        path = os.path.join(directory, f"{name}.{file_type}")
+        data = geometry.export(file_type=file_type)
+        with open(path, "wb") as fh:
+            fh.write(data if isinstance(data, bytes) else data.encode("utf-8"))
+        faces = sum(len(g.faces) for g in geometry.geometry.values()) if hasattr(geometry, "geometry") else len(geometry.faces)
+        corpus[name] = (path, file_type, int(faces))
+    return corpus
+
+
+# ─────────────────────────────────────────────────────────────
+# Stage runners (inside the spawned process)
+# ─────────────────────────────────────────────────────────────
+def _rss_mb(field):
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    """Reset VmHWM so the peak covers the stage only (Linux ≥ 4.0)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _run_analyze(path, file_type):
+    from backend.services.print_analysis_service import PrintAnalysisService
+
+    result = PrintAnalysisService.analyze(path, file_type=file_type)
+    checks = result.get("checks") or {}
+    wall = checks.get("wall_thickness") or {}
+    return {
+        "score": result.get("score"),
+        "features_source": checks.get("features_source"),
+        "streamed": bool(checks.get("analysis_streamed")),
+        "largest_part_only": bool(checks.get("analysis_limited_to_largest_part")),
+        "lod": (checks.get("lod") or {}).get("method"),
+        "wall_engine": wall.get("engine"),
+        "wall_proxy_faces": (wall.get("proxy") or {}).get("faces"),
+    }
+
+
+def _run_repair(path, file_type):
+    from backend.services.stl_repair_service import _repair_file
+
+    result = _repair_file(path, file_type=file_type)
+    report = result.get("component_repair") or {}
+    return {
+        "repaired": bool(result.get("ok")),
+        "engine": result.get("engine"),
+        "component_mode": report.get("mode") if isinstance(report, dict) else None,
+        "lod": (result.get("lod") or {}).get("method"),
+        "watertight_after": (result.get("after") or {}).get("is_watertight"),
+    }
+
+
+def _run_convert(path, file_type):
+    import io
+
+    from backend.services.mesh_conversion_service import load_mesh, write_binary_stl
+
+    with open(path, "rb") as fh:
+        mesh = load_mesh(fh.read(), file_type)
+    out = io.BytesIO()
+    write_binary_stl(mesh, out)
+    return {"engine": "binary_stl", "output_bytes": out.tell()}
+
+
+RUNNERS = {"analyze": _run_analyze, "repair": _run_repair, "convert": _run_convert}
+
+
+def _stage_child(conn, stage, path, file_type, env):
+    try:
+        for name in THREAD_ENV:
+            os.environ.setdefault(name, "1")
+        os.environ.update(env)
+        # Import before timing: module import cost is paid once per worker in production.
+        if stage == "analyze":
+            import backend.services.print_analysis_service  # noqa: F401
+        elif stage == "repair":
+            import backend.services.stl_repair_service  # noqa: F401
+        else:
+            import backend.services.mesh_conversion_service  # noqa: F401
+        rss_before = _rss_mb("VmRSS")
+        peak_reset = _reset_peak_rss()
+        started = time.perf_counter()
+        engine = RUNNERS[stage](path, file_type)
+        seconds = time.perf_counter() - started
+        peak = _rss_mb("VmHWM")
+        if not peak_reset or peak is None:
+            import resource
+
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+        conn.send({
+            "ok": True,
+            "seconds": seconds,
+            "rss_before_mb": rss_before,
+            "peak_rss_mb": peak,
+            "engine": engine,
+        })
+    except BaseException as exc:
+        conn.send({"ok": False, "error": f"{type(exc).__name__}: {exc}"})
+    finally:
+        conn.close()
+
+
+def run_stage(stage, path, file_type, env=None, timeout=600):
+    """Run one stage in a spawned process; returns its measurement dict."""
+    ctx = mp.get_context("spawn")
+    parent_conn, child_conn = ctx.Pipe(duplex=False)
+    # Not daemonic: STL repair may start its own component pool.
+    proc = ctx.Process(target=_stage_child, args=(child_conn, stage, path, file_type, dict(env or {})))
+    proc.start()
+    child_conn.close()
+    payload = None
+    try:
+        if parent_conn.poll(timeout):
+            payload = parent_conn.recv()
+    except EOFError:
+        payload = None
+    finally:
+        if proc.is_alive():
+            proc.terminate()
+        proc.join(timeout=5)
+        parent_conn.close()
+    if payload is None:
+        return {"ok": False, "error": f"no result (timeout {timeout}s or exit code {proc.exitcode})"}
+    return payload
+
+
+def measure(stage, path, file_type, repeat=1, env=None, timeout=600):
+    """Median wall time and max peak RSS over ``repeat`` runs."""
+    runs = [run_stage(stage, path, file_type, env=env, timeout=timeout) for _ in range(max(1, repeat))]
+    failed = next((r for r in runs if not r.get("ok")), None)
+    if failed:
+        return failed
+    return {
+        "ok": True,
+        "seconds": round(statistics.median(r["seconds"] for r in runs), 4),
+        "seconds_all": [round(r["seconds"], 4) for r in runs],
+        "peak_rss_mb": round(max(r["peak_rss_mb"] for r in runs), 1),
+        "stage_rss_mb": round(max(r["peak_rss_mb"] - (r["rss_before_mb"] or 0.0) for r in runs), 1),
+        "engine": runs[-1]["engine"],
+    }
+
+
+# ─────────────────────────────────────────────────────────────
+# Baseline comparison
+# ─────────────────────────────────────────────────────────────
+def compare(results, baseline, tolerance=0.25):
+    """
+    Regressions and engine changes of ``results`` against ``baseline`` (both
+    {"cases": {case: {stage: measurement}}}). A stage regresses when its
+    time or stage RSS exceeds the baseline by more than ``tolerance`` and
+    by more than the noise floor.
+    """
+    regressions, changes = [], []
+    for case, stages in results.get("cases", {}).items():
+        for stage, cur in stages.items():
+            base = baseline.get("cases", {}).get(case, {}).get(stage)
+            if not base or not base.get("ok"):
+                continue
+            label = f"{case}/{stage}"
+            if not cur.get("ok"):
+                regressions.append(f"{label}: failed ({cur.get('error')})")
+                continue
+            if (
+                cur["seconds"] > base["seconds"] * (1 + tolerance)
+                and cur["seconds"] - base["seconds"] > MIN_SECONDS_DELTA
+            ):
+                regressions.append(f"{label}: {base['seconds']:.3f}s -> {cur['seconds']:.3f}s")
+            if (
+                cur["stage_rss_mb"] > base["stage_rss_mb"] * (1 + tolerance)
+                and cur["stage_rss_mb"] - base["stage_rss_mb"] > MIN_RSS_DELTA_MB
+            ):
+                regressions.append(f"{label}: {base['stage_rss_mb']:.0f}MB -> {cur['stage_rss_mb']:.0f}MB")
+            cur_engine, base_engine = cur.get("engine") or {}, base.get("engine") or {}
+            for key in sorted(set(cur_engine) | set(base_engine)):
+                if cur_engine.get(key) != base_engine.get(key):
+                    changes.append(f"{label}: {key} {base_engine.get(key)} -> {cur_engine.get(key)}")
+    return regressions, changes
+
+
+def _environment():
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+    for module in ("numpy", "trimesh", "pymeshlab", "pymeshfix", "scipy", "rtree"):
+        try:
+            info[module] = getattr(__import__(module), "__version__", "installed")
+        except Exception:
+            info[module] = None
+    return info
+
+
+def _format_engine(engine):
+    return ", ".join(f"{k}={v}" for k, v in (engine or {}).items() if v not in (None, False, ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark mesh analysis, repair and conversion.")
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="Case to run (repeatable)")
+    parser.add_argument("--stage", action="append", choices=STAGES, help="Stage to run (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="Skip the high-poly cases")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the median time is kept")
+    parser.add_argument("--timeout", type=int, default=600, help="Seconds before a stage is killed")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Env override for the stage processes (repeatable)")
+    parser.add_argument("--baseline", help="Compare with this results file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown / growth vs baseline")
+    parser.add_argument("--save-baseline", help="Write results to this file as the new baseline")
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args()
+
+    env = {}
+    for item in args.env:
+        key, sep, value = item.partition("=")
+        if not sep:
+            parser.error(f"--env expects KEY=VALUE, got {item!r}")
+        env[key] = value
+
+    names = args.case or [n for n, spec in CASES.items() if not (args.quick and spec[2])]
+    stages = args.stage or list(STAGES)
+
+    results = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": _environment(),
+        "env_overrides": env,
+        "repeat": args.repeat,
+        "cases": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="mesh-bench-") as directory:
+        corpus = build_corpus(names, directory)
+        print(f"{'case':<18}{'stage':<9}{'faces':>9}{'time s':>9}{'peak MB':>9}{'stage MB':>10}  engine")
+        for name in names:
+            path, file_type, faces = corpus[name]
+            results["cases"][name] = {}
+            for stage in stages:
+                m = measure(stage, path, file_type, repeat=args.repeat, env=env, timeout=args.timeout)
+                m["faces"] = faces
+                results["cases"][name][stage] = m
+                if m.get("ok"):
+                    print(f"{name:<18}{stage:<9}{faces:>9,}{m['seconds']:>9.3f}{m['peak_rss_mb']:>9.0f}"
+                          f"{m['stage_rss_mb']:>10.0f}  {_format_engine(m['engine'])}")
+                else:
+                    print(f"{name:<18}{stage:<9}{faces:>9,}  FAILED: {m.get('error')}")
+
+    for target in (args.output, args.save_baseline):
+        if target:
+            with open(target, "w") as fh:
+                json.dump(results, fh, indent=2, sort_keys=True)
+            print(f"[benchmark_mesh_pipelines] Wrote {target}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        regressions, changes = compare(results, baseline, tolerance=args.tolerance)
+        for line in changes:
+            print(f"[benchmark_mesh_pipelines] CHANGED {line}")
+        for line in regressions:
+            print(f"[benchmark_mesh_pipelines] REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"[benchmark_mesh_pipelines] No regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Reservation Contention Benchmark
+--------------------------------
+Fires many concurrent reserve_credits() calls at ONE identity -- the worst
+case for the reservation path, since every request needs that identity's
+wallet row -- and reports throughput, latency percentiles and how each
+reservation was decided:
+
+- fast   claimed with the conditional reserved-total UPDATE (migration 093)
+- exact  the locked fallback (wallet lock + sum of held reservations)
+
+``--path exact`` sends every call through the locked path, which is how
+reserve_credits worked before the maintained totals, so the two runs can be
+compared on the same database.
+
+After the run it checks the invariants: the accepted holds never exceed the
+wallet balance, and the wallet's reserved total equals the sum of its held
+reservations. The scratch identity, wallet, jobs and reservations are
+deleted afterwards.
+
+Needs a real database (DATABASE_URL); nothing here is mocked.
+
+Usage:
+    DATABASE_URL=... python scripts/benchmark_reservation_contention.py
+    DATABASE_URL=... python scripts/benchmark_reservation_contention.py --threads 32 --requests 400
+    DATABASE_URL=... python scripts/benchmark_reservation_contention.py --path exact --output exact.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path for imports
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+ACTION_KEY = "text_to_3d_generate"
+
+
+def summarize(latencies_ms, wall_seconds):
+    """Throughput and latency percentiles for one run."""
+    if not latencies_ms:
+        return {"requests": 0, "per_second": 0.0}
+    ordered = sorted(latencies_ms)
+
+    def pct(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+    return {
+        "requests": len(ordered),
+        "per_second": round(len(ordered) / wall_seconds, 1) if wall_seconds > 0 else 0.0,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(ordered[-1], 2),
+        "mean_ms": round(statistics.fmean(ordered), 2),
+    }
+
+
+def check_invariants(balance, cost, accepted, reserved_total, held_sum):
+    """Problems with the end state of a run (empty when it is consistent)."""
+    problems = []
+    if accepted * cost > balance:
+        problems.append(f"overspend: {accepted} x {cost} held against a balance of {balance}")
+    if reserved_total != held_sum:
+        problems.append(f"reserved_total {reserved_total} != held reservations {held_sum}")
+    return problems
+
+
+def _setup(balance):
+    from backend.db import Tables, transaction
+
+    identity_id = str(uuid.uuid4())
+    with transaction("bench_reservation_setup") as cur:
+        cur.execute(f"INSERT INTO {Tables.IDENTITIES} (id) VALUES (%s)", (identity_id,))
+        cur.execute(
+            f"INSERT INTO {Tables.WALLETS} (identity_id, balance_credits) VALUES (%s, %s)",
+            (identity_id, balance),
+        )
+    return identity_id
+
+
+def _end_state(identity_id):
+    from backend.db import Tables, query_one
+
+    row = query_one(
+        f"""
+        SELECT w.reserved_total,
+               (SELECT COALESCE(SUM(cost_credits), 0) FROM {Tables.CREDIT_RESERVATIONS}
+                WHERE identity_id = w.identity_id AND status = 'held'
+                  AND credit_type IS DISTINCT FROM 'video') AS held_sum
+        FROM {Tables.WALLETS} w WHERE w.identity_id = %s
+        """,
+        (identity_id,),
+    )
+    return int(row["reserved_total"]), int(row["held_sum"])
+
+
+def _teardown(identity_id):
+    from backend.db import Tables, transaction
+
+    with transaction("bench_reservation_teardown") as cur:
+        cur.execute(f"UPDATE {Tables.JOBS} SET reservation_id = NULL WHERE identity_id = %s", (identity_id,))
+        cur.execute(f"DELETE FROM {Tables.CREDIT_RESERVATIONS} WHERE identity_id = %s", (identity_id,))
+        cur.execute(f"DELETE FROM {Tables.JOBS} WHERE identity_id = %s", (identity_id,))
+        cur.execute(f"DELETE FROM {Tables.WALLETS} WHERE identity_id = %s", (identity_id,))
+        cur.execute(f"DELETE FROM {Tables.IDENTITIES} WHERE id = %s", (identity_id,))
+
+
+def run(threads=16, requests=200, balance=None, path="fast"):
+    """Run ``requests`` concurrent reservations on ``threads`` threads against one identity."""
+    from backend.services import reservation_service as rs
+    from backend.services.pricing_service import PricingService
+
+    cost = PricingService.get_action_cost(ACTION_KEY)
+    action_code = PricingService.get_db_action_code(ACTION_KEY) or ACTION_KEY
+    provider = rs._derive_provider_from_action_code(action_code)
+    if balance is None:
+        balance = cost * requests // 2  # half the requests must be refused
+    identity_id = _setup(balance)
+    rs.reset_reserve_path_stats()
+    latencies, outcomes, lock = [], {"accepted": 0, "insufficient": 0, "errors": 0}, threading.Lock()
+
+    def reserve(n):
+        job_id = str(uuid.uuid4())
+        started = time.perf_counter()
+        outcome = "accepted"
+        try:
+            if path == "exact":
+                rs.ReservationService._reserve_with_exact_check(
+                    (identity_id, job_id, provider, action_code, cost, "general", 20, None),
+                    "balance_credits", "reserved_total", ACTION_KEY,
+                )
+            else:
+                rs.ReservationService.reserve_credits(identity_id, ACTION_KEY, job_id)
+        except ValueError as e:
+            outcome = "insufficient" if str(e).startswith("INSUFFICIENT_") else "errors"
+        except Exception as e:
+            print(f"[benchmark_reservation] request {n} failed: {type(e).__name__}: {e}")
+            outcome = "errors"
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.append(elapsed_ms)
+            outcomes[outcome] += 1
+
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(reserve, range(requests)))
+        wall = time.perf_counter() - started
+        reserved_total, held_sum = _end_state(identity_id)
+    finally:
+        _teardown(identity_id)
+
+    return {
+        "path": path,
+        "threads": threads,
+        "balance": balance,
+        "cost": cost,
+        "outcomes": outcomes,
+        "decided_by": rs.reserve_path_stats(),
+        "latency": summarize(latencies, wall),
+        "problems": check_invariants(balance, cost, outcomes["accepted"], reserved_total, held_sum),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent credit reservations on one identity.")
+    parser.add_argument("--threads", type=int, default=16, help="Concurrent callers")
+    parser.add_argument("--requests", type=int, default=200, help="Reservations to attempt")
+    parser.add_argument("--balance", type=int, help="Wallet balance (default: enough for half the requests)")
+    parser.add_argument("--path", choices=("fast", "exact"), default="fast",
+                        help="fast = reserve_credits, exact = always the locked path")
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        print("[benchmark_reservation] DATABASE_URL is required")
+        return 2
+
+    results = run(threads=args.threads, requests=args.requests, balance=args.balance, path=args.path)
+    lat = results["latency"]
+    print(f"{results['path']} path, {args.threads} threads, {lat['requests']} reservations on one identity: "
+          f"{lat['per_second']}/s  p50 {lat.get('p50_ms')}ms  p95 {lat.get('p95_ms')}ms  p99 {lat.get('p99_ms')}ms")
+    print(f"  outcomes: {results['outcomes']}")
+    print(f"  decided by: {results['decided_by']}")
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(results, fh, indent=2, sort_keys=True)
+        print(f"[benchmark_reservation] Wrote {args.output}")
+
+    for problem in results["problems"]:
+        print(f"[benchmark_reservation] INVARIANT {problem}")
+    return 1 if results["problems"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+App Startup Benchmark
+---------------------
+Times a cold import of backend.app_modular (module imports + create_app())
+in fresh interpreter processes, the way a gunicorn worker or a spawned
+analysis child pays for it, and lists where the time goes:
+
+- per-phase timings from create_app() (STARTUP_PROFILE, see app_modular)
+- the slowest modules by cumulative and self import time (python -X importtime)
+- which heavy libraries got imported at startup; trimesh, scipy, numpy,
+  boto3 and Pillow are meant to load on first use, so any of them showing
+  up is reported as a regression
+
+DATABASE_URL is removed from the child environment unless --with-db is
+given, so by default the app starts in degraded mode and nothing touches
+the network.
+
+Usage:
+    python scripts/benchmark_startup.py
+    python scripts/benchmark_startup.py --repeat 10 --top 30
+    python scripts/benchmark_startup.py --save-baseline startup_baseline.json
+    python scripts/benchmark_startup.py --baseline startup_baseline.json   # exit 1 on regression
+    DATABASE_URL=... python scripts/benchmark_startup.py --with-db
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+# Add parent directory to path for imports
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+HEAVY_MODULES = ("trimesh", "scipy", "numpy", "boto3", "PIL.Image", "pymeshfix", "pymeshlab")
+
+# Differences below this are noise, whatever the ratio.
+MIN_SECONDS_DELTA = 0.05
+
+_CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import backend.app_modular as m
+elapsed = time.perf_counter() - started
+print("@@STARTUP@@" + json.dumps({
+    "import_seconds": elapsed,
+    "phases": m.startup_profile(),
+    "modules": len(sys.modules),
+    "heavy": [name for name in HEAVY if name in sys.modules],
+}))
+"""
+
+
+def parse_importtime(text):
+    """Rows of ``python -X importtime`` output as dicts (times in seconds)."""
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|", 2)
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        try:
+            self_seconds, cumulative_seconds = int(self_us) / 1e6, int(cumulative_us) / 1e6
+        except ValueError:
+            continue
+        rows.append({
+            "module": name.strip(),
+            "self_seconds": self_seconds,
+            "cumulative_seconds": cumulative_seconds,
+            # importtime indents nested imports by two spaces after one leading space
+            "depth": (len(name) - len(name.lstrip(" ")) - 1) // 2,
+        })
+    return rows
+
+
+def run_once(with_db=False, env=None, timeout=120):
+    child_env = dict(os.environ)
+    if not with_db:
+        child_env.pop("DATABASE_URL", None)
+    child_env.update(env or {})
+    child_env["STARTUP_PROFILE"] = "1"
+    child_env["PYTHONDONTWRITEBYTECODE"] = "1"
+    code = f"HEAVY = {HEAVY_MODULES!r}\n" + _CHILD
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT, env=child_env, capture_output=True, text=True, timeout=timeout,
+    )
+    process_seconds = time.perf_counter() - started
+    marker = next((line for line in proc.stdout.splitlines() if line.startswith("@@STARTUP@@")), None)
+    if proc.returncode != 0 or marker is None:
+        tail = (proc.stderr or proc.stdout).strip().splitlines()[-1:] or ["no output"]
+        return {"ok": False, "error": tail[0]}
+    result = json.loads(marker[len("@@STARTUP@@"):])
+    result.update(ok=True, process_seconds=process_seconds, imports=parse_importtime(proc.stderr))
+    return result
+
+
+def measure(repeat=3, with_db=False, env=None, top=20, timeout=120):
+    """Median timings of ``repeat`` cold starts plus the import breakdown of the last one."""
+    runs = [run_once(with_db=with_db, env=env, timeout=timeout) for _ in range(max(1, repeat))]
+    failed = next((r for r in runs if not r["ok"]), None)
+    if failed:
+        return failed
+    last = runs[-1]
+    imports = last["imports"]
+    return {
+        "ok": True,
+        "import_seconds": statistics.median(r["import_seconds"] for r in runs),
+        "process_seconds": statistics.median(r["process_seconds"] for r in runs),
+        "modules": last["modules"],
+        "heavy": last["heavy"],
+        "phases": last["phases"],
+        "slowest_cumulative": [
+            (r["module"], r["cumulative_seconds"])
+            for r in sorted(imports, key=lambda r: -r["cumulative_seconds"])[:top]
+        ],
+        "slowest_self": [
+            (r["module"], r["self_seconds"]) for r in sorted(imports, key=lambda r: -r["self_seconds"])[:top]
+        ],
+    }
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Regressions of ``results`` against ``baseline``: slower startup beyond
+    ``tolerance`` (and the noise floor), or a heavy module loaded at startup."""
+    regressions = []
+    if not results.get("ok"):
+        return [f"startup failed ({results.get('error')})"]
+    for name in results.get("heavy", []):
+        regressions.append(f"{name} is imported at startup")
+    if not baseline.get("ok"):
+        return regressions
+    for key in ("import_seconds", "process_seconds"):
+        cur, base = results[key], baseline[key]
+        if cur > base * (1 + tolerance) and cur - base > MIN_SECONDS_DELTA:
+            regressions.append(f"{key}: {base:.3f}s -> {cur:.3f}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app cold-start time and import cost.")
+    parser.add_argument("--repeat", type=int, default=5, help="Cold starts; the median time is kept")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list")
+    parser.add_argument("--with-db", action="store_true", help="Keep DATABASE_URL (boot DDL check runs)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Env override for the child processes (repeatable)")
+    parser.add_argument("--timeout", type=int, default=120, help="Seconds before a start is killed")
+    parser.add_argument("--baseline", help="Compare with this results file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs baseline")
+    parser.add_argument("--save-baseline", help="Write results to this file as the new baseline")
+    parser.add_argument("--output", help="Write results JSON here")
+    args = parser.parse_args()
+
+    env = {}
+    for item in args.env:
+        key, sep, value = item.partition("=")
+        if not sep:
+            parser.error(f"--env expects KEY=VALUE, got {item!r}")
+        env[key] = value
+
+    results = measure(repeat=args.repeat, with_db=args.with_db, env=env, top=args.top, timeout=args.timeout)
+    results.update(
+        created_at=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        environment={"python": platform.python_version(), "machine": platform.machine()},
+        env_overrides=env,
+        repeat=args.repeat,
+    )
+    if not results["ok"]:
+        print(f"[benchmark_startup] FAILED: {results['error']}")
+    else:
+        print(f"app import + create_app: {results['import_seconds']:.3f}s "
+              f"(process {results['process_seconds']:.3f}s, {results['modules']} modules, median of {args.repeat})")
+        for phase in results["phases"]:
+            print(f"  phase {phase['phase']:<12}{phase['seconds']:>8.3f}s  {phase['modules']:>5} modules")
+        print("slowest imports (cumulative):")
+        for name, seconds in results["slowest_cumulative"]:
+            print(f"  {seconds:>8.3f}s  {name}")
+        print("slowest imports (self):")
+        for name, seconds in results["slowest_self"]:
+            print(f"  {seconds:>8.3f}s  {name}")
+        print(f"heavy modules at startup: {', '.join(results['heavy']) or 'none'}")
+
+    for target in (args.output, args.save_baseline):
+        if target:
+            with open(target, "w") as fh:
+                json.dump(results, fh, indent=2, sort_keys=True)
+            print(f"[benchmark_startup] Wrote {target}")
+
+    baseline = {"ok": False}
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+    regressions = compare(results, baseline, tolerance=args.tolerance)
+    for line in regressions:
+        print(f"[benchmark_startup] REGRESSION {line}")
+    if regressions:
+        return 1
+    if args.baseline:
+        print(f"[benchmark_startup] No regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -72,6 +72,7 @@ PREFIX_DB_MAP = {
     "models": [
         (f"{APP_SCHEMA}.models", "glb_s3_key"),
         (f"{APP_SCHEMA}.history_items", "glb_url"),  # contains full S3 URL
+        (f"{APP_SCHEMA}.derived_artifacts", "artifact_s3_key"),  # models/derived/ STL/3MF
     ],
     "videos": [
         (f"{APP_SCHEMA}.videos", "video_s3_key"),
@@ -83,6 +84,12 @@ PREFIX_DB_MAP = {
     ],
 }
 
+# image_derivative_service layout: thumbnails/derivatives/{provider}/{hash}/{size}{ext}
+DERIVATIVES_PREFIX = "thumbnails/derivatives/"
+DERIVATIVE_PRIMARY_NAME = "400.jpg"
+
+CONTENT_INDEX_TABLE = f"{APP_SCHEMA}.s3_content_index"
+
 
 def list_s3_keys(s3_client, bucket: str, prefix: str, max_keys: int = 0) -> list[str]:
     """List all S3 keys under a prefix using pagination."""
@@ -118,6 +125,11 @@ def check_key_referenced(cur, s3_key: str, bucket: str, table_columns: list[tupl
     - direct s3_key column match (e.g., image_s3_key = 'images/openai/abc.png')
     - full URL match (e.g., image_url LIKE '%images/openai/abc.png')
     """
+    # Derivative variants (WebP/AVIF/other sizes) are only referenced through
+    # their primary 400px JPEG sibling; keep the set alive while it is.
+    if s3_key.startswith(DERIVATIVES_PREFIX):
+        s3_key = f"{s3_key.rsplit('/', 1)[0]}/{DERIVATIVE_PRIMARY_NAME}"
+
     full_url = f"https://{bucket}.s3.{config.AWS_REGION}.amazonaws.com/{s3_key}"
 
     for table, column in table_columns:
@@ -259,6 +271,18 @@ def main():
                 print(f"  ERROR deleting batch: {e}")
             time.sleep(0.5)  # Rate limit
         print(f"Deleted {deleted} orphan objects")
+
+        # Keep the upload dedup index from vouching for deleted keys.
+        try:
+            with psycopg.connect(database_url) as conn:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        f"DELETE FROM {CONTENT_INDEX_TABLE} WHERE s3_bucket = %s AND s3_key = ANY(%s)",
+                        (bucket, all_orphans),
+                    )
+                    print(f"Removed {cur.rowcount} content-index entries")
+        except Exception as e:
+            print(f"  [WARN] Content-index cleanup failed: {e}")
     elif args.delete and not all_orphans:
         print("No orphans to delete.")
     elif all_orphans: